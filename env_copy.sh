@@ -15,3 +15,4 @@ MAIL_FROM=
 MAIL_TO=
 MAIL_TLS=
 MAIL_SSL=
+MAIL_SPOOL_PATH=
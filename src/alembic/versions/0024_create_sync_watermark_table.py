@@ -0,0 +1,35 @@
+"""create sync_watermark table
+
+Revision ID: 0024
+Revises: 0023
+Create Date: 2022-06-01 10:12:45.221873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import BINARY
+
+# revision identifiers, used by Alembic.
+revision = '0024'
+down_revision = '0023'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sync_watermark',
+                    sa.Column('id', BINARY(16), nullable=False),
+                    sa.Column('task', sa.String(length=191), nullable=False),
+                    sa.Column('security_id', BINARY(16), nullable=True),
+                    sa.Column('source_updated', sa.DateTime, nullable=True),
+                    sa.Column('row_count', sa.Integer, nullable=True),
+                    sa.Column('updated', sa.DateTime, nullable=False),
+                    sa.ForeignKeyConstraint(['security_id'], ['security.id'], ),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index(op.f('ix_sync_watermark_task_security_id'), 'sync_watermark', ['task', 'security_id'],
+                    unique=True)
+
+
+def downgrade():
+    op.drop_table('sync_watermark')
@@ -0,0 +1,33 @@
+"""add portfolio_log listing and ssn lookup indexes
+
+Revision ID: 0025
+Revises: 0024
+Create Date: 2022-06-20 10:12:44.201354
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0025'
+down_revision = '0024'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_portfolio_log_portfolio_id_status_transaction_date',
+        'portfolio_log',
+        ['portfolio_id', 'status', 'transaction_date', 'transaction_number', 'transaction_code'],
+        unique=False
+    )
+
+    op.create_index('ix_company_ssn_name', 'company', ['ssn', 'name'], unique=False)
+    op.create_index('ix_company_access_ssn_company_id', 'company_access', ['ssn', 'company_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_company_access_ssn_company_id', table_name='company_access')
+    op.drop_index('ix_company_ssn_name', table_name='company')
+    op.drop_index('ix_portfolio_log_portfolio_id_status_transaction_date', table_name='portfolio_log')
@@ -0,0 +1,41 @@
+"""create portfolio_position table
+
+Revision ID: 0026
+Revises: 0025
+Create Date: 2022-06-22 09:41:17.512093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0026'
+down_revision = '0025'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('portfolio_position',
+                    sa.Column('id', sa.BINARY(length=16), nullable=False),
+                    sa.Column('portfolio_id', sa.BINARY(length=16), nullable=False),
+                    sa.Column('security_id', sa.BINARY(length=16), nullable=False),
+                    sa.Column('total_amount', sa.DECIMAL(precision=26, scale=6), nullable=True),
+                    sa.Column('purchase_total', sa.DECIMAL(precision=22, scale=2), nullable=True),
+                    sa.ForeignKeyConstraint(['portfolio_id'], ['portfolio.id'], ),
+                    sa.ForeignKeyConstraint(['security_id'], ['security.id'], ),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+
+    op.create_index('ix_portfolio_position_portfolio_id_security_id', 'portfolio_position',
+                    ['portfolio_id', 'security_id'], unique=True)
+    op.create_index(op.f('ix_portfolio_position_security_id'), 'portfolio_position', ['security_id'], unique=False)
+
+    op.execute('INSERT INTO portfolio_position (id, portfolio_id, security_id, total_amount, purchase_total) '
+               'SELECT UNHEX(REPLACE(UUID(), "-", "")), portfolio_id, security_id, SUM(amount), SUM(purchase_c_value) '
+               'FROM portfolio_transaction GROUP BY portfolio_id, security_id')
+
+
+def downgrade():
+    op.drop_table('portfolio_position')
@@ -0,0 +1,38 @@
+"""add scope to sync_watermark
+
+Revision ID: 0027
+Revises: 0026
+Create Date: 2022-07-04 09:18:52.640117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0027'
+down_revision = '0026'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('sync_watermark', sa.Column('scope', sa.String(length=32), nullable=True))
+
+    # unique index on nullable security_id did not prevent duplicate task level rows, keep the latest one
+    op.execute('DELETE older FROM sync_watermark older '
+               'INNER JOIN sync_watermark newer ON older.task = newer.task '
+               'AND older.security_id IS NULL AND newer.security_id IS NULL '
+               'AND (older.updated < newer.updated OR (older.updated = newer.updated AND older.id < newer.id))')
+
+    op.execute("UPDATE sync_watermark SET scope = COALESCE(LOWER(HEX(security_id)), 'task')")
+    op.alter_column('sync_watermark', 'scope', existing_type=sa.String(length=32), nullable=False)
+
+    op.create_index('ix_sync_watermark_task_scope', 'sync_watermark', ['task', 'scope'], unique=True)
+    op.drop_index('ix_sync_watermark_task_security_id', table_name='sync_watermark')
+
+
+def downgrade():
+    op.create_index('ix_sync_watermark_task_security_id', 'sync_watermark', ['task', 'security_id'], unique=True)
+    op.drop_index('ix_sync_watermark_task_scope', table_name='sync_watermark')
+    op.drop_column('sync_watermark', 'scope')
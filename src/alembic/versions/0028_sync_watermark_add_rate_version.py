@@ -0,0 +1,34 @@
+"""add rate version columns to sync_watermark
+
+Revision ID: 0028
+Revises: 0027
+Create Date: 2022-07-11 10:42:17.284310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0028'
+down_revision = '0027'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('sync_watermark', sa.Column('value_sum', sa.DECIMAL(precision=25, scale=6), nullable=True))
+    op.add_column('sync_watermark', sa.Column('revision', sa.Integer(), nullable=True))
+
+    # rate versions were previously aggregated from security_rate on every request
+    op.execute("INSERT INTO sync_watermark "
+               "(id, task, scope, security_id, source_updated, row_count, value_sum, revision, updated) "
+               "SELECT UNHEX(REPLACE(UUID(), '-', '')), 'security-rate-version', LOWER(HEX(security_id)), "
+               "security_id, MAX(rate_date), COUNT(id), SUM(rate_close), 0, NOW() "
+               "FROM security_rate GROUP BY security_id")
+
+
+def downgrade():
+    op.execute("DELETE FROM sync_watermark WHERE task = 'security-rate-version'")
+    op.drop_column('sync_watermark', 'revision')
+    op.drop_column('sync_watermark', 'value_sum')
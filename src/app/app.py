@@ -3,12 +3,19 @@
 """
 from fastapi import FastAPI
 
+from config.settings import Settings
+
 from impl.apis.system_api import system_api_router
 from impl.apis.funds_api import funds_api_router
 from impl.apis.meetings_api import meetings_api_router
 from impl.apis.portfolios_api import portfolios_api_router
 from impl.apis.companies_api import companies_api_router
 from impl.apis.securities_api import securities_api_router
+from utils.compression import CompressionMiddleware
+from mail.dispatcher import mail_dispatcher
+from utils.process_pool import BoundedProcessPool
+
+settings = Settings()
 
 app = FastAPI(
     title="Taskusalkku API",
@@ -16,9 +23,29 @@ app = FastAPI(
     version="1.0.0",
 )
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+)
+
 app.include_router(system_api_router)
 app.include_router(funds_api_router)
 app.include_router(securities_api_router)
 app.include_router(meetings_api_router)
 app.include_router(portfolios_api_router)
 app.include_router(companies_api_router)
+
+
+@app.on_event("shutdown")
+def shutdown_process_pools():
+    """Stops worker processes"""
+    for pool in BoundedProcessPool.instances:
+        pool.shutdown()
+
+
+@app.on_event("shutdown")
+def close_mail_dispatcher():
+    """Sends or spools queued mails"""
+    mail_dispatcher.close(timeout=settings.MAIL_CLOSE_TIMEOUT)
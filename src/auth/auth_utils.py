@@ -50,3 +50,16 @@ class AuthUtils:
         """
         roles = AuthUtils.get_user_roles(token_bearer=token_bearer)
         return "user" in roles
+
+    @staticmethod
+    def has_metrics_role(token_bearer: TokenModel) -> bool:
+        """
+        Returns whether logged user has metrics role
+        Args:
+            token_bearer: logged user access token
+
+        Returns:
+            whether logged user has metrics role
+        """
+        roles = AuthUtils.get_user_roles(token_bearer=token_bearer)
+        return "metrics" in roles
@@ -0,0 +1,266 @@
+import logging
+import threading
+import time
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from auth.auth_utils import AuthUtils
+from config.settings import Settings
+from database import operations
+from spec.models.extra_models import TokenModel
+
+logger = logging.getLogger(__name__)
+
+AUTHORIZATION_WATERMARK_TASK = "authorization"
+GENERATION_CHECK_SECONDS = 1.0
+
+
+class AuthorizationContext:
+    """
+    Companies a user owns or has been given access to
+    """
+
+    def __init__(self, ssn: str, owned_company_ids: FrozenSet[UUID], shared_company_ids: FrozenSet[UUID]):
+        """
+        Constructor
+        Args:
+            ssn: user SSN
+            owned_company_ids: ids of companies user owns
+            shared_company_ids: ids of companies shared with user, excluding owned companies
+        """
+        self.ssn = ssn
+        self.owned_company_ids = owned_company_ids
+        self.shared_company_ids = shared_company_ids
+
+    def is_owned(self, company_id: UUID) -> bool:
+        """
+        Returns whether user owns a company
+
+        Args:
+            company_id: company id
+
+        Returns: whether user owns the company
+        """
+        return company_id in self.owned_company_ids
+
+    def has_access(self, company_id: UUID) -> bool:
+        """
+        Returns whether user owns or has access to a company
+
+        Args:
+            company_id: company id
+
+        Returns: whether user has access to the company
+        """
+        return company_id in self.owned_company_ids or company_id in self.shared_company_ids
+
+
+class AuthorizationCache:
+    """
+    Per process cache of authorization contexts by SSN. Entries expire after a short time to live and the whole cache
+    is cleared when the company migration tasks report changed companies or company access through the authorization
+    watermark. The watermark is checked at most once a second.
+    """
+
+    instances: List["AuthorizationCache"] = []
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        """
+        Constructor
+        Args:
+            name: name used in metrics
+            max_size: max number of cached contexts
+            ttl: time to live of cached contexts in seconds
+        """
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.contexts: "OrderedDict[str, Tuple[float, AuthorizationContext]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation: Optional[Tuple[datetime, Optional[int]]] = None
+        self.generation_checked = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        AuthorizationCache.instances.append(self)
+
+    def get_context(self, database: Session, ssn: str) -> AuthorizationContext:
+        """
+        Returns authorization context of a user, loading it when it is not cached or has expired
+        Args:
+            database: database session
+            ssn: user SSN
+
+        Returns: authorization context
+        """
+        if self.ttl > 0:
+            self.check_generation(database=database)
+
+        now = time.monotonic()
+
+        with self.lock:
+            cached = self.contexts.get(ssn, None)
+            if cached is not None and cached[0] > now:
+                self.hits += 1
+                self.contexts.move_to_end(ssn)
+                return cached[1]
+
+            self.misses += 1
+
+        context = self.load_context(database=database, ssn=ssn)
+
+        with self.lock:
+            self.contexts[ssn] = (now + self.ttl, context)
+            self.contexts.move_to_end(ssn)
+            while len(self.contexts) > self.max_size:
+                self.contexts.popitem(last=False)
+
+        return context
+
+    def check_generation(self, database: Session):
+        """
+        Clears the cache when authorization watermark has changed since the last check
+        Args:
+            database: database session
+        """
+        now = time.monotonic()
+        if now - self.generation_checked < GENERATION_CHECK_SECONDS:
+            return
+
+        watermark = operations.find_sync_watermark(database=database, task=AUTHORIZATION_WATERMARK_TASK,
+                                                   security_id=None)
+        generation = (watermark.updated, watermark.row_count) if watermark is not None else None
+
+        with self.lock:
+            if generation != self.generation:
+                if self.contexts:
+                    logger.info(f"{self.name}: authorization changed, clearing {len(self.contexts)} contexts")
+                    self.invalidations += 1
+
+                self.contexts.clear()
+                self.generation = generation
+
+            self.generation_checked = now
+
+    @staticmethod
+    def load_context(database: Session, ssn: str) -> AuthorizationContext:
+        """
+        Loads authorization context of a user from the database
+        Args:
+            database: database session
+            ssn: user SSN
+
+        Returns: authorization context
+        """
+        company_access = operations.get_company_access_levels(database=database, ssn=ssn)
+        owned_company_ids = frozenset(company_id for company_id, owned in company_access if owned)
+        shared_company_ids = frozenset(company_id for company_id, owned in company_access
+                                       if not owned and company_id not in owned_company_ids)
+
+        return AuthorizationContext(ssn=ssn, owned_company_ids=owned_company_ids,
+                                    shared_company_ids=shared_company_ids)
+
+    def invalidate(self):
+        """
+        Clears cached contexts of this process
+        """
+        with self.lock:
+            self.contexts.clear()
+            self.invalidations += 1
+
+    @staticmethod
+    def invalidate_all(database: Session):
+        """
+        Updates authorization watermark, so that all API processes clear their caches. Row count of the watermark
+        is used as a generation counter, because update times are stored with one second precision. Changes are not
+        committed.
+
+        Args:
+            database: database session
+        """
+        watermark = operations.find_sync_watermark(database=database, task=AUTHORIZATION_WATERMARK_TASK,
+                                                   security_id=None)
+        generation = (watermark.row_count or 0) if watermark is not None else 0
+
+        operations.upsert_sync_watermark(database=database, task=AUTHORIZATION_WATERMARK_TASK, security_id=None,
+                                         source_updated=None, row_count=generation + 1)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns cache counters
+
+        Returns: cached contexts, hits, misses and invalidations
+        """
+        return {
+            "size": len(self.contexts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations
+        }
+
+
+class RequestAuthorization:
+    """
+    Authorization of a single request. Logged user SSN and authorization context are resolved once per request,
+    when first needed.
+    """
+
+    def __init__(self, token_bearer: TokenModel):
+        """
+        Constructor
+        Args:
+            token_bearer: logged user access token
+        """
+        self.token_bearer = token_bearer
+        self.ssn: Optional[str] = None
+        self.context: Optional[AuthorizationContext] = None
+
+    def get_ssn(self) -> str:
+        """
+        Returns logged user SSN
+
+        Returns: SSN
+
+        Raises:
+            HTTPException, with status 403 if logged user SSN can not be resolved
+        """
+        if self.ssn is None:
+            ssn = AuthUtils.get_user_ssn(token_bearer=self.token_bearer)
+            if not ssn:
+                raise HTTPException(
+                    status_code=403,
+                    detail=f"Cannot resolve logged user SSN"
+                )
+
+            self.ssn = ssn
+
+        return self.ssn
+
+    def get_context(self, database: Session) -> AuthorizationContext:
+        """
+        Returns authorization context of logged user
+
+        Args:
+            database: database session
+
+        Returns: authorization context
+
+        Raises:
+            HTTPException, with status 403 if logged user SSN can not be resolved
+        """
+        if self.context is None:
+            self.context = authorization_cache.get_context(database=database, ssn=self.get_ssn())
+
+        return self.context
+
+
+settings = Settings()
+authorization_cache = AuthorizationCache(name="authorization",
+                                         max_size=settings.AUTHORIZATION_CACHE_SIZE,
+                                         ttl=settings.AUTHORIZATION_CACHE_TTL)
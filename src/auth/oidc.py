@@ -1,17 +1,118 @@
+import hashlib
+import threading
+import time
+
 import requests
 import jwt
 import logging
 
+from collections import OrderedDict
 from cryptography.x509.base import Certificate
 from cryptography.x509 import load_pem_x509_certificate
 from cryptography.hazmat.backends import default_backend
-from typing import Union, List
+from typing import Dict, Optional, Tuple, Union, List
 
 from jwt import InvalidIssuedAtError, InvalidIssuerError
 
+from config.settings import Settings
+
 logger = logging.getLogger(__name__)
 
 
+class VerifiedTokenCache:
+    """
+    Per process LRU cache of verified token claims. Entries are keyed by a digest of the token and audience,
+    so raw tokens are not kept in memory, and they expire when the token expires. Tokens without expiry are
+    not cached.
+    """
+
+    instances: List["VerifiedTokenCache"] = []
+
+    def __init__(self, name: str, max_size: int):
+        """
+        Constructor
+        Args:
+            name: name used in metrics
+            max_size: max number of cached tokens
+        """
+        self.name = name
+        self.max_size = max_size
+        self.tokens: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        VerifiedTokenCache.instances.append(self)
+
+    def get(self, token: str, audience: str) -> Optional[dict]:
+        """
+        Returns cached claims of a verified token
+        Args:
+            token: JWT token
+            audience: token audience
+
+        Returns: claims or None if token has not been verified or it has expired
+        """
+        key = self.get_key(token=token, audience=audience)
+        now = time.time()
+
+        with self.lock:
+            cached = self.tokens.get(key, None)
+            if cached is None or cached[0] <= now:
+                if cached is not None:
+                    del self.tokens[key]
+
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.tokens.move_to_end(key)
+            return cached[1]
+
+    def put(self, token: str, audience: str, claims: dict):
+        """
+        Caches claims of a verified token until the token expires
+        Args:
+            token: JWT token
+            audience: token audience
+            claims: verified claims
+        """
+        expires = claims.get("exp", None)
+        if not isinstance(expires, (int, float)) or expires <= time.time() or self.max_size <= 0:
+            return
+
+        key = self.get_key(token=token, audience=audience)
+
+        with self.lock:
+            self.tokens[key] = (float(expires), claims)
+            self.tokens.move_to_end(key)
+            while len(self.tokens) > self.max_size:
+                self.tokens.popitem(last=False)
+
+    @staticmethod
+    def get_key(token: str, audience: str) -> bytes:
+        """
+        Returns cache key of a token
+        Args:
+            token: JWT token
+            audience: token audience
+
+        Returns: token digest
+        """
+        return hashlib.sha256(f"{audience}\n{token}".encode("utf-8")).digest()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns cache counters
+
+        Returns: cached tokens, hits and misses
+        """
+        return {
+            "size": len(self.tokens),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
 class Oidc:
     """OIDC helper class"""
 
@@ -38,6 +139,10 @@ class Oidc:
             logger.warning("No token provided")
             return None
 
+        cached = verified_token_cache.get(token=token, audience=audience)
+        if cached is not None:
+            return cached
+
         jwt_header = jwt.get_unverified_header(token)
         if not jwt_header:
             logger.warning("Could not parse JWT header")
@@ -48,7 +153,7 @@ class Oidc:
             logger.warning("Could not resolve kid from JWT header")
             return None
 
-        for issuer in self.issuers:
+        for issuer in self.get_candidate_issuers(token=token):
             result = self.try_decode_with_issuer(
                 issuer=issuer,
                 token=token,
@@ -57,10 +162,37 @@ class Oidc:
             )
 
             if result:
+                verified_token_cache.put(token=token, audience=audience, claims=result)
                 return result
 
         return None
 
+    def get_candidate_issuers(self, token: str) -> List[str]:
+        """
+        Returns issuers to verify the token with. When the unverified iss claim of the token matches a configured
+        issuer, only that issuer is tried. Otherwise, e.g. when issuers are configured with internal addresses,
+        all configured issuers are tried. The claim is verified against the issuer's OIDC configuration when the
+        token is decoded.
+
+        Args:
+            token: JWT token
+
+        Returns:
+            issuers to try in order
+        """
+        try:
+            unverified_issuer = jwt.decode(token, options={"verify_signature": False}).get("iss", None)
+        except Exception:
+            return self.issuers
+
+        if isinstance(unverified_issuer, str):
+            unverified_issuer = unverified_issuer.rstrip("/")
+            matching = [issuer for issuer in self.issuers if issuer.rstrip("/") == unverified_issuer]
+            if matching:
+                return matching
+
+        return self.issuers
+
     def try_decode_with_issuer(self, issuer: str, token: str, audience: str, kid: str):
         """
         Tries to decode token using given issuer
@@ -151,3 +283,7 @@ class Oidc:
         dict: JSON object
     """    
         return requests.get(jwks_uri).json()
+
+
+settings = Settings()
+verified_token_cache = VerifiedTokenCache(name="verifiedTokens", max_size=settings.VERIFIED_TOKEN_CACHE_SIZE)
@@ -0,0 +1,179 @@
+import gzip
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, Any, List, Tuple
+from uuid import UUID
+
+import brotli
+import click
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_utils import FastJSONResponse, JsonUtils
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVELS = [1, 6, 9]
+BROTLI_QUALITIES = [1, 4, 6, 11]
+
+
+class CompressionBenchmark:
+    """
+    Measures compression CPU cost against bytes saved on realistic API response payloads
+    """
+
+    def __init__(self, years: int, rounds: int):
+        """
+        Constructor
+        Args:
+            years: years of daily values in history payloads
+            rounds: how many times each payload is compressed for timing
+        """
+        self.years = years
+        self.rounds = rounds
+        self.random = random.Random(1997)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Runs the benchmark
+
+        Returns: benchmark report
+        """
+        payloads = {
+            "portfolio-history": self.create_portfolio_history_payload(),
+            "security-history": self.create_security_history_payload(),
+            "portfolio-transactions": self.create_transactions_payload()
+        }
+
+        compressors: List[Tuple[str, Callable[[bytes], bytes]]] = \
+            [(f"gzip-{level}", lambda body, level=level: gzip.compress(body, compresslevel=level))
+             for level in GZIP_LEVELS] + \
+            [(f"br-{quality}", lambda body, quality=quality: brotli.compress(body, quality=quality))
+             for quality in BROTLI_QUALITIES]
+
+        return {
+            "years": self.years,
+            "rounds": self.rounds,
+            "payloads": {name: [self.measure(body, compressor_name, compressor)
+                                for compressor_name, compressor in compressors]
+                         for name, body in payloads.items()}
+        }
+
+    def measure(self, body: bytes, name: str, compressor: Callable[[bytes], bytes]) -> Dict[str, Any]:
+        """
+        Measures compression of a payload
+        Args:
+            body: payload
+            name: compressor name
+            compressor: compression function
+
+        Returns: measurement
+        """
+        started = time.process_time()
+        compressed = b""
+        for _ in range(self.rounds):
+            compressed = compressor(body)
+        cpu_ms = (time.process_time() - started) * 1000 / self.rounds
+
+        return {
+            "compressor": name,
+            "original_bytes": len(body),
+            "compressed_bytes": len(compressed),
+            "saved_percent": round(100 - len(compressed) * 100 / len(body), 1),
+            "cpu_ms": round(cpu_ms, 3),
+            "saved_bytes_per_cpu_ms": round((len(body) - len(compressed)) / cpu_ms) if cpu_ms else None
+        }
+
+    def create_portfolio_history_payload(self) -> bytes:
+        """
+        Creates portfolio history values response as returned by the portfolio historyValues endpoint
+
+        Returns: response body
+        """
+        value = Decimal("10000")
+        rows = []
+        for day in self.get_days():
+            value = value * Decimal(1 + self.random.gauss(0, 0.01)) / Decimal("5.94573") * Decimal("5.94573")
+            rows.append((day, value))
+
+        return FastJSONResponse.from_rows(fields=("date", "value"), rows=rows).body
+
+    def create_security_history_payload(self) -> bytes:
+        """
+        Creates security history values response as returned by the security historyValues endpoint
+
+        Returns: response body
+        """
+        rate = 10.0
+        rows = []
+        for day in self.get_days():
+            if day.weekday() < 5:
+                rate = rate * (1 + self.random.gauss(0, 0.01))
+                rows.append((day, Decimal(f"{rate:.16f}")))
+
+        return FastJSONResponse.from_rows(fields=("date", "value"), rows=rows).body
+
+    def create_transactions_payload(self) -> bytes:
+        """
+        Creates portfolio transactions response of a monthly saver
+
+        Returns: response body
+        """
+        security_ids = [str(UUID(int=self.random.getrandbits(128))) for _ in range(5)]
+        transactions = []
+        for index, day in enumerate(self.get_days()[::30]):
+            amount = Decimal(self.random.uniform(1, 100)).quantize(Decimal("0.000001"))
+            price = Decimal(self.random.uniform(1, 50)).quantize(Decimal("0.000001"))
+            transactions.append({
+                "id": str(UUID(int=self.random.getrandbits(128))),
+                "securityId": security_ids[index % len(security_ids)],
+                "targetSecurityId": None,
+                "transactionType": "SUBSCRIPTION",
+                "valueDate": day,
+                "value": (amount * price).quantize(Decimal("0.01")),
+                "shareAmount": amount,
+                "marketValue": price,
+                "totalValue": (amount * price).quantize(Decimal("0.01")),
+                "paymentDate": day - timedelta(days=2),
+                "provision": Decimal("0.00")
+            })
+
+        return JsonUtils.dumps(transactions)
+
+    def get_days(self) -> List[date]:
+        """
+        Returns daily dates of the benchmarked period
+
+        Returns: dates
+        """
+        start = date.today() - timedelta(days=self.years * 365)
+        return [start + timedelta(days=i) for i in range(self.years * 365)]
+
+
+@click.command()
+@click.option("--years", default=20, help="Years of daily values in history payloads")
+@click.option("--rounds", default=20, help="Compression rounds per payload")
+@click.option("--report", default="compression-benchmark.json", help="Benchmark report file")
+def main(years, rounds, report):
+    """Response compression benchmark"""
+    result = CompressionBenchmark(years=years, rounds=rounds).run()
+
+    with open(report, "w") as file:
+        json.dump(result, file, indent=2)
+
+    for payload, measurements in result["payloads"].items():
+        for measurement in measurements:
+            logger.warning(f"Info: {payload} {measurement['compressor']}: {measurement['original_bytes']} -> "
+                           f"{measurement['compressed_bytes']} bytes ({measurement['saved_percent']}% saved), "
+                           f"{measurement['cpu_ms']} ms CPU")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+import logging
+import random
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List, Dict, Any, Iterator, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from database.models import Fund
+
+logger = logging.getLogger(__name__)
+
+INSERT_BATCH = 5000
+
+# Funds database tables with the columns read by the migration tasks
+FUNDS_SCHEMA = {
+    "TABLE_SECURITY": "SECID varchar(20) not null, SORTNAME varchar(20), CURRENCY char(3), NAME1 varchar(255), "
+                      "NAME2 varchar(255), NAME3 varchar(255), SERIES_ID smallint, UPD_DATE datetime",
+    "TABLE_RATE": "SECID varchar(20) not null, RDATE datetime not null, RCLOSE decimal(18,16), UPD_DATE datetime",
+    "TABLE_RATELAST": "SECID varchar(20) not null, RDATE datetime, RCLOSE decimal(18,16), UPD_DATE datetime",
+    "TABLE_COMPANY": "COM_CODE varchar(20) not null, COM_TYPE char(1), NAME1 varchar(255), SO_SEC_NR varchar(20), "
+                     "CREA_DATE datetime, UPD_DATE datetime",
+    "TABLE_PORTFOL": "PORID varchar(20) not null, NAME1 varchar(255), COM_CODE varchar(20)",
+    "TABLE_PORCLASSDEF": "COM_CODE varchar(20), PORID varchar(20), PORCLASS int",
+    "TABLE_PORTLOG": "TRANS_NR int not null, TRANS_CODE char(2), TRANS_DATE datetime, COM_CODE varchar(20), "
+                     "PORID varchar(20), SECID varchar(20), CSECID varchar(20), CCOM_CODE varchar(20), "
+                     "CTOT_VALUE decimal(17,2), AMOUNT decimal(21,6), CPRICE decimal(18,6), PMT_DATE datetime, "
+                     "CVALUE decimal(17,2), PROVISION decimal(17,2), STATUS char(1), UPD_DATE datetime, "
+                     "UPD_TIME varchar(8)",
+    "TABLE_PORTRANS": "TRANS_NR int not null, COM_CODE varchar(20), PORID varchar(20), SECID varchar(20), "
+                      "TRANS_DATE datetime, AMOUNT decimal(21,6), PUR_CVALUE decimal(17,2), UPD_DATE datetime, "
+                      "UPD_TIME varchar(8)"
+}
+
+FUNDS_INDEXES = [
+    "CREATE INDEX IX_TABLE_RATE_SECID_RDATE ON TABLE_RATE (SECID, RDATE)",
+    "CREATE INDEX IX_TABLE_PORTLOG_SECID ON TABLE_PORTLOG (SECID)",
+    "CREATE INDEX IX_TABLE_PORTRANS_SECID ON TABLE_PORTRANS (SECID)"
+]
+
+
+@dataclass
+class DatasetScale:
+    """
+    Size of the generated dataset
+    """
+    securities: int = 40
+    companies: int = 20000
+    portfolios_per_company: int = 2
+    rate_years: int = 25
+    log_rows: int = 2000000
+    transaction_rows: int = 1000000
+    seed: int = 1
+
+
+class DatasetGenerator:
+    """
+    Generates deterministic production-scale data into the funds database and the matching
+    backend data that is not migrated from the funds database
+    """
+
+    def __init__(self, scale: DatasetScale):
+        """
+        Constructor
+        Args:
+            scale: dataset size
+        """
+        self.scale = scale
+        self.random = random.Random(scale.seed)
+        self.end_date = date(2022, 6, 30)
+        self.start_date = self.end_date - timedelta(days=365 * scale.rate_years)
+        self.security_ids = [f"BENCH{index:04d}" for index in range(scale.securities)]
+        self.com_codes = [str(100000 + index) for index in range(scale.companies)]
+        self.portfolio_ids = [f"{com_code}_{index + 1}"
+                              for com_code in self.com_codes
+                              for index in range(scale.portfolios_per_company)]
+
+    def generate(self, funds_engine: Engine, backend_engine: Engine):
+        """
+        Creates funds database tables and generates all data
+        Args:
+            funds_engine: funds database engine
+            backend_engine: backend database engine
+        """
+        self.create_funds_schema(funds_engine=funds_engine)
+        self.generate_funds_data(funds_engine=funds_engine)
+        self.generate_backend_data(backend_engine=backend_engine)
+
+    @staticmethod
+    def create_funds_schema(funds_engine: Engine):
+        """
+        Recreates funds database tables
+        Args:
+            funds_engine: funds database engine
+        """
+        with funds_engine.begin() as connection:
+            for table, columns in FUNDS_SCHEMA.items():
+                connection.execute(text(f"IF OBJECT_ID('{table}', 'U') IS NOT NULL DROP TABLE {table}"))
+                connection.execute(text(f"CREATE TABLE {table} ({columns})"))
+
+            for index in FUNDS_INDEXES:
+                connection.execute(text(index))
+
+    def generate_funds_data(self, funds_engine: Engine):
+        """
+        Generates funds database rows
+        Args:
+            funds_engine: funds database engine
+        """
+        self.insert(funds_engine, "TABLE_SECURITY", self.list_security_rows())
+
+        last_rates = {}
+        for row in self.list_rate_rows():
+            last_rates[row["SECID"]] = row
+
+        self.insert(funds_engine, "TABLE_RATE", self.list_rate_rows())
+        self.insert(funds_engine, "TABLE_RATELAST", iter(last_rates.values()))
+        self.insert(funds_engine, "TABLE_COMPANY", self.list_company_rows())
+        self.insert(funds_engine, "TABLE_PORTFOL", self.list_portfolio_rows())
+        self.insert(funds_engine, "TABLE_PORCLASSDEF", self.list_portfolio_class_rows())
+        self.insert(funds_engine, "TABLE_PORTRANS", self.list_transaction_rows())
+        self.insert(funds_engine, "TABLE_PORTLOG", self.list_log_rows())
+
+    def generate_backend_data(self, backend_engine: Engine):
+        """
+        Generates backend funds. Funds are migrated from KIID database, which is not part of the benchmark
+        Args:
+            backend_engine: backend database engine
+        """
+        with Session(backend_engine) as backend_session:
+            existing = {value for value, in backend_session.query(Fund.original_id).all()}
+
+            for fund_original_id in self.list_fund_original_ids():
+                if fund_original_id not in existing:
+                    fund = Fund()
+                    fund.original_id = fund_original_id
+                    fund.group = "PASSIVE"
+                    fund.deprecated = False
+                    backend_session.add(fund)
+
+            backend_session.commit()
+
+    def list_fund_original_ids(self) -> List[int]:
+        """
+        Lists original ids of the generated funds. Every fund has two securities
+
+        Returns: fund original ids
+        """
+        return [1000 + index // 2 for index in range(len(self.security_ids))]
+
+    def list_security_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Lists TABLE_SECURITY rows
+
+        Returns: rows
+        """
+        fund_original_ids = self.list_fund_original_ids()
+
+        for index, secid in enumerate(self.security_ids):
+            yield {
+                "SECID": secid,
+                "SORTNAME": str(fund_original_ids[index]),
+                "CURRENCY": "SEK" if index % 10 == 9 else "EUR",
+                "NAME1": f"Rahasto {secid}",
+                "NAME2": f"Fond {secid}",
+                "NAME3": f"Fund {secid}",
+                "SERIES_ID": 1 + index % 2,
+                "UPD_DATE": datetime(2022, 1, 1)
+            }
+
+    def list_rate_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Lists TABLE_RATE rows, a rate for each weekday of every security. The series is deterministic so that
+        the generator can be iterated more than once
+
+        Returns: rows
+        """
+        for index, secid in enumerate(self.security_ids):
+            series_random = random.Random(self.scale.seed * 1000 + index)
+            rate = 10.0 + index
+            rate_date = self.start_date
+
+            while rate_date <= self.end_date:
+                if rate_date.weekday() < 5:
+                    rate = min(max(rate * (1 + series_random.gauss(0.0002, 0.01)), 0.5), 99.0)
+                    yield {
+                        "SECID": secid,
+                        "RDATE": datetime.combine(rate_date, datetime.min.time()),
+                        "RCLOSE": Decimal(f"{rate:.6f}"),
+                        "UPD_DATE": datetime.combine(rate_date, datetime.min.time())
+                    }
+
+                rate_date += timedelta(days=1)
+
+    def list_company_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Lists TABLE_COMPANY rows
+
+        Returns: rows
+        """
+        for index, com_code in enumerate(self.com_codes):
+            created = self.random_datetime()
+            yield {
+                "COM_CODE": com_code,
+                "COM_TYPE": "3",
+                "NAME1": f"Asiakas {com_code}",
+                "SO_SEC_NR": f"{index % 28 + 1:02d}{index % 12 + 1:02d}{70 + index % 30:02d}-{index % 1000:03d}X",
+                "CREA_DATE": created,
+                "UPD_DATE": created
+            }
+
+    def list_portfolio_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Lists TABLE_PORTFOL rows
+
+        Returns: rows
+        """
+        for porid in self.portfolio_ids:
+            yield {
+                "PORID": porid,
+                "NAME1": f"Salkku {porid}",
+                "COM_CODE": porid.split("_")[0]
+            }
+
+    def list_portfolio_class_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Lists TABLE_PORCLASSDEF rows. Every hundredth portfolio belongs to an excluded class
+
+        Returns: rows
+        """
+        for index, porid in enumerate(self.portfolio_ids):
+            yield {
+                "COM_CODE": porid.split("_")[0],
+                "PORID": porid,
+                "PORCLASS": 3 if index % 100 == 99 else 1
+            }
+
+    def list_transaction_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Lists TABLE_PORTRANS rows
+
+        Returns: rows
+        """
+        for trans_nr, porid, secid, transaction_date, updated in self.list_transactions(self.scale.transaction_rows):
+            amount = Decimal(f"{self.random.uniform(1, 5000):.6f}")
+            yield {
+                "TRANS_NR": trans_nr,
+                "COM_CODE": porid.split("_")[0],
+                "PORID": porid,
+                "SECID": secid,
+                "TRANS_DATE": transaction_date,
+                "AMOUNT": amount,
+                "PUR_CVALUE": Decimal(f"{amount * Decimal(self.random.uniform(5, 50)):.2f}"),
+                "UPD_DATE": datetime.combine(updated.date(), datetime.min.time()),
+                "UPD_TIME": updated.strftime("%H:%M:%S")
+            }
+
+    def list_log_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Lists TABLE_PORTLOG rows. Subscriptions, redemptions and every twentieth row a switch to another security
+
+        Returns: rows
+        """
+        for trans_nr, porid, secid, transaction_date, updated in self.list_transactions(self.scale.log_rows):
+            amount = Decimal(f"{self.random.uniform(1, 5000):.6f}")
+            price = Decimal(f"{self.random.uniform(5, 50):.6f}")
+            value = Decimal(f"{amount * price:.2f}")
+            switch = trans_nr % 20 == 0
+
+            yield {
+                "TRANS_NR": trans_nr,
+                "TRANS_CODE": "11" if trans_nr % 3 else "12",
+                "TRANS_DATE": transaction_date,
+                "COM_CODE": porid.split("_")[0],
+                "PORID": porid,
+                "SECID": secid,
+                "CSECID": self.random.choice(self.security_ids) if switch else " ",
+                "CCOM_CODE": "",
+                "CTOT_VALUE": value,
+                "AMOUNT": amount,
+                "CPRICE": price,
+                "PMT_DATE": transaction_date + timedelta(days=2),
+                "CVALUE": value,
+                "PROVISION": Decimal("0.00"),
+                "STATUS": "0",
+                "UPD_DATE": datetime.combine(updated.date(), datetime.min.time()),
+                "UPD_TIME": updated.strftime("%H.%M.%S")
+            }
+
+    def list_transactions(self, count: int) -> Iterator[Tuple[int, str, str, datetime, datetime]]:
+        """
+        Lists common values of generated transactions
+
+        Args:
+            count: transaction count
+
+        Returns: tuples of transaction number, portfolio id, security id, transaction date and update time
+        """
+        for trans_nr in range(1, count + 1):
+            transaction_date = self.random_datetime()
+            updated = transaction_date + timedelta(days=self.random.randint(0, 5),
+                                                   seconds=self.random.randint(8 * 3600, 18 * 3600))
+            yield trans_nr, self.random.choice(self.portfolio_ids), self.random.choice(self.security_ids), \
+                transaction_date, updated
+
+    def random_datetime(self) -> datetime:
+        """
+        Returns random date within the dataset period
+
+        Returns: random date at midnight
+        """
+        days = self.random.randint(0, (self.end_date - self.start_date).days)
+        return datetime.combine(self.start_date + timedelta(days=days), datetime.min.time())
+
+    @staticmethod
+    def insert(engine: Engine, table: str, rows: Iterator[Dict[str, Any]]):
+        """
+        Inserts rows in batches
+        Args:
+            engine: database engine
+            table: table name
+            rows: rows
+        """
+        count = 0
+        batch = []
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH:
+                count += DatasetGenerator.insert_batch(engine=engine, table=table, batch=batch)
+                batch = []
+
+        if batch:
+            count += DatasetGenerator.insert_batch(engine=engine, table=table, batch=batch)
+
+        logger.warning(f"Info: Generated {count} rows into {table}")
+
+    @staticmethod
+    def insert_batch(engine: Engine, table: str, batch: List[Dict[str, Any]]) -> int:
+        """
+        Inserts a batch of rows
+        Args:
+            engine: database engine
+            table: table name
+            batch: rows
+
+        Returns: inserted row count
+        """
+        columns = list(batch[0].keys())
+        statement = text(f"INSERT INTO {table} ({', '.join(columns)}) "
+                         f"VALUES ({', '.join(':' + column for column in columns)})")
+
+        with engine.begin() as connection:
+            connection.execute(statement, batch)
+
+        return len(batch)
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+
+from typing import Optional, List, Dict, Any
+
+import click
+from sqlalchemy import create_engine
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.dataset import DatasetGenerator, DatasetScale
+
+logger = logging.getLogger(__name__)
+
+alembicini = os.path.join(os.path.dirname(__file__), '..', 'alembic.ini')
+
+# tasks reading the funds database. Funds and company access tasks read KIID and Salkku databases
+BENCHMARK_TASKS = ["securities", "security-rates", "last-rate", "companies", "portfolios",
+                   "portfolio-transactions", "portfolio-logs"]
+SKIPPED_TASKS = ["funds", "company_access"]
+
+
+class MigrationBenchmark:
+    """
+    Runs migration tasks against generated data and reports throughput per task
+    """
+
+    def __init__(self, scale: DatasetScale, pipeline: bool, timeout: int):
+        """
+        Constructor
+        Args:
+            scale: dataset size
+            pipeline: whether to run migrations in pipelined mode
+            timeout: migration timeout in minutes
+        """
+        self.scale = scale
+        self.pipeline = pipeline
+        self.timeout = timeout
+        self.containers = []
+
+    def run(self, funds_url: Optional[str], backend_url: Optional[str], generate: bool) -> Dict[str, Any]:
+        """
+        Runs the benchmark. Database containers are started for the databases without url
+        Args:
+            funds_url: funds database url or None to start a SQL Server container
+            backend_url: backend database url or None to start a MariaDB container
+            generate: whether to generate the dataset
+
+        Returns: benchmark report
+        """
+        try:
+            funds_url = funds_url or self.start_funds_container()
+            backend_url = backend_url or self.start_backend_container()
+
+            os.environ["FUNDS_DATABASE_URL"] = funds_url
+            os.environ["BACKEND_DATABASE_URL"] = backend_url
+            os.environ.setdefault("KIID_DATABASE_URL", backend_url)
+            os.environ.setdefault("SALKKU_DATABASE_URL", backend_url)
+
+            self.upgrade_backend()
+
+            if generate:
+                DatasetGenerator(scale=self.scale).generate(funds_engine=create_engine(funds_url),
+                                                            backend_engine=create_engine(backend_url))
+
+            return {
+                "scale": self.scale.__dict__,
+                "pipeline": self.pipeline,
+                "runs": {
+                    "initial": self.run_migration(),
+                    "incremental": self.run_migration()
+                }
+            }
+        finally:
+            for container in self.containers:
+                container.stop()
+
+    def run_migration(self) -> List[Dict[str, Any]]:
+        """
+        Runs all benchmarked tasks once
+
+        Returns: throughput per task
+        """
+        from commands.migrate import MigrateHandler
+
+        with tempfile.TemporaryDirectory() as report_dir:
+            report_file = os.path.join(report_dir, "report.json")
+            handler = MigrateHandler(
+                debug=False,
+                force_recheck=False,
+                timeout=self.timeout,
+                security=None,
+                verify_only=False,
+                skip_verify=False,
+                pipeline=self.pipeline,
+                profile=report_file
+            )
+
+            asyncio.run(handler.handle(task_name=None, skip_tasks=SKIPPED_TASKS))
+
+            with open(report_file) as file:
+                report = json.load(file)
+
+        return [self.get_task_result(entry) for entry in report["entries"] if entry["security"] is None]
+
+    @staticmethod
+    def get_task_result(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns throughput of a task
+        Args:
+            entry: task entry of the migration profile report
+
+        Returns: throughput of the task
+        """
+        migrate_seconds = entry["migrate_seconds"]
+        return {
+            **entry,
+            "rows_read_per_second": round(entry["rows_read"] / migrate_seconds, 1) if migrate_seconds else None,
+            "rows_written_per_second": round(entry["rows_written"] / migrate_seconds, 1) if migrate_seconds else None
+        }
+
+    def start_funds_container(self) -> str:
+        """
+        Starts SQL Server container for the funds database
+
+        Returns: database url
+        """
+        from tests.testcontainers.mssql import SqlServerContainer
+
+        mssql = SqlServerContainer(password="Test1234.")  # NOSONAR
+        mssql.start()
+        self.containers.append(mssql)
+        return mssql.get_connection_url()
+
+    def start_backend_container(self) -> str:
+        """
+        Starts MariaDB container for the backend database
+
+        Returns: database url
+        """
+        from testcontainers.mysql import MySqlContainer
+
+        mysql = MySqlContainer('mariadb:10.3.29')
+        mysql.with_command("--character-set-server=utf8mb4 --collation-server=utf8mb4_unicode_ci")
+        mysql.start()
+        self.containers.append(mysql)
+        return mysql.get_connection_url()
+
+    @staticmethod
+    def upgrade_backend():
+        """
+        Runs backend database migrations
+        """
+        from alembic.config import Config
+        from alembic import command
+
+        command.upgrade(Config(alembicini), 'head')
+
+
+@click.command()
+@click.option("--funds-url", default=None, help="Funds database url. Starts a container if not specified")
+@click.option("--backend-url", default=None, help="Backend database url. Starts a container if not specified")
+@click.option("--skip-generate", default=False, help="Use previously generated data")
+@click.option("--securities", default=DatasetScale.securities, help="Number of securities")
+@click.option("--companies", default=DatasetScale.companies, help="Number of companies")
+@click.option("--rate-years", default=DatasetScale.rate_years, help="Years of daily rates")
+@click.option("--log-rows", default=DatasetScale.log_rows, help="Number of portfolio log rows")
+@click.option("--transaction-rows", default=DatasetScale.transaction_rows, help="Number of portfolio transactions")
+@click.option("--pipeline", default=False, help="Run migrations in pipelined mode")
+@click.option("--timeout", default=600, help="Migration timeout in minutes")
+@click.option("--report", default="migration-benchmark.json", help="Benchmark report file")
+def main(funds_url, backend_url, skip_generate, securities, companies, rate_years, log_rows, transaction_rows,
+         pipeline, timeout, report):
+    """Migration benchmark"""
+    scale = DatasetScale(securities=securities,
+                         companies=companies,
+                         rate_years=rate_years,
+                         log_rows=log_rows,
+                         transaction_rows=transaction_rows)
+
+    result = MigrationBenchmark(scale=scale, pipeline=pipeline, timeout=timeout).run(
+        funds_url=funds_url,
+        backend_url=backend_url,
+        generate=not skip_generate
+    )
+
+    with open(report, "w") as file:
+        json.dump(result, file, indent=2)
+
+    for run, tasks in result["runs"].items():
+        for task in tasks:
+            logger.warning(f"Info: {run} {task['task']}: {task['rows_written']} rows written, "
+                           f"{task['rows_written_per_second']} rows/s, {task['total_seconds']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -19,8 +19,10 @@ from commands.migration_tasks import AbstractMigrationTask, MigrateFundsTask, Mi
     MigrateCompanyAccessTask, MigratePortfolioLogsTask, MigratePortfolioTransactionsTask, MigrationTaskType
 
 from commands.migration_exceptions import MigrationException, MissingEntityException
+from commands.migration_profiler import MemorySampler, MigrationProfiler
+from config.settings import Settings
 from database.models import SynchronizationFailure, Security
-from mail.mailer import Mailer
+from mail.dispatcher import mail_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -44,13 +46,21 @@ class MigrateHandler:
                  timeout: int,
                  security: str,
                  verify_only: bool,
-                 skip_verify: bool
+                 skip_verify: bool,
+                 full_verify: bool = False,
+                 pipeline: bool = False,
+                 profile: Optional[str] = None,
+                 profile_dump: Optional[str] = None
                  ):
         """
         Constructor
         Args:
             debug: whether to run the command in debug mode
             force_recheck: Whether task should be forced to recheck all entities
+            full_verify: Whether up-to-date tasks are verified too
+            pipeline: Whether source pages are fetched in parallel with backend writes
+            profile: Path of JSON performance report or None to disable profiling
+            profile_dump: Path of cProfile dump written when profiling
         """
         self.backend_engine = self.get_backend_engine()
         self.debug = debug
@@ -62,6 +72,13 @@ class MigrateHandler:
         self.security = security
         self.verify_only = verify_only
         self.skip_verify = skip_verify
+        self.full_verify = full_verify
+
+        self.profiler = MigrationProfiler(report_file=profile, dump_file=profile_dump)
+
+        for task in self.tasks:
+            task.pipelined = pipeline
+            task.profiler = self.profiler if self.profiler.enabled else None
 
     async def handle(self,
                      task_name: Optional[str],
@@ -74,12 +91,20 @@ class MigrateHandler:
             task_name: name of the task to run. Runs everything is not specified
             skip_tasks: list of tasks to skip
         """
-        with Session(self.backend_engine) as backend_session:
-            await self.do_handle(
-                task_name=task_name,
-                skip_tasks=skip_tasks,
-                backend_session=backend_session
-            )
+        self.profiler.start(backend_engine=self.backend_engine)
+
+        try:
+            # objects are detached from the session after each saved unit of work, so they must stay readable
+            # after commit
+            with Session(self.backend_engine, expire_on_commit=False) as backend_session:
+                await self.do_handle(
+                    task_name=task_name,
+                    skip_tasks=skip_tasks,
+                    backend_session=backend_session
+                )
+        finally:
+            self.profiler.stop()
+            mail_dispatcher.close(timeout=Settings().MAIL_CLOSE_TIMEOUT)
 
     async def do_handle(self,
                         task_name: Optional[str],
@@ -124,7 +149,8 @@ class MigrateHandler:
         for task in self.tasks:
             if timeout > datetime.now() and task.get_name() in task_names:
                 try:
-                    await self.run_and_verify_task(task=task, timeout=timeout, backend_session=backend_session)
+                    with self.profiler.scope(task=task.get_name(), security=None):
+                        await self.run_and_verify_task(task=task, timeout=timeout, backend_session=backend_session)
                 except Exception as e:
                     await self.notify_error(e)
 
@@ -148,56 +174,77 @@ class MigrateHandler:
         """
         result = True
         start_time = datetime.now()
+        start_memory = MigrationProfiler.get_current_memory()
         force_failed_task = task.get_name() in self.force_failed_tasks
         force = self.force_recheck or force_failed_task
 
         self.print_message(f"Info: Start time: {start_time}")
 
-        task.prepare(backend_session=backend_session)
-        up_to_date = task.up_to_date(backend_session)
+        with MemorySampler() as memory_sampler:
+            task.prepare(backend_session=backend_session)
+            up_to_date = task.up_to_date(backend_session)
 
-        if force:
-            self.print_message(f"Info: {task.get_name()} is forced.")
-        elif up_to_date:
-            self.print_message(f"Info: {task.get_name()} is already up-to-date.")
-        else:
-            self.print_message(f"Info: {task.get_name()} is not up-to-date. Migrating...")
+            if force:
+                self.print_message(f"Info: {task.get_name()} is forced.")
+            elif up_to_date:
+                self.print_message(f"Info: {task.get_name()} is already up-to-date.")
+            else:
+                self.print_message(f"Info: {task.get_name()} is not up-to-date. Migrating...")
 
-        try:
-            if task.get_type() == MigrationTaskType.DEFAULT:
-                await self.run_and_verify_default_task(
-                    task=task,
-                    timeout=timeout,
-                    force=force,
-                    up_to_date=up_to_date,
-                    retry=False,
-                    backend_session=backend_session
-                )
+            verified = False
 
-            elif task.get_type() == MigrationTaskType.SECURITY_BASED:
-                await self.run_and_verify_security_based_task(
-                    task=task,
-                    timeout=timeout,
-                    force=force,
-                    up_to_date=up_to_date,
-                    backend_session=backend_session
+            try:
+                if task.get_type() == MigrationTaskType.DEFAULT:
+                    verified = await self.run_and_verify_default_task(
+                        task=task,
+                        timeout=timeout,
+                        force=force,
+                        up_to_date=up_to_date,
+                        retry=False,
+                        backend_session=backend_session
+                    )
+
+                elif task.get_type() == MigrationTaskType.SECURITY_BASED:
+                    verified = await self.run_and_verify_security_based_task(
+                        task=task,
+                        timeout=timeout,
+                        force=force,
+                        up_to_date=up_to_date,
+                        backend_session=backend_session
+                    )
+
+            except MissingEntityException as e:
+                await self.handle_synchronization_failure(
+                    backend_session=backend_session,
+                    original_id=e.original_id,
+                    message=e.message,
+                    target_task=e.target_task,
+                    origin_task=task.get_name()
                 )
 
-        except MissingEntityException as e:
-            await self.handle_synchronization_failure(
-                backend_session=backend_session,
-                original_id=e.original_id,
-                message=e.message,
-                target_task=e.target_task,
-                origin_task=task.get_name()
-            )
+                result = False
 
-            result = False
+            if result and not verified:
+                self.print_message(f"Warning: {task.get_name()} was not verified, skipping finish.")
+                result = False
+
+            if result and not self.debug and not self.verify_only:
+                with self.profiler.phase("finish"):
+                    task.finish(backend_session=backend_session)
 
         end_time = datetime.now()
         total_time = end_time - start_time
 
+        end_memory = MigrationProfiler.get_current_memory()
+        peak_memory = memory_sampler.peak_kb
+
         self.print_message(f"Success: {result}, End time: {end_time}, total time: {total_time}")
+        if start_memory is not None and end_memory is not None and peak_memory is not None:
+            self.print_message(f"Info: {task.get_name()} memory: {start_memory / 1024:.1f} MB before task, "
+                               f"{end_memory / 1024:.1f} MB after task, task peak {peak_memory / 1024:.1f} MB")
+        else:
+            process_peak_memory = MigrationProfiler.get_peak_memory()
+            self.print_message(f"Info: {task.get_name()} process peak memory: {process_peak_memory / 1024:.1f} MB")
         return result
 
     async def run_and_verify_default_task(self,
@@ -207,7 +254,7 @@ class MigrateHandler:
                                           up_to_date: bool,
                                           retry: bool,
                                           backend_session: Session
-                                          ):
+                                          ) -> bool:
         """
         Runs default task
         Args:
@@ -217,49 +264,62 @@ class MigrateHandler:
             up_to_date: whether the task is up-to-date
             retry: whether this is a retry attempt
             backend_session: backend session
+        Returns:
+            Whether the task passed verification or verification was skipped
         """
 
         if not self.verify_only and (not up_to_date or force or retry):
-            count = task.migrate(backend_session=backend_session,
-                                 timeout=timeout,
-                                 force_recheck=force or retry
-                                 )
-
-            if not self.debug:
-                backend_session.commit()
-                self.print_message(f"Info: Saved changes.")
-            else:
-                self.print_message(f"Warning: Running in debug mode, not saving the changes")
+            with self.profiler.phase("migrate"):
+                count = task.migrate(backend_session=backend_session,
+                                     timeout=timeout,
+                                     force_recheck=force or retry
+                                     )
+
+                if not self.debug:
+                    backend_session.commit()
+                    self.print_message(f"Info: Saved changes.")
+                else:
+                    self.print_message(f"Warning: Running in debug mode, not saving the changes")
+
+                task.release_session_objects(backend_session=backend_session)
+
+            self.profiler.add_written(count)
 
             self.print_message(f"Info: {task.get_name()} migration complete. {count} updated entries")
 
         if task.should_timeout(timeout=timeout):
             self.print_message(f"Info: {task.get_name()} timeout reached.")
-            return
+            return False
+
+        if not self.should_verify(force=force, up_to_date=up_to_date, retry=retry):
+            return True
 
-        if not self.skip_verify:
+        with self.profiler.phase("verify"):
             valid = task.verify(
                 backend_session=backend_session,
                 security=None
             )
 
-            if valid:
-                self.print_message(f"Info: {task.get_name()} verification passed.")
-            else:
-                if retry:
-                    self.print_message(f"Error: {task.get_name()} verification failed after retry. Notifying admins...")
-                    await self.notify_verification_failure(task)
-                else:
-                    self.print_message(f"Error: {task.get_name()} verification failed. Retrying...")
-
-                    await self.run_and_verify_default_task(
-                        task=task,
-                        timeout=timeout,
-                        force=force,
-                        up_to_date=up_to_date,
-                        retry=True,
-                        backend_session=backend_session
-                    )
+        if valid:
+            self.print_message(f"Info: {task.get_name()} verification passed.")
+            return True
+
+        if retry:
+            self.print_message(f"Error: {task.get_name()} verification failed after retry. Notifying admins...")
+            self.reset_task_watermark(task=task, security=None, backend_session=backend_session)
+            await self.notify_verification_failure(task)
+            return False
+
+        self.print_message(f"Error: {task.get_name()} verification failed. Retrying...")
+
+        return await self.run_and_verify_default_task(
+            task=task,
+            timeout=timeout,
+            force=force,
+            up_to_date=up_to_date,
+            retry=True,
+            backend_session=backend_session
+        )
 
     async def run_and_verify_security_based_task(self,
                                                  task: AbstractMigrationTask,
@@ -267,7 +327,7 @@ class MigrateHandler:
                                                  force: bool,
                                                  up_to_date: bool,
                                                  backend_session: Session
-                                                 ):
+                                                 ) -> bool:
         """
         Runs a security based task
 
@@ -277,26 +337,35 @@ class MigrateHandler:
             force: whether to force the task
             up_to_date: whether the task is up-to-date
             backend_session: backend session
+        Returns:
+            Whether all securities passed verification or verification was skipped
         """
+        verified = True
+
         for security in self.securities:
-            task.prepare_security(
-                backend_session=backend_session,
-                security=security
-            )
+            with self.profiler.scope(task=task.get_name(), security=security.original_id):
+                task.prepare_security(
+                    backend_session=backend_session,
+                    security=security
+                )
 
-            await self.run_and_verify_security_based_task_security(
-                task=task,
-                timeout=timeout,
-                force=force,
-                up_to_date=up_to_date,
-                security=security,
-                retry=False,
-                backend_session=backend_session
-            )
+                security_verified = await self.run_and_verify_security_based_task_security(
+                    task=task,
+                    timeout=timeout,
+                    force=force,
+                    up_to_date=up_to_date,
+                    security=security,
+                    retry=False,
+                    backend_session=backend_session
+                )
+
+                verified = verified and security_verified
 
             if task.should_timeout(timeout=timeout):
                 self.print_message(f"Info: {task.get_name()} timeout reached.")
-                return
+                return False
+
+        return verified
 
     async def run_and_verify_security_based_task_security(self,
                                                           task: AbstractMigrationTask,
@@ -306,7 +375,7 @@ class MigrateHandler:
                                                           retry: bool,
                                                           security: Security,
                                                           backend_session: Session
-                                                          ):
+                                                          ) -> bool:
         """
         Runs a security-based task and verification. If the verification fails, it will retry the task.
         Args:
@@ -317,19 +386,26 @@ class MigrateHandler:
             retry: whether this is a retry attempt
             security: security to be used
             backend_session: backend session
+        Returns:
+            Whether the security passed verification or verification was skipped
         """
 
         if not self.verify_only and (not up_to_date or force or retry):
-            count = task.migrate_security(backend_session=backend_session,
-                                          timeout=timeout,
-                                          force_recheck=force or retry,
-                                          security=security)
-
-            if not self.debug:
-                backend_session.commit()
-                self.print_message(f"Info: Saved changes.")
-            else:
-                self.print_message(f"Warning: Running in debug mode, not saving the changes")
+            with self.profiler.phase("migrate"):
+                count = task.migrate_security(backend_session=backend_session,
+                                              timeout=timeout,
+                                              force_recheck=force or retry,
+                                              security=security)
+
+                if not self.debug:
+                    backend_session.commit()
+                    self.print_message(f"Info: Saved changes.")
+                else:
+                    self.print_message(f"Warning: Running in debug mode, not saving the changes")
+
+                task.release_session_objects(backend_session=backend_session)
+
+            self.profiler.add_written(count)
 
             self.print_message(f"Info: {task.get_name()} migration complete. {count} updated entries")
 
@@ -338,34 +414,76 @@ class MigrateHandler:
 
         if task.should_timeout(timeout=timeout):
             self.print_message(f"Info: {task.get_name()}, security {security.original_id} timeout reached.")
-            return
+            return False
 
-        if not self.skip_verify:
+        if not self.should_verify(force=force, up_to_date=up_to_date, retry=retry):
+            return True
+
+        with self.profiler.phase("verify"):
             valid = task.verify(
                 backend_session=backend_session,
                 security=security
             )
 
-            if valid:
-                self.print_message(f"Info: {task.get_name()}, security {security.original_id} verification passed.")
-            else:
-                if retry:
-                    self.print_message(f"Error: {task.get_name()}, security {security.original_id} verification failed "
-                                       f"after retry. Notifying admins...")
-                    await self.notify_verification_failure(task)
-                else:
-                    self.print_message(f"Warning: {task.get_name()}, security {security.original_id} "
-                                       f"verification failed. Retrying..")
+        if valid:
+            self.print_message(f"Info: {task.get_name()}, security {security.original_id} verification passed.")
+            return True
+
+        if retry:
+            self.print_message(f"Error: {task.get_name()}, security {security.original_id} verification failed "
+                               f"after retry. Notifying admins...")
+            self.reset_task_watermark(task=task, security=security, backend_session=backend_session)
+            await self.notify_verification_failure(task)
+            return False
+
+        self.print_message(f"Warning: {task.get_name()}, security {security.original_id} "
+                           f"verification failed. Retrying..")
+
+        return await self.run_and_verify_security_based_task_security(
+            task=task,
+            timeout=timeout,
+            force=force,
+            up_to_date=up_to_date,
+            retry=True,
+            security=security,
+            backend_session=backend_session
+        )
 
-                    await self.run_and_verify_security_based_task_security(
-                        task=task,
-                        timeout=timeout,
-                        force=force,
-                        up_to_date=up_to_date,
-                        retry=True,
-                        security=security,
-                        backend_session=backend_session
-                    )
+    def should_verify(self, force: bool, up_to_date: bool, retry: bool) -> bool:
+        """
+        Returns whether a task should be verified. Up-to-date tasks were verified when they were migrated, so they
+        are verified again only in verify only or full verify mode.
+
+        Args:
+            force: whether the task is forced
+            up_to_date: whether the task is up-to-date
+            retry: whether this is a retry attempt
+
+        Returns:
+            Whether the task should be verified
+        """
+        if self.skip_verify:
+            return False
+
+        return not up_to_date or force or retry or self.verify_only or self.full_verify
+
+    def reset_task_watermark(self,
+                             task: AbstractMigrationTask,
+                             security: Optional[Security],
+                             backend_session: Session
+                             ):
+        """
+        Resets task watermark so that the failed task is not considered up-to-date on the next run
+
+        Args:
+            task: failed task
+            security: failed security or None if task is not security based
+            backend_session: backend session
+        """
+        task.reset_watermark(backend_session=backend_session, security=security)
+
+        if not self.debug:
+            backend_session.commit()
 
     async def handle_synchronization_failure(self,
                                              backend_session: Session,
@@ -464,10 +582,7 @@ class MigrateHandler:
             body=email_body
         )
 
-        try:
-            await Mailer.send_mail(message)
-        except Exception as e:
-            self.print_message(f"Error sending email {e}")
+        mail_dispatcher.enqueue(message)
 
     async def notify_synchronization_failure(self,
                                              backend_session: Session,
@@ -504,10 +619,7 @@ class MigrateHandler:
             body=email_body
         )
 
-        try:
-            await Mailer.send_mail(message)
-        except Exception as e:
-            self.print_message(f"Error sending email {e}")
+        mail_dispatcher.enqueue(message)
 
         synchronization_failure.handled = True
         synchronization_failure.updated = datetime.now()
@@ -531,10 +643,7 @@ class MigrateHandler:
             body=email_body
         )
 
-        try:
-            await Mailer.send_mail(message)
-        except Exception as e:
-            self.print_message(f"Error sending email {e}")
+        mail_dispatcher.enqueue(message)
 
     @staticmethod
     def list_force_failed_tasks(backend_session: Session) -> List[str]:
@@ -623,7 +732,12 @@ class MigrateHandler:
 @click.option("--security", default=None, help="Specify security for the task")
 @click.option("--verify-only", default=False, help="Runs only verifications")
 @click.option("--skip-verify", default=False, help="Skip verifications")
-def main(debug, task, skip_tasks, force_recheck, timeout, security, verify_only, skip_verify):
+@click.option("--full-verify", default=False, help="Verify also up-to-date tasks")
+@click.option("--pipeline", default=False, help="Fetch next source page while writing the current one")
+@click.option("--profile", default=None, help="Write JSON performance report into given file")
+@click.option("--profile-dump", default=None, help="Write cProfile dump into given file when profiling")
+def main(debug, task, skip_tasks, force_recheck, timeout, security, verify_only, skip_verify, full_verify, pipeline,
+         profile, profile_dump):
     """Migration method"""
     handler = MigrateHandler(
         debug=debug,
@@ -631,7 +745,11 @@ def main(debug, task, skip_tasks, force_recheck, timeout, security, verify_only,
         timeout=int(timeout),
         security=security,
         verify_only=verify_only,
-        skip_verify=skip_verify
+        skip_verify=skip_verify,
+        full_verify=full_verify,
+        pipeline=pipeline,
+        profile=profile,
+        profile_dump=profile_dump
     )
 
     asyncio.run(handler.handle(
@@ -0,0 +1,218 @@
+import queue
+import threading
+import time
+
+from datetime import datetime
+from typing import Callable, Iterator, List, Tuple, Any
+
+from sqlalchemy.orm import Session
+
+PIPELINE_QUEUE_SIZE = 2
+
+_END = object()
+
+
+class PipelineStats:
+    """
+    Throughput statistics of a paged source read
+    """
+
+    def __init__(self):
+        self.pages = 0
+        self.rows = 0
+        self.fetch_seconds = 0.0
+        self.process_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def get_summary(self) -> str:
+        """
+        Returns human-readable summary of the statistics
+
+        Returns: summary
+        """
+        fetch_rate = self.rows / self.fetch_seconds if self.fetch_seconds > 0 else 0
+        process_rate = self.rows / self.process_seconds if self.process_seconds > 0 else 0
+        return f"{self.rows} rows in {self.pages} pages, " \
+               f"fetch {self.fetch_seconds:.2f}s ({fetch_rate:.0f} rows/s), " \
+               f"transform and write {self.process_seconds:.2f}s ({process_rate:.0f} rows/s), " \
+               f"waited for source {self.wait_seconds:.2f}s"
+
+
+class PagedSourceReader:
+    """
+    Reads offset paginated source rows page by page.
+
+    In pipelined mode the next page is fetched in a producer thread with its own session while
+    the caller transforms and writes the current page. The bounded queue stops the producer when
+    the caller falls behind.
+    """
+
+    def __init__(self,
+                 funds_session: Session,
+                 fetch_page: Callable[[Session, int, int], List[Any]],
+                 batch: int,
+                 timeout: datetime,
+                 pipelined: bool
+                 ):
+        """
+        Constructor
+        Args:
+            funds_session: source database session
+            fetch_page: function returning rows of a page for given session, offset and limit
+            batch: page size
+            timeout: timeout
+            pipelined: whether pages are fetched in a producer thread
+        """
+        self.funds_session = funds_session
+        self.fetch_page = fetch_page
+        self.batch = batch
+        self.timeout = timeout
+        self.pipelined = pipelined
+        self.stats = PipelineStats()
+
+    def __iter__(self) -> Iterator[Tuple[int, List[Any]]]:
+        if self.pipelined:
+            return self.iterate_pipelined()
+
+        return self.iterate_sequential()
+
+    def iterate_sequential(self) -> Iterator[Tuple[int, List[Any]]]:
+        """
+        Fetches pages in the calling thread
+
+        Returns: iterator of offset and rows tuples
+        """
+        offset = 0
+
+        while self.timeout > datetime.now():
+            rows = self.fetch(session=self.funds_session, offset=offset)
+            if len(rows) == 0:
+                break
+
+            yield from self.process(offset=offset, rows=rows)
+
+            if len(rows) < self.batch:
+                break
+
+            offset += self.batch
+
+    def iterate_pipelined(self) -> Iterator[Tuple[int, List[Any]]]:
+        """
+        Fetches pages in a producer thread
+
+        Returns: iterator of offset and rows tuples
+        """
+        pages = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        stopped = threading.Event()
+        producer = threading.Thread(target=self.produce, args=(pages, stopped), daemon=True)
+        producer.start()
+
+        try:
+            while True:
+                started = time.perf_counter()
+                item = pages.get()
+                self.stats.wait_seconds += time.perf_counter() - started
+
+                if item is _END:
+                    break
+
+                if isinstance(item, BaseException):
+                    raise item
+
+                offset, rows = item
+                yield from self.process(offset=offset, rows=rows)
+        finally:
+            stopped.set()
+            self.drain(pages=pages)
+            producer.join()
+
+    def produce(self, pages: queue.Queue, stopped: threading.Event):
+        """
+        Producer thread fetching pages into the queue
+        Args:
+            pages: page queue
+            stopped: event set when the consumer stops reading
+        """
+        try:
+            with Session(bind=self.funds_session.get_bind()) as producer_session:
+                offset = 0
+
+                while not stopped.is_set() and self.timeout > datetime.now():
+                    rows = self.fetch(session=producer_session, offset=offset)
+                    if len(rows) == 0:
+                        break
+
+                    if not self.put(pages=pages, stopped=stopped, item=(offset, rows)):
+                        return
+
+                    if len(rows) < self.batch:
+                        break
+
+                    offset += self.batch
+        except Exception as e:
+            self.put(pages=pages, stopped=stopped, item=e)
+            return
+
+        self.put(pages=pages, stopped=stopped, item=_END)
+
+    def fetch(self, session: Session, offset: int) -> List[Any]:
+        """
+        Fetches a page and records fetch statistics
+        Args:
+            session: source database session
+            offset: offset
+
+        Returns: rows of the page
+        """
+        started = time.perf_counter()
+        rows = list(self.fetch_page(session, offset, self.batch))
+        self.stats.fetch_seconds += time.perf_counter() - started
+        return rows
+
+    def process(self, offset: int, rows: List[Any]) -> Iterator[Tuple[int, List[Any]]]:
+        """
+        Yields a page to the caller and records the time the caller spent processing it
+        Args:
+            offset: offset
+            rows: rows of the page
+
+        Returns: iterator with single offset and rows tuple
+        """
+        started = time.perf_counter()
+        yield offset, rows
+        self.stats.process_seconds += time.perf_counter() - started
+        self.stats.pages += 1
+        self.stats.rows += len(rows)
+
+    @staticmethod
+    def put(pages: queue.Queue, stopped: threading.Event, item: Any) -> bool:
+        """
+        Puts an item into the queue unless the consumer has stopped
+        Args:
+            pages: page queue
+            stopped: event set when the consumer stops reading
+            item: item
+
+        Returns: whether the item was put into the queue
+        """
+        while not stopped.is_set():
+            try:
+                pages.put(item, timeout=1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    @staticmethod
+    def drain(pages: queue.Queue):
+        """
+        Removes remaining items from the queue so that a blocked producer can finish
+        Args:
+            pages: page queue
+        """
+        while True:
+            try:
+                pages.get_nowait()
+            except queue.Empty:
+                return
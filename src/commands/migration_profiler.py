@@ -0,0 +1,311 @@
+import cProfile
+import json
+import os
+import resource
+import threading
+import time
+
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .migration_pipeline import PagedSourceReader
+
+MEMORY_SAMPLE_INTERVAL = 0.05
+
+
+class ProfileEntry:
+    """
+    Performance figures of a migration task or a single security of a security based task
+    """
+
+    def __init__(self, task: str, security: Optional[str]):
+        """
+        Constructor
+        Args:
+            task: task name
+            security: security original id or None for the whole task
+        """
+        self.task = task
+        self.security = security
+        self.rows_written = 0
+        self.source_queries = 0
+        self.source_seconds = 0.0
+        self.backend_queries = 0
+        self.backend_seconds = 0.0
+        self.migrate_seconds = 0.0
+        self.verify_seconds = 0.0
+        self.finish_seconds = 0.0
+        self.total_seconds = 0.0
+        self.start_memory_kb: Optional[int] = None
+        self.end_memory_kb: Optional[int] = None
+        self.peak_memory_kb: Optional[int] = None
+        self.readers: List[PagedSourceReader] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns entry as JSON serializable dict
+
+        Returns: entry as dict
+        """
+        return {
+            "task": self.task,
+            "security": self.security,
+            "rows_read": sum(x.stats.rows for x in self.readers),
+            "rows_written": self.rows_written,
+            "source_queries": self.source_queries,
+            "source_seconds": round(self.source_seconds, 3),
+            "backend_queries": self.backend_queries,
+            "backend_seconds": round(self.backend_seconds, 3),
+            "migrate_seconds": round(self.migrate_seconds, 3),
+            "verify_seconds": round(self.verify_seconds, 3),
+            "finish_seconds": round(self.finish_seconds, 3),
+            "total_seconds": round(self.total_seconds, 3),
+            "start_memory_kb": self.start_memory_kb,
+            "end_memory_kb": self.end_memory_kb,
+            "peak_memory_kb": self.peak_memory_kb
+        }
+
+
+class MemorySampler:
+    """
+    Samples resident set size of the process in a background thread and keeps the peak of the sampled period.
+    Unlike the process peak from rusage, the peak is specific to the period, but allocations shorter than
+    the sampling interval may be missed.
+    """
+
+    def __init__(self, interval: float = MEMORY_SAMPLE_INTERVAL):
+        """
+        Constructor
+        Args:
+            interval: sampling interval in seconds
+        """
+        self.interval = interval
+        self.peak_kb: Optional[int] = None
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "MemorySampler":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """
+        Starts sampling
+        """
+        self.sample()
+        self.thread = threading.Thread(target=self.run, name="memory-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops sampling. Memory is sampled once more, so the peak is not below the memory at the end of the period
+        """
+        self.stopped.set()
+        self.thread.join()
+        self.sample()
+
+    def run(self):
+        """
+        Samples memory until stopped
+        """
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """
+        Samples current memory into the peak
+        """
+        memory = MigrationProfiler.get_current_memory()
+        if memory is not None and (self.peak_kb is None or memory > self.peak_kb):
+            self.peak_kb = memory
+
+
+class MigrationProfiler:
+    """
+    Collects migration performance report. Source and backend query counts and times are collected
+    from SQLAlchemy engine events, so everything executed within a task or security scope is included.
+    """
+
+    def __init__(self, report_file: Optional[str], dump_file: Optional[str]):
+        """
+        Constructor
+        Args:
+            report_file: path of the JSON report or None to disable profiling
+            dump_file: path of the cProfile dump or None to skip the dump
+        """
+        self.report_file = report_file
+        self.dump_file = dump_file
+        self.enabled = bool(report_file)
+        self.backend_engine: Optional[Engine] = None
+        self.entries: List[ProfileEntry] = []
+        self.active: List[ProfileEntry] = []
+        self.started: Optional[datetime] = None
+        self.profile: Optional[cProfile.Profile] = None
+
+    def start(self, backend_engine: Engine):
+        """
+        Starts profiling
+        Args:
+            backend_engine: backend database engine. Queries of other engines are counted as source queries
+        """
+        if not self.enabled:
+            return
+
+        self.backend_engine = backend_engine
+        self.started = datetime.now()
+        event.listen(Engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", self.after_cursor_execute)
+
+        if self.dump_file:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self):
+        """
+        Stops profiling and writes the report and the cProfile dump
+        """
+        if not self.enabled:
+            return
+
+        if self.profile:
+            self.profile.disable()
+            self.profile.dump_stats(self.dump_file)
+
+        event.remove(Engine, "before_cursor_execute", self.before_cursor_execute)
+        event.remove(Engine, "after_cursor_execute", self.after_cursor_execute)
+
+        ended = datetime.now()
+        report = {
+            "started": self.started.isoformat(),
+            "ended": ended.isoformat(),
+            "total_seconds": round((ended - self.started).total_seconds(), 3),
+            "process_peak_memory_kb": self.get_peak_memory(),
+            "entries": [x.to_dict() for x in self.entries]
+        }
+
+        with open(self.report_file, "w") as file:
+            json.dump(report, file, indent=2)
+
+    @contextmanager
+    def scope(self, task: str, security: Optional[str]) -> Iterator[None]:
+        """
+        Records everything executed within the context into a task or security entry
+        Args:
+            task: task name
+            security: security original id or None for the whole task
+        """
+        if not self.enabled:
+            yield
+            return
+
+        entry = ProfileEntry(task=task, security=security)
+        entry.start_memory_kb = self.get_current_memory()
+        self.entries.append(entry)
+        self.active.append(entry)
+        started = time.perf_counter()
+        memory_sampler = MemorySampler()
+        memory_sampler.start()
+
+        try:
+            yield
+        finally:
+            memory_sampler.stop()
+            entry.total_seconds = time.perf_counter() - started
+            entry.end_memory_kb = self.get_current_memory()
+            entry.peak_memory_kb = memory_sampler.peak_kb
+            self.active.remove(entry)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Records time spent within the context as migrate, verify or finish time of the active entries
+        Args:
+            name: phase, one of migrate, verify or finish
+        """
+        if not self.enabled:
+            yield
+            return
+
+        started = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            for entry in self.active:
+                if name == "verify":
+                    entry.verify_seconds += elapsed
+                elif name == "finish":
+                    entry.finish_seconds += elapsed
+                else:
+                    entry.migrate_seconds += elapsed
+
+    def add_written(self, count: int):
+        """
+        Adds written row count to the active entries
+        Args:
+            count: written row count
+        """
+        for entry in self.active:
+            entry.rows_written += count
+
+    def add_reader(self, reader: PagedSourceReader):
+        """
+        Adds a source page reader whose rows are counted as read rows of the active entries
+        Args:
+            reader: page reader
+        """
+        for entry in self.active:
+            entry.readers.append(reader)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("migration_profiler_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("migration_profiler_started", None)
+        if not started:
+            return
+
+        elapsed = time.perf_counter() - started.pop()
+        backend = conn.engine is self.backend_engine
+
+        for entry in list(self.active):
+            if backend:
+                entry.backend_queries += 1
+                entry.backend_seconds += elapsed
+            else:
+                entry.source_queries += 1
+                entry.source_seconds += elapsed
+
+    @staticmethod
+    def get_peak_memory() -> int:
+        """
+        Returns peak resident set size of the process. The peak is over the whole process lifetime, so it does not
+        grow during a task that uses less memory than an earlier one. The kernel updates the peak lazily, so it is
+        not reported below the current resident set size
+
+        Returns: peak resident set size in kilobytes
+        """
+        return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, MigrationProfiler.get_current_memory() or 0)
+
+    @staticmethod
+    def get_current_memory() -> Optional[int]:
+        """
+        Returns current resident set size of the process
+
+        Returns: current resident set size in kilobytes or None when /proc is not available
+        """
+        try:
+            with open("/proc/self/statm") as file:
+                resident_pages = int(file.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            return None
+
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
@@ -10,17 +10,24 @@ from abc import ABC, abstractmethod
 from sqlalchemy import create_engine, and_, func, text, Integer, DECIMAL
 from sqlalchemy.engine.mock import MockConnection
 from sqlalchemy.orm import Session
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any, Callable, Set, Tuple
 
+from auth.authorization import AuthorizationCache
+from config.settings import Settings
 from database import models as destination_models
+from database import operations
+from utils.rate_store import RateStore, RateStoreWriter
+from utils.security_catalog import security_catalog
 from datetime import datetime, date, timedelta
 
+from .migration_pipeline import PagedSourceReader
 from .migration_exceptions import MigrationException, MissingSecurityException, \
     MissingCompanyException, MissingPortfolioException
 
 FUND_GROUPS = ["PASSIVE", "ACTIVE", "BALANCED", "FIXED_INCOME", "DIMENSION", "SPILTAN"]
 
 TIMED_OUT = "Timed out."
+RATES_FIRST_DATE = date(1970, 1, 1)
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +42,12 @@ class AbstractMigrationTask(ABC):
     Abstract migration task
     """
 
+    # whether source pages are fetched in parallel with backend writes
+    pipelined = False
+
+    # profiler collecting read rows of the source page readers
+    profiler = None
+
     @abstractmethod
     def get_name(self) -> str:
         """
@@ -76,6 +89,18 @@ class AbstractMigrationTask(ABC):
         """
         pass
 
+    def finish(self, backend_session: Session):
+        """
+        Task can override this method to perform actions after the task has been migrated and verified.
+        Method is not executed in debug or verify only mode.
+        Args:
+            backend_session: backend session
+
+        Returns:
+
+        """
+        pass
+
     @abstractmethod
     def up_to_date(self, backend_session: Session) -> bool:
         """
@@ -217,12 +242,144 @@ class AbstractMigrationTask(ABC):
             value += timedelta(seconds=1)
         return value.replace(microsecond=0)
 
+    @staticmethod
+    def release_session_objects(backend_session: Session):
+        """
+        Flushes pending changes and detaches synchronized objects from the session so that
+        memory use does not grow with the number of migrated rows. Securities are kept in the
+        session because they are shared between tasks.
+        Args:
+            backend_session: backend session
+        """
+        backend_session.flush()
+
+        for instance in list(backend_session.identity_map.values()):
+            if not isinstance(instance, destination_models.Security):
+                backend_session.expunge(instance)
+
+    def get_watermarks(self, backend_session: Session) -> Dict[Optional[UUID], destination_models.SyncWatermark]:
+        """
+        Returns task synchronization watermarks
+        Args:
+            backend_session: backend session
+
+        Returns: dict of watermarks by security id. Watermark of task that is not security based has None key
+        """
+        watermarks = operations.list_sync_watermarks(database=backend_session, task=self.get_name())
+        return {x.security_id: x for x in watermarks}
+
+    def update_watermark(self,
+                         backend_session: Session,
+                         security: Optional[destination_models.Security],
+                         source_updated: Optional[datetime],
+                         row_count: Optional[int]
+                         ) -> destination_models.SyncWatermark:
+        """
+        Updates task synchronization watermark to match given source state
+        Args:
+            backend_session: backend session
+            security: security or None if task is not security based
+            source_updated: latest source update time
+            row_count: source row count
+
+        Returns: updated watermark
+        """
+        return operations.upsert_sync_watermark(database=backend_session,
+                                                task=self.get_name(),
+                                                security_id=security.id if security else None,
+                                                source_updated=source_updated,
+                                                row_count=row_count)
+
+    def reset_watermark(self, backend_session: Session, security: Optional[destination_models.Security]):
+        """
+        Removes task synchronization watermark so that the next run will not consider the task up-to-date
+        Args:
+            backend_session: backend session
+            security: security or None to remove all watermarks of the task
+        """
+        operations.delete_sync_watermarks(database=backend_session,
+                                          task=self.get_name(),
+                                          security_ids=[security.id] if security else None)
+
+    def is_watermark_current(self,
+                             watermark: Optional[destination_models.SyncWatermark],
+                             source_updated: Optional[datetime],
+                             row_count: Optional[int]
+                             ) -> bool:
+        """
+        Returns whether watermark matches given source state
+        Args:
+            watermark: watermark
+            source_updated: latest source update time
+            row_count: source row count
+
+        Returns: whether watermark matches given source state
+        """
+        if watermark is None or watermark.source_updated is None or source_updated is None:
+            return False
+
+        return watermark.row_count == row_count and \
+            self.round_datetime_to_seconds(watermark.source_updated) == self.round_datetime_to_seconds(source_updated)
+
+    def is_security_watermarks_current(self, backend_session: Session, funds_states: Dict[str, Any]) -> bool:
+        """
+        Returns whether all securities have a watermark that matches the funds database state
+        Args:
+            backend_session: backend session
+            funds_states: dict of rows with LAST_DATE and ROW_COUNT columns by security original id
+
+        Returns: whether all securities have a watermark that matches the funds database state
+        """
+        watermarks = self.get_watermarks(backend_session=backend_session)
+        security_ids = dict(backend_session.query(destination_models.Security.original_id,
+                                                  destination_models.Security.id).all())
+
+        for original_id, funds_state in funds_states.items():
+            security_id = security_ids.get(original_id, None)
+            if not security_id:
+                return False
+
+            if not self.is_watermark_current(watermark=watermarks.get(security_id, None),
+                                             source_updated=funds_state.LAST_DATE,
+                                             row_count=funds_state.ROW_COUNT):
+                return False
+
+        return True
+
 
 class AbstractFundsTask(AbstractMigrationTask, ABC):
     """
     Abstract base class for fund migrations
     """
 
+    def read_funds_pages(self,
+                         funds_session: Session,
+                         fetch_page: Callable[[Session, int, int], List[Any]],
+                         batch: int,
+                         timeout: datetime
+                         ) -> PagedSourceReader:
+        """
+        Returns reader for offset paginated funds database rows. When the task is pipelined, the next
+        page is fetched while the current one is being written into the backend database
+        Args:
+            funds_session: funds database session
+            fetch_page: function returning rows of a page for given session, offset and limit
+            batch: page size
+            timeout: timeout
+
+        Returns: page reader
+        """
+        reader = PagedSourceReader(funds_session=funds_session,
+                                   fetch_page=fetch_page,
+                                   batch=batch,
+                                   timeout=timeout,
+                                   pipelined=self.pipelined)
+
+        if self.profiler:
+            self.profiler.add_reader(reader)
+
+        return reader
+
     @staticmethod
     def get_funds_database_engine() -> MockConnection:
         """
@@ -385,6 +542,14 @@ class MigrateSecuritiesTask(AbstractFundsTask):
             if len(removed_original_ids) > 0:
                 self.print_message(f"Deleting securities with original_ids {removed_original_ids}")
 
+                removed_security_ids = backend_session.query(destination_models.Security.id) \
+                    .filter(destination_models.Security.original_id.in_(removed_original_ids)) \
+                    .all()
+
+                operations.delete_sync_watermarks(database=backend_session,
+                                                  task=None,
+                                                  security_ids=[x.id for x in removed_security_ids])
+
                 synchronized_count = synchronized_count + backend_session.query(destination_models.Security) \
                     .filter(destination_models.Security.original_id.in_(removed_original_ids)) \
                     .delete(synchronize_session=False)
@@ -555,46 +720,205 @@ class MigrateSecurityRatesTask(AbstractFundsTask):
 
     def up_to_date(self, backend_session: Session) -> bool:
         with Session(self.get_funds_database_engine()) as funds_session:
-            backend_count = backend_session.execute(statement="SELECT COUNT(ID) FROM security_rate").scalar()
-            funds_count = funds_session.execute(statement="SELECT COUNT(*) FROM TABLE_RATE").scalar()
-            return backend_count == funds_count
+            funds_summaries = self.get_funds_rate_summaries(funds_session=funds_session)
+
+        return self.is_security_watermarks_current(backend_session=backend_session, funds_states=funds_summaries)
 
     def migrate(self, backend_session: Session, timeout: datetime, force_recheck: bool) -> int:
         synchronized_count = 0
 
         with Session(self.get_funds_database_engine()) as funds_session:
-            last_funds_dates = None if force_recheck else self.get_last_funds_dates(funds_session=funds_session)
-            last_backend_dates = None if force_recheck else self.get_last_backend_dates(backend_session=backend_session)
+            funds_summaries = self.get_funds_rate_summaries(funds_session=funds_session)
+            watermarks = self.get_watermarks(backend_session=backend_session)
+            versioned_security_ids = self.get_rate_version_security_ids(backend_session=backend_session)
+            backend_states = None
 
             securities = self.list_securities(backend_session=backend_session)
             for security in securities:
                 if self.should_timeout(timeout=timeout):
                     break
 
-                if not force_recheck:
-                    last_fund_date = last_funds_dates.get(security.original_id, None)
-                    if not last_fund_date:
-                        continue
+                funds_summary = funds_summaries.get(security.original_id, None)
+                watermark = watermarks.get(security.id, None)
+                rates_checked = False
+
+                if force_recheck:
+                    synchronized_count += self.resync_security_rates(security=security,
+                                                                     backend_session=backend_session,
+                                                                     funds_session=funds_session,
+                                                                     timeout=timeout)
+                    rates_checked = True
+                elif funds_summary and not self.is_watermark_current(watermark=watermark,
+                                                                     source_updated=funds_summary.LAST_DATE,
+                                                                     row_count=funds_summary.ROW_COUNT):
+                    if watermark and watermark.source_updated and watermark.row_count is not None:
+                        last_backend_date, backend_count = watermark.source_updated.date(), watermark.row_count
+                    else:
+                        # securities without a watermark fall back to the synchronized rates in the backend
+                        if backend_states is None:
+                            backend_states = self.get_backend_rate_states(backend_session=backend_session)
+
+                        last_backend_date, backend_count = backend_states.get(security.id, (RATES_FIRST_DATE, 0))
+
+                    if funds_summary.LAST_DATE.date() > last_backend_date:
+                        created_count = self.migrate_security_rates(security=security,
+                                                                    backend_session=backend_session,
+                                                                    funds_session=funds_session,
+                                                                    last_backend_date=last_backend_date,
+                                                                    timeout=timeout,
+                                                                    force_recheck=False
+                                                                    )
+                        synchronized_count += created_count
+                        backend_count += created_count
+
+                    # rates inserted or deleted before the last synchronized date change only the row count
+                    if backend_count != funds_summary.ROW_COUNT and not self.should_timeout(timeout=timeout):
+                        self.print_message(f"Info: Security {security.original_id} has {funds_summary.ROW_COUNT} "
+                                           f"rates instead of {backend_count}, rechecking all rates")
+
+                        synchronized_count += self.resync_security_rates(security=security,
+                                                                         backend_session=backend_session,
+                                                                         funds_session=funds_session,
+                                                                         timeout=timeout)
+
+                    rates_checked = True
 
-                    last_backend_date = last_backend_dates.get(security.id, date(1970, 1, 1))
-                    if last_fund_date <= last_backend_date:
-                        continue
-                else:
-                    last_backend_date = date(1970, 1, 1)
+                if self.should_timeout(timeout=timeout):
+                    continue
 
-                synchronized_count += self.migrate_security_rates(security=security,
-                                                                  backend_session=backend_session,
-                                                                  funds_session=funds_session,
-                                                                  last_backend_date=last_backend_date,
-                                                                  timeout=timeout,
-                                                                  force_recheck=force_recheck
-                                                                  )
+                if rates_checked or security.id not in versioned_security_ids:
+                    self.update_rate_version(backend_session=backend_session, security=security)
+
+                if funds_summary and rates_checked:
+                    self.update_watermark(backend_session=backend_session,
+                                          security=security,
+                                          source_updated=funds_summary.LAST_DATE,
+                                          row_count=funds_summary.ROW_COUNT)
 
             if self.should_timeout(timeout=timeout):
                 self.print_message(TIMED_OUT)
 
             return synchronized_count
 
+    @staticmethod
+    def get_rate_version_security_ids(backend_session: Session) -> Set[UUID]:
+        """
+        Returns ids of securities with a maintained rate version
+        Args:
+            backend_session: backend database session
+
+        Returns: security ids
+        """
+        watermarks = operations.list_sync_watermarks(database=backend_session,
+                                                     task=operations.SECURITY_RATE_VERSION_TASK)
+        return {x.security_id for x in watermarks}
+
+    @staticmethod
+    def update_rate_version(backend_session: Session, security: destination_models.Security):
+        """
+        Recalculates maintained rate version of a security after its rates have been synchronized
+        Args:
+            backend_session: backend database session
+            security: security
+        """
+        operations.refresh_security_rate_version(database=backend_session, security_id=security.id)
+
+    def resync_security_rates(self,
+                              security: destination_models.Security,
+                              funds_session: Session,
+                              backend_session: Session,
+                              timeout: datetime
+                              ) -> int:
+        """
+        Rechecks all rates of a security from its first date and deletes rates removed from the funds database
+        Args:
+            security: security
+            funds_session: fund database session
+            backend_session: backend database session
+            timeout: timeout
+
+        Returns: synchronized count
+        """
+        synchronized_count = self.migrate_security_rates(security=security,
+                                                         backend_session=backend_session,
+                                                         funds_session=funds_session,
+                                                         last_backend_date=RATES_FIRST_DATE,
+                                                         timeout=timeout,
+                                                         force_recheck=True
+                                                         )
+
+        if self.should_timeout(timeout=timeout):
+            return synchronized_count
+
+        return synchronized_count + self.delete_removed_security_rates(security=security,
+                                                                       backend_session=backend_session,
+                                                                       funds_session=funds_session)
+
+    def delete_removed_security_rates(self,
+                                      security: destination_models.Security,
+                                      funds_session: Session,
+                                      backend_session: Session
+                                      ) -> int:
+        """
+        Deletes backend rates of a security that no longer exist in the funds database
+        Args:
+            security: security
+            funds_session: fund database session
+            backend_session: backend database session
+
+        Returns: deleted count
+        """
+        batch = 1000
+        funds_rows = funds_session.execute("SELECT RDATE FROM TABLE_RATE WHERE SECID = :SECID",
+                                           {"SECID": security.original_id})
+        funds_dates = {row.RDATE.date() if isinstance(row.RDATE, datetime) else row.RDATE for row in funds_rows}
+
+        removed_dates = [rate_date for (rate_date,) in
+                         backend_session.query(destination_models.SecurityRate.rate_date)
+                         .filter(destination_models.SecurityRate.security_id == security.id)
+                         if rate_date not in funds_dates]
+
+        for offset in range(0, len(removed_dates), batch):
+            backend_session.query(destination_models.SecurityRate) \
+                .filter(destination_models.SecurityRate.security_id == security.id) \
+                .filter(destination_models.SecurityRate.rate_date.in_(removed_dates[offset:offset + batch])) \
+                .delete(synchronize_session=False)
+
+        if removed_dates:
+            self.print_message(f"Info: Deleted {len(removed_dates)} removed rates of security {security.original_id}")
+
+        return len(removed_dates)
+
+    def finish(self, backend_session: Session):
+        settings = Settings()
+        if not settings.RATE_STORE_PATH:
+            return
+
+        securities = self.list_securities(backend_session=backend_session)
+        versions = operations.get_security_rate_versions(database=backend_session,
+                                                         security_ids=[x.id for x in securities])
+
+        rate_store = RateStore(path=settings.RATE_STORE_PATH)
+        try:
+            up_to_date = rate_store.is_current(versions=versions)
+        finally:
+            rate_store.close()
+
+        if up_to_date:
+            self.print_message(f"Info: Rate store {settings.RATE_STORE_PATH} is up-to-date.")
+            return
+
+        rate_count = RateStoreWriter.write(
+            path=settings.RATE_STORE_PATH,
+            securities=((x.id, operations.list_security_rate_values(database=backend_session, security_id=x.id))
+                        for x in securities),
+            security_count=len(securities),
+            headroom_days=settings.RATE_STORE_HEADROOM_DAYS
+        )
+
+        self.print_message(f"Info: Wrote {rate_count} rates of {len(securities)} securities into rate store "
+                           f"{settings.RATE_STORE_PATH}")
+
     def verify(self, backend_session: Session, security: Optional[destination_models.Security]) -> bool:
         with Session(self.get_funds_database_engine()) as funds_session:
             funds_verification_values = self.get_funds_verification_values(funds_session=funds_session)
@@ -715,22 +1039,23 @@ class MigrateSecurityRatesTask(AbstractFundsTask):
         Returns: synchronized count
         """
         batch = 1000
-        offset = 0
         synchronized_count = 0
 
-        while not self.should_timeout(timeout=timeout):
-            self.print_message(f"Migrating security {security.original_id} rates from offset {offset}")
-
-            rate_rows = self.list_funds_security_rates(
-                funds_session=funds_session,
+        pages = self.read_funds_pages(
+            funds_session=funds_session,
+            fetch_page=lambda session, offset, limit: self.list_funds_security_rates(
+                funds_session=session,
                 security=security,
                 rdate=last_backend_date,
                 offset=offset,
-                limit=batch
-            )
+                limit=limit
+            ),
+            batch=batch,
+            timeout=timeout
+        )
 
-            if rate_rows.rowcount == 0:
-                break
+        for offset, rate_rows in pages:
+            self.print_message(f"Migrating security {security.original_id} rates from offset {offset}")
 
             for rate_row in rate_rows:
                 rate_date = rate_row.RDATE
@@ -753,46 +1078,44 @@ class MigrateSecurityRatesTask(AbstractFundsTask):
 
                     synchronized_count = synchronized_count + 1
 
-            if rate_rows.rowcount != -1 and rate_rows.rowcount < batch:
-                break
+            self.release_session_objects(backend_session=backend_session)
 
-            offset += batch
+        self.print_message(f"Info: Security {security.original_id} rates: {pages.stats.get_summary()}")
 
         return synchronized_count
 
     @staticmethod
-    def get_last_backend_dates(backend_session: Session) -> Dict[UUID, date]:
+    def get_backend_rate_states(backend_session: Session) -> Dict[UUID, Tuple[date, int]]:
         """
-        Returns dict of last security backend dates
+        Returns dict of last backend rate dates and rate counts by security
         Args:
             backend_session: backend database session
 
-        Returns: dict of last security backend dates"""
+        Returns: dict of last backend rate dates and rate counts by security id"""
         result = {}
         rows = backend_session.query(destination_models.SecurityRate.security_id,
-                                     func.max(destination_models.SecurityRate.rate_date)) \
+                                     func.max(destination_models.SecurityRate.rate_date),
+                                     func.count(destination_models.SecurityRate.id)) \
             .group_by(destination_models.SecurityRate.security_id) \
             .all()
 
         for row in rows:
-            result[row[0]] = row[1]
+            result[row[0]] = (row[1], row[2])
 
         return result
 
     @staticmethod
-    def get_last_funds_dates(funds_session: Session) -> Dict[str, date]:
+    def get_funds_rate_summaries(funds_session: Session) -> Dict[str, Any]:
         """
-        Returns dict of last security fund dates
+        Returns dict of last rate dates and rate counts by security
         Args:
             funds_session: fund database session
 
-        Returns: dict of last security fund dates
+        Returns: dict of rows with LAST_DATE and ROW_COUNT columns by security original id
         """
-        result = {}
-        rows = funds_session.execute("SELECT SECID, max(RDATE) as LAST_DATE FROM TABLE_RATE GROUP BY SECID")
-        for row in rows:
-            result[row.SECID] = row.LAST_DATE.date()
-        return result
+        rows = funds_session.execute("SELECT SECID, max(RDATE) as LAST_DATE, COUNT(*) as ROW_COUNT "
+                                     "FROM TABLE_RATE GROUP BY SECID")
+        return {row.SECID: row for row in rows}
 
     @staticmethod
     def list_funds_security_rates(funds_session: Session, security: destination_models.Security, rdate: date,
@@ -880,7 +1203,9 @@ class MigrateLastRatesTask(AbstractFundsTask):
             fund_rows = funds_session.execute("SELECT SECID, RDATE, RCLOSE FROM TABLE_RATELAST")
             backend_rows = backend_session.query(destination_models.LastRate).all()
             self.funds_entities = {x.SECID: x for x in fund_rows}
-            self.backend_entities = {x.security.original_id: x for x in backend_rows}
+            securities = security_catalog.get_securities(database=backend_session,
+                                                         security_ids=[x.security_id for x in backend_rows])
+            self.backend_entities = {securities[x.security_id].original_id: x for x in backend_rows}
 
     def up_to_date(self, backend_session: Session) -> bool:
         for security_original_id, funds_row in self.funds_entities.items():
@@ -955,8 +1280,8 @@ class MigrateLastRatesTask(AbstractFundsTask):
                 self.print_message(f"Updating security {security_original_id} last rate "
                                    f"({rate_date} < {funds_rate_date})")
 
-                security = self.get_security_by_original_id(backend_session=backend_session,
-                                                            original_id=funds_row.SECID)
+                security = security_catalog.find_by_original_id(database=backend_session,
+                                                                 original_id=funds_row.SECID)
                 if not security:
                     raise MissingSecurityException(
                         original_id=funds_row.SECID
@@ -1008,6 +1333,7 @@ class MigrateCompaniesTask(AbstractFundsTask):
         """
         self.source_updated = None
         self.backend_updated = datetime(1970, 1, 1, 0, 0)
+        self.changed_count = 0
 
     def get_name(self):
         return "companies"
@@ -1132,6 +1458,10 @@ class MigrateCompaniesTask(AbstractFundsTask):
 
                 self.print_message(f"Deleted {deleted_portfolio_transaction_count} portfolio related transactions")
 
+                backend_session.query(destination_models.PortfolioPosition) \
+                    .filter(destination_models.PortfolioPosition.portfolio_id.in_(removed_portfolios_query)) \
+                    .delete(synchronize_session=False)
+
                 deleted_company_access_count = backend_session.query(destination_models.CompanyAccess) \
                     .filter(destination_models.CompanyAccess.company_id.in_(removed_company_ids)) \
                     .delete(synchronize_session=False)
@@ -1151,8 +1481,21 @@ class MigrateCompaniesTask(AbstractFundsTask):
         if self.should_timeout(timeout=timeout):
             self.print_message(TIMED_OUT)
 
+        self.changed_count += synchronized_count
+
         return synchronized_count
 
+    def finish(self, backend_session: Session):
+        """
+        Clears cached authorization contexts of API processes when companies have changed
+
+        Args:
+            backend_session: backend session
+        """
+        if self.changed_count > 0:
+            AuthorizationCache.invalidate_all(database=backend_session)
+            backend_session.commit()
+
     def verify(self, backend_session: Session, security: Optional[destination_models.Security]) -> bool:
         batch = 10000
         offset = 0
@@ -1560,6 +1903,7 @@ class MigratePortfolioLogsTask(AbstractFundsTask):
     def __init__(self):
         self.funds_updates = None
         self.backend_updates = None
+        self.watermarks = None
         self.excluded_ccom_codes = None
 
     def get_name(self):
@@ -1569,12 +1913,13 @@ class MigratePortfolioLogsTask(AbstractFundsTask):
         return MigrationTaskType.SECURITY_BASED
 
     def up_to_date(self, backend_session: Session) -> bool:
-        return False
+        return self.is_security_watermarks_current(backend_session=backend_session, funds_states=self.funds_updates)
 
     def prepare(self, backend_session: Session):
         with Session(self.get_funds_database_engine()) as funds_session:
             self.funds_updates = self.get_funds_updates(funds_session=funds_session)
-            self.backend_updates = self.get_backend_updates(backend_session=backend_session)
+            self.watermarks = self.get_watermarks(backend_session=backend_session)
+            self.backend_updates = None
 
     def prepare_security(self, backend_session: Session, security: destination_models.Security):
         with Session(self.get_funds_database_engine()) as funds_session:
@@ -1591,39 +1936,49 @@ class MigratePortfolioLogsTask(AbstractFundsTask):
         backend_company_map = {x.original_id: x for x in backend_companies}
 
         with Session(self.get_funds_database_engine()) as funds_session:
-            offset = 0
+            funds_state = self.funds_updates.get(security.original_id, None)
 
             if force_recheck:
                 backend_update = datetime(1970, 1, 1)
             else:
-                funds_updated = self.funds_updates.get(security.original_id, None)
-                if not funds_updated:
+                if not funds_state:
                     return 0
 
-                backend_update = self.backend_updates.get(security.id, None)
-                if not backend_update:
-                    backend_update = datetime(1970, 1, 1)
+                funds_updated = funds_state.LAST_DATE
+                watermark = self.watermarks.get(security.id, None)
+                if self.is_watermark_current(watermark=watermark,
+                                             source_updated=funds_updated,
+                                             row_count=funds_state.ROW_COUNT):
+                    return 0
+
+                backend_update = self.get_backend_update(backend_session=backend_session, security=security)
 
                 if funds_updated <= backend_update:
+                    self.update_watermark(backend_session=backend_session,
+                                          security=security,
+                                          source_updated=funds_updated,
+                                          row_count=funds_state.ROW_COUNT)
                     return 0
 
                 self.print_message(f"Info: Security {security.original_id} portfolio logs are not upd-to-date funds "
                                    f"{funds_updated}, backend {backend_update}")
 
-            while not self.should_timeout(timeout=timeout):
-                self.print_message(f"Info: Migrating security {security.original_id} "
-                                   f"portfolio logs from offset {offset}")
-
-                portfolio_log_rows = list(self.list_portfolio_logs(
-                    funds_session=funds_session,
+            pages = self.read_funds_pages(
+                funds_session=funds_session,
+                fetch_page=lambda session, offset, limit: self.list_portfolio_logs(
+                    funds_session=session,
                     security=security,
                     updated=backend_update,
                     offset=offset,
-                    limit=batch
-                ).fetchall())
+                    limit=limit
+                ).fetchall(),
+                batch=batch,
+                timeout=timeout
+            )
 
-                if len(portfolio_log_rows) == 0:
-                    break
+            for offset, portfolio_log_rows in pages:
+                self.print_message(f"Info: Migrating security {security.original_id} "
+                                   f"portfolio logs from offset {offset}")
 
                 trans_nrs = list(map(lambda i: i.TRANS_NR, portfolio_log_rows))
                 por_ids = set(map(lambda i: i.PORID, portfolio_log_rows))
@@ -1722,13 +2077,17 @@ class MigratePortfolioLogsTask(AbstractFundsTask):
 
                     synchronized_count = synchronized_count + 1
 
-                if len(portfolio_log_rows) < batch:
-                    break
+                self.release_session_objects(backend_session=backend_session)
 
-                offset += batch
+            self.print_message(f"Info: Security {security.original_id} portfolio logs: {pages.stats.get_summary()}")
 
             if self.should_timeout(timeout=timeout):
                 self.print_message(TIMED_OUT)
+            elif funds_state:
+                self.update_watermark(backend_session=backend_session,
+                                      security=security,
+                                      source_updated=funds_state.LAST_DATE,
+                                      row_count=funds_state.ROW_COUNT)
 
             return synchronized_count
 
@@ -2239,6 +2598,25 @@ class MigratePortfolioLogsTask(AbstractFundsTask):
 
         return [value for value, in rows]
 
+    def get_backend_update(self, backend_session: Session, security: destination_models.Security) -> datetime:
+        """
+        Returns last synchronized update time of security. Securities without a watermark fall back to
+        the latest update time in the backend database
+        Args:
+            backend_session: backend database session
+            security: security
+
+        Returns: last synchronized update time of security
+        """
+        watermark = self.watermarks.get(security.id, None)
+        if watermark and watermark.source_updated:
+            return watermark.source_updated
+
+        if self.backend_updates is None:
+            self.backend_updates = self.get_backend_updates(backend_session=backend_session)
+
+        return self.backend_updates.get(security.id, None) or datetime(1970, 1, 1)
+
     @staticmethod
     def get_backend_updates(backend_session: Session) -> Dict[UUID, datetime]:
         """
@@ -2259,21 +2637,18 @@ class MigratePortfolioLogsTask(AbstractFundsTask):
         return result
 
     @staticmethod
-    def get_funds_updates(funds_session: Session) -> Dict[str, datetime]:
+    def get_funds_updates(funds_session: Session) -> Dict[str, Any]:
         """
-        Returns dict of updated values from funds database
+        Returns dict of updated values and row counts from funds database
         Args:
             funds_session: fund database session
 
-        Returns: dict of updated values from funds database
+        Returns: dict of rows with LAST_DATE and ROW_COUNT columns by security original id
         """
-        result = {}
         rows = funds_session.execute(
-            "SELECT SECID, max(UPD_DATE + CAST(REPLACE(UPD_TIME, '.', ':') as DATETIME)) as LAST_DATE "
-            "FROM TABLE_PORTLOG GROUP BY SECID")
-        for row in rows:
-            result[row.SECID] = row.LAST_DATE
-        return result
+            "SELECT SECID, max(UPD_DATE + CAST(REPLACE(UPD_TIME, '.', ':') as DATETIME)) as LAST_DATE, "
+            "COUNT(*) as ROW_COUNT FROM TABLE_PORTLOG GROUP BY SECID")
+        return {row.SECID: row for row in rows}
 
     def list_portfolio_logs(self, funds_session: Session, security: destination_models.Security, updated: datetime,
                             limit: int, offset: int):
@@ -2413,11 +2788,13 @@ class MigratePortfolioTransactionsTask(AbstractFundsTask):
     def __init__(self):
         self.funds_updates = None
         self.backend_updates = None
+        self.watermarks = None
 
     def prepare(self, backend_session: Session):
         with Session(self.get_funds_database_engine()) as funds_session:
             self.funds_updates = self.get_funds_updates(funds_session=funds_session)
-            self.backend_updates = self.get_backend_updates(backend_session=backend_session)
+            self.watermarks = self.get_watermarks(backend_session=backend_session)
+            self.backend_updates = None
 
     def get_name(self):
         return "portfolio-transactions"
@@ -2426,13 +2803,22 @@ class MigratePortfolioTransactionsTask(AbstractFundsTask):
         return MigrationTaskType.SECURITY_BASED
 
     def up_to_date(self, backend_session: Session) -> bool:
-        return False
+        return self.is_security_watermarks_current(backend_session=backend_session, funds_states=self.funds_updates)
 
     def migrate_security(self, backend_session: Session, timeout: datetime, force_recheck: bool,
                          security: destination_models.Security) -> int:
         synchronized_count = 0
         batch = 10000
 
+        funds_state = self.funds_updates.get(security.original_id, None)
+
+        # unchanged update time and row count means that nothing has been added, updated or removed
+        if not force_recheck and funds_state and self.is_watermark_current(
+                watermark=self.watermarks.get(security.id, None),
+                source_updated=funds_state.LAST_DATE,
+                row_count=funds_state.ROW_COUNT):
+            return 0
+
         with Session(self.get_funds_database_engine()) as funds_session:
             self.print_message(f"Info: Checking removed portfolio transactions from security {security.original_id}...")
 
@@ -2449,6 +2835,12 @@ class MigratePortfolioTransactionsTask(AbstractFundsTask):
             removed_trans_nrs = set(backend_transaction_numbers).difference(set(funds_nrs))
 
             if len(removed_trans_nrs) > 0:
+                removed_positions = backend_session.query(destination_models.PortfolioTransaction.portfolio_id,
+                                                          destination_models.PortfolioTransaction.security_id) \
+                    .filter(destination_models.PortfolioTransaction.transaction_number.in_(removed_trans_nrs)) \
+                    .distinct() \
+                    .all()
+
                 removed_count = backend_session.query(destination_models.PortfolioTransaction) \
                     .filter(destination_models.PortfolioTransaction.transaction_number.in_(removed_trans_nrs)) \
                     .delete(synchronize_session=False)
@@ -2457,41 +2849,48 @@ class MigratePortfolioTransactionsTask(AbstractFundsTask):
                     self.print_message(f"Info: Removed {removed_count} portfolio transactions.")
                     synchronized_count += removed_count
 
-            offset = 0
+                operations.update_portfolio_positions(
+                    database=backend_session,
+                    positions=set((x.portfolio_id, x.security_id) for x in removed_positions)
+                )
+
+            if not funds_state:
+                return synchronized_count
 
-            funds_updated = self.funds_updates.get(security.original_id, None)
-            if not funds_updated:
-                return 0
+            funds_updated = funds_state.LAST_DATE
 
             if force_recheck:
                 backend_update = datetime(1970, 1, 1)
             else:
-                backend_update = self.backend_updates.get(security.id, None)
-                if not backend_update:
-                    backend_update = datetime(1970, 1, 1)
+                backend_update = self.get_backend_update(backend_session=backend_session, security=security)
 
             if funds_updated <= backend_update:
-                return 0
+                self.update_watermark(backend_session=backend_session,
+                                      security=security,
+                                      source_updated=funds_updated,
+                                      row_count=funds_state.ROW_COUNT)
+                return synchronized_count
 
             self.print_message(f"Info: Security {security.original_id} portfolio transactions are not upd-to-date "
                                f"funds {funds_updated}, backend {backend_update}")
 
-            while not self.should_timeout(timeout=timeout):
-                self.print_message(f"Info: Migrating security {security.original_id} portfolio transactions "
-                                   f"from offset {offset}")
-
-                portfolio_transaction_cursor = self.list_portfolio_transactions(
-                    funds_session=funds_session,
+            pages = self.read_funds_pages(
+                funds_session=funds_session,
+                fetch_page=lambda session, offset, limit: self.list_portfolio_transactions(
+                    funds_session=session,
                     security=security,
                     updated=backend_update,
                     offset=offset,
-                    limit=batch
-                )
+                    limit=limit
+                ).fetchall(),
+                batch=batch,
+                timeout=timeout
+            )
 
-                if portfolio_transaction_cursor.rowcount == 0:
-                    break
+            for offset, portfolio_transaction_rows in pages:
+                self.print_message(f"Info: Migrating security {security.original_id} portfolio transactions "
+                                   f"from offset {offset}")
 
-                portfolio_transaction_rows = list(portfolio_transaction_cursor.fetchall())
                 trans_nrs = list(map(lambda i: i.TRANS_NR, portfolio_transaction_rows))
                 por_ids = set(map(lambda i: i.PORID, portfolio_transaction_rows))
 
@@ -2505,6 +2904,7 @@ class MigratePortfolioTransactionsTask(AbstractFundsTask):
 
                 existing_transaction_map = {x.transaction_number: x for x in existing_transactions}
                 portfolio_id_map = {x.original_id: x.id for x in portfolio_ids}
+                changed_positions = set((x.portfolio_id, x.security_id) for x in existing_transactions)
 
                 for portfolio_transaction_row in portfolio_transaction_rows:
                     portfolio_original_id = portfolio_transaction_row.PORID
@@ -2527,15 +2927,23 @@ class MigratePortfolioTransactionsTask(AbstractFundsTask):
                                                       updated=portfolio_transaction_row.UPDATED
                                                       )
 
+                    changed_positions.add((portfolio_id, security.id))
                     synchronized_count = synchronized_count + 1
 
-                if len(portfolio_transaction_rows) < batch:
-                    break
+                backend_session.flush()
+                operations.update_portfolio_positions(database=backend_session, positions=changed_positions)
+                self.release_session_objects(backend_session=backend_session)
 
-                offset += batch
+            self.print_message(f"Info: Security {security.original_id} portfolio transactions: "
+                               f"{pages.stats.get_summary()}")
 
             if self.should_timeout(timeout=timeout):
                 self.print_message(TIMED_OUT)
+            else:
+                self.update_watermark(backend_session=backend_session,
+                                      security=security,
+                                      source_updated=funds_updated,
+                                      row_count=funds_state.ROW_COUNT)
 
             return synchronized_count
 
@@ -2723,6 +3131,25 @@ class MigratePortfolioTransactionsTask(AbstractFundsTask):
             por_id_sum.label("por_id_sum")
         ).filter(destination_models.PortfolioTransaction.security_id == security_id).one()
 
+    def get_backend_update(self, backend_session: Session, security: destination_models.Security) -> datetime:
+        """
+        Returns last synchronized update time of security. Securities without a watermark fall back to
+        the latest update time in the backend database
+        Args:
+            backend_session: backend database session
+            security: security
+
+        Returns: last synchronized update time of security
+        """
+        watermark = self.watermarks.get(security.id, None)
+        if watermark and watermark.source_updated:
+            return watermark.source_updated
+
+        if self.backend_updates is None:
+            self.backend_updates = self.get_backend_updates(backend_session=backend_session)
+
+        return self.backend_updates.get(security.id, None) or datetime(1970, 1, 1)
+
     @staticmethod
     def get_backend_updates(backend_session: Session) -> Dict[UUID, datetime]:
         """
@@ -2742,22 +3169,19 @@ class MigratePortfolioTransactionsTask(AbstractFundsTask):
 
         return result
 
-    def get_funds_updates(self, funds_session: Session) -> Dict[str, datetime]:
+    def get_funds_updates(self, funds_session: Session) -> Dict[str, Any]:
         """
-        Returns dict of updated values from funds database
+        Returns dict of updated values and row counts from funds database
         Args:
             funds_session: fund database session
 
-        Returns: dict of updated values from funds database
+        Returns: dict of rows with LAST_DATE and ROW_COUNT columns by security original id
         """
-        result = {}
         excluded = self.get_excluded_portfolio_ids_query()
         rows = funds_session.execute(
-            "SELECT SECID, max(UPD_DATE + CAST(UPD_TIME as DATETIME)) as LAST_DATE "
+            "SELECT SECID, max(UPD_DATE + CAST(UPD_TIME as DATETIME)) as LAST_DATE, COUNT(*) as ROW_COUNT "
             f"FROM TABLE_PORTRANS WHERE PORID NOT IN ({excluded}) GROUP BY SECID")
-        for row in rows:
-            result[row.SECID] = row.LAST_DATE
-        return result
+        return {row.SECID: row for row in rows}
 
     def list_portfolio_transactions(self, funds_session: Session, security: destination_models.Security,
                                     updated: datetime, limit: int, offset: int):
@@ -3095,6 +3519,12 @@ class MigrateCompanyAccessTask(AbstractSalkkuTask):
     Migration task for company access
     """
 
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.changed_count = 0
+
     def get_name(self):
         return "company_access"
 
@@ -3161,8 +3591,21 @@ class MigrateCompanyAccessTask(AbstractSalkkuTask):
 
                 synchronized_count = synchronized_count + 1
 
+            self.changed_count += synchronized_count
+
             return synchronized_count
 
+    def finish(self, backend_session: Session):
+        """
+        Clears cached authorization contexts of API processes when company access has changed
+
+        Args:
+            backend_session: backend session
+        """
+        if self.changed_count > 0:
+            AuthorizationCache.invalidate_all(database=backend_session)
+            backend_session.commit()
+
     def verify(self, backend_session: Session, security: Optional[destination_models.Security]) -> bool:
         with Session(self.get_salkku_database_engine()) as salkku_session:
             salkku_company_accesses = self.list_salkku_authorizations(salkku_session=salkku_session).all()
@@ -1,5 +1,6 @@
 from datetime import date
 from decimal import Decimal
+from typing import Optional
 
 from pydantic import BaseSettings
 
@@ -12,3 +13,24 @@ class Settings(BaseSettings):
     SUBSCRIPTION_CODE = "11"
     REDEMPTION_CODE = "12"
     EURO_CURRENCY_CODE = "EUR"
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    HISTORY_PROCESS_POOL_WORKERS: int = 2
+    HISTORY_PROCESS_POOL_MAX_PENDING: int = 16
+    UNIT_VALUE_CACHE_SIZE: int = 512
+    RATE_STORE_PATH: Optional[str] = None
+    RATE_STORE_HEADROOM_DAYS: int = 366
+    AUTHORIZATION_CACHE_SIZE: int = 4096
+    AUTHORIZATION_CACHE_TTL: int = 30
+    VERIFIED_TOKEN_CACHE_SIZE: int = 4096
+    MAIL_QUEUE_SIZE: int = 100
+    MAIL_MAX_ATTEMPTS: int = 3
+    MAIL_RETRY_DELAY: float = 2.0
+    MAIL_CONNECTION_IDLE_SECONDS: float = 30.0
+    MAIL_SPOOL_PATH: Optional[str] = None
+    MAIL_SPOOL_CLAIM_TIMEOUT: float = 3600.0
+    MAIL_CLOSE_TIMEOUT: float = 30.0
+    SECURITY_CATALOG_REFRESH_SECONDS: float = 10.0
+    SECURITY_CATALOG_FULL_RELOAD_SECONDS: float = 600.0
+    SECURITY_CATALOG_MISS_REFRESH_SECONDS: float = 1.0
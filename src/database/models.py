@@ -71,6 +71,7 @@ class Company(Base):
     company_access = relationship("CompanyAccess", back_populates="company", lazy=True)
     c_portfolio_logs = relationship("PortfolioLog", back_populates="c_company", lazy=True,
                                     foreign_keys="PortfolioLog.c_company_id")
+    __table_args__ = (Index("ix_company_ssn_name", "ssn", "name"),)
 
 
 class CompanyAccess(Base):
@@ -79,6 +80,7 @@ class CompanyAccess(Base):
     ssn = Column(String(11), nullable=False)
     company_id = Column("company_id", SqlAlchemyUuid, ForeignKey('company.id'), index=True, nullable=False)
     company = relationship("Company", back_populates="company_access", lazy=True)
+    __table_args__ = (Index("ix_company_access_ssn_company_id", "ssn", "company_id"),)
 
 
 class LastRate(Base):
@@ -134,7 +136,10 @@ class PortfolioLog(Base):
                             foreign_keys="PortfolioLog.security_id")
     c_company = relationship("Company", back_populates="c_portfolio_logs", lazy=True,
                              foreign_keys="PortfolioLog.c_company_id")
-    __table_args__ = (Index("ix_portfolio_log_security_id_updated", "security_id", "updated"),)
+    # portfolio listing filters by portfolio, status and transaction codes and orders by transaction date and number
+    __table_args__ = (Index("ix_portfolio_log_security_id_updated", "security_id", "updated"),
+                      Index("ix_portfolio_log_portfolio_id_status_transaction_date", "portfolio_id", "status",
+                            "transaction_date", "transaction_number", "transaction_code"))
 
 
 class PortfolioTransaction(Base):
@@ -153,6 +158,19 @@ class PortfolioTransaction(Base):
     __table_args__ = (Index("ix_portfolio_transaction_security_id_updated", "security_id", "updated"),)
 
 
+class PortfolioPosition(Base):
+    __tablename__ = 'portfolio_position'
+
+    # Transaction totals of a security in a portfolio, maintained by the portfolio transactions migration
+    id = Column(SqlAlchemyUuid, primary_key=True, default=uuid4)
+    portfolio_id = Column("portfolio_id", SqlAlchemyUuid, ForeignKey('portfolio.id'), nullable=False)
+    security_id = Column("security_id", SqlAlchemyUuid, ForeignKey('security.id'), index=True, nullable=False)
+    total_amount = Column(DECIMAL(26, 6))
+    purchase_total = Column(DECIMAL(22, 2))
+    __table_args__ = (Index("ix_portfolio_position_portfolio_id_security_id", "portfolio_id", "security_id",
+                            unique=True),)
+
+
 class SynchronizationFailure(Base):
     __tablename__ = 'synchronization_failure'
 
@@ -165,3 +183,23 @@ class SynchronizationFailure(Base):
     handled = Column(Boolean, nullable=False)
     created = Column(DateTime, nullable=False)
     updated = Column(DateTime, nullable=False)
+
+
+class SyncWatermark(Base):
+    __tablename__ = 'sync_watermark'
+
+    # Latest source state synchronized by a migration task. Security based tasks keep one row per security,
+    # other tasks keep a single row with null security_id. Uniqueness is enforced on scope, which is the hex
+    # security id or "task" for task level rows, because MySQL unique indexes allow duplicate nulls.
+    # Security rate version rows hold the last rate date, rate count, sum of close rates and a revision that is
+    # incremented when rates up to the previous last rate date change
+    id = Column(SqlAlchemyUuid, primary_key=True, default=uuid4)
+    task = Column(String(191), nullable=False)
+    scope = Column(String(32), nullable=False)
+    security_id = Column("security_id", SqlAlchemyUuid, ForeignKey('security.id'), nullable=True)
+    source_updated = Column(DateTime, nullable=True)
+    row_count = Column(Integer, nullable=True)
+    value_sum = Column(DECIMAL(25, 6), nullable=True)
+    revision = Column(Integer, nullable=True)
+    updated = Column(DateTime, nullable=False)
+    __table_args__ = (Index("ix_sync_watermark_task_scope", "task", "scope", unique=True),)
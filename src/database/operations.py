@@ -1,13 +1,45 @@
-from decimal import Decimal
-from typing import List, Optional, Dict
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable, List, Optional, Dict, Set, Tuple
 from uuid import UUID
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import func
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import func, literal, null
 from sqlalchemy.sql.functions import coalesce
 
 from .models import Fund, SecurityRate, Company, CompanyAccess, PortfolioTransaction, LastRate, Security, Portfolio, \
-    PortfolioLog
-from datetime import date
+    PortfolioLog, PortfolioPosition, SyncWatermark
+from datetime import date, datetime
+
+SYNC_WATERMARK_TASK_SCOPE = "task"
+SECURITY_RATE_VERSION_TASK = "security-rate-version"
+# close rates are stored with six decimals
+RATE_CLOSE_QUANTUM = Decimal("0.000001")
+
+LOAD_PROFILE_PORTFOLIO_COMPANY = "portfolio_company"
+LOAD_PROFILE_COMPANY_PORTFOLIOS = "company_portfolios"
+
+# Named loading strategies for relationships read after the query. Many-to-one relationships are joined into the
+# query, one-to-many relationships are loaded with one additional query for all rows. Portfolios loaded through
+# company portfolios find their company from the session identity map, so both directions are loaded.
+LOAD_PROFILES = {
+    LOAD_PROFILE_PORTFOLIO_COMPANY: (joinedload(Portfolio.company),),
+    LOAD_PROFILE_COMPANY_PORTFOLIOS: (selectinload(Company.portfolios),)
+}
+
+
+def apply_load_profile(query: Query, load_profile: Optional[str]) -> Query:
+    """Applies named loading strategies to query
+
+    Args:
+        query (Query): query
+        load_profile (str, optional): name of load profile or None to use lazy loading
+    Returns:
+        Query: query with loading options
+    """
+    if load_profile is None:
+        return query
+
+    return query.options(*LOAD_PROFILES[load_profile])
 
 
 def find_fund(database: Session, fund_id: UUID) -> Optional[Fund]:
@@ -113,20 +145,26 @@ def list_securities_with_fund(database: Session,
         .all()
 
 
-def get_last_rate_date_for_security_rate(database: Session, security_id: UUID) -> date:
+def get_last_rate_dates(database: Session, security_ids: List[UUID]) -> Dict[UUID, date]:
     """
-    Returns the last rate date for a security.
+    Returns the last rate dates of multiple securities with a single query.
 
     Args:
         database (Session): database session
-        security_id (UUID): security id
+        security_ids (List[UUID]): security ids
 
     Returns:
-        Optional[datetime]: last rate date
+        Dict[UUID, date]: last rate date by security id. Securities without rates are left out
     """
-    return database.query(func.max(SecurityRate.rate_date)) \
-        .filter(SecurityRate.security_id == security_id) \
-        .scalar()
+    if not security_ids:
+        return {}
+
+    rows = database.query(SecurityRate.security_id, func.max(SecurityRate.rate_date)) \
+        .filter(SecurityRate.security_id.in_(security_ids)) \
+        .group_by(SecurityRate.security_id) \
+        .all()
+
+    return {security_id: rate_date for security_id, rate_date in rows}
 
 
 def query_security_rates(database: Session,
@@ -164,6 +202,166 @@ def query_security_rates(database: Session,
     return query.all()
 
 
+def list_security_rate_values(database: Session, security_id: UUID) -> List[Tuple[date, Decimal]]:
+    """Lists all rates of a security ordered by rate date
+
+    Args:
+        database (Session): database session
+        security_id (UUID): security id
+
+    Returns:
+        List[Tuple[date, Decimal]]: rate dates and close rates
+    """
+    return database.query(SecurityRate.rate_date, SecurityRate.rate_close) \
+        .filter(SecurityRate.security_id == security_id) \
+        .order_by(SecurityRate.rate_date) \
+        .all()
+
+
+def list_security_rate_versions(database: Session, security_ids: List[UUID]) -> List[SyncWatermark]:
+    """Lists maintained rate versions of securities
+
+    Args:
+        database (Session): database session
+        security_ids (List[UUID]): security ids
+
+    Returns:
+        List[SyncWatermark]: rate version rows. Securities without rates are left out
+    """
+    if not security_ids:
+        return []
+
+    return database.query(SyncWatermark) \
+        .filter(SyncWatermark.task == SECURITY_RATE_VERSION_TASK) \
+        .filter(SyncWatermark.scope.in_([get_sync_watermark_scope(security_id=x) for x in security_ids])) \
+        .all()
+
+
+def get_security_rate_versions(database: Session, security_ids: List[UUID]) -> Dict[UUID, Tuple]:
+    """Returns version of rates for each security from the maintained rate version rows.
+    Version changes when rates are added, removed or updated.
+
+    Args:
+        database (Session): database session
+        security_ids (List[UUID]): security ids
+
+    Returns:
+        Dict[UUID, Tuple]: rate count, last rate date and sum of close rates by security id.
+        Securities without rates are left out
+    """
+    rows = list_security_rate_versions(database=database, security_ids=security_ids)
+    return {row.security_id: (row.row_count, row.source_updated.date(), row.value_sum) for row in rows}
+
+
+def refresh_security_rate_version(database: Session, security_id: UUID) -> Optional[SyncWatermark]:
+    """Recalculates maintained rate version of a security from its rates. Revision is incremented unless rates
+    were only added after the previous last rate date. Pending changes of the session are flushed first.
+
+    Args:
+        database (Session): database session
+        security_id (UUID): security id
+
+    Returns:
+        Optional[SyncWatermark]: rate version or None if the security has no rates
+    """
+    database.flush()
+
+    version = find_sync_watermark(database=database, task=SECURITY_RATE_VERSION_TASK, security_id=security_id)
+    rate_count, last_rate_date, rate_sum = get_security_rate_aggregate(database=database, security_id=security_id)
+
+    if not rate_count:
+        if version is not None:
+            database.delete(version)
+
+        return None
+
+    revision = 0
+    if version is not None:
+        revision = version.revision or 0
+        previous_last_date = version.source_updated.date()
+
+        if (version.row_count, previous_last_date, version.value_sum) != (rate_count, last_rate_date, rate_sum):
+            previous_count, _, previous_sum = get_security_rate_aggregate(database=database,
+                                                                          security_id=security_id,
+                                                                          rate_date_max=previous_last_date)
+            if (previous_count, previous_sum) != (version.row_count, version.value_sum):
+                revision += 1
+
+    return upsert_sync_watermark(database=database,
+                                 task=SECURITY_RATE_VERSION_TASK,
+                                 security_id=security_id,
+                                 source_updated=datetime.combine(last_rate_date, datetime.min.time()),
+                                 row_count=rate_count,
+                                 value_sum=rate_sum,
+                                 revision=revision)
+
+
+def apply_security_rate_version_change(database: Session,
+                                       security_id: UUID,
+                                       rate_date: date,
+                                       previous_close: Optional[Decimal],
+                                       rate_close: Decimal
+                                       ) -> Optional[SyncWatermark]:
+    """Updates maintained rate version of a security from a created or updated rate without aggregating the rate
+    history. Revision is incremented unless the rate was added after the previous last rate date. Versions that do
+    not exist yet are recalculated from the rates.
+
+    Args:
+        database (Session): database session
+        security_id (UUID): security id
+        rate_date (date): date of the changed rate
+        previous_close (Decimal, optional): close rate before the change or None when the rate was created
+        rate_close (Decimal): close rate after the change
+
+    Returns:
+        Optional[SyncWatermark]: rate version or None if the security has no rates
+    """
+    version = find_sync_watermark(database=database, task=SECURITY_RATE_VERSION_TASK, security_id=security_id)
+    if version is None or version.row_count is None or version.value_sum is None:
+        return refresh_security_rate_version(database=database, security_id=security_id)
+
+    rate_close = Decimal(rate_close).quantize(RATE_CLOSE_QUANTUM, rounding=ROUND_HALF_UP)
+    if previous_close is not None and previous_close == rate_close:
+        return version
+
+    previous_last_date = version.source_updated.date()
+    appended = previous_close is None and rate_date > previous_last_date
+
+    return upsert_sync_watermark(database=database,
+                                 task=SECURITY_RATE_VERSION_TASK,
+                                 security_id=security_id,
+                                 source_updated=datetime.combine(max(previous_last_date, rate_date),
+                                                                 datetime.min.time()),
+                                 row_count=version.row_count + (1 if previous_close is None else 0),
+                                 value_sum=version.value_sum + rate_close - (previous_close or 0),
+                                 revision=(version.revision or 0) + (0 if appended else 1))
+
+
+def get_security_rate_aggregate(database: Session,
+                                security_id: UUID,
+                                rate_date_max: Optional[date] = None
+                                ) -> Tuple[int, Optional[date], Optional[Decimal]]:
+    """Returns rate count, last rate date and sum of close rates of a security
+
+    Args:
+        database (Session): database session
+        security_id (UUID): security id
+        rate_date_max (date, optional): include only rates on or before given date
+
+    Returns:
+        Tuple[int, Optional[date], Optional[Decimal]]: rate count, last rate date and sum of close rates
+    """
+    query = database.query(func.count(SecurityRate.id),
+                           func.max(SecurityRate.rate_date),
+                           func.sum(SecurityRate.rate_close)) \
+        .filter(SecurityRate.security_id == security_id)
+
+    if rate_date_max:
+        query = query.filter(SecurityRate.rate_date <= rate_date_max)
+
+    return tuple(query.one())
+
+
 def find_most_recent_security_rate(database: Session,
                                    security_id: UUID,
                                    rate_date_before: date
@@ -187,17 +385,51 @@ def find_most_recent_security_rate(database: Session,
         .one_or_none()
 
 
-def find_company(database: Session, company_id: UUID) -> Optional[Company]:
+def get_most_recent_security_rates(database: Session,
+                                   security_ids: List[UUID],
+                                   rate_date_before: date
+                                   ) -> Dict[UUID, SecurityRate]:
+    """Finds most recent rates of multiple securities before given time with a single query
+
+    Args:
+        database (Session): database session
+        security_ids (List[UUID]): security ids
+        rate_date_before (date): date before (or at same day) the returned rates should be
+
+    Returns:
+        Dict[UUID, SecurityRate]: most recent rate by security id. Securities without rates are left out
+    """
+    if not security_ids:
+        return {}
+
+    last_rate_dates = database.query(SecurityRate.security_id.label("security_id"),
+                                     func.max(SecurityRate.rate_date).label("rate_date")) \
+        .filter(SecurityRate.security_id.in_(security_ids)) \
+        .filter(SecurityRate.rate_date <= rate_date_before) \
+        .group_by(SecurityRate.security_id) \
+        .subquery()
+
+    rates = database.query(SecurityRate) \
+        .join(last_rate_dates, and_(SecurityRate.security_id == last_rate_dates.c.security_id,
+                                    SecurityRate.rate_date == last_rate_dates.c.rate_date)) \
+        .all()
+
+    return {rate.security_id: rate for rate in rates}
+
+
+def find_company(database: Session, company_id: UUID, load_profile: Optional[str] = None) -> Optional[Company]:
     """Queries the company table
 
     Args:
         database (Session): database session
         company_id (UUID): company id
+        load_profile (str, optional): load profile for company relationships
     Returns:
         List[Company]: list of matching company table rows
     """
 
-    return database.query(Company).filter(Company.id == company_id).one_or_none()
+    return apply_load_profile(database.query(Company), load_profile=load_profile)\
+        .filter(Company.id == company_id).one_or_none()
 
 
 def get_companies(database: Session, ssn: str) -> List[Company]:
@@ -214,6 +446,28 @@ def get_companies(database: Session, ssn: str) -> List[Company]:
         .order_by(Company.name).all()
 
 
+def list_companies_by_ids(database: Session,
+                          company_ids: Iterable[UUID],
+                          load_profile: Optional[str] = None
+                          ) -> List[Company]:
+    """Lists companies by ids
+
+    Args:
+        database (Session): database session
+        company_ids (Iterable[UUID]): company ids
+        load_profile (str, optional): load profile for company relationships
+    Returns:
+        List[Company]: companies ordered by name
+    """
+    company_ids = list(company_ids)
+    if not company_ids:
+        return []
+
+    return apply_load_profile(database.query(Company), load_profile=load_profile)\
+        .filter(Company.id.in_(company_ids))\
+        .order_by(Company.name).all()
+
+
 def get_company_access(database: Session, ssn: str) -> List[CompanyAccess]:
     """Queries the company access table
 
@@ -227,6 +481,23 @@ def get_company_access(database: Session, ssn: str) -> List[CompanyAccess]:
     return database.query(CompanyAccess).filter(CompanyAccess.ssn == ssn).all()
 
 
+def get_company_access_levels(database: Session, ssn: str) -> List[Tuple[UUID, bool]]:
+    """Lists companies owned by or shared with a user in one query
+
+    Args:
+        database (Session): database session
+        ssn (str): ssn of user
+    Returns:
+        List[Tuple[UUID, bool]]: company ids and whether the user owns the company. A company may be listed both
+        as owned and as shared
+    """
+
+    owned = database.query(Company.id, literal(True)).filter(Company.ssn == ssn)
+    shared = database.query(CompanyAccess.company_id, literal(False)).filter(CompanyAccess.ssn == ssn)
+
+    return [(company_id, bool(owned)) for company_id, owned in owned.union_all(shared).all()]
+
+
 def find_company_access_by_ssn_and_company_id(database: Session, ssn: str, company_id: UUID) -> Optional[CompanyAccess]:
     """Finds company access row by ssn and company_id
 
@@ -244,21 +515,22 @@ def find_company_access_by_ssn_and_company_id(database: Session, ssn: str, compa
         .one_or_none()
 
 
-def find_portfolio(database: Session, portfolio_id: UUID) -> Optional[Portfolio]:
+def find_portfolio(database: Session, portfolio_id: UUID, load_profile: Optional[str] = None) -> Optional[Portfolio]:
     """Finds portfolio from the database
 
     Args:
             database (Session): database session
             portfolio_id (UUID): portfolio id
+            load_profile (str, optional): load profile for portfolio relationships
     """
-    return database.query(Portfolio) \
+    return apply_load_profile(database.query(Portfolio), load_profile=load_profile) \
         .filter(Portfolio.id == portfolio_id) \
         .one_or_none()
 
 
 def get_portfolio_summary(database: Session, portfolio: Portfolio, start_date: date, end_date: date,
-                          transaction_codes: [str]) -> List[PortfolioLog]:
-    """Queries the portfolio_log table
+                          transaction_codes: [str]) -> List:
+    """Sums portfolio_log total values by transaction code
 
         Args:
             database (Session): database session
@@ -267,42 +539,142 @@ def get_portfolio_summary(database: Session, portfolio: Portfolio, start_date: d
             end_date (date): filter results to this date
             portfolio (Portfolio): portfolio
         Returns:
-             List[PortfolioLog]: rows of portfolio_log
+             List: rows with transaction_code and c_total_value sum
         """
 
-    return database.query(PortfolioLog)\
+    return database.query(PortfolioLog.transaction_code.label("transaction_code"),
+                          func.sum(PortfolioLog.c_total_value).label("c_total_value"))\
         .filter(PortfolioLog.transaction_code.in_(transaction_codes))\
         .filter(PortfolioLog.status == '0')\
         .filter(PortfolioLog.transaction_date >= start_date.isoformat())\
         .filter(PortfolioLog.transaction_date <= end_date.isoformat())\
-        .filter(PortfolioLog.portfolio == portfolio)\
+        .filter(PortfolioLog.portfolio_id == portfolio.id)\
+        .group_by(PortfolioLog.transaction_code)\
         .all()
 
 
-def get_portfolio_security_values(database: Session, portfolio: Portfolio) -> List:
-    """ Queries for portfolio securities
+def get_portfolio_period_summaries(database: Session, portfolio: Portfolio, start_date: date, end_date: date,
+                                   transaction_codes: [str], monthly: bool) -> List:
+    """Sums portfolio_log total values by transaction code for each year or month
 
         Args:
             database (Session): database session
             portfolio (Portfolio): portfolio
+            start_date (date): filter results from this date
+            end_date (date): filter results to this date
+            transaction_codes ([str]): list of valid transaction_code for the operation
+            monthly (bool): whether to sum by month instead of year
+        Returns:
+             List: rows with year, month, transaction_code and c_total_value sum ordered by period.
+             Month is None when summing by year
+        """
+    year = func.year(PortfolioLog.transaction_date)
+    month = func.month(PortfolioLog.transaction_date) if monthly else null()
+
+    query = database.query(year.label("year"),
+                           month.label("month"),
+                           PortfolioLog.transaction_code.label("transaction_code"),
+                           func.sum(PortfolioLog.c_total_value).label("c_total_value"))\
+        .filter(PortfolioLog.transaction_code.in_(transaction_codes))\
+        .filter(PortfolioLog.status == '0')\
+        .filter(PortfolioLog.transaction_date >= start_date.isoformat())\
+        .filter(PortfolioLog.transaction_date <= end_date.isoformat())\
+        .filter(PortfolioLog.portfolio_id == portfolio.id)
+
+    if monthly:
+        return query.group_by(year, month, PortfolioLog.transaction_code).order_by(year, month).all()
+
+    return query.group_by(year, PortfolioLog.transaction_code).order_by(year).all()
+
+
+def get_portfolio_security_values(database: Session, portfolio_id: UUID) -> List:
+    """ Queries for portfolio securities
+
+        Args:
+            database (Session): database session
+            portfolio_id (UUID): portfolio id
         Returns:
              List[PortfolioSecurityValues]: list of portfolio securities
     """
     return database.query(Portfolio,
                           Security.currency.label("currency"),
-                          PortfolioTransaction.security_id.label("security_id"),
-                          func.sum(PortfolioTransaction.amount).label("total_amount"),
-                          func.sum(PortfolioTransaction.purchase_c_value).label("purchase_total"),
-                          func.sum(LastRate.rate_close * PortfolioTransaction.amount).label("market_value_total")
+                          PortfolioPosition.security_id.label("security_id"),
+                          PortfolioPosition.total_amount.label("total_amount"),
+                          PortfolioPosition.purchase_total.label("purchase_total"),
+                          (LastRate.rate_close * PortfolioPosition.total_amount).label("market_value_total")
                           ) \
-        .join(PortfolioTransaction, Portfolio.id == PortfolioTransaction.portfolio_id) \
-        .join(LastRate, PortfolioTransaction.security_id == LastRate.security_id) \
-        .join(Security, PortfolioTransaction.security_id == Security.id) \
-        .filter(Portfolio.id == portfolio.id) \
-        .group_by(Security.id)\
+        .join(PortfolioPosition, Portfolio.id == PortfolioPosition.portfolio_id) \
+        .join(LastRate, PortfolioPosition.security_id == LastRate.security_id) \
+        .join(Security, PortfolioPosition.security_id == Security.id) \
+        .filter(Portfolio.id == portfolio_id) \
         .all()
 
 
+def get_portfolios_security_values(database: Session, portfolio_ids: List[UUID]) -> List:
+    """ Queries for securities of multiple portfolios in one query
+
+        Args:
+            database (Session): database session
+            portfolio_ids (List[UUID]): portfolio ids
+        Returns:
+             List: rows with portfolio id, currency, security id, total amount, purchase total and market value total
+    """
+    return database.query(PortfolioPosition.portfolio_id.label("portfolio_id"),
+                          Security.currency.label("currency"),
+                          PortfolioPosition.security_id.label("security_id"),
+                          PortfolioPosition.total_amount.label("total_amount"),
+                          PortfolioPosition.purchase_total.label("purchase_total"),
+                          (LastRate.rate_close * PortfolioPosition.total_amount).label("market_value_total")
+                          ) \
+        .join(LastRate, PortfolioPosition.security_id == LastRate.security_id) \
+        .join(Security, PortfolioPosition.security_id == Security.id) \
+        .filter(PortfolioPosition.portfolio_id.in_(portfolio_ids)) \
+        .all()
+
+
+def update_portfolio_positions(database: Session, positions: Set[Tuple[UUID, UUID]]):
+    """Recalculates portfolio positions from portfolio transactions
+
+    Args:
+        database (Session): database session
+        positions (Set[Tuple[UUID, UUID]]): portfolio id and security id pairs to be recalculated
+    """
+    portfolio_ids_by_security: Dict[UUID, Set[UUID]] = {}
+    for portfolio_id, security_id in positions:
+        portfolio_ids_by_security.setdefault(security_id, set()).add(portfolio_id)
+
+    for security_id, portfolio_ids in portfolio_ids_by_security.items():
+        totals = database.query(PortfolioTransaction.portfolio_id,
+                                func.sum(PortfolioTransaction.amount).label("total_amount"),
+                                func.sum(PortfolioTransaction.purchase_c_value).label("purchase_total")) \
+            .filter(PortfolioTransaction.security_id == security_id) \
+            .filter(PortfolioTransaction.portfolio_id.in_(portfolio_ids)) \
+            .group_by(PortfolioTransaction.portfolio_id) \
+            .all()
+
+        existing_positions = database.query(PortfolioPosition) \
+            .filter(PortfolioPosition.security_id == security_id) \
+            .filter(PortfolioPosition.portfolio_id.in_(portfolio_ids)) \
+            .all()
+
+        position_map = {x.portfolio_id: x for x in existing_positions}
+
+        for total in totals:
+            position = position_map.pop(total.portfolio_id, None)
+            if position is None:
+                position = PortfolioPosition()
+                position.portfolio_id = total.portfolio_id
+                position.security_id = security_id
+
+            position.total_amount = total.total_amount
+            position.purchase_total = total.purchase_total
+            database.add(position)
+
+        # positions without remaining transactions
+        for position in position_map.values():
+            database.delete(position)
+
+
 def get_currency_rate_map(database: Session, currencies: List[str]) -> Dict[str, Decimal]:
     """
     Returns conversion map from currency to EUR
@@ -326,23 +698,25 @@ def get_currency_rate_map(database: Session, currencies: List[str]) -> Dict[str,
 
 
 def get_portfolio_logs(database: Session,
-                       portfolio: Portfolio,
+                       portfolio_id: UUID,
                        transaction_codes: List[str],
                        transaction_date_min: Optional[date],
                        transaction_date_max: Optional[date],
                        first_result: Optional[int] = None,
-                       max_result: Optional[int] = None
+                       max_result: Optional[int] = None,
+                       after: Optional[PortfolioLog] = None
                        ) -> List[PortfolioLog]:
     """ Queries for portfolio logs
 
         Args:
             database (Session): database session
-            portfolio (Portfolio): portfolio
+            portfolio_id (UUID): portfolio id
             transaction_codes (List[str]): filter by transaction codes
             transaction_date_min (date): filter results by transaction_date after given date
             transaction_date_max (date): filter results by transaction_date before given date
             first_result (int, optional): first result.
             max_result (int, optional): max results.
+            after (PortfolioLog, optional): return only logs ordered after given log (keyset pagination).
 
         Returns:
              List[PortfolioLog]: list of portfolio logs
@@ -350,7 +724,7 @@ def get_portfolio_logs(database: Session,
 
     query = database.query(PortfolioLog) \
         .filter(PortfolioLog.status == "0") \
-        .filter(PortfolioLog.portfolio_id == portfolio.id) \
+        .filter(PortfolioLog.portfolio_id == portfolio_id) \
         .filter(PortfolioLog.transaction_code.in_(transaction_codes))
 
     if transaction_date_min:
@@ -359,6 +733,11 @@ def get_portfolio_logs(database: Session,
     if transaction_date_max:
         query = query.filter(PortfolioLog.transaction_date <= transaction_date_max)
 
+    if after:
+        query = query.filter(or_(PortfolioLog.transaction_date > after.transaction_date,
+                                 and_(PortfolioLog.transaction_date == after.transaction_date,
+                                      PortfolioLog.transaction_number > after.transaction_number)))
+
     query = query.order_by(PortfolioLog.transaction_date, PortfolioLog.transaction_number)
 
     if first_result:
@@ -370,6 +749,36 @@ def get_portfolio_logs(database: Session,
     return query.all()
 
 
+def get_portfolios_logs(database: Session,
+                        portfolio_ids: List[UUID],
+                        transaction_codes: List[str],
+                        transaction_date_max: Optional[date]
+                        ) -> List[PortfolioLog]:
+    """ Queries for logs of multiple portfolios in one query
+
+        Args:
+            database (Session): database session
+            portfolio_ids (List[UUID]): portfolio ids
+            transaction_codes (List[str]): filter by transaction codes
+            transaction_date_max (date): filter results by transaction_date before given date
+
+        Returns:
+             List[PortfolioLog]: list of portfolio logs ordered by transaction date
+    """
+    if not portfolio_ids:
+        return []
+
+    query = database.query(PortfolioLog) \
+        .filter(PortfolioLog.status == "0") \
+        .filter(PortfolioLog.portfolio_id.in_(portfolio_ids)) \
+        .filter(PortfolioLog.transaction_code.in_(transaction_codes))
+
+    if transaction_date_max:
+        query = query.filter(PortfolioLog.transaction_date <= transaction_date_max)
+
+    return query.order_by(PortfolioLog.transaction_date, PortfolioLog.transaction_number).all()
+
+
 def find_portfolio_log(database: Session, portfolio_log_id: UUID) -> Optional[PortfolioLog]:
     """Finds portfolio log from the database
 
@@ -382,6 +791,44 @@ def find_portfolio_log(database: Session, portfolio_log_id: UUID) -> Optional[Po
         .one_or_none()
 
 
+def list_security_catalog_rows(database: Session, updated_min: Optional[datetime]) -> List[Tuple]:
+    """Lists security columns needed by the security catalog, without loading security entities
+
+    Args:
+            database (Session): database session
+            updated_min (datetime, optional): list only securities updated on or after given time
+
+    Returns:
+        List[Tuple]: security id, original id, currency, fund id, series id, names and update time
+    """
+    query = database.query(Security.id,
+                           Security.original_id,
+                           Security.currency,
+                           Security.fund_id,
+                           Security.series_id,
+                           Security.name_fi,
+                           Security.name_sv,
+                           Security.name_en,
+                           Security.updated)
+
+    if updated_min is not None:
+        query = query.filter(Security.updated >= updated_min)
+
+    return query.all()
+
+
+def count_securities(database: Session) -> int:
+    """Counts securities
+
+    Args:
+            database (Session): database session
+
+    Returns:
+        int: number of securities
+    """
+    return database.query(func.count(Security.id)).scalar()
+
+
 def find_security_by_original_id(database: Session, original_id: str) -> Optional[Security]:
     """Finds security from the database using original_id
 
@@ -392,3 +839,107 @@ def find_security_by_original_id(database: Session, original_id: str) -> Optiona
     return database.query(Security) \
         .filter(Security.original_id == original_id) \
         .one_or_none()
+
+
+def list_sync_watermarks(database: Session, task: str) -> List[SyncWatermark]:
+    """Lists synchronization watermarks of a task
+
+    Args:
+            database (Session): database session
+            task (str): task name
+
+    Returns:
+        List[SyncWatermark]: watermarks of the task
+    """
+    return database.query(SyncWatermark) \
+        .filter(SyncWatermark.task == task) \
+        .all()
+
+
+def get_sync_watermark_scope(security_id: Optional[UUID]) -> str:
+    """Returns unique scope key of a synchronization watermark
+
+    Args:
+            security_id (UUID, optional): security id or None for tasks that are not security based
+
+    Returns:
+        str: hex security id or SYNC_WATERMARK_TASK_SCOPE for tasks that are not security based
+    """
+    return security_id.hex if security_id is not None else SYNC_WATERMARK_TASK_SCOPE
+
+
+def find_sync_watermark(database: Session, task: str, security_id: Optional[UUID]) -> Optional[SyncWatermark]:
+    """Finds synchronization watermark of a task
+
+    Args:
+            database (Session): database session
+            task (str): task name
+            security_id (UUID, optional): security id or None for tasks that are not security based
+
+    Returns:
+        Optional[SyncWatermark]: found watermark or None if not found
+    """
+    return database.query(SyncWatermark) \
+        .filter(SyncWatermark.task == task) \
+        .filter(SyncWatermark.scope == get_sync_watermark_scope(security_id=security_id)) \
+        .one_or_none()
+
+
+def upsert_sync_watermark(database: Session,
+                          task: str,
+                          security_id: Optional[UUID],
+                          source_updated: Optional[datetime],
+                          row_count: Optional[int],
+                          value_sum: Optional[Decimal] = None,
+                          revision: Optional[int] = None
+                          ) -> SyncWatermark:
+    """Creates or updates synchronization watermark of a task
+
+    Args:
+            database (Session): database session
+            task (str): task name
+            security_id (UUID, optional): security id or None for tasks that are not security based
+            source_updated (datetime, optional): latest synchronized source timestamp
+            row_count (int, optional): synchronized source row count
+            value_sum (Decimal, optional): sum of synchronized source values
+            revision (int, optional): revision of synchronized source values
+
+    Returns:
+        SyncWatermark: created or updated watermark
+    """
+    watermark = find_sync_watermark(database=database, task=task, security_id=security_id)
+    if watermark is None:
+        watermark = SyncWatermark()
+        watermark.task = task
+        watermark.scope = get_sync_watermark_scope(security_id=security_id)
+        watermark.security_id = security_id
+
+    watermark.source_updated = source_updated
+    watermark.row_count = row_count
+    watermark.value_sum = value_sum
+    watermark.revision = revision
+    watermark.updated = datetime.now()
+    database.add(watermark)
+    return watermark
+
+
+def delete_sync_watermarks(database: Session, task: Optional[str], security_ids: Optional[List[UUID]]) -> int:
+    """Deletes synchronization watermarks
+
+    Args:
+            database (Session): database session
+            task (str, optional): delete only watermarks of this task
+            security_ids (List[UUID], optional): delete only watermarks of these securities
+
+    Returns:
+        int: count of deleted watermarks
+    """
+    query = database.query(SyncWatermark)
+
+    if task is not None:
+        query = query.filter(SyncWatermark.task == task)
+
+    if security_ids is not None:
+        query = query.filter(SyncWatermark.security_id.in_(security_ids))
+
+    return query.delete(synchronize_session=False)
@@ -0,0 +1,164 @@
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+import numpy
+
+from .holdings import Holdings
+
+MISSING_RATE = numpy.iinfo(numpy.int64).min
+NO_DIVISOR = -1
+
+
+class HistoryInput:
+    """
+    Compact, picklable input for portfolio history calculation. Securities are referred by index,
+    dates by ordinal and unit values as consecutive daily arrays, so the input can be sent to a worker process cheaply.
+    Unit values are given as rates and divisors, so that values are calculated as amount * rate / divisor.
+
+    Rates are sent as a fixed-point int64 matrix with a shared scale. Divisors are sent as an index matrix to a list
+    of distinct divisors, as the FIM conversion rate is not a fixed-point number and SEK rates are shared by all
+    SEK securities. Decimals are rebuilt from the arrays in the worker.
+    """
+
+    def __init__(self,
+                 start_date: int,
+                 end_date: int,
+                 deltas: List[List[Tuple[int, Decimal]]],
+                 rates: numpy.ndarray,
+                 scale: int,
+                 divisors: numpy.ndarray,
+                 divisor_values: List[Decimal]):
+        """
+        Constructor
+        Args:
+            start_date: first calculated day ordinal
+            end_date: last calculated day ordinal
+            deltas: holding amount changes per security as day ordinal and amount change
+            rates: int64 matrix of daily rates per security from start date to end date multiplied by 10^scale.
+                MISSING_RATE for days without rate
+            scale: number of decimals in rates
+            divisors: matrix of daily divisor indexes per security from start date to end date. NO_DIVISOR
+                for days whose rate is not divided
+            divisor_values: distinct divisors
+        """
+        self.start_date = start_date
+        self.end_date = end_date
+        self.deltas = deltas
+        self.rates = rates
+        self.scale = scale
+        self.divisors = divisors
+        self.divisor_values = divisor_values
+
+    @staticmethod
+    def create(holdings: Holdings,
+               start_date: date,
+               end_date: date,
+               rates: Dict[UUID, List[Optional[Decimal]]],
+               divisors: Optional[Dict[UUID, Optional[List[Optional[Decimal]]]]] = None) -> "HistoryInput":
+        """
+        Creates history input from holdings and unit values
+        Args:
+            holdings: holdings with added transactions
+            start_date: first calculated date
+            end_date: last calculated date
+            rates: daily rates from start date to end date per security id
+            divisors: daily divisors from start date to end date per security id. Rates of missing securities
+                are not divided
+
+        Returns: history input
+        """
+        security_ids = holdings.get_security_ids()
+        days = end_date.toordinal() - start_date.toordinal() + 1
+        security_rates = [rates[x] for x in security_ids]
+        security_divisors = [divisors.get(x) if divisors else None for x in security_ids]
+
+        scale = max([-x.as_tuple().exponent for values in security_rates for x in values if x is not None] + [0])
+        rate_matrix = numpy.full((len(security_ids), days), MISSING_RATE, dtype=numpy.int64)
+        divisor_matrix = numpy.full((len(security_ids), days), NO_DIVISOR, dtype=numpy.int32)
+        divisor_indexes: Dict[Tuple, int] = {}
+        divisor_values: List[Decimal] = []
+
+        for index, values in enumerate(security_rates):
+            rate_matrix[index] = [MISSING_RATE if x is None else int(x.scaleb(scale)) for x in values]
+
+            if security_divisors[index] is None:
+                continue
+
+            for day, divisor in enumerate(security_divisors[index]):
+                if divisor is None:
+                    continue
+
+                """Divisors are told apart by their digits, so that rebuilt divisors have the original exponent"""
+                key = divisor.as_tuple()
+                if key not in divisor_indexes:
+                    divisor_indexes[key] = len(divisor_values)
+                    divisor_values.append(divisor)
+
+                divisor_matrix[index, day] = divisor_indexes[key]
+
+        return HistoryInput(
+            start_date=start_date.toordinal(),
+            end_date=end_date.toordinal(),
+            deltas=[[(holding_date.toordinal(), amount) for holding_date, amount in holdings.data[x].items()]
+                    for x in security_ids],
+            rates=rate_matrix,
+            scale=scale,
+            divisors=divisor_matrix,
+            divisor_values=divisor_values
+        )
+
+
+def calculate_history_values(history_input: HistoryInput) -> List[Tuple[date, Decimal]]:
+    """
+    Calculates daily portfolio values as dot product of daily holding amounts and unit values.
+    Module level function so that it can be run in a worker process.
+
+    Args:
+        history_input: history input
+
+    Returns: list of date and portfolio value tuples
+    """
+    start_date = history_input.start_date
+    days = history_input.end_date - start_date + 1
+    totals: List[Decimal] = [Decimal(0)] * days
+    scale = history_input.scale
+    divisor_values = history_input.divisor_values
+
+    for index, deltas in enumerate(history_input.deltas):
+        changes: Dict[int, Decimal] = {}
+        amount = Decimal(0)
+
+        for ordinal, change in deltas:
+            if ordinal < start_date:
+                amount += change
+            else:
+                changes[ordinal] = changes.get(ordinal, 0) + change
+
+        rates = history_input.rates[index].tolist()
+        divisors = history_input.divisors[index].tolist()
+
+        for day in range(days):
+            amount += changes.get(start_date + day, 0)
+            rate = rates[day]
+            if rate == MISSING_RATE:
+                continue
+
+            value = amount * Decimal(rate).scaleb(-scale)
+            divisor = divisors[day]
+            totals[day] += value if divisor == NO_DIVISOR else value / divisor_values[divisor]
+
+    return [(date.fromordinal(start_date + day), total) for day, total in enumerate(totals)]
+
+
+def calculate_history_values_list(history_inputs: List[HistoryInput]) -> List[List[Tuple[date, Decimal]]]:
+    """
+    Calculates daily values of several portfolio groups in one worker process call
+
+    Args:
+        history_inputs: history inputs
+
+    Returns: list of date and value tuples for each input
+    """
+    return [calculate_history_values(x) for x in history_inputs]
@@ -1,5 +1,7 @@
+from bisect import bisect_right
 from decimal import Decimal
-from typing import Optional, Dict, List
+from itertools import accumulate
+from typing import Optional, Dict, List, Tuple
 from uuid import UUID
 from datetime import date, timedelta
 
@@ -18,6 +20,7 @@ class Holdings:
         """Constructor"""
         self.data: Dict[UUID, Dict[date, Decimal]] = {}
         self.day_amounts: Dict[UUID, Dict[date, Decimal]] = {}
+        self.cumulative_amounts: Dict[UUID, Tuple[List[date], List[Decimal]]] = {}
 
     def add_holding(self, security_id: UUID, holding_date: date, amount: Decimal):
         """
@@ -38,6 +41,31 @@ class Holdings:
             self.data[security_id][holding_date] = Decimal(0)
 
         self.data[security_id][holding_date] += amount
+        self.cumulative_amounts.pop(security_id, None)
+
+    def get_amount_on(self, security_id: UUID, holding_date: date) -> Decimal:
+        """
+        Returns holding amount of a security at the end of given day without calculating daily amounts.
+        Amount changes are sorted and summed once per security, after which amounts are found with binary search.
+
+        Args:
+            security_id: security id
+            holding_date: date
+
+        Returns: holding amount of a security on given date
+        """
+        if security_id not in self.data:
+            return Decimal(0)
+
+        if security_id not in self.cumulative_amounts:
+            changes = sorted(self.data[security_id].items())
+            self.cumulative_amounts[security_id] = ([x[0] for x in changes],
+                                                    list(accumulate(x[1] for x in changes)))
+
+        dates, amounts = self.cumulative_amounts[security_id]
+        index = bisect_right(dates, holding_date)
+
+        return amounts[index - 1] if index > 0 else Decimal(0)
 
     def calculate_amounts(self, start_date: date, end_date: date):
         """
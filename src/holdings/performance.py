@@ -0,0 +1,189 @@
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy
+
+from .history import HistoryInput, MISSING_RATE
+
+DAYS_IN_YEAR = 365
+IRR_MIN_RATE = -0.9999
+IRR_MAX_RATE = 1000.0
+IRR_TOLERANCE = 1e-10
+IRR_MAX_ITERATIONS = 200
+
+
+class PerformanceInput:
+    """
+    Compact, picklable input for portfolio performance calculation. The history input starts from the day before
+    the period, whose value is the starting value of the period.
+    """
+
+    def __init__(self, history_input: HistoryInput, flows: List[List[Tuple[int, Decimal]]]):
+        """
+        Constructor
+        Args:
+            history_input: history input from the day before the period to the last day of the period
+            flows: holding amount changes caused by external cash flows (subscriptions, redemptions and transfers)
+                per security as day ordinal and amount change. Securities are in the same order as in history input
+        """
+        self.history_input = history_input
+        self.flows = flows
+
+
+def get_amount_matrix(deltas: List[List[Tuple[int, Decimal]]], start: int, days: int,
+                      cumulative: bool) -> numpy.ndarray:
+    """
+    Creates security by day matrix of holding amount changes or cumulative amounts
+
+    Args:
+        deltas: amount changes per security as day ordinal and amount change
+        start: first day ordinal
+        days: number of days
+        cumulative: whether the matrix contains held amounts instead of amount changes
+
+    Returns: matrix of shape (securities, days)
+    """
+    result = numpy.zeros((len(deltas), days))
+
+    for index, security_deltas in enumerate(deltas):
+        if not security_deltas:
+            continue
+
+        ordinals = numpy.fromiter((x[0] for x in security_deltas), dtype=numpy.int64, count=len(security_deltas))
+        amounts = numpy.array([x[1] for x in security_deltas], dtype=object).astype(float)
+        in_range = (ordinals >= start) & (ordinals < start + days)
+
+        numpy.add.at(result[index], ordinals[in_range] - start, amounts[in_range])
+
+        if cumulative:
+            result[index, 0] += amounts[ordinals < start].sum()
+
+    return numpy.cumsum(result, axis=1) if cumulative else result
+
+
+def get_unit_value_matrix(history_input: HistoryInput) -> numpy.ndarray:
+    """
+    Creates security by day matrix of unit values from fixed-point rates and divisors of history input. Days without
+    unit value are zero, so that the security does not contribute to the value of the day.
+
+    Args:
+        history_input: history input
+
+    Returns: matrix of shape (securities, days)
+    """
+    rates = history_input.rates
+    missing = rates == MISSING_RATE
+    """NO_DIVISOR index (-1) refers to the last divisor, which is one"""
+    divisor_values = numpy.array([float(x) for x in history_input.divisor_values] + [1.0])
+
+    values = numpy.where(missing, 0, rates) * 10.0 ** -history_input.scale
+    return values / divisor_values[history_input.divisors]
+
+
+def calculate_irr(times: numpy.ndarray, cash_flows: numpy.ndarray) -> Optional[float]:
+    """
+    Calculates annual internal rate of return for cash flows. Newton's method is tried first and bisection
+    is used when it does not converge.
+
+    Args:
+        times: cash flow times in years
+        cash_flows: cash flows from the investor's point of view, investments negative
+
+    Returns: annual rate or None if the cash flows do not have a rate of return
+    """
+    if not (cash_flows > 0).any() or not (cash_flows < 0).any():
+        return None
+
+    def npv(rate: float) -> float:
+        return float((cash_flows * numpy.power(1 + rate, -times)).sum())
+
+    rate = 0.1
+    for _ in range(50):
+        discount = numpy.power(1 + rate, -times)
+        value = (cash_flows * discount).sum()
+        derivative = (-times * cash_flows * discount / (1 + rate)).sum()
+        if derivative == 0 or not numpy.isfinite(value):
+            break
+
+        next_rate = rate - value / derivative
+        if not IRR_MIN_RATE < next_rate < IRR_MAX_RATE:
+            break
+
+        if abs(next_rate - rate) < IRR_TOLERANCE:
+            return float(next_rate)
+
+        rate = next_rate
+
+    low, high = IRR_MIN_RATE, IRR_MAX_RATE
+    low_value = npv(low)
+    if low_value * npv(high) > 0:
+        return None
+
+    for _ in range(IRR_MAX_ITERATIONS):
+        middle = (low + high) / 2
+        middle_value = npv(middle)
+        if abs(high - low) < IRR_TOLERANCE:
+            break
+
+        if low_value * middle_value <= 0:
+            high = middle
+        else:
+            low, low_value = middle, middle_value
+
+    return (low + high) / 2
+
+
+def calculate_performance(performance_input: PerformanceInput) -> Dict[str, Any]:
+    """
+    Calculates time-weighted and money-weighted returns of a portfolio with array math. Module level function
+    so that it can be run in a worker process.
+
+    Cash flows are valued with the unit values of their transaction day, as funds are subscribed and redeemed at
+    the unit value of the day, so the day's return is earned only by the previous day's holdings. Daily time-weighted
+    returns are chained and the money-weighted return is the annual internal rate of return of the starting value,
+    cash flows and ending value.
+
+    Args:
+        performance_input: performance input
+
+    Returns: period values and returns, returns are None when they are not defined
+    """
+    history_input = performance_input.history_input
+    start = history_input.start_date
+    days = history_input.end_date - start + 1
+
+    units = get_unit_value_matrix(history_input)
+    values = (get_amount_matrix(history_input.deltas, start, days, cumulative=True) * units).sum(axis=0)
+    flows = (get_amount_matrix(performance_input.flows, start, days, cumulative=False) * units).sum(axis=0)
+    flows[0] = 0
+
+    denominators = values[:-1]
+    positive = denominators > 0
+    daily_returns = numpy.divide(values[1:] - flows[1:], denominators, out=numpy.ones_like(denominators),
+                                 where=positive)
+
+    period_days = days - 1
+    time_weighted_return = float(numpy.prod(daily_returns) - 1) if positive.any() else None
+
+    annualized_time_weighted_return = None
+    if time_weighted_return is not None and period_days >= DAYS_IN_YEAR and time_weighted_return > -1:
+        annualized_time_weighted_return = (1 + time_weighted_return) ** (DAYS_IN_YEAR / period_days) - 1
+
+    cash_flows = -flows
+    cash_flows[0] = -values[0]
+    cash_flows[-1] += values[-1]
+    flow_days = numpy.nonzero(cash_flows)[0]
+
+    money_weighted_return = calculate_irr(times=flow_days / DAYS_IN_YEAR, cash_flows=cash_flows[flow_days])
+
+    return {
+        "startDate": date.fromordinal(start + 1),
+        "endDate": date.fromordinal(history_input.end_date),
+        "startValue": float(values[0]),
+        "endValue": float(values[-1]),
+        "netCashFlow": float(flows.sum()),
+        "timeWeightedReturn": time_weighted_return,
+        "annualizedTimeWeightedReturn": annualized_time_weighted_return,
+        "moneyWeightedReturn": money_weighted_return
+    }
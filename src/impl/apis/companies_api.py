@@ -2,7 +2,6 @@
 import logging
 from uuid import UUID
 
-from auth.auth_utils import AuthUtils
 from fastapi import HTTPException
 from fastapi_utils.cbv import cbv
 from spec.apis.companies_api import CompaniesApiSpec, router as companies_api_router
@@ -22,12 +21,7 @@ class CompaniesApiImpl(CompaniesApiSpec):
             company_id: UUID,
             token_bearer: TokenModel
     ) -> Company:
-        ssn = AuthUtils.get_user_ssn(token_bearer=token_bearer)
-        if not ssn:
-            raise HTTPException(
-                status_code=403,
-                detail=f"Cannot resolve logged user SSN"
-            )
+        context = self.authorization.get_context(database=self.database)
 
         company = operations.find_company(
             database=self.database,
@@ -40,44 +34,31 @@ class CompaniesApiImpl(CompaniesApiSpec):
                 detail=f"Company with id {company_id} not found"
             )
 
-        owned = company.ssn == ssn
-        if not owned:
-            company_access = operations.find_company_access_by_ssn_and_company_id(
-                database=self.database,
-                ssn=ssn,
-                company_id=company_id
+        if not context.has_access(company_id=company.id):
+            raise HTTPException(
+                status_code=403,
+                detail=f"No permission to find this company"
             )
 
-            if not company_access:
-                raise HTTPException(
-                    status_code=403,
-                    detail=f"No permission to find this company"
-                )
-
         return self.translate_company(
             company=company,
-            owned=owned
+            owned=context.is_owned(company_id=company.id)
         )
 
     async def list_companies(
             self,
             token_bearer: TokenModel
     ) -> Company:
-        ssn = AuthUtils.get_user_ssn(token_bearer=token_bearer)
-        if not ssn:
-            raise HTTPException(
-                status_code=403,
-                detail=f"Cannot resolve logged user SSN"
-            )
+        context = self.authorization.get_context(database=self.database)
 
-        own_companies = operations.get_companies(
+        own_companies = operations.list_companies_by_ids(
             database=self.database,
-            ssn=ssn
+            company_ids=context.owned_company_ids
         )
 
-        company_access_rows = operations.get_company_access(
+        shared_companies = operations.list_companies_by_ids(
             database=self.database,
-            ssn=ssn
+            company_ids=context.shared_company_ids
         )
 
         result = []
@@ -88,9 +69,9 @@ class CompaniesApiImpl(CompaniesApiSpec):
                 owned=True
             ))
 
-        for company_access in company_access_rows:
+        for shared_company in shared_companies:
             result.append(self.translate_company(
-                company=company_access.company,
+                company=shared_company,
                 owned=False
             ))
 
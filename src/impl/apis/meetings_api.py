@@ -7,14 +7,12 @@ from spec.apis.meetings_api import MeetingsApiSpec, router as meetings_api_route
 from spec.models.meeting_time import MeetingTime
 from spec.models.meeting import Meeting
 from typing import List
-from csv import reader
-from datetime import date, datetime, timedelta, time
+from datetime import date
 from spec.models.extra_models import TokenModel
 from fastapi import HTTPException
 from fastapi_mail import MessageSchema
-from mail.mailer import Mailer
-
-LOCAL_TIMEZONE = 'Europe/Helsinki'
+from mail.dispatcher import mail_dispatcher
+from utils.meeting_calendar import LOCAL_TIMEZONE, meeting_calendar
 
 
 @cbv(meetings_api_router)
@@ -48,13 +46,7 @@ class MeetingsApiImpl(MeetingsApiSpec):
             recipients=os.environ["MAIL_TO"].split(","),
             body=email_body)
 
-        try:
-            await Mailer.send_mail(message)
-        except Exception:
-            raise HTTPException(
-                                status_code=500,
-                                detail="Failed to send email due to invalid credentials."
-                              )
+        mail_dispatcher.enqueue(message)
 
         return meeting
 
@@ -76,46 +68,7 @@ class MeetingsApiImpl(MeetingsApiSpec):
                                 detail="End date and start date can not be in the past"
                               )
 
-        with open(os.environ["HOLIDAYS_CSV"]) as csv_file:
-            rows = reader(csv_file, delimiter=",")
-            row1 = next(rows)
-            holidays = row1
-
-        result = []
-
         first_available_date = start_date if start_date > date.today() else date.today()
+        slots = meeting_calendar.list_slots(start_date=first_available_date, end_date=end_date)
 
-        while first_available_date <= end_date:
-            if str(first_available_date) in holidays or first_available_date.weekday() >= 5:
-                first_available_date += timedelta(days=1)
-                continue
-
-            for hour in self.settings.MEETING_TIME_PERIOD:
-                result.append(self.construct_meeting_time(first_available_date, hour, hour + 1))
-
-            result.append(self.construct_meeting_time_from_time(first_available_date, time(hour=16, minute=30),
-                                                                time(hour=17, minute=30)))
-
-            first_available_date += timedelta(days=1)
-
-        return result
-
-    @staticmethod
-    def construct_meeting_time(meeting_date: date, start_hour: int, end_hour: int) -> MeetingTime:
-        meeting_start_time = datetime.combine(meeting_date, time(hour=start_hour))
-        meeting_end_time = datetime.combine(meeting_date, time(hour=end_hour))
-
-        return MeetingTime(
-            startTime=pytz.timezone(LOCAL_TIMEZONE).localize(meeting_start_time),
-            endTime=pytz.timezone(LOCAL_TIMEZONE).localize(meeting_end_time)
-        )
-
-    @staticmethod
-    def construct_meeting_time_from_time(meeting_date: date, start_time: time, end_time: time) -> MeetingTime:
-        meeting_start_time = datetime.combine(meeting_date, start_time)
-        meeting_end_time = datetime.combine(meeting_date, end_time)
-
-        return MeetingTime(
-            startTime=pytz.timezone(LOCAL_TIMEZONE).localize(meeting_start_time),
-            endTime=pytz.timezone(LOCAL_TIMEZONE).localize(meeting_end_time)
-        )
+        return [MeetingTime(startTime=start_time, endTime=end_time) for start_time, end_time in slots]
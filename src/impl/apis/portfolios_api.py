@@ -1,30 +1,64 @@
 # coding: utf-8
 import logging
+from contextlib import contextmanager
 from decimal import Decimal
 from uuid import UUID
 
 from auth.auth_utils import AuthUtils
-from typing import List, Optional, Dict
-from fastapi import HTTPException
+from auth.authorization import AuthorizationContext
+from typing import List, Optional, Dict, Iterator, Tuple, Any, Callable
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
 from fastapi_utils.cbv import cbv
-from spec.apis.portfolios_api import PortfoliosApiSpec, router as portfolios_api_router
+from spec.apis.portfolios_api import PortfoliosApiSpec, router as portfolios_api_router, get_database, get_settings
 from datetime import date, timedelta
 from spec.models.extra_models import TokenModel
 from spec.models.portfolio import Portfolio
 from spec.models.portfolio_summary import PortfolioSummary
-from spec.models.portfolio_history_value import PortfolioHistoryValue
+from spec.models.portfolio_period_summary import PortfolioPeriodSummary
+from spec.models.portfolio_performance import PortfolioPerformance
+from spec.models.summary_period import SummaryPeriod
 from database import operations
 from business_logics import business_logics
-from database.models import Portfolio as DbPortfolio, PortfolioLog as DbPortfolioLog, Security as DbSecurity, \
-    Company as DbCompany
+from database.models import Portfolio as DbPortfolio, PortfolioLog as DbPortfolioLog, Company as DbCompany, \
+    SecurityRate
 from spec.models.portfolio_security import PortfolioSecurity
+from spec.models.portfolio_security_position import PortfolioSecurityPosition
 from spec.models.portfolio_transaction import PortfolioTransaction
 from spec.models.transaction_type import TransactionType
 from holdings.holdings import Holdings
-from utils.portfolio_utils import PortfolioUtils, PortfolioSecurityValues
+from holdings.history import HistoryInput, calculate_history_values, calculate_history_values_list
+from holdings.performance import PerformanceInput, calculate_performance
+from utils.portfolio_utils import PortfolioUtils, PortfolioValues
+from utils.json_utils import FastJSONResponse, JsonUtils
+from utils.history_validator import HistoryValidator, HistoryValidation
+from utils.single_flight import SingleFlight
+from utils.process_pool import BoundedProcessPool, PoolSaturatedException
+from utils.security_catalog import CatalogSecurity, security_catalog
+from utils.unit_value_cache import unit_value_cache, UnitValueSeries, SEK_SECURITY_ORIGINAL_ID
+from config.settings import Settings
+from starlette.concurrency import run_in_threadpool
 
 logger = logging.getLogger(__name__)
 
+EXPORT_PAGE_SIZE = 500
+TRANSACTIONS_PAGE_SIZE = 500
+TRANSACTIONS_MAX_RESULTS = 1000
+HISTORY_VALUE_FIELDS = ("date", "value")
+COMPANY_HISTORY_VALUE_FIELDS = ("date", "value", "companyId")
+HISTORY_TRANSACTION_CODES = ["11", "12", "30", "31", "46"]
+HISTORY_GROUP_BY_COMPANY = "COMPANY"
+HISTORY_INVALIDATED_HEADER = "X-History-Invalidated"
+PERFORMANCE_CASH_FLOW_CODES = ["11", "12", "30", "31"]
+PERFORMANCE_RETURN_DECIMALS = 6
+
+portfolio_single_flight = SingleFlight(name="portfolios")
+
+settings = Settings()
+history_process_pool = BoundedProcessPool(name="history",
+                                          max_workers=settings.HISTORY_PROCESS_POOL_WORKERS,
+                                          max_pending=settings.HISTORY_PROCESS_POOL_MAX_PENDING)
+
 
 @cbv(portfolios_api_router)
 class PortfoliosApiImpl(PortfoliosApiSpec):
@@ -34,23 +68,49 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
             portfolio_id: UUID,
             token_bearer: TokenModel
     ) -> Portfolio:
-        portfolio = self.get_portfolio(token_bearer=token_bearer, portfolio_id=portfolio_id)
-        ssn = AuthUtils.get_user_ssn(token_bearer=token_bearer)
-        if not ssn:
-            raise HTTPException(
-                status_code=403,
-                detail=f"Cannot resolve logged user SSN"
-            )
-
-        own_companies = operations.get_companies(
-            database=self.database,
-            ssn=ssn
+        portfolio = self.get_portfolio(token_bearer=token_bearer,
+                                       portfolio_id=portfolio_id,
+                                       load_profile=operations.LOAD_PROFILE_PORTFOLIO_COMPANY)
+        owned = self.authorization.get_context(database=self.database).is_owned(company_id=portfolio.company_id)
+
+        portfolio_values = await portfolio_single_flight.run(
+            ("portfolio_values", portfolio.id),
+            self.run_in_own_session,
+            PortfoliosApiImpl.find_portfolio_values,
+            portfolio.id
         )
 
-        return self.translate_portfolio(
-            portfolio=portfolio,
-            own_companies=own_companies
-        )
+        return self.translate_portfolio(portfolio=portfolio, owned=owned, portfolio_values=portfolio_values)
+
+    def find_portfolio_values(self, portfolio_id: UUID) -> PortfolioValues:
+        """
+        Calculates summary of portfolio values
+
+        Args:
+            portfolio_id: portfolio id
+
+        Returns:
+            calculated summary of portfolio values
+        """
+        return PortfolioUtils.get_portfolio_values(database=self.database, portfolio_id=portfolio_id)
+
+    @staticmethod
+    def run_in_own_session(function: Callable[..., Any], *args) -> Any:
+        """
+        Runs a computation shared by concurrent requests with a database session of its own. The session of the
+        request starting the computation is closed when that request ends, while other requests may still be
+        waiting for the result, so shared computations take only plain values from the request.
+
+        Args:
+            function: API method to run, called with an API instance bound to the new session
+            *args: plain function arguments, e.g. ids and dates
+
+        Returns:
+            function result
+        """
+        with contextmanager(get_database)() as database:
+            api = PortfoliosApiImpl(database=database, authorization=None, settings=get_settings())
+            return function(api, *args)
 
     async def get_portfolio_summary(
             self,
@@ -78,196 +138,771 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
 
         for result in summary:
             if business_logics.transaction_is_subscription(result.transaction_code):
-                subscriptions += result.c_total_value
+                subscriptions += result.c_total_value or 0
             elif business_logics.transaction_is_redemption(result.transaction_code):
-                redemptions += result.c_total_value
+                redemptions += result.c_total_value or 0
 
         result = PortfolioSummary(subscriptions=subscriptions, redemptions=redemptions)
 
         return result
 
-    def get_security_rate_map(self, security_id: UUID, min_date: date, max_date: date) -> Dict[date, Decimal]:
-        security_rates = operations.query_security_rates(
+    async def list_portfolio_period_summaries(
+            self,
+            portfolio_id: UUID,
+            start_date: date,
+            end_date: date,
+            period: Optional[SummaryPeriod],
+            token_bearer: TokenModel
+    ) -> List[PortfolioPeriodSummary]:
+        """ lists portfolio subscriptions and redemptions by month or year"""
+
+        if period is not None and period not in ["MONTH", "YEAR"]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid period {period}"
+            )
+
+        portfolio = self.get_portfolio(token_bearer=token_bearer, portfolio_id=portfolio_id)
+
+        monthly = period != "YEAR"
+
+        rows = operations.get_portfolio_period_summaries(
             database=self.database,
-            security_id=security_id,
-            rate_date_min=min_date,
-            rate_date_max=max_date
+            portfolio=portfolio,
+            start_date=start_date,
+            end_date=end_date,
+            transaction_codes=business_logics.get_transaction_codes_for_subscription_redemption(),
+            monthly=monthly
         )
 
-        date_rates: Dict[date, Decimal] = {x.rate_date: x.rate_close for x in security_rates}
-        current_date = min_date
+        subscriptions: Dict[date, Decimal] = {}
+        redemptions: Dict[date, Decimal] = {}
+
+        for row in rows:
+            period_start = date(row.year, row.month if monthly else 1, 1)
+            subscriptions.setdefault(period_start, Decimal(0))
+            redemptions.setdefault(period_start, Decimal(0))
+
+            if business_logics.transaction_is_subscription(row.transaction_code):
+                subscriptions[period_start] += row.c_total_value or 0
+            elif business_logics.transaction_is_redemption(row.transaction_code):
+                redemptions[period_start] += row.c_total_value or 0
+
+        return list(map(lambda period_start: PortfolioPeriodSummary(
+            startDate=period_start,
+            subscriptions=subscriptions[period_start],
+            redemptions=redemptions[period_start]
+        ), subscriptions.keys()))
+
+    async def list_portfolio_history_values(
+            self,
+            portfolio_id: UUID,
+            start_date: date,
+            end_date: date,
+            since: Optional[date],
+            if_none_match: Optional[str],
+            token_bearer: TokenModel
+    ) -> Response:
+        portfolio = self.get_portfolio(token_bearer=token_bearer, portfolio_id=portfolio_id)
+
+        if end_date > date.today():
+            end_date = date.today()
+
+        if history_process_pool.is_saturated():
+            raise self.get_history_saturated_exception()
+
+        try:
+            rows, validation = await portfolio_single_flight.run(
+                ("history_values", portfolio.id, start_date, end_date, since, if_none_match),
+                self.get_portfolio_history_values,
+                portfolio.id,
+                start_date,
+                end_date,
+                since,
+                HistoryValidator.from_etag(if_none_match)
+            )
+        except PoolSaturatedException:
+            raise self.get_history_saturated_exception()
 
-        last_rate = operations.find_most_recent_security_rate(
+        return self.create_history_response(fields=HISTORY_VALUE_FIELDS, rows=rows, validation=validation)
+
+    @staticmethod
+    async def get_portfolio_history_values(portfolio_id: UUID,
+                                           start_date: date,
+                                           end_date: date,
+                                           since: Optional[date],
+                                           previous: Optional[HistoryValidator]
+                                           ) -> Tuple[Optional[List[Tuple[date, Decimal]]], HistoryValidation]:
+        """
+        Calculates daily values of a portfolio. Transactions and rates are loaded in the thread pool with a
+        database session of its own and the values are calculated in the history process pool.
+
+        Args:
+            portfolio_id: portfolio id
+            start_date: first date
+            end_date: last date
+            since: first date of values client needs, when client has earlier values
+            previous: validator of the values client has
+
+        Returns:
+            list of date and value tuples or None if client has the current values, and validation result
+
+        Raises:
+            PoolSaturatedException: when history process pool is saturated
+        """
+        history_input, validation = await run_in_threadpool(PortfoliosApiImpl.run_in_own_session,
+                                                            PortfoliosApiImpl.load_portfolio_history_input,
+                                                            portfolio_id, start_date, end_date, since, previous)
+        if validation.not_modified:
+            return None, validation
+
+        if history_input is None:
+            return [], validation
+
+        return await history_process_pool.run(calculate_history_values, history_input), validation
+
+    @staticmethod
+    def get_history_saturated_exception() -> HTTPException:
+        """
+        Returns exception for rejecting history requests when history process pool is saturated
+
+        Returns:
+            HTTPException with status 503
+        """
+        return HTTPException(
+            status_code=503,
+            detail="Too many concurrent history calculations",
+            headers={"Retry-After": "1"}
+        )
+
+    @staticmethod
+    def create_history_response(fields: Tuple[str, ...],
+                                rows: Optional[List[Tuple]],
+                                validation: HistoryValidation) -> Response:
+        """
+        Creates history values response with validator headers
+
+        Args:
+            fields: value object field names
+            rows: value tuples or None if client has the current values
+            validation: validation result
+
+        Returns:
+            response with ETag header, and invalidation header when since date was given
+        """
+        headers = {"ETag": validation.validator.to_etag()}
+
+        if validation.invalidated is not None:
+            headers[HISTORY_INVALIDATED_HEADER] = "true" if validation.invalidated else "false"
+
+        if rows is None:
+            return Response(status_code=304, headers=headers)
+
+        return FastJSONResponse(content=JsonUtils.rows_to_dicts(fields=fields, rows=rows), headers=headers)
+
+    def load_portfolio_history_input(self,
+                                     portfolio_id: UUID,
+                                     start_date: date,
+                                     end_date: date,
+                                     since: Optional[date],
+                                     previous: Optional[HistoryValidator]
+                                     ) -> Tuple[Optional[HistoryInput], HistoryValidation]:
+        """
+        Loads transactions and rates needed for calculating daily values of a portfolio
+
+        Args:
+            portfolio_id: portfolio id
+            start_date: first date
+            end_date: last date
+            since: first date of values client needs, when client has earlier values
+            previous: validator of the values client has
+
+        Returns:
+            history calculation input or None if portfolio has no holdings or client has the current values,
+            and validation result
+        """
+
+        """List portfolio transactions from given time period """
+        rows: List[DbPortfolioLog] = operations.get_portfolio_logs(
             database=self.database,
-            security_id=security_id,
-            rate_date_before=min_date
+            portfolio_id=portfolio_id,
+            transaction_codes=HISTORY_TRANSACTION_CODES,
+            transaction_date_min=None,
+            transaction_date_max=end_date,
         )
 
-        if last_rate is None:
-            raise HTTPException(
-                status_code=500,
-                detail=f"could not find rate for security {security_id} before {min_date}"
+        validation = self.validate_history(
+            rows=rows,
+            key=("portfolio", portfolio_id, start_date),
+            start_date=start_date,
+            end_date=end_date,
+            since=since,
+            previous=previous
+        )
+
+        if validation.not_modified or validation.values_start > end_date:
+            return None, validation
+
+        return self.create_history_inputs(
+            rows=rows,
+            group_keys={portfolio_id: None},
+            start_date=validation.values_start,
+            end_date=end_date
+        ).get(None, None), validation
+
+    def validate_history(self,
+                         rows: List[DbPortfolioLog],
+                         key: Tuple,
+                         start_date: date,
+                         end_date: date,
+                         since: Optional[date],
+                         previous: Optional[HistoryValidator]
+                         ) -> HistoryValidation:
+        """
+        Validates history values held by a client against current portfolio logs and rates.
+
+        Client values before since date are kept only when client sends the validator of its values and
+        neither the logs nor the settled rates before since date have changed. Otherwise the whole series is returned.
+
+        Args:
+            rows: portfolio transactions of the series
+            key: request parameters excluding the end date
+            start_date: first date
+            end_date: last date
+            since: first date of values client needs, when client has earlier values
+            previous: validator of the values client has
+
+        Returns:
+            validation result
+        """
+        securities = self.get_log_securities(rows=rows)
+        security_ids = list(securities.keys())
+        currency_security = unit_value_cache.find_currency_security(
+            database=self.database,
+            securities=list(securities.values()),
+            convert_currency=True
+        )
+
+        if currency_security is not None:
+            security_ids.append(currency_security.id)
+
+        logs = [(row.transaction_date, row.updated) for row in rows]
+        rate_versions = {
+            x.security_id: (x.row_count, x.source_updated.date(), x.value_sum, x.revision)
+            for x in operations.list_security_rate_versions(database=self.database, security_ids=security_ids)
+        }
+        rate_date = HistoryValidator.get_rate_date(rate_versions=rate_versions)
+
+        validator = HistoryValidator.create(
+            key=key,
+            end_date=end_date,
+            logs=logs,
+            rate_versions=rate_versions,
+            rate_date=rate_date,
+            rate_date_versions=HistoryValidator.get_settled_versions(rate_versions=rate_versions, rate_date=rate_date)
+        )
+
+        if previous is not None and previous.series_digest == validator.series_digest:
+            return HistoryValidation(validator=validator, not_modified=True, values_start=start_date,
+                                     invalidated=None if since is None else False)
+
+        if since is None:
+            return HistoryValidation(validator=validator, not_modified=False, values_start=start_date,
+                                     invalidated=None)
+
+        valid_until = previous.get_valid_until(
+            key=key,
+            logs=logs,
+            rate_date_versions=HistoryValidator.get_settled_versions(rate_versions=rate_versions,
+                                                                     rate_date=previous.rate_date)
+        ) if previous is not None else None
+
+        if valid_until is None or valid_until <= start_date:
+            return HistoryValidation(validator=validator, not_modified=False, values_start=start_date,
+                                     invalidated=True)
+
+        return HistoryValidation(validator=validator, not_modified=False,
+                                 values_start=max(start_date, min(since, valid_until)), invalidated=False)
+
+    def create_history_inputs(self,
+                              rows: List[DbPortfolioLog],
+                              group_keys: Dict[UUID, Any],
+                              start_date: date,
+                              end_date: date
+                              ) -> Dict[Any, HistoryInput]:
+        """
+        Creates history calculation inputs from portfolio transactions. Holdings of portfolios with the same group key
+        are combined and unit values of securities are resolved once for all groups.
+
+        Args:
+            rows: portfolio transactions
+            group_keys: group key by portfolio id
+            start_date: first date
+            end_date: last date
+
+        Returns:
+            history calculation inputs by group key. Groups without holdings are left out
+        """
+        group_holdings: Dict[Any, Holdings] = {}
+        securities = self.get_log_securities(rows=rows)
+
+        """Add transactions to holdings objects"""
+        for row in rows:
+            holdings = group_holdings.setdefault(group_keys[row.portfolio_id], Holdings())
+            self.add_portfolio_log_holding(holdings=holdings, row=row)
+
+        """If there are no holdings, the portfolios are empty"""
+        group_holdings = {key: holdings for key, holdings in group_holdings.items() if not holdings.is_empty()}
+        if not group_holdings:
+            return {}
+
+        """Resolve shared EUR unit values (FIM and SEK converted) of securities once for all groups"""
+        security_ids = {security_id for holdings in group_holdings.values()
+                        for security_id in holdings.get_security_ids()}
+
+        security_unit_values = unit_value_cache.get_unit_values(
+            database=self.database,
+            securities=[securities[x] for x in security_ids],
+            convert_currency=True
+        )
+
+        result: Dict[Any, HistoryInput] = {}
+
+        for key, holdings in group_holdings.items():
+            group_start_date = max(start_date, holdings.get_min_date())
+
+            rates, divisors = self.align_unit_values(
+                holdings=holdings,
+                security_unit_values=security_unit_values,
+                start_date=group_start_date,
+                end_date=end_date
             )
 
-        last_rate_close = last_rate.rate_close
+            result[key] = HistoryInput.create(
+                holdings=holdings,
+                start_date=group_start_date,
+                end_date=end_date,
+                rates=rates,
+                divisors=divisors
+            )
 
-        delta_for_day = timedelta(days=1)
+        return result
 
-        while current_date <= max_date:
-            if current_date not in date_rates:
-                date_rates[current_date] = last_rate_close
-            else:
-                last_rate_close = date_rates[current_date]
+    @staticmethod
+    def align_unit_values(holdings: Holdings,
+                          security_unit_values: Dict[UUID, UnitValueSeries],
+                          start_date: date,
+                          end_date: date
+                          ) -> Tuple[Dict[UUID, List[Optional[Decimal]]],
+                                     Dict[UUID, Optional[List[Optional[Decimal]]]]]:
+        """
+        Aligns unit values of held securities to given date range
 
-            current_date += delta_for_day
+        Args:
+            holdings: holdings
+            security_unit_values: unit value series by security id
+            start_date: first date
+            end_date: last date
 
-        return date_rates
+        Returns:
+            daily rates and divisors from start date to end date by security id
 
-    async def list_portfolio_history_values(
+        Raises:
+            HTTPException, with status 500 if a security has no rate before it was first held
+        """
+        rates: Dict[UUID, List[Optional[Decimal]]] = {}
+        divisors: Dict[UUID, Optional[List[Optional[Decimal]]]] = {}
+
+        for security_id in holdings.get_security_ids():
+            series = security_unit_values[security_id]
+            min_date = holdings.get_security_min_date(security_id=security_id)
+            first_date = series.get_first_date()
+
+            if first_date is None or first_date > min_date:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"could not find rate for security {security_id} before {min_date}"
+                )
+
+            rates[security_id], divisors[security_id] = series.get_range(start_date=start_date, end_date=end_date)
+
+        return rates, divisors
+
+    def get_log_securities(self, rows: List[DbPortfolioLog]) -> Dict[UUID, CatalogSecurity]:
+        """
+        Returns securities and conversion securities of portfolio transactions from security catalog
+
+        Args:
+            rows: portfolio transactions
+
+        Returns:
+            securities by id
+        """
+        security_ids = {row.security_id for row in rows}
+        security_ids.update(row.c_security_id for row in rows if row.c_security_id is not None)
+
+        return security_catalog.get_securities(database=self.database, security_ids=security_ids)
+
+    @staticmethod
+    def add_portfolio_log_holding(holdings: Holdings, row: DbPortfolioLog):
+        """
+        Adds holding amount changes of a portfolio transaction to holdings
+
+        Args:
+            holdings: holdings
+            row: portfolio transaction
+        """
+        transaction_code = row.transaction_code
+
+        is_subscription = transaction_code == "11"
+        is_redemption = transaction_code == "12"
+        is_transfer_to_portfolio = transaction_code == "30"
+        is_transfer_from_portfolio = transaction_code == "31"
+        is_fund_change = transaction_code == "46"
+
+        if is_subscription:
+            """User has subscribed to security, add value to portfolio security"""
+            holdings.add_holding(security_id=row.security_id, amount=row.amount, 
+                                 holding_date=row.transaction_date)
+        elif is_redemption:
+            """User has redeemed from security, remove value from portfolio security"""
+            holdings.add_holding(security_id=row.security_id, amount=-row.amount,
+                                 holding_date=row.transaction_date)
+        elif is_transfer_to_portfolio:
+            """User has transferred to portfolio, add value to portfolio security"""
+            holdings.add_holding(security_id=row.security_id, amount=row.amount,
+                                 holding_date=row.transaction_date)
+        elif is_transfer_from_portfolio:
+            """User has transferred from portfolio, remove value from portfolio security"""
+            holdings.add_holding(security_id=row.security_id, amount=-row.amount,
+                                 holding_date=row.transaction_date)
+        elif is_fund_change:
+            """User has changed fund, remove value from portfolio security and add to c_security"""
+            holdings.add_holding(security_id=row.security_id, amount=-row.amount,
+                                 holding_date=row.transaction_date)
+            holdings.add_holding(security_id=row.c_security_id, amount=row.amount,
+                                 holding_date=row.transaction_date)
+
+    async def get_portfolio_performance(
             self,
             portfolio_id: UUID,
             start_date: date,
             end_date: date,
             token_bearer: TokenModel
-    ) -> List[PortfolioHistoryValue]:
+    ) -> PortfolioPerformance:
         portfolio = self.get_portfolio(token_bearer=token_bearer, portfolio_id=portfolio_id)
 
         if end_date > date.today():
             end_date = date.today()
 
-        """List portfolio transactions from given time period """
+        if start_date > end_date:
+            raise HTTPException(
+                status_code=400,
+                detail="Start date must not be after end date"
+            )
+
+        if history_process_pool.is_saturated():
+            raise self.get_history_saturated_exception()
+
+        try:
+            result = await portfolio_single_flight.run(
+                ("performance", portfolio.id, start_date, end_date),
+                self.calculate_portfolio_performance,
+                portfolio.id,
+                start_date,
+                end_date
+            )
+        except PoolSaturatedException:
+            raise self.get_history_saturated_exception()
+
+        return self.translate_portfolio_performance(result=result)
+
+    @staticmethod
+    async def calculate_portfolio_performance(portfolio_id: UUID,
+                                              start_date: date,
+                                              end_date: date
+                                              ) -> Dict[str, Any]:
+        """
+        Calculates returns of a portfolio. Transactions and rates are loaded in the thread pool with a
+        database session of its own and the returns are calculated in the history process pool.
+
+        Args:
+            portfolio_id: portfolio id
+            start_date: first date of the period
+            end_date: last date of the period
+
+        Returns:
+            period values and returns
+
+        Raises:
+            PoolSaturatedException: when history process pool is saturated
+        """
+        performance_input = await run_in_threadpool(PortfoliosApiImpl.run_in_own_session,
+                                                    PortfoliosApiImpl.load_portfolio_performance_input,
+                                                    portfolio_id, start_date, end_date)
+        if performance_input is None:
+            return {
+                "startDate": start_date,
+                "endDate": end_date,
+                "startValue": 0,
+                "endValue": 0,
+                "netCashFlow": 0,
+                "timeWeightedReturn": None,
+                "annualizedTimeWeightedReturn": None,
+                "moneyWeightedReturn": None
+            }
+
+        return await history_process_pool.run(calculate_performance, performance_input)
+
+    def load_portfolio_performance_input(self,
+                                         portfolio_id: UUID,
+                                         start_date: date,
+                                         end_date: date
+                                         ) -> Optional[PerformanceInput]:
+        """
+        Loads transactions and rates needed for calculating returns of a portfolio
+
+        Args:
+            portfolio_id: portfolio id
+            start_date: first date of the period
+            end_date: last date of the period
+
+        Returns:
+            performance calculation input or None if portfolio has no holdings
+        """
         rows: List[DbPortfolioLog] = operations.get_portfolio_logs(
             database=self.database,
-            portfolio=portfolio,
-            transaction_codes=['11', '12', '30', '31', '46'],
+            portfolio_id=portfolio_id,
+            transaction_codes=HISTORY_TRANSACTION_CODES,
             transaction_date_min=None,
             transaction_date_max=end_date,
         )
 
         holdings = Holdings()
-        securities: Dict[UUID, DbSecurity] = {}
-        result: List[PortfolioHistoryValue] = []
+        flow_holdings = Holdings()
+        securities = self.get_log_securities(rows=rows)
 
-        """Add transactions to holdings object"""
         for row in rows:
-            transaction_code = row.transaction_code
-
-            is_subscription = transaction_code == "11"
-            is_redemption = transaction_code == "12"
-            is_transfer_to_portfolio = transaction_code == "30"
-            is_transfer_from_portfolio = transaction_code == "31"
-            is_fund_change = transaction_code == "46"
-
-            if is_subscription:
-                """User has subscribed to security, add value to portfolio security"""
-                holdings.add_holding(security_id=row.security_id, amount=row.amount, 
-                                     holding_date=row.transaction_date)
-            elif is_redemption:
-                """User has redeemed from security, remove value from portfolio security"""
-                holdings.add_holding(security_id=row.security_id, amount=-row.amount,
-                                     holding_date=row.transaction_date)
-            elif is_transfer_to_portfolio:
-                """User has transferred to portfolio, add value to portfolio security"""
-                holdings.add_holding(security_id=row.security_id, amount=row.amount,
-                                     holding_date=row.transaction_date)
-            elif is_transfer_from_portfolio:
-                """User has transferred from portfolio, remove value from portfolio security"""
-                holdings.add_holding(security_id=row.security_id, amount=-row.amount,
-                                     holding_date=row.transaction_date)
-            elif is_fund_change:
-                """User has changed fund, remove value from portfolio security and add to c_security"""
-                holdings.add_holding(security_id=row.security_id, amount=-row.amount,
-                                     holding_date=row.transaction_date)
-                holdings.add_holding(security_id=row.c_security_id, amount=row.amount,
-                                     holding_date=row.transaction_date)
-
-            securities[row.security.id] = row.security
-
-            if row.c_security is not None:
-                securities[row.c_security.id] = row.c_security
-
-        """If there are no holdings, the portfolio is empty"""
+            self.add_portfolio_log_holding(holdings=holdings, row=row)
+
+            """Fund changes move value within the portfolio and are not cash flows"""
+            if row.transaction_code in PERFORMANCE_CASH_FLOW_CODES:
+                self.add_portfolio_log_holding(holdings=flow_holdings, row=row)
+
         if holdings.is_empty():
-            return result
+            return None
 
-        """Resolve if SEK rates if needed"""
-        first_sek_date = None
-        sek_rates: Dict[date, Decimal] = {}
+        """Value of the day before the period is the starting value"""
+        base_date = max(start_date, holdings.get_min_date()) - timedelta(days=1)
 
-        for security_id in holdings.get_security_ids():
-            security = securities[security_id]
-            if "SPILTAN" in security.original_id:
-                min_date = holdings.get_security_min_date(security_id=security_id)
-                if first_sek_date is None or min_date < first_sek_date:
-                    first_sek_date = min_date
-
-        if first_sek_date is not None:
-            sek_security = operations.find_security_by_original_id(
-                database=self.database,
-                original_id="SEK"
-            )
+        security_unit_values = unit_value_cache.get_unit_values(
+            database=self.database,
+            securities=[securities[x] for x in holdings.get_security_ids()],
+            convert_currency=True
+        )
 
-            sek_rates = self.get_security_rate_map(
-                security_id=sek_security.id,
-                min_date=first_sek_date,
-                max_date=end_date
-            )
+        rates, divisors = self.align_unit_values(
+            holdings=holdings,
+            security_unit_values=security_unit_values,
+            start_date=base_date,
+            end_date=end_date
+        )
 
-        """Resolve EUR rates (including FIM for transactions before 1999-01-01) """
-        holdings_min_date = holdings.get_min_date()
-        eur_rates: Dict[date, Decimal] = {}
-        last_fim_date = self.settings.LAST_FIM_DATE
-        fim_convert_rate = self.settings.FIM_CONVERT_RATE
+        history_input = HistoryInput.create(
+            holdings=holdings,
+            start_date=base_date,
+            end_date=end_date,
+            rates=rates,
+            divisors=divisors
+        )
 
-        for i in range((end_date - holdings_min_date).days + 1):
-            eur_date = holdings_min_date + timedelta(days=i)
-            if eur_date > last_fim_date:
-                eur_rates[eur_date] = Decimal(1)
-            else:
-                eur_rates[eur_date] = fim_convert_rate
+        return PerformanceInput(
+            history_input=history_input,
+            flows=[[(holding_date.toordinal(), amount) for holding_date, amount in flow_holdings.data[x].items()]
+                   if x in flow_holdings.data else [] for x in holdings.get_security_ids()]
+        )
 
-        security_rates: Dict[UUID, Dict[date, Decimal]] = {}
+    @staticmethod
+    def translate_portfolio_performance(result: Dict[str, Any]) -> PortfolioPerformance:
+        """
+        Translates calculated performance into REST resource
 
-        """Resolve rates for all securities"""
-        for security_id in holdings.get_security_ids():
-            security_rates[security_id] = self.get_security_rate_map(
-                security_id=security_id,
-                min_date=holdings.get_security_min_date(security_id=security_id),
-                max_date=end_date
+        Args:
+            result: calculated period values and returns
+
+        Returns:
+            REST resource
+        """
+        def format_return(value: Optional[float]) -> Optional[str]:
+            return None if value is None else f"{value:.{PERFORMANCE_RETURN_DECIMALS}f}"
+
+        return PortfolioPerformance(
+            startDate=result["startDate"],
+            endDate=result["endDate"],
+            startValue=f"{result['startValue']:.2f}",
+            endValue=f"{result['endValue']:.2f}",
+            netCashFlow=f"{result['netCashFlow']:.2f}",
+            timeWeightedReturn=format_return(result["timeWeightedReturn"]),
+            annualizedTimeWeightedReturn=format_return(result["annualizedTimeWeightedReturn"]),
+            moneyWeightedReturn=format_return(result["moneyWeightedReturn"])
+        )
+
+    async def list_aggregated_history_values(
+            self,
+            start_date: date,
+            end_date: date,
+            company_id: Optional[UUID],
+            group_by: Optional[str],
+            since: Optional[date],
+            if_none_match: Optional[str],
+            token_bearer: TokenModel
+    ) -> Response:
+        if not AuthUtils.has_user_role(token_bearer=token_bearer):
+            raise HTTPException(
+                status_code=403,
+                detail="This endpoint is not available for anonymous users"
             )
 
-        """Map correct currency rates to securities"""
-        currency_rates: Dict[UUID, Dict[date, Decimal]] = {}
+        context = self.authorization.get_context(database=self.database)
 
-        for security_id in holdings.get_security_ids():
-            security = securities[security_id]
-            if "SPILTAN" in security.original_id:
-                currency_rates[security_id] = sek_rates
-            else:
-                currency_rates[security_id] = eur_rates
-
-        holdings_min_date = holdings.get_min_date()
-        if holdings_min_date > start_date:
-            start_date = holdings_min_date
-
-        holdings.calculate_amounts(start_date=start_date, end_date=end_date)
-
-        """Calculate daily sums for all holdings"""
-        for i in range((end_date - start_date).days + 1):
-            holding_date = start_date + timedelta(days=i)
-
-            day_sum = holdings.get_day_sum(
-                holding_date=holding_date,
-                currency_rates=currency_rates,
-                security_rates=security_rates
+        if group_by is not None and group_by != HISTORY_GROUP_BY_COMPANY:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid groupBy {group_by}"
             )
 
-            result.append(PortfolioHistoryValue(
-                date=holding_date,
-                value=day_sum
-            ))
+        if end_date > date.today():
+            end_date = date.today()
 
-        return result
+        if history_process_pool.is_saturated():
+            raise self.get_history_saturated_exception()
+
+        group_by_company = group_by == HISTORY_GROUP_BY_COMPANY
+
+        try:
+            rows, validation = await portfolio_single_flight.run(
+                ("aggregated_history_values", context.ssn, company_id, group_by_company, start_date, end_date, since,
+                 if_none_match),
+                self.get_aggregated_history_values,
+                context,
+                company_id,
+                group_by_company,
+                start_date,
+                end_date,
+                since,
+                HistoryValidator.from_etag(if_none_match)
+            )
+        except PoolSaturatedException:
+            raise self.get_history_saturated_exception()
+
+        return self.create_history_response(
+            fields=COMPANY_HISTORY_VALUE_FIELDS if group_by_company else HISTORY_VALUE_FIELDS,
+            rows=rows,
+            validation=validation
+        )
+
+    @staticmethod
+    async def get_aggregated_history_values(context: AuthorizationContext,
+                                            company_id: Optional[UUID],
+                                            group_by_company: bool,
+                                            start_date: date,
+                                            end_date: date,
+                                            since: Optional[date],
+                                            previous: Optional[HistoryValidator]
+                                            ) -> Tuple[Optional[List[Tuple]], HistoryValidation]:
+        """
+        Calculates combined daily values of portfolios user owns or has access to. Transactions and rates are
+        loaded in the thread pool with a database session of its own.
+
+        Args:
+            context: logged user authorization context
+            company_id: combine only portfolios of given company
+            group_by_company: whether values are combined per company
+            start_date: first date
+            end_date: last date
+            since: first date of values client needs, when client has earlier values
+            previous: validator of the values client has
+
+        Returns:
+            list of date and value tuples or date, value and company id tuples when grouped by company, or None if
+            client has the current values, and validation result
+
+        Raises:
+            PoolSaturatedException: when history process pool is saturated
+        """
+        history_inputs, validation = await run_in_threadpool(PortfoliosApiImpl.run_in_own_session,
+                                                              PortfoliosApiImpl.load_aggregated_history_inputs,
+                                                              context, company_id, group_by_company, start_date,
+                                                              end_date, since, previous)
+        if validation.not_modified:
+            return None, validation
+
+        if not history_inputs:
+            return [], validation
+
+        keys = list(history_inputs.keys())
+        values = await history_process_pool.run(calculate_history_values_list, [history_inputs[x] for x in keys])
+
+        if not group_by_company:
+            return values[0], validation
+
+        return [(value_date, value, str(key)) for key, key_values in zip(keys, values)
+                for value_date, value in key_values], validation
+
+    def load_aggregated_history_inputs(self,
+                                       context: AuthorizationContext,
+                                       company_id: Optional[UUID],
+                                       group_by_company: bool,
+                                       start_date: date,
+                                       end_date: date,
+                                       since: Optional[date],
+                                       previous: Optional[HistoryValidator]
+                                       ) -> Tuple[Dict[Any, HistoryInput], HistoryValidation]:
+        """
+        Loads transactions of all portfolios user owns or has access to in one query and rates needed
+        for calculating their combined daily values
+
+        Args:
+            context: logged user authorization context
+            company_id: combine only portfolios of given company
+            group_by_company: whether portfolios are combined per company
+            start_date: first date
+            end_date: last date
+            since: first date of values client needs, when client has earlier values
+            previous: validator of the values client has
+
+        Returns:
+            history calculation inputs by company id or by None when not grouped, and validation result
+        """
+        own_companies, company_access_companies = self.find_user_companies_v2(context=context, company_id=company_id)
+        portfolios = list({portfolio.id: portfolio for company in own_companies + company_access_companies
+                           for portfolio in company.portfolios}.values())
+
+        rows: List[DbPortfolioLog] = operations.get_portfolios_logs(
+            database=self.database,
+            portfolio_ids=[x.id for x in portfolios],
+            transaction_codes=HISTORY_TRANSACTION_CODES,
+            transaction_date_max=end_date
+        )
+
+        validation = self.validate_history(
+            rows=rows,
+            key=("aggregated", context.ssn, company_id, group_by_company, start_date, sorted(x.id for x in portfolios)),
+            start_date=start_date,
+            end_date=end_date,
+            since=since,
+            previous=previous
+        )
+
+        if validation.not_modified or validation.values_start > end_date:
+            return {}, validation
+
+        return self.create_history_inputs(
+            rows=rows,
+            group_keys={x.id: x.company_id if group_by_company else None for x in portfolios},
+            start_date=validation.values_start,
+            end_date=end_date
+        ), validation
 
     async def list_portfolios(
             self,
@@ -280,16 +915,29 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
                 detail="This endpoint is not available for anonymous users"
             )
 
-        ssn = AuthUtils.get_user_ssn(token_bearer=token_bearer)
-        if not ssn:
-            raise HTTPException(
-                status_code=403,
-                detail=f"Cannot resolve logged user SSN"
-            )
+        context = self.authorization.get_context(database=self.database)
+
+        return await portfolio_single_flight.run(
+            ("portfolios", context.ssn),
+            self.run_in_own_session,
+            PortfoliosApiImpl.list_user_portfolios,
+            context
+        )
+
+    def list_user_portfolios(self, context: AuthorizationContext) -> List[Portfolio]:
+        """
+        Lists portfolios of companies owned by given user
+
+        Args:
+            context: logged user authorization context
 
-        companies = operations.get_companies(
+        Returns:
+            list of REST resources
+        """
+        companies = operations.list_companies_by_ids(
             database=self.database,
-            ssn=ssn
+            company_ids=context.owned_company_ids,
+            load_profile=operations.LOAD_PROFILE_COMPANY_PORTFOLIOS
         )
 
         portfolios = []
@@ -297,10 +945,7 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
         for company in companies:
             portfolios = portfolios + company.portfolios
 
-        return list(map(lambda portfolio: self.translate_portfolio(
-            portfolio=portfolio,
-            own_companies=companies
-        ), portfolios))
+        return self.translate_portfolios(portfolios=portfolios, context=context)
 
     async def list_portfolios_v2(
             self,
@@ -314,20 +959,64 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
                 detail="This endpoint is not available for anonymous users"
             )
 
-        ssn = AuthUtils.get_user_ssn(token_bearer=token_bearer)
-        if not ssn:
-            raise HTTPException(
-                status_code=403,
-                detail=f"Cannot resolve logged user SSN"
-            )
+        context = self.authorization.get_context(database=self.database)
+
+        return await portfolio_single_flight.run(
+            ("portfolios_v2", context.ssn, company_id),
+            self.run_in_own_session,
+            PortfoliosApiImpl.list_user_portfolios_v2,
+            context,
+            company_id
+        )
+
+    def list_user_portfolios_v2(self, context: AuthorizationContext, company_id: Optional[UUID]) -> List[Portfolio]:
+        """
+        Lists portfolios of companies owned by or shared with given user
+
+        Args:
+            context: logged user authorization context
+            company_id: list only portfolios of given company
+
+        Returns:
+            list of REST resources
+
+        Raises:
+            HTTPException, with status 404 if company does not exist
+            HTTPException, with status 403 if user has no access to the company
+        """
+        own_companies, company_access_companies = self.find_user_companies_v2(context=context, company_id=company_id)
+
+        companies = own_companies + company_access_companies
+        portfolios = []
 
-        own_companies = []
-        company_access_companies = []
+        for company in companies:
+            portfolios = portfolios + company.portfolios
+
+        return self.translate_portfolios(portfolios=portfolios, context=context)
+
+    def find_user_companies_v2(self,
+                               context: AuthorizationContext,
+                               company_id: Optional[UUID]
+                               ) -> Tuple[List[DbCompany], List[DbCompany]]:
+        """
+        Finds companies owned by or shared with given user
+
+        Args:
+            context: logged user authorization context
+            company_id: find only given company
 
+        Returns:
+            companies owned by user and companies shared with user
+
+        Raises:
+            HTTPException, with status 404 if company does not exist
+            HTTPException, with status 403 if user has no access to the company
+        """
         if company_id:
             company = operations.find_company(
                 database=self.database,
-                company_id=company_id
+                company_id=company_id,
+                load_profile=operations.LOAD_PROFILE_COMPANY_PORTFOLIOS
             )
 
             if not company:
@@ -336,46 +1025,30 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
                     detail=f"Company with id {company_id} not found"
                 )
 
-            owned = company.ssn == ssn
-            if not owned:
-                company_access = operations.find_company_access_by_ssn_and_company_id(
-                    database=self.database,
-                    ssn=ssn,
-                    company_id=company_id
+            if not context.has_access(company_id=company.id):
+                raise HTTPException(
+                    status_code=403,
+                    detail=f"No permission to find this company"
                 )
 
-                if not company_access:
-                    raise HTTPException(
-                        status_code=403,
-                        detail=f"No permission to find this company"
-                    )
-
-                company_access_companies = [company]
-            else:
-                own_companies = [company]
-        else:
-            own_companies = operations.get_companies(
-                database=self.database,
-                ssn=ssn
-            )
-
-            company_access = operations.get_company_access(
-                database=self.database,
-                ssn=ssn
-            )
+            if context.is_owned(company_id=company.id):
+                return [company], []
 
-            company_access_companies = list(map(lambda i: i.company, company_access))
+            return [], [company]
 
-        companies = own_companies + company_access_companies
-        portfolios = []
+        own_companies = operations.list_companies_by_ids(
+            database=self.database,
+            company_ids=context.owned_company_ids,
+            load_profile=operations.LOAD_PROFILE_COMPANY_PORTFOLIOS
+        )
 
-        for company in companies:
-            portfolios = portfolios + company.portfolios
+        company_access_companies = operations.list_companies_by_ids(
+            database=self.database,
+            company_ids=context.shared_company_ids,
+            load_profile=operations.LOAD_PROFILE_COMPANY_PORTFOLIOS
+        )
 
-        return list(map(lambda portfolio: self.translate_portfolio(
-            portfolio=portfolio,
-            own_companies=own_companies
-        ), portfolios))
+        return own_companies, company_access_companies
 
     async def list_portfolio_transactions(
             self,
@@ -383,10 +1056,26 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
             start_date: date,
             end_date: date,
             transaction_type: TransactionType,
+            after: Optional[UUID],
+            max_results: Optional[int],
             token_bearer: TokenModel
-    ) -> List[PortfolioTransaction]:
-        transaction_code = self.get_transaction_code_for_transaction_type(transaction_type=transaction_type)
-        transaction_codes = ["11", "12", "46"] if transaction_code is None else [transaction_code]
+    ) -> Response:
+        transaction_codes = self.get_transaction_codes_for_transaction_type(transaction_type=transaction_type)
+
+        if not max_results:
+            max_results = TRANSACTIONS_PAGE_SIZE
+
+        if max_results < 0:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid max results parameter cannot be negative"
+            )
+
+        if max_results > TRANSACTIONS_MAX_RESULTS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid max results parameter cannot be greater than {TRANSACTIONS_MAX_RESULTS}"
+            )
 
         portfolio = self.get_portfolio(token_bearer=token_bearer, portfolio_id=portfolio_id)
 
@@ -396,15 +1085,72 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
         if not end_date:
             end_date = date.today()
 
+        after_log = None
+        if after:
+            after_log = operations.find_portfolio_log(
+                database=self.database,
+                portfolio_log_id=after
+            )
+
+            if after_log is None or after_log.portfolio_id != portfolio.id:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid after parameter {after}"
+                )
+
         portfolio_logs = operations.get_portfolio_logs(
             database=self.database,
-            portfolio=portfolio,
+            portfolio_id=portfolio.id,
             transaction_codes=transaction_codes,
             transaction_date_min=start_date,
             transaction_date_max=end_date,
+            max_result=max_results,
+            after=after_log
         )
 
-        return list(map(self.translate_portfolio_log, portfolio_logs))
+        return FastJSONResponse(content=list(map(self.translate_portfolio_log_dict, portfolio_logs)))
+
+    async def export_portfolio_transactions(
+            self,
+            portfolio_id: UUID,
+            start_date: Optional[date],
+            end_date: Optional[date],
+            transaction_type: Optional[TransactionType],
+            token_bearer: TokenModel
+    ) -> Response:
+        transaction_codes = self.get_transaction_codes_for_transaction_type(transaction_type=transaction_type)
+
+        portfolio = self.get_portfolio(token_bearer=token_bearer, portfolio_id=portfolio_id)
+
+        if not start_date:
+            start_date = date(1997, 1, 1)
+
+        if not end_date:
+            end_date = date.today()
+
+        def export_lines() -> Iterator[bytes]:
+            after_log = None
+
+            while True:
+                portfolio_logs = operations.get_portfolio_logs(
+                    database=self.database,
+                    portfolio_id=portfolio.id,
+                    transaction_codes=transaction_codes,
+                    transaction_date_min=start_date,
+                    transaction_date_max=end_date,
+                    max_result=EXPORT_PAGE_SIZE,
+                    after=after_log
+                )
+
+                for portfolio_log in portfolio_logs:
+                    yield JsonUtils.dumps(self.translate_portfolio_log_dict(portfolio_log=portfolio_log)) + b"\n"
+
+                if len(portfolio_logs) < EXPORT_PAGE_SIZE:
+                    break
+
+                after_log = portfolio_logs[-1]
+
+        return StreamingResponse(export_lines(), media_type="application/x-ndjson")
 
     async def find_portfolio_transaction(
             self,
@@ -440,19 +1186,180 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
     ) -> List[PortfolioSecurity]:
         portfolio = self.get_portfolio(token_bearer=token_bearer, portfolio_id=portfolio_id)
 
+        return await portfolio_single_flight.run(
+            ("portfolio_securities", portfolio.id),
+            self.run_in_own_session,
+            PortfoliosApiImpl.list_portfolio_security_resources,
+            portfolio.id
+        )
+
+    def list_portfolio_security_resources(self, portfolio_id: UUID) -> List[PortfolioSecurity]:
+        """
+        Lists valuated securities of a portfolio
+
+        Args:
+            portfolio_id: portfolio id
+
+        Returns:
+            list of REST resources
+        """
         portfolio_securities = PortfolioUtils.get_portfolio_security_values(
             database=self.database,
-            portfolio=portfolio
+            portfolio_id=portfolio_id
+        )
+
+        rate_dates = operations.get_last_rate_dates(
+            database=self.database,
+            security_ids=[x.security_id for x in portfolio_securities]
+        )
+
+        return [PortfolioSecurity(
+            id=str(x.security_id),
+            amount=str(x.total_amount),
+            totalValue=str(x.market_value_total),
+            purchaseValue=str(x.purchase_total),
+            rateDate=rate_dates.get(x.security_id)
+        ) for x in portfolio_securities]
+
+    async def list_portfolio_positions(
+            self,
+            portfolio_id: UUID,
+            position_date: date,
+            token_bearer: TokenModel
+    ) -> List[PortfolioSecurityPosition]:
+        portfolio = self.get_portfolio(token_bearer=token_bearer, portfolio_id=portfolio_id)
+
+        return await portfolio_single_flight.run(
+            ("portfolio_positions", portfolio.id, position_date),
+            self.run_in_own_session,
+            PortfoliosApiImpl.list_portfolio_position_resources,
+            portfolio.id,
+            position_date
         )
 
-        return list(map(self.translate_portfolio_security, portfolio_securities))
+    def list_portfolio_position_resources(self,
+                                          portfolio_id: UUID,
+                                          position_date: date
+                                          ) -> List[PortfolioSecurityPosition]:
+        """
+        Lists amounts and values of securities held in a portfolio at the end of given date. Only transactions up to
+        the date are loaded and rates of all held securities are looked up with a single query.
+
+        Args:
+            portfolio_id: portfolio id
+            position_date: date
+
+        Returns:
+            list of REST resources
+
+        Raises:
+            HTTPException, with status 500 if there is no rate for a held security on or before the date or
+            the SEK security needed for converting SEK rates is missing
+        """
+        rows: List[DbPortfolioLog] = operations.get_portfolio_logs(
+            database=self.database,
+            portfolio_id=portfolio_id,
+            transaction_codes=HISTORY_TRANSACTION_CODES,
+            transaction_date_min=None,
+            transaction_date_max=position_date,
+        )
+
+        holdings = Holdings()
+        securities = self.get_log_securities(rows=rows)
+
+        for row in rows:
+            self.add_portfolio_log_holding(holdings=holdings, row=row)
+
+        amounts = {}
+        for security_id in holdings.get_security_ids():
+            amount = holdings.get_amount_on(security_id=security_id, holding_date=position_date)
+            if amount:
+                amounts[security_id] = amount
+
+        rate_security_ids = list(amounts.keys())
+        sek_security = unit_value_cache.find_currency_security(
+            database=self.database,
+            securities=[securities[security_id] for security_id in amounts],
+            convert_currency=True
+        )
+
+        if sek_security is not None:
+            rate_security_ids.append(sek_security.id)
+
+        rates = operations.get_most_recent_security_rates(
+            database=self.database,
+            security_ids=rate_security_ids,
+            rate_date_before=position_date
+        )
+
+        result = []
+
+        for security_id, amount in amounts.items():
+            rate = self.get_position_rate(rates=rates, security_id=security_id, position_date=position_date)
+            currency_rate = None
+
+            if unit_value_cache.is_sek_security(securities[security_id]):
+                if sek_security is None:
+                    raise HTTPException(
+                        status_code=500,
+                        detail=f"could not find {SEK_SECURITY_ORIGINAL_ID} security for converting security "
+                               f"{security_id}"
+                    )
+
+                currency_rate = self.get_position_rate(rates=rates,
+                                                       security_id=sek_security.id,
+                                                       position_date=position_date).rate_close
+
+            result.append(PortfolioSecurityPosition(
+                securityId=str(security_id),
+                amount=amount,
+                rate=rate.rate_close,
+                rateDate=rate.rate_date,
+                value=unit_value_cache.get_value(value_date=position_date,
+                                                 amount=amount,
+                                                 rate=rate.rate_close,
+                                                 currency_rate=currency_rate)
+            ))
 
-    def get_portfolio(self, token_bearer: TokenModel, portfolio_id: UUID) -> DbPortfolio:
+        return result
+
+    @staticmethod
+    def get_position_rate(rates: Dict[UUID, SecurityRate], security_id: UUID, position_date: date) -> SecurityRate:
+        """
+        Returns most recent rate of a security on or before given date from loaded rates
+
+        Args:
+            rates: most recent rates by security id
+            security_id: security id
+            position_date: date
+
+        Returns:
+            security rate
+
+        Raises:
+            HTTPException, with status 500 if there is no rate on or before the date
+        """
+        rate = rates.get(security_id, None)
+
+        if rate is None:
+            raise HTTPException(
+                status_code=500,
+                detail=f"could not find rate for security {security_id} before {position_date}"
+            )
+
+        return rate
+
+    def get_portfolio(self,
+                      token_bearer: TokenModel,
+                      portfolio_id: UUID,
+                      load_profile: Optional[str] = None
+                      ) -> DbPortfolio:
         """
 
         Args:
             token_bearer (TokenModel): access token
             portfolio_id (UUID): portfolio id
+            load_profile (str, optional): load profile for portfolio relationships
 
         Returns:
             DbPortfolio
@@ -470,7 +1377,8 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
 
         portfolio = operations.find_portfolio(
             database=self.database,
-            portfolio_id=portfolio_id
+            portfolio_id=portfolio_id,
+            load_profile=load_profile
         )
 
         if not portfolio:
@@ -479,49 +1387,64 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
                 detail=f"Portfolio {portfolio_id} not found"
             )
 
-        user_ssn = AuthUtils.get_user_ssn(token_bearer=token_bearer)
-        if not user_ssn:
+        context = self.authorization.get_context(database=self.database)
+        if not context.has_access(company_id=portfolio.company_id):
             raise HTTPException(
                 status_code=403,
-                detail=f"Cannot resolve logged user SSN"
+                detail=f"No permission to find this portfolio"
             )
 
-        if user_ssn != portfolio.company.ssn:
-            company_access = operations.find_company_access_by_ssn_and_company_id(
-                database=self.database,
-                ssn=user_ssn,
-                company_id=portfolio.company.id
-            )
+        return portfolio
 
-            if not company_access:
-                raise HTTPException(
-                    status_code=403,
-                    detail=f"No permission to find this portfolio"
-                )
+    def translate_portfolios(self,
+                             portfolios: List[DbPortfolio],
+                             context: AuthorizationContext
+                             ) -> List[Portfolio]:
+        """
+        Translates portfolios into REST resources. Values of all portfolios are calculated together, so the
+        number of queries does not depend on the number of portfolios
 
-        return portfolio
+        Args:
+            portfolios: portfolios to translate, with companies loaded
+            context: logged user authorization context
+
+        Returns:
+            REST resources
+        """
+        portfolios_values = PortfolioUtils.get_portfolios_values(
+            database=self.database,
+            portfolio_ids=[portfolio.id for portfolio in portfolios]
+        )
+
+        return [self.translate_portfolio(
+            portfolio=portfolio,
+            owned=context.is_owned(company_id=portfolio.company_id),
+            portfolio_values=portfolios_values[portfolio.id]
+        ) for portfolio in portfolios]
 
     def translate_portfolio(self,
                             portfolio: DbPortfolio,
-                            own_companies: List[DbCompany],
+                            owned: bool,
+                            portfolio_values: Optional[PortfolioValues] = None
                             ) -> Portfolio:
         """
         Translates portfolio into REST resource
 
         Args:
             portfolio: portfolio to translate
-            own_companies: list of companies that user owns
+            owned: whether the portfolio belongs to a company user owns
+            portfolio_values: precalculated portfolio values, calculated when not given
 
         Returns:
             REST resource
         """
-        portfolio_values = PortfolioUtils.get_portfolio_values(
-            database=self.database,
-            portfolio=portfolio
-        )
+        if portfolio_values is None:
+            portfolio_values = PortfolioUtils.get_portfolio_values(
+                database=self.database,
+                portfolio_id=portfolio.id
+            )
 
-        own_company_ids = [company.id for company in own_companies]
-        access_level = "OWNED" if portfolio.company_id in own_company_ids else "SHARED"
+        access_level = "OWNED" if owned else "SHARED"
 
         total_amount = str(portfolio_values.total_amount) \
             if portfolio_values.total_amount is not None else "0"
@@ -552,25 +1475,40 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
         )
 
     def translate_portfolio_log(self, portfolio_log: DbPortfolioLog) -> PortfolioTransaction:
+        return PortfolioTransaction(**self.translate_portfolio_log_dict(portfolio_log=portfolio_log))
+
+    def translate_portfolio_log_dict(self, portfolio_log: DbPortfolioLog) -> Dict[str, Any]:
+        """Translates portfolio log into plain dict with PortfolioTransaction fields for fast JSON responses
+
+        Args:
+            portfolio_log (DbPortfolioLog): portfolio log
+
+        Returns:
+            Dict[str, Any]: PortfolioTransaction fields
+        """
         target_security_id = None
         if portfolio_log.c_security_id is not None:
             target_security_id = str(portfolio_log.c_security_id)
 
         transaction_type = self.get_transaction_type_for_transaction_code(portfolio_log.transaction_code)
 
-        return PortfolioTransaction(
-            id=str(portfolio_log.id),
-            securityId=str(portfolio_log.security_id),
-            targetSecurityId=target_security_id,
-            transactionType=transaction_type,
-            valueDate=portfolio_log.transaction_date,
-            value=portfolio_log.c_value,
-            shareAmount=portfolio_log.amount,
-            marketValue=portfolio_log.c_price,
-            totalValue=portfolio_log.c_total_value,
-            paymentDate=portfolio_log.payment_date,
-            provision=portfolio_log.provision
-        )
+        return {
+            "id": str(portfolio_log.id),
+            "securityId": str(portfolio_log.security_id),
+            "targetSecurityId": target_security_id,
+            "transactionType": transaction_type,
+            "valueDate": portfolio_log.transaction_date,
+            "value": portfolio_log.c_value,
+            "shareAmount": portfolio_log.amount,
+            "marketValue": portfolio_log.c_price,
+            "totalValue": portfolio_log.c_total_value,
+            "paymentDate": portfolio_log.payment_date,
+            "provision": portfolio_log.provision
+        }
+
+    def get_transaction_codes_for_transaction_type(self, transaction_type: Optional[TransactionType]) -> List[str]:
+        transaction_code = self.get_transaction_code_for_transaction_type(transaction_type=transaction_type)
+        return ["11", "12", "46"] if transaction_code is None else [transaction_code]
 
     @staticmethod
     def get_transaction_code_for_transaction_type(transaction_type: Optional[TransactionType]) -> Optional[str]:
@@ -601,20 +1539,3 @@ class PortfoliosApiImpl(PortfoliosApiSpec):
             status_code=500,
             detail=f"Invalid transaction code found {transaction_code}"
         )
-
-    def translate_portfolio_security(self, portfolio_security_values: PortfolioSecurityValues) -> PortfolioSecurity:
-        rate_date = operations.get_last_rate_date_for_security_rate(
-            database=self.database,
-            security_id=portfolio_security_values.security_id
-        )
-
-        """
-        Translates portfolio security into REST resource
-        """
-        return PortfolioSecurity(
-            id=str(portfolio_security_values.security_id),
-            amount=str(portfolio_security_values.total_amount),
-            totalValue=str(portfolio_security_values.market_value_total),
-            purchaseValue=str(portfolio_security_values.purchase_total),
-            rateDate=rate_date
-        )
@@ -7,15 +7,18 @@ from uuid import UUID
 from database import operations
 
 from typing import List, Optional, Dict
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
 from fastapi_utils.cbv import cbv
 from spec.apis.securities_api import SecuritiesApiSpec, router as securities_api_router
 
 from spec.models.security import Security, LocalizedValue
 from spec.models.extra_models import TokenModel
 
-from database.models import Security as DbSecurity, SecurityRate
+from database.models import SecurityRate
 from spec.models.security_history_value import SecurityHistoryValue
+from utils.json_utils import FastJSONResponse
+from utils.security_catalog import CatalogSecurity, security_catalog
+from utils.unit_value_cache import unit_value_cache
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +32,7 @@ class SecuritiesApiImpl(SecuritiesApiSpec):
             token_bearer: TokenModel,
     ) -> Security:
 
-        security = operations.find_security(
+        security = security_catalog.find(
             database=self.database,
             security_id=security_id
         )
@@ -69,15 +72,12 @@ class SecuritiesApiImpl(SecuritiesApiSpec):
                 detail="Invalid max results parameter cannot be negative"
             )
 
-        securities = operations.list_securities_with_fund(
-            database=self.database,
-            first_result=first_result,
-            max_result=max_results,
-            series_id=series_id,
-            fund_id=fund_id
-        )
+        securities = [security for security in security_catalog.list_securities(database=self.database)
+                      if security.fund_id is not None
+                      and (not series_id or security.series_id == series_id)
+                      and (not fund_id or security.fund_id == fund_id)]
 
-        return list(map(self.translate_security, securities))
+        return list(map(self.translate_security, securities[first_result:first_result + max_results]))
 
     async def list_security_history_values(self,
                                            security_id: UUID,
@@ -86,9 +86,9 @@ class SecuritiesApiImpl(SecuritiesApiSpec):
                                            start_date: Optional[date],
                                            end_date: Optional[date],
                                            token_bearer: TokenModel
-                                           ) -> List[SecurityHistoryValue]:
+                                           ) -> Response:
 
-        security = operations.find_security(
+        security = security_catalog.find(
             database=self.database,
             security_id=security_id
         )
@@ -108,7 +108,14 @@ class SecuritiesApiImpl(SecuritiesApiSpec):
             max_result=max_results
         )
 
-        return list(map(self.translate_historical_value, security_values))
+        unit_values = unit_value_cache.get_unit_values(
+            database=self.database,
+            securities=[security],
+            convert_currency=False
+        )[security.id]
+
+        return FastJSONResponse.from_rows(fields=("date", "value"),
+                                          rows=[(x.rate_date, unit_values.get(x.rate_date)) for x in security_values])
 
     def get_non_euro_security_history_values(self, security_rate_values: List[SecurityRate],
                                              currency_security_values: List[SecurityRate]) -> List[SecurityHistoryValue]:
@@ -144,11 +151,11 @@ class SecuritiesApiImpl(SecuritiesApiSpec):
         return min(currency_rate_dates, key=lambda rate_date: abs(security_rate_date - rate_date))
 
     @staticmethod
-    def translate_security(security: DbSecurity) -> Security:
+    def translate_security(security: CatalogSecurity) -> Security:
         """Translates security to REST resource
 
         Args:
-            security (DbSecurity): security
+            security (CatalogSecurity): security
 
         Returns:
             Security: Translated REST resource
@@ -164,19 +171,3 @@ class SecuritiesApiImpl(SecuritiesApiSpec):
             ),
             currency=security.currency
         )
-
-    def translate_historical_value(self, security_rate: SecurityRate) -> SecurityHistoryValue:
-        """Translates historical value
-
-        Args:
-            security_rate (SecurityRate): security rate
-
-        Returns:
-            SecurityHistoryValue: REST resource
-        """
-        result = SecurityHistoryValue()
-        last_fim_date = self.settings.LAST_FIM_DATE
-        fim_convert_rate = self.settings.FIM_CONVERT_RATE
-        result.date = security_rate.rate_date
-        result.value = security_rate.rate_close if result.date > last_fim_date else security_rate.rate_close / fim_convert_rate
-        return result
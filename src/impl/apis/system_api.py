@@ -1,7 +1,19 @@
 # coding: utf-8
 
+from typing import Dict
+
+from auth.auth_utils import AuthUtils
+from auth.authorization import AuthorizationCache
+from auth.oidc import VerifiedTokenCache
+from fastapi import HTTPException
 from fastapi_utils.cbv import cbv
+from mail.dispatcher import MailDispatcher
 from spec.apis.system_api import SystemApiSpec, router as system_api_router
+from spec.models.extra_models import TokenModel
+from utils.single_flight import SingleFlight
+from utils.process_pool import BoundedProcessPool
+from utils.security_catalog import SecurityCatalog
+from utils.unit_value_cache import UnitValueCache
 
 
 @cbv(system_api_router)
@@ -10,3 +22,23 @@ class SystemApiImpl(SystemApiSpec):
     @staticmethod
     async def ping() -> str:
         return "pong"
+
+    @staticmethod
+    async def get_metrics(token_bearer: TokenModel) -> Dict[str, Dict[str, Dict[str, int]]]:
+        if not AuthUtils.has_metrics_role(token_bearer=token_bearer):
+            raise HTTPException(
+                status_code=403,
+                detail="This endpoint requires metrics role"
+            )
+
+        return {
+            "singleFlight": {x.name: x.get_stats() for x in SingleFlight.instances},
+            "processPools": {x.name: x.get_stats() for x in BoundedProcessPool.instances},
+            "mailDispatchers": {x.name: x.get_stats() for x in MailDispatcher.instances},
+            "caches": {
+                **{x.name: x.get_stats() for x in UnitValueCache.instances},
+                **{x.name: x.get_stats() for x in AuthorizationCache.instances},
+                **{x.name: x.get_stats() for x in VerifiedTokenCache.instances},
+                **{x.name: x.get_stats() for x in SecurityCatalog.instances}
+            }
+        }
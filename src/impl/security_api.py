@@ -1,10 +1,11 @@
 # coding: utf-8
 import logging
 import os
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from spec.models.extra_models import TokenModel
+from auth.authorization import RequestAuthorization
 from auth.oidc import Oidc
 
 logger = logging.getLogger(__name__)
@@ -52,3 +53,16 @@ def get_token_bearer(credentials: HTTPAuthorizationCredentials = Depends(bearer_
         raise HTTPException(status_code=403, detail="Forbidden")
 
     return token
+
+
+def get_request_authorization(token_bearer: TokenModel = Security(get_token_bearer)) -> RequestAuthorization:
+    """Returns authorization of the request. Logged user SSN and companies are resolved when first needed and
+    only once per request.
+
+    Args:
+        token_bearer (TokenModel): access token, decoded once per request
+
+    Returns:
+        RequestAuthorization: request authorization
+    """
+    return RequestAuthorization(token_bearer=token_bearer)
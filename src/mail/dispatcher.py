@@ -0,0 +1,476 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+
+from typing import Dict, List, Optional, Set
+from uuid import uuid4
+
+import aiosmtplib
+
+from fastapi_mail import MessageSchema
+from fastapi_mail.msg import MailMsg
+
+from config.settings import Settings
+from mail.mailer import Mailer
+
+logger = logging.getLogger(__name__)
+
+STOP = object()
+SPOOL_SUFFIX = ".json"
+CLAIM_SUFFIX = ".claimed"
+
+
+class MailDispatcher:
+    """
+    In-process mail queue. Messages are sent by a background thread that keeps one SMTP connection open while
+    there are messages to send and closes it after an idle period.
+
+    Failed deliveries are retried a few times with growing delays. Messages that still can not be sent, or that
+    do not fit into the queue, are written into the spool directory, and spooled messages are queued again when
+    the worker starts and whenever it has been idle.
+
+    Every worker process may share the spool directory, so a dispatcher claims a spool file by renaming it with its
+    process id and dispatcher id before queueing it. Claims are released when the message can not be sent.
+    Claims of processes that are no longer running, of dispatchers that no longer exist in this process and claims
+    older than the claim timeout are released by the next dispatcher that lists the spool directory. The claim is
+    refreshed before each delivery attempt, and the claim timeout must exceed the total retry delay, so a claim does
+    not time out while its dispatcher is still retrying.
+    """
+
+    instances: List["MailDispatcher"] = []
+
+    def __init__(self,
+                 name: str,
+                 queue_size: int,
+                 max_attempts: int,
+                 retry_delay: float,
+                 idle_timeout: float,
+                 spool_path: Optional[str],
+                 claim_timeout: float):
+        """
+        Constructor
+        Args:
+            name: name used in logs and metrics
+            queue_size: max number of queued messages
+            max_attempts: max number of delivery attempts before a message is spooled
+            retry_delay: delay before the first retry in seconds, doubled for each further retry
+            idle_timeout: seconds after which an unused SMTP connection is closed
+            spool_path: directory for undelivered messages or None if they are not spooled
+            claim_timeout: seconds after which claimed spool files are considered abandoned. Must be longer than
+                the total retry delay
+
+        Raises:
+            ValueError: if claim timeout is not longer than the total retry delay
+        """
+        total_retry_delay = retry_delay * (2 ** max(max_attempts - 1, 0) - 1)
+        if claim_timeout <= total_retry_delay:
+            raise ValueError(f"{name}: claim timeout {claim_timeout} s must be longer than the total retry delay "
+                             f"{total_retry_delay} s")
+
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.idle_timeout = idle_timeout
+        self.spool_path = spool_path
+        self.claim_timeout = claim_timeout
+        self.claim_id = uuid4().hex
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.connection: Optional[aiosmtplib.SMTP] = None
+        self.claimed_spool_files: Set[str] = set()
+        self.sent = 0
+        self.retries = 0
+        self.spooled = 0
+        self.dropped = 0
+        MailDispatcher.instances.append(self)
+
+    def enqueue(self, message: MessageSchema):
+        """
+        Queues message for sending. Message is spooled when the queue is full.
+
+        Args:
+            message: message
+        """
+        self.start()
+
+        try:
+            self.queue.put_nowait((message, None))
+        except queue.Full:
+            logger.warning(f"{self.name}: mail queue is full")
+            self.spool(message=message)
+
+    def start(self):
+        """
+        Starts worker thread if it is not running
+        """
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name=f"{self.name}-worker", daemon=True)
+                self.thread.start()
+
+    def close(self, timeout: float):
+        """
+        Sends queued messages and stops worker thread. Messages that are not sent within timeout are spooled.
+
+        Args:
+            timeout: max seconds to wait
+        """
+        with self.lock:
+            thread = self.thread
+            self.thread = None
+
+        if thread is not None and thread.is_alive():
+            deadline = time.monotonic() + timeout
+
+            try:
+                self.queue.put(STOP, timeout=timeout)
+            except queue.Full:
+                pass
+
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is STOP:
+                continue
+
+            message, spool_file = item
+            if spool_file is None:
+                self.spool(message=message)
+            else:
+                self.release_spooled(spool_file=spool_file)
+
+    def run(self):
+        """
+        Worker thread main loop
+        """
+        loop = asyncio.new_event_loop()
+
+        try:
+            self.queue_spooled()
+
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    loop.run_until_complete(self.disconnect())
+                    self.queue_spooled()
+                    continue
+
+                if item is STOP:
+                    break
+
+                message, spool_file = item
+                loop.run_until_complete(self.deliver(message=message, spool_file=spool_file))
+        finally:
+            loop.run_until_complete(self.disconnect())
+            loop.close()
+
+    async def deliver(self, message: MessageSchema, spool_file: Optional[str]):
+        """
+        Sends message, retrying failed attempts. Message is spooled if all attempts fail.
+
+        Args:
+            message: message
+            spool_file: spool file of the message or None if message has not been spooled
+        """
+        for attempt in range(self.max_attempts):
+            if attempt > 0:
+                self.retries += 1
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+            if spool_file is not None and not self.refresh_claim(spool_file=spool_file):
+                logger.warning(f"{self.name}: claim of spooled mail {spool_file} has been released, not sending")
+                return
+
+            try:
+                await self.send(message=message)
+                self.sent += 1
+
+                if spool_file is not None:
+                    self.remove_spooled(spool_file=spool_file)
+
+                return
+            except Exception as e:
+                logger.warning(f"{self.name}: sending mail failed on attempt {attempt + 1}: {e}")
+                await self.disconnect()
+
+        if spool_file is not None:
+            self.release_spooled(spool_file=spool_file)
+        else:
+            self.spool(message=message)
+
+    async def send(self, message: MessageSchema):
+        """
+        Sends message using the open SMTP connection, opening it first if needed
+
+        Args:
+            message: message
+        """
+        if self.connection is None or not self.connection.is_connected:
+            self.connection = await self.connect()
+
+        mime_message = await MailMsg(**message.dict())._message(os.environ["MAIL_FROM"])
+        await self.connection.send_message(mime_message)
+
+    @staticmethod
+    async def connect() -> aiosmtplib.SMTP:
+        """
+        Opens SMTP connection
+
+        Returns:
+            connection
+        """
+        config = Mailer.get_connection_config()
+        connection = aiosmtplib.SMTP(
+            hostname=config.MAIL_SERVER,
+            port=config.MAIL_PORT,
+            use_tls=config.MAIL_SSL,
+            start_tls=config.MAIL_TLS,
+            validate_certs=config.VALIDATE_CERTS
+        )
+
+        await connection.connect()
+
+        if config.USE_CREDENTIALS:
+            await connection.login(config.MAIL_USERNAME, config.MAIL_PASSWORD)
+
+        return connection
+
+    async def disconnect(self):
+        """
+        Closes SMTP connection if it is open
+        """
+        connection = self.connection
+        self.connection = None
+
+        if connection is None or not connection.is_connected:
+            return
+
+        try:
+            await connection.quit()
+        except Exception:
+            connection.close()
+
+    def spool(self, message: MessageSchema):
+        """
+        Writes undelivered message into spool directory. Message is dropped if spooling is not configured
+        or fails.
+
+        Args:
+            message: message
+        """
+        if not self.spool_path:
+            logger.error(f"{self.name}: dropping undelivered mail \"{message.subject}\", spooling is not configured")
+            self.dropped += 1
+            return
+
+        try:
+            os.makedirs(self.spool_path, exist_ok=True)
+            file_name = f"{time.time_ns()}-{uuid4()}{SPOOL_SUFFIX}"
+            temp_path = os.path.join(self.spool_path, f".{file_name}.tmp")
+
+            with open(temp_path, "w", encoding="utf-8") as spool_file:
+                spool_file.write(message.json())
+
+            os.replace(temp_path, os.path.join(self.spool_path, file_name))
+            self.spooled += 1
+        except Exception as e:
+            logger.error(f"{self.name}: dropping undelivered mail \"{message.subject}\", spooling failed: {e}")
+            self.dropped += 1
+
+    def list_spooled(self) -> List[str]:
+        """
+        Lists spooled messages that are not claimed, oldest first. Abandoned claims are released first.
+
+        Returns:
+            spool file names
+        """
+        if not self.spool_path or not os.path.isdir(self.spool_path):
+            return []
+
+        file_names = sorted(os.listdir(self.spool_path))
+        released = [x for x in file_names if x.endswith(CLAIM_SUFFIX) and self.is_abandoned_claim(claimed_file=x)]
+
+        for claimed_file in released:
+            self.release_spooled(spool_file=claimed_file)
+
+        spool_files = [x for x in file_names if x.endswith(SPOOL_SUFFIX) and not x.startswith(".")]
+        return sorted(spool_files + [self.get_unclaimed_name(claimed_file=x) for x in released])
+
+    def queue_spooled(self):
+        """
+        Claims and queues spooled messages while there is room in the queue
+        """
+        for file_name in self.list_spooled():
+            if self.queue.full():
+                return
+
+            claimed_file = self.claim_spooled(file_name=file_name)
+            if claimed_file is None:
+                continue
+
+            try:
+                message = MessageSchema.parse_file(os.path.join(self.spool_path, claimed_file))
+            except Exception as e:
+                logger.error(f"{self.name}: could not read spooled mail {file_name}: {e}")
+                self.release_spooled(spool_file=claimed_file)
+                continue
+
+            try:
+                self.queue.put_nowait((message, claimed_file))
+            except queue.Full:
+                self.release_spooled(spool_file=claimed_file)
+                return
+
+    def claim_spooled(self, file_name: str) -> Optional[str]:
+        """
+        Claims spooled message for this dispatcher by renaming its spool file
+
+        Args:
+            file_name: spool file name
+
+        Returns:
+            claimed spool file name or None if another dispatcher has claimed the message
+        """
+        claimed_file = f"{file_name}.{os.getpid()}.{self.claim_id}{CLAIM_SUFFIX}"
+        claimed_path = os.path.join(self.spool_path, claimed_file)
+
+        try:
+            os.rename(os.path.join(self.spool_path, file_name), claimed_path)
+            os.utime(claimed_path)
+        except FileNotFoundError:
+            return None
+
+        with self.lock:
+            self.claimed_spool_files.add(claimed_file)
+
+        return claimed_file
+
+    def refresh_claim(self, spool_file: str) -> bool:
+        """
+        Updates modification time of claimed spool file, so that the claim does not time out
+
+        Args:
+            spool_file: claimed spool file name
+
+        Returns:
+            whether the message is still claimed by this dispatcher
+        """
+        try:
+            os.utime(os.path.join(self.spool_path, spool_file))
+        except FileNotFoundError:
+            with self.lock:
+                self.claimed_spool_files.discard(spool_file)
+
+            return False
+
+        return True
+
+    def release_spooled(self, spool_file: str):
+        """
+        Releases claimed message so that it can be claimed again
+
+        Args:
+            spool_file: claimed spool file name
+        """
+        with self.lock:
+            self.claimed_spool_files.discard(spool_file)
+
+        try:
+            os.rename(os.path.join(self.spool_path, spool_file),
+                      os.path.join(self.spool_path, self.get_unclaimed_name(claimed_file=spool_file)))
+        except FileNotFoundError:
+            pass
+
+    def is_abandoned_claim(self, claimed_file: str) -> bool:
+        """
+        Returns whether claimed spool file is no longer going to be sent by the dispatcher that claimed it
+
+        Args:
+            claimed_file: claimed spool file name
+
+        Returns:
+            whether the claim is abandoned
+        """
+        try:
+            pid, claim_id = claimed_file[:-len(CLAIM_SUFFIX)].split(".")[-2:]
+            pid = int(pid)
+            claimed = os.path.getmtime(os.path.join(self.spool_path, claimed_file))
+        except (ValueError, OSError):
+            return False
+
+        if time.time() - claimed > self.claim_timeout:
+            return True
+
+        if pid == os.getpid():
+            return claim_id not in [x.claim_id for x in MailDispatcher.instances]
+
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+
+        return False
+
+    @staticmethod
+    def get_unclaimed_name(claimed_file: str) -> str:
+        """
+        Returns original name of claimed spool file
+
+        Args:
+            claimed_file: claimed spool file name
+
+        Returns:
+            spool file name
+        """
+        return claimed_file.rsplit(".", 3)[0]
+
+    def remove_spooled(self, spool_file: str):
+        """
+        Removes spooled message after it has been sent
+
+        Args:
+            spool_file: claimed spool file name
+        """
+        with self.lock:
+            self.claimed_spool_files.discard(spool_file)
+
+        try:
+            os.remove(os.path.join(self.spool_path, spool_file))
+        except FileNotFoundError:
+            pass
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns dispatcher counters
+
+        Returns: queued, sent, retried, spooled and dropped messages
+        """
+        return {
+            "queued": self.queue.qsize(),
+            "sent": self.sent,
+            "retries": self.retries,
+            "spooled": self.spooled,
+            "dropped": self.dropped
+        }
+
+
+settings = Settings()
+mail_dispatcher = MailDispatcher(name="mail",
+                                 queue_size=settings.MAIL_QUEUE_SIZE,
+                                 max_attempts=settings.MAIL_MAX_ATTEMPTS,
+                                 retry_delay=settings.MAIL_RETRY_DELAY,
+                                 idle_timeout=settings.MAIL_CONNECTION_IDLE_SECONDS,
+                                 spool_path=settings.MAIL_SPOOL_PATH,
+                                 claim_timeout=settings.MAIL_SPOOL_CLAIM_TIMEOUT)
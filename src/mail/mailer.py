@@ -1,4 +1,4 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+from fastapi_mail import ConnectionConfig
 import os
 
 
@@ -8,18 +8,18 @@ class Mailer:
     """
 
     @staticmethod
-    def send_mail(message: MessageSchema):
+    def get_connection_config() -> ConnectionConfig:
         """
-        Sends an e-mail
-        Args:
-            message: message
+        Returns SMTP connection config from environment
+        Returns:
+            connection config
         """
         mail_username = os.environ["MAIL_USERNAME"]
         mail_password = os.environ["MAIL_PASSWORD"]
         use_credentials = bool(mail_username) and bool(mail_password)
         validate_certs = use_credentials
 
-        email_conf = ConnectionConfig(
+        return ConnectionConfig(
             MAIL_USERNAME=mail_username,
             MAIL_PASSWORD=mail_password,
             MAIL_FROM=os.environ["MAIL_FROM"],
@@ -30,6 +30,3 @@ class Mailer:
             USE_CREDENTIALS=use_credentials,
             VALIDATE_CERTS=validate_certs
         )
-
-        fast_mail = FastMail(email_conf)
-        return fast_mail.send_message(message)
\ No newline at end of file
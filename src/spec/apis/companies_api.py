@@ -31,7 +31,8 @@ from config.settings import Settings
 from spec.models.extra_models import TokenModel  # noqa: F401
 from spec.models.company import Company
 from spec.models.error import Error
-from impl.security_api import get_token_bearer
+from auth.authorization import RequestAuthorization
+from impl.security_api import get_token_bearer, get_request_authorization
 
 router = InferringRouter()
 
@@ -65,6 +66,7 @@ def get_settings():
 class CompaniesApiSpec(ABC):
 
     database: Session = Depends(get_database)
+    authorization: RequestAuthorization = Depends(get_request_authorization)
     settings: Settings = Depends(get_settings)
 
     @abstractmethod
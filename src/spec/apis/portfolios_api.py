@@ -29,14 +29,21 @@ from sqlalchemy.orm import Session
 from config.settings import Settings
 
 from spec.models.extra_models import TokenModel  # noqa: F401
+from spec.models.aggregated_history_value import AggregatedHistoryValue
 from spec.models.error import Error
+from spec.models.history_group_by import HistoryGroupBy
 from spec.models.portfolio import Portfolio
 from spec.models.portfolio_history_value import PortfolioHistoryValue
+from spec.models.portfolio_period_summary import PortfolioPeriodSummary
+from spec.models.portfolio_performance import PortfolioPerformance
 from spec.models.portfolio_security import PortfolioSecurity
+from spec.models.portfolio_security_position import PortfolioSecurityPosition
 from spec.models.portfolio_summary import PortfolioSummary
 from spec.models.portfolio_transaction import PortfolioTransaction
+from spec.models.summary_period import SummaryPeriod
 from spec.models.transaction_type import TransactionType
-from impl.security_api import get_token_bearer
+from auth.authorization import RequestAuthorization
+from impl.security_api import get_token_bearer, get_request_authorization
 
 router = InferringRouter()
 
@@ -70,6 +77,7 @@ def get_settings():
 class PortfoliosApiSpec(ABC):
 
     database: Session = Depends(get_database)
+    authorization: RequestAuthorization = Depends(get_request_authorization)
     settings: Settings = Depends(get_settings)
 
     @abstractmethod
@@ -217,12 +225,74 @@ class PortfoliosApiSpec(ABC):
             token_bearer=token_bearer
         )
 
+    @abstractmethod
+    async def list_portfolio_period_summaries(
+        self,
+        portfolio_id: UUID,
+        start_date: date,
+        end_date: date,
+        period: Optional[SummaryPeriod],
+        token_bearer: TokenModel,
+    ) -> List[PortfolioPeriodSummary]:
+        ...
+
+    @router.get(
+        "/v1/portfolios/{portfolioId}/summaries",
+        responses={
+            200: {"model": List[PortfolioPeriodSummary], "description": "List of portfolio period summaries"},
+            400: {"model": Error, "description": "Invalid request was sent to the server"},
+            403: {"model": Error, "description": "Attempted to make a call with unauthorized client"},
+            500: {"model": Error, "description": "Internal server error"},
+        },
+        tags=["Portfolios"],
+        summary="List portfolio summaries by period",
+    )
+    async def list_portfolio_period_summaries_spec(
+        self,
+        portfolio_id: str = Path(None, description="portfolio id", alias="portfolioId"),
+        start_date: str = Query(None, description="Start date for the date range", alias="startDate"),
+        end_date: str = Query(None, description="End date for the date range", alias="endDate"),
+        period: SummaryPeriod = Query(None, description="Summary period, MONTH or YEAR. Defaults to MONTH", alias="period"),
+        token_bearer: TokenModel = FastAPISecurity(
+            get_token_bearer
+        ),
+    ) -> List[PortfolioPeriodSummary]:
+        """Returns subscriptions and redemptions of a portfolio for each month or year of given time range"""
+
+        if portfolio_id is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Missing required parameter portfolioId"
+            )
+
+        if start_date is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Missing required parameter startDate"
+            )
+
+        if end_date is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Missing required parameter endDate"
+            )
+
+        return await self.list_portfolio_period_summaries(
+            portfolio_id=self.to_uuid(portfolio_id),
+            start_date=self.to_date(start_date),
+            end_date=self.to_date(end_date),
+            period=period,
+            token_bearer=token_bearer
+        )
+
     @abstractmethod
     async def list_portfolio_history_values(
         self,
         portfolio_id: UUID,
         start_date: date,
         end_date: date,
+        since: Optional[date],
+        if_none_match: Optional[str],
         token_bearer: TokenModel,
     ) -> List[PortfolioHistoryValue]:
         ...
@@ -231,6 +301,7 @@ class PortfoliosApiSpec(ABC):
         "/v1/portfolios/{portfolioId}/historyValues",
         responses={
             200: {"model": List[PortfolioHistoryValue], "description": "List of portfolio history values"},
+            304: {"description": "Client has the current history values"},
             400: {"model": Error, "description": "Invalid request was sent to the server"},
             403: {"model": Error, "description": "Attempted to make a call with unauthorized client"},
             500: {"model": Error, "description": "Internal server error"},
@@ -243,6 +314,9 @@ class PortfoliosApiSpec(ABC):
         portfolio_id: str = Path(None, description="portfolio id", alias="portfolioId"),
         start_date: str = Query(None, description="Start date for the date range", alias="startDate"),
         end_date: str = Query(None, description="End date for the date range", alias="endDate"),
+        since: str = Query(None, description="Return only values from given date forward. Requires validator of "
+                                             "previously fetched values in If-None-Match header", alias="since"),
+        if_none_match: str = Header(None, description="ETag of previously fetched values", alias="If-None-Match"),
         token_bearer: TokenModel = FastAPISecurity(
             get_token_bearer
         ),
@@ -271,6 +345,8 @@ class PortfoliosApiSpec(ABC):
             portfolio_id=self.to_uuid(portfolio_id),
             start_date=self.to_date(start_date),
             end_date=self.to_date(end_date),
+            since=self.to_date(since),
+            if_none_match=if_none_match,
             token_bearer=token_bearer
         )
 
@@ -314,6 +390,114 @@ class PortfoliosApiSpec(ABC):
             token_bearer=token_bearer
         )
 
+    @abstractmethod
+    async def get_portfolio_performance(
+        self,
+        portfolio_id: UUID,
+        start_date: date,
+        end_date: date,
+        token_bearer: TokenModel,
+    ) -> PortfolioPerformance:
+        ...
+
+    @router.get(
+        "/v1/portfolios/{portfolioId}/performance",
+        responses={
+            200: {"model": PortfolioPerformance, "description": "Portfolio performance"},
+            400: {"model": Error, "description": "Invalid request was sent to the server"},
+            403: {"model": Error, "description": "Attempted to make a call with unauthorized client"},
+            404: {"model": Error, "description": "Not found"},
+            500: {"model": Error, "description": "Internal server error"},
+            503: {"model": Error, "description": "Server is too busy to calculate performance"},
+        },
+        tags=["Portfolios"],
+        summary="Returns portfolio performance for a period",
+    )
+    async def get_portfolio_performance_spec(
+        self,
+        portfolio_id: str = Path(None, description="portfolio id", alias="portfolioId"),
+        start_date: str = Query(None, description="First date of the period", alias="startDate"),
+        end_date: str = Query(None, description="Last date of the period", alias="endDate"),
+        token_bearer: TokenModel = FastAPISecurity(
+            get_token_bearer
+        ),
+    ) -> PortfolioPerformance:
+        """Returns time-weighted and money-weighted returns of a portfolio for given period"""
+
+        if portfolio_id is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Missing required parameter portfolioId"
+            )
+
+        if start_date is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Missing required parameter startDate"
+            )
+
+        if end_date is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Missing required parameter endDate"
+            )
+
+        return await self.get_portfolio_performance(
+            portfolio_id=self.to_uuid(portfolio_id),
+            start_date=self.to_date(start_date),
+            end_date=self.to_date(end_date),
+            token_bearer=token_bearer
+        )
+
+    @abstractmethod
+    async def list_portfolio_positions(
+        self,
+        portfolio_id: UUID,
+        position_date: date,
+        token_bearer: TokenModel,
+    ) -> List[PortfolioSecurityPosition]:
+        ...
+
+    @router.get(
+        "/v1/portfolios/{portfolioId}/positions",
+        responses={
+            200: {"model": List[PortfolioSecurityPosition], "description": "List of portfolio positions"},
+            400: {"model": Error, "description": "Invalid request was sent to the server"},
+            403: {"model": Error, "description": "Attempted to make a call with unauthorized client"},
+            404: {"model": Error, "description": "Not found"},
+            500: {"model": Error, "description": "Internal server error"},
+        },
+        tags=["Portfolios"],
+        summary="Lists portfolio positions on a date",
+    )
+    async def list_portfolio_positions_spec(
+        self,
+        portfolio_id: str = Path(None, description="portfolio id", alias="portfolioId"),
+        position_date: str = Query(None, description="Date of the positions", alias="date"),
+        token_bearer: TokenModel = FastAPISecurity(
+            get_token_bearer
+        ),
+    ) -> List[PortfolioSecurityPosition]:
+        """Returns amounts, rates and EUR values of securities held in a portfolio at the end of given date"""
+
+        if portfolio_id is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Missing required parameter portfolioId"
+            )
+
+        if position_date is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Missing required parameter date"
+            )
+
+        return await self.list_portfolio_positions(
+            portfolio_id=self.to_uuid(portfolio_id),
+            position_date=self.to_date(position_date),
+            token_bearer=token_bearer
+        )
+
     @abstractmethod
     async def list_portfolio_transactions(
         self,
@@ -321,6 +505,8 @@ class PortfoliosApiSpec(ABC):
         start_date: Optional[date],
         end_date: Optional[date],
         transaction_type: Optional[TransactionType],
+        after: Optional[UUID],
+        max_results: Optional[int],
         token_bearer: TokenModel,
     ) -> List[PortfolioTransaction]:
         ...
@@ -343,6 +529,8 @@ class PortfoliosApiSpec(ABC):
         start_date: str = Query(None, description="Start date for the date range", alias="startDate"),
         end_date: str = Query(None, description="End date for the date range", alias="endDate"),
         transaction_type: TransactionType = Query(None, description="Transaction type", alias="transactionType"),
+        after: str = Query(None, description="Return transactions after transaction with given id. Used for paging", alias="after"),
+        max_results: int = Query(None, description="Max results. Defaults to 500, at most 1000", alias="maxResults"),
         token_bearer: TokenModel = FastAPISecurity(
             get_token_bearer
         ),
@@ -356,6 +544,57 @@ class PortfoliosApiSpec(ABC):
             )
 
         return await self.list_portfolio_transactions(
+            portfolio_id=self.to_uuid(portfolio_id),
+            start_date=self.to_date(start_date),
+            end_date=self.to_date(end_date),
+            transaction_type=transaction_type,
+            after=self.to_uuid(after),
+            max_results=max_results,
+            token_bearer=token_bearer
+        )
+
+    @abstractmethod
+    async def export_portfolio_transactions(
+        self,
+        portfolio_id: UUID,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        transaction_type: Optional[TransactionType],
+        token_bearer: TokenModel,
+    ) -> Response:
+        ...
+
+    @router.get(
+        "/v1/portfolios/{portfolioId}/transactionsExport",
+        responses={
+            200: {"content": {"application/x-ndjson": {}}, "description": "Portfolio transactions as newline delimited JSON"},
+            400: {"model": Error, "description": "Invalid request was sent to the server"},
+            403: {"model": Error, "description": "Attempted to make a call with unauthorized client"},
+            404: {"model": Error, "description": "Not found"},
+            500: {"model": Error, "description": "Internal server error"},
+        },
+        tags=["Portfolios"],
+        summary="Exports portfolio transactions",
+    )
+    async def export_portfolio_transactions_spec(
+        self,
+        portfolio_id: str = Path(None, description="portfolio id", alias="portfolioId"),
+        start_date: str = Query(None, description="Start date for the date range", alias="startDate"),
+        end_date: str = Query(None, description="End date for the date range", alias="endDate"),
+        transaction_type: TransactionType = Query(None, description="Transaction type", alias="transactionType"),
+        token_bearer: TokenModel = FastAPISecurity(
+            get_token_bearer
+        ),
+    ):
+        """Streams portfolio transactions as newline delimited JSON, one transaction per line"""
+
+        if portfolio_id is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Missing required parameter portfolioId"
+            )
+
+        return await self.export_portfolio_transactions(
             portfolio_id=self.to_uuid(portfolio_id),
             start_date=self.to_date(start_date),
             end_date=self.to_date(end_date),
@@ -426,6 +665,71 @@ class PortfoliosApiSpec(ABC):
             token_bearer=token_bearer
         )
 
+    @abstractmethod
+    async def list_aggregated_history_values(
+        self,
+        start_date: date,
+        end_date: date,
+        company_id: Optional[UUID],
+        group_by: Optional[HistoryGroupBy],
+        since: Optional[date],
+        if_none_match: Optional[str],
+        token_bearer: TokenModel,
+    ) -> List[AggregatedHistoryValue]:
+        ...
+
+    @router.get(
+        "/v2/portfolios/historyValues",
+        responses={
+            200: {"model": List[AggregatedHistoryValue], "description": "List of aggregated history values"},
+            304: {"description": "Client has the current history values"},
+            400: {"model": Error, "description": "Invalid request was sent to the server"},
+            403: {"model": Error, "description": "Attempted to make a call with unauthorized client"},
+            404: {"model": Error, "description": "Company not found"},
+            500: {"model": Error, "description": "Internal server error"},
+            503: {"model": Error, "description": "Server is too busy to calculate history values"},
+        },
+        tags=["Portfolios"],
+        summary="List combined history values of portfolios.",
+    )
+    async def list_aggregated_history_values_spec(
+        self,
+        start_date: str = Query(None, description="Start date for the date range", alias="startDate"),
+        end_date: str = Query(None, description="End date for the date range", alias="endDate"),
+        company_id: str = Query(None, description="company id", alias="companyId"),
+        group_by: HistoryGroupBy = Query(None, description="Group values by COMPANY. Not grouped by default",
+                                         alias="groupBy"),
+        since: str = Query(None, description="Return only values from given date forward. Requires validator of "
+                                             "previously fetched values in If-None-Match header", alias="since"),
+        if_none_match: str = Header(None, description="ETag of previously fetched values", alias="If-None-Match"),
+        token_bearer: TokenModel = FastAPISecurity(
+            get_token_bearer
+        ),
+    ) -> List[AggregatedHistoryValue]:
+        """Lists daily combined values of portfolios logged user has access to"""
+
+        if start_date is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Missing required parameter startDate"
+            )
+
+        if end_date is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Missing required parameter endDate"
+            )
+
+        return await self.list_aggregated_history_values(
+            start_date=self.to_date(start_date),
+            end_date=self.to_date(end_date),
+            company_id=self.to_uuid(company_id),
+            group_by=group_by,
+            since=self.to_date(since),
+            if_none_match=if_none_match,
+            token_bearer=token_bearer
+        )
+
     @staticmethod
     def to_date(isodate: str) -> Optional[date]:
         """Translates given string to date
@@ -28,7 +28,9 @@ from fastapi_utils.session import FastAPISessionMaker
 from sqlalchemy.orm import Session
 from config.settings import Settings
 
+from spec.models.error import Error
 from spec.models.extra_models import TokenModel  # noqa: F401
+from impl.security_api import get_token_bearer
 
 
 router = InferringRouter()
@@ -88,6 +90,34 @@ class SystemApiSpec(ABC):
             
         )
 
+    @abstractmethod
+    async def get_metrics(
+        self,
+        token_bearer: TokenModel,
+    ) -> Dict[str, Dict[str, Dict[str, int]]]:
+        ...
+
+    @router.get(
+        "/v1/system/metrics",
+        responses={
+            200: {"model": Dict[str, Dict[str, Dict[str, int]]], "description": "Metrics"},
+            403: {"model": Error, "description": "Attempted to make a call with unauthorized client"},
+        },
+        tags=["System"],
+        summary="Returns runtime metrics",
+    )
+    async def get_metrics_spec(
+        self,
+        token_bearer: TokenModel = FastAPISecurity(
+            get_token_bearer
+        ),
+    ) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Returns runtime metrics of the process serving the request"""
+
+        return await self.get_metrics(
+            token_bearer=token_bearer
+        )
+
     @staticmethod
     def to_date(isodate: str) -> Optional[date]:
         """Translates given string to date
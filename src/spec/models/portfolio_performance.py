@@ -0,0 +1,74 @@
+# coding: utf-8
+
+from __future__ import annotations
+from datetime import date, datetime  # noqa: F401
+
+import re  # noqa: F401
+from typing import Any, Dict, List, Optional  # noqa: F401
+
+from pydantic import AnyUrl, BaseModel, EmailStr, validator  # noqa: F401
+
+
+class PortfolioPerformance(BaseModel):
+    """NOTE: This class is auto generated by OpenAPI Generator (https://openapi-generator.tech).
+
+    Do not edit the class manually.
+
+    PortfolioPerformance - a model defined in OpenAPI
+
+        startDate: The startDate of this PortfolioPerformance.
+        endDate: The endDate of this PortfolioPerformance.
+        startValue: The startValue of this PortfolioPerformance.
+        endValue: The endValue of this PortfolioPerformance.
+        netCashFlow: The netCashFlow of this PortfolioPerformance.
+        timeWeightedReturn: The timeWeightedReturn of this PortfolioPerformance [Optional].
+        annualizedTimeWeightedReturn: The annualizedTimeWeightedReturn of this PortfolioPerformance [Optional].
+        moneyWeightedReturn: The moneyWeightedReturn of this PortfolioPerformance [Optional].
+    """
+    startDate: date
+    endDate: date
+    startValue: str
+    endValue: str
+    netCashFlow: str
+    timeWeightedReturn: Optional[str] = None
+    annualizedTimeWeightedReturn: Optional[str] = None
+    moneyWeightedReturn: Optional[str] = None
+
+    @classmethod
+    @validator("startValue")
+    def startValue_pattern(cls, value):
+        assert value is not None and re.match(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$", value)
+        return value
+
+    @classmethod
+    @validator("endValue")
+    def endValue_pattern(cls, value):
+        assert value is not None and re.match(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$", value)
+        return value
+
+    @classmethod
+    @validator("netCashFlow")
+    def netCashFlow_pattern(cls, value):
+        assert value is not None and re.match(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$", value)
+        return value
+
+    @classmethod
+    @validator("timeWeightedReturn")
+    def timeWeightedReturn_pattern(cls, value):
+        assert value is not None and re.match(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$", value)
+        return value
+
+    @classmethod
+    @validator("annualizedTimeWeightedReturn")
+    def annualizedTimeWeightedReturn_pattern(cls, value):
+        assert value is not None and re.match(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$", value)
+        return value
+
+    @classmethod
+    @validator("moneyWeightedReturn")
+    def moneyWeightedReturn_pattern(cls, value):
+        assert value is not None and re.match(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$", value)
+        return value
+
+
+PortfolioPerformance.update_forward_refs()
@@ -0,0 +1,40 @@
+# coding: utf-8
+
+from __future__ import annotations
+from datetime import date, datetime  # noqa: F401
+
+import re  # noqa: F401
+from typing import Any, Dict, List, Optional  # noqa: F401
+
+from pydantic import AnyUrl, BaseModel, EmailStr, validator  # noqa: F401
+
+
+class PortfolioPeriodSummary(BaseModel):
+    """NOTE: This class is auto generated by OpenAPI Generator (https://openapi-generator.tech).
+
+    Do not edit the class manually.
+
+    PortfolioPeriodSummary - a model defined in OpenAPI
+
+        startDate: The startDate of this PortfolioPeriodSummary.
+        subscriptions: The subscriptions of this PortfolioPeriodSummary.
+        redemptions: The redemptions of this PortfolioPeriodSummary.
+    """
+    startDate: date
+    subscriptions: str
+    redemptions: str
+
+    @classmethod
+    @validator("subscriptions")
+    def subscriptions_pattern(cls, value):
+        assert value is not None and re.match(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$", value)
+        return value
+
+    @classmethod
+    @validator("redemptions")
+    def redemptions_pattern(cls, value):
+        assert value is not None and re.match(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$", value)
+        return value
+
+
+PortfolioPeriodSummary.update_forward_refs()
@@ -0,0 +1,50 @@
+# coding: utf-8
+
+from __future__ import annotations
+from datetime import date, datetime  # noqa: F401
+
+import re  # noqa: F401
+from typing import Any, Dict, List, Optional  # noqa: F401
+
+from pydantic import AnyUrl, BaseModel, EmailStr, validator  # noqa: F401
+
+
+class PortfolioSecurityPosition(BaseModel):
+    """NOTE: This class is auto generated by OpenAPI Generator (https://openapi-generator.tech).
+
+    Do not edit the class manually.
+
+    PortfolioSecurityPosition - a model defined in OpenAPI
+
+        securityId: The securityId of this PortfolioSecurityPosition.
+        amount: The amount of this PortfolioSecurityPosition.
+        rate: The rate of this PortfolioSecurityPosition.
+        rateDate: The rateDate of this PortfolioSecurityPosition.
+        value: The value of this PortfolioSecurityPosition.
+    """
+    securityId: str
+    amount: str
+    rate: str
+    rateDate: date
+    value: str
+
+    @classmethod
+    @validator("amount")
+    def amount_pattern(cls, value):
+        assert value is not None and re.match(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$", value)
+        return value
+
+    @classmethod
+    @validator("rate")
+    def rate_pattern(cls, value):
+        assert value is not None and re.match(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$", value)
+        return value
+
+    @classmethod
+    @validator("value")
+    def value_pattern(cls, value):
+        assert value is not None and re.match(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$", value)
+        return value
+
+
+PortfolioSecurityPosition.update_forward_refs()
@@ -1,17 +1,24 @@
 import os
 import logging
 import json
-from datetime import date
+from datetime import date, datetime
+from decimal import Decimal
 
-from typing import Dict
+from typing import Dict, Optional
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 from aiokafka import ConsumerRecord
 
-from database.models import Security, SecurityRate
+from config.settings import Settings
+from database import operations
+from database.models import SecurityRate
+from utils.rate_store import RateStoreWriter
+from utils.security_catalog import CatalogSecurity, security_catalog
 
 logger = logging.getLogger(__name__)
 
+SECURITY_RATES_WATERMARK_TASK = "security-rates"
+
 
 class SyncException(Exception):
     pass
@@ -23,6 +30,7 @@ class SyncHandler:
         """Constructor"""
         url = os.environ["BACKEND_DATABASE_URL"]
         self.engine = create_engine(url)
+        self.rate_store_path = Settings().RATE_STORE_PATH
 
     async def handle_message(self, record: ConsumerRecord):
         """Handles message from Kafka
@@ -83,29 +91,43 @@ class SyncHandler:
 
         rate_date = date.fromtimestamp(rdate / 1000.0)
 
-        security: Security = session.query(Security) \
-            .filter(Security.original_id == security_original_id) \
-            .one_or_none()
+        security = security_catalog.find_by_original_id(database=session, original_id=security_original_id)
 
         if security is None:
             raise SyncException("Unable to sync security rate, security for SECID %s not foud", security_original_id)
 
         security_rate = session.query(SecurityRate) \
-            .filter(SecurityRate.security == security) \
+            .filter(SecurityRate.security_id == security.id) \
             .filter(SecurityRate.rate_date == rate_date) \
             .one_or_none()
 
+        previous_close = None
+
         if security_rate is None:
             security_rate = SecurityRate()
-            security_rate.security = security
+            security_rate.security_id = security.id
             security_rate.rate_date = rate_date
             created = True
+        else:
+            previous_close = security_rate.rate_close
 
         security_rate.rate_close = rclose
 
         session.add(security_rate)
+
+        if created:
+            self.advance_security_rates_watermark(session=session, security=security, rate_date=rate_date)
+
+        operations.apply_security_rate_version_change(database=session,
+                                                      security_id=security.id,
+                                                      rate_date=rate_date,
+                                                      previous_close=previous_close,
+                                                      rate_close=rclose)
+
         session.commit()
 
+        self.patch_rate_store(security=security, rate_date=rate_date, rate_close=security_rate.rate_close)
+
         if created:
             logger.info("Created new security value for %s / %s", security_original_id, rate_date)
         else:
@@ -123,9 +145,7 @@ class SyncHandler:
         if security_original_id is None:
             raise SyncException("Invalid fund rate message, SECID is not defined")
 
-        security: Security = session.query(Security) \
-            .filter(Security.original_id == security_original_id) \
-            .one_or_none()
+        security = security_catalog.find_by_original_id(database=session, original_id=security_original_id)
 
         if security is None:
             raise SyncException("Unable to sync security rate, security for SECID %s not foud", security_original_id)
@@ -136,10 +156,92 @@ class SyncHandler:
 
         rate_date = date.fromtimestamp(rdate / 1000.0)
 
-        session.query(SecurityRate) \
-            .filter(SecurityRate.security == security) \
+        deleted_count = session.query(SecurityRate) \
+            .filter(SecurityRate.security_id == security.id) \
             .filter(SecurityRate.rate_date == rate_date) \
             .delete()
 
+        if deleted_count > 0:
+            self.retreat_security_rates_watermark(session=session, security=security, rate_date=rate_date)
+            operations.refresh_security_rate_version(database=session, security_id=security.id)
+
         session.commit()
+
+        if deleted_count > 0:
+            self.patch_rate_store(security=security, rate_date=rate_date, rate_close=None)
+
         logger.info("Deleted security rate for %s / %s", security_original_id, rate_date)
+
+    def patch_rate_store(self, security: CatalogSecurity, rate_date: date, rate_close: Optional[Decimal]):
+        """Patches synchronized rate into the shared rate store. Rates that can not be patched leave the security
+        stale in the store, in which case API reads its rates from the database until the next migration.
+
+        Args:
+            security (CatalogSecurity): security
+            rate_date (date): rate date
+            rate_close (Optional[Decimal]): close rate or None when the rate was deleted
+        """
+        if not self.rate_store_path:
+            return
+
+        try:
+            patched = RateStoreWriter.patch(path=self.rate_store_path,
+                                            security_id=security.id,
+                                            rate_date=rate_date,
+                                            rate_close=rate_close)
+            if not patched:
+                logger.info("Rate store was not patched for %s / %s", security.original_id, rate_date)
+        except Exception as e:
+            logger.error("Failed to patch rate store %s", e)
+
+    @staticmethod
+    def advance_security_rates_watermark(session: Session, security: CatalogSecurity, rate_date: date):
+        """Updates security rates migration watermark to include a rate created from Kafka message.
+
+        Securities without a watermark are left for the migration to resolve.
+
+        Args:
+            session (Session): database session
+            security (CatalogSecurity): security
+            rate_date (date): date of created rate
+        """
+        watermark = operations.find_sync_watermark(database=session,
+                                                   task=SECURITY_RATES_WATERMARK_TASK,
+                                                   security_id=security.id)
+        if watermark is None or watermark.source_updated is None or watermark.row_count is None:
+            return
+
+        rate_updated = datetime.combine(rate_date, datetime.min.time())
+        operations.upsert_sync_watermark(database=session,
+                                         task=SECURITY_RATES_WATERMARK_TASK,
+                                         security_id=security.id,
+                                         source_updated=max(watermark.source_updated, rate_updated),
+                                         row_count=watermark.row_count + 1)
+
+    @staticmethod
+    def retreat_security_rates_watermark(session: Session, security: CatalogSecurity, rate_date: date):
+        """Updates security rates migration watermark to exclude a rate deleted according to Kafka message.
+
+        Deleting the latest rate removes the watermark because the previous rate date is not known.
+
+        Args:
+            session (Session): database session
+            security (CatalogSecurity): security
+            rate_date (date): date of deleted rate
+        """
+        watermark = operations.find_sync_watermark(database=session,
+                                                   task=SECURITY_RATES_WATERMARK_TASK,
+                                                   security_id=security.id)
+        if watermark is None or watermark.source_updated is None or watermark.row_count is None:
+            return
+
+        if rate_date >= watermark.source_updated.date():
+            operations.delete_sync_watermarks(database=session,
+                                              task=SECURITY_RATES_WATERMARK_TASK,
+                                              security_ids=[security.id])
+        else:
+            operations.upsert_sync_watermark(database=session,
+                                             task=SECURITY_RATES_WATERMARK_TASK,
+                                             security_id=security.id,
+                                             source_updated=watermark.source_updated,
+                                             row_count=watermark.row_count - 1)
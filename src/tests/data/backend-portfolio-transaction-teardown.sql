@@ -1 +1,2 @@
+DELETE FROM portfolio_position;
 DELETE FROM portfolio_transaction;
\ No newline at end of file
@@ -28,3 +28,4 @@ INSERT INTO portfolio_transaction (id, transaction_number, portfolio_id, securit
 INSERT INTO portfolio_transaction (id, transaction_number, portfolio_id, security_id, transaction_date, amount, purchase_c_value, updated) VALUES ((UNHEX(REPLACE(UUID(), "-",""))), 28, (SELECT id FROM portfolio WHERE original_id = '125'), (SELECT id FROM security WHERE original_id =  'ACTIVETEST01' ), '1998-01-23', 76.842500, 5000.00, NOW());
 INSERT INTO portfolio_transaction (id, transaction_number, portfolio_id, security_id, transaction_date, amount, purchase_c_value, updated) VALUES ((UNHEX(REPLACE(UUID(), "-",""))), 29, (SELECT id FROM portfolio WHERE original_id = '126'), (SELECT id FROM security WHERE original_id =  'ACTIVETEST01' ), '1998-01-23', 76.842500, 5000.00, NOW());
 INSERT INTO portfolio_transaction (id, transaction_number, portfolio_id, security_id, transaction_date, amount, purchase_c_value, updated) VALUES ((UNHEX(REPLACE(UUID(), "-",""))), 30, (SELECT id FROM portfolio WHERE original_id = '126'), (SELECT id FROM security WHERE original_id =  'ACTIVETEST01' ), '1998-01-23', 76.842500, 5000.00, NOW());
+INSERT INTO portfolio_position (id, portfolio_id, security_id, total_amount, purchase_total) SELECT UNHEX(REPLACE(UUID(), "-", "")), portfolio_id, security_id, SUM(amount), SUM(purchase_c_value) FROM portfolio_transaction GROUP BY portfolio_id, security_id;
@@ -1 +1,2 @@
+DELETE FROM sync_watermark WHERE task = 'security-rate-version';
 DELETE FROM security_rate;
\ No newline at end of file
@@ -77,3 +77,4 @@ INSERT INTO security_rate (id, security_id, rate_date, rate_close) VALUES ((UNHE
 INSERT INTO security_rate (id, security_id, rate_date, rate_close) VALUES ((UNHEX(REPLACE(UUID(), "-",""))), (SELECT id FROM security WHERE original_id = 'SEK'), DATE('2020-01-02'), 9.5645);
 INSERT INTO security_rate (id, security_id, rate_date, rate_close) VALUES ((UNHEX(REPLACE(UUID(), "-",""))), (SELECT id FROM security WHERE original_id = 'SEK'), DATE('2020-01-01'), 0.12);
 
+INSERT INTO sync_watermark (id, task, scope, security_id, source_updated, row_count, value_sum, revision, updated) SELECT UNHEX(REPLACE(UUID(), '-', '')), 'security-rate-version', LOWER(HEX(security_id)), security_id, MAX(rate_date), COUNT(id), SUM(rate_close), 0, NOW() FROM security_rate GROUP BY security_id;
@@ -2,6 +2,12 @@ import pytest
 import os
 
 from starlette.testclient import TestClient
+
+# Tests modify companies, company access and securities directly in the database, so authorization contexts
+# are not cached and security catalog is refreshed on every lookup
+os.environ["AUTHORIZATION_CACHE_TTL"] = "0"
+os.environ["SECURITY_CATALOG_REFRESH_SECONDS"] = "0"
+
 from ...app.main import app
 from testcontainers.mysql import MySqlContainer
 
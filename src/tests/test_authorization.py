@@ -0,0 +1,71 @@
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+from ..auth import authorization
+from ..auth.authorization import AuthorizationCache
+
+
+class TestAuthorization:
+    """
+    Tests for authorization context cache
+    """
+
+    def test_context(self, monkeypatch):
+        """Tests that owned companies are not listed as shared and contexts are cached per SSN"""
+        owned_id, shared_id = uuid4(), uuid4()
+        queries = []
+        monkeypatch.setattr(authorization.operations, "find_sync_watermark", lambda **kwargs: None)
+        monkeypatch.setattr(authorization.operations, "get_company_access_levels",
+                            lambda database, ssn: queries.append(ssn) or [
+                                (owned_id, True), (shared_id, False), (owned_id, False)
+                            ])
+
+        cache = AuthorizationCache(name="test-context", max_size=1, ttl=60)
+        context = cache.get_context(database=None, ssn="010101-0101")
+
+        assert frozenset([owned_id]) == context.owned_company_ids
+        assert frozenset([shared_id]) == context.shared_company_ids
+        assert context.is_owned(company_id=owned_id)
+        assert not context.is_owned(company_id=shared_id)
+        assert context.has_access(company_id=shared_id)
+        assert not context.has_access(company_id=uuid4())
+
+        assert context is cache.get_context(database=None, ssn="010101-0101")
+        cache.get_context(database=None, ssn="020202-0202")
+        cache.get_context(database=None, ssn="010101-0101")
+
+        assert ["010101-0101", "020202-0202", "010101-0101"] == queries
+        assert {"size": 1, "hits": 1, "misses": 3, "invalidations": 0} == cache.get_stats()
+
+    def test_expiry(self, monkeypatch):
+        """Tests that expired contexts are reloaded"""
+        queries = []
+        monkeypatch.setattr(authorization.operations, "find_sync_watermark", lambda **kwargs: None)
+        monkeypatch.setattr(authorization.operations, "get_company_access_levels",
+                            lambda database, ssn: queries.append(ssn) or [])
+
+        cache = AuthorizationCache(name="test-expiry", max_size=10, ttl=0)
+        cache.get_context(database=None, ssn="010101-0101")
+        cache.get_context(database=None, ssn="010101-0101")
+
+        assert 2 == len(queries)
+
+    def test_generation(self, monkeypatch):
+        """Tests that cache is cleared when authorization watermark changes"""
+        watermark = SimpleNamespace(updated=datetime(2022, 3, 1, 12), row_count=1)
+        queries = []
+        monkeypatch.setattr(authorization, "GENERATION_CHECK_SECONDS", 0)
+        monkeypatch.setattr(authorization.operations, "find_sync_watermark", lambda **kwargs: watermark)
+        monkeypatch.setattr(authorization.operations, "get_company_access_levels",
+                            lambda database, ssn: queries.append(ssn) or [])
+
+        cache = AuthorizationCache(name="test-generation", max_size=10, ttl=60)
+        cache.get_context(database=None, ssn="010101-0101")
+        cache.get_context(database=None, ssn="010101-0101")
+
+        watermark.row_count = 2
+        cache.get_context(database=None, ssn="010101-0101")
+
+        assert 2 == len(queries)
+        assert 1 == cache.get_stats()["invalidations"]
@@ -0,0 +1,45 @@
+from ..benchmark.dataset import DatasetGenerator, DatasetScale
+
+
+class TestBenchmarkDataset:
+    """
+    Tests for migration benchmark dataset generator
+    """
+
+    scale = DatasetScale(securities=4, companies=10, portfolios_per_company=2, rate_years=1, log_rows=100,
+                         transaction_rows=50, seed=5)
+
+    def test_row_counts(self):
+        """Tests generated row counts"""
+        generator = DatasetGenerator(scale=self.scale)
+
+        assert 4 == len(list(generator.list_security_rows()))
+        assert 10 == len(list(generator.list_company_rows()))
+        assert 20 == len(list(generator.list_portfolio_rows()))
+        assert 20 == len(list(generator.list_portfolio_class_rows()))
+        assert 50 == len(list(generator.list_transaction_rows()))
+        assert 100 == len(list(generator.list_log_rows()))
+
+        rates = list(generator.list_rate_rows())
+        assert 4 * 262 == len(rates)
+        assert all(rate["RDATE"].weekday() < 5 for rate in rates)
+
+    def test_deterministic(self):
+        """Tests that the same seed generates the same data"""
+        first = list(DatasetGenerator(scale=self.scale).list_log_rows())
+        second = list(DatasetGenerator(scale=self.scale).list_log_rows())
+        assert first == second
+
+    def test_references(self):
+        """Tests that generated rows reference generated portfolios and securities"""
+        generator = DatasetGenerator(scale=self.scale)
+        securities = {row["SECID"] for row in generator.list_security_rows()}
+        portfolios = {row["PORID"] for row in generator.list_portfolio_rows()}
+        funds = {str(x) for x in generator.list_fund_original_ids()}
+
+        for row in generator.list_log_rows():
+            assert row["SECID"] in securities
+            assert row["PORID"] in portfolios
+            assert row["CSECID"] == " " or row["CSECID"] in securities
+
+        assert all(row["SORTNAME"] in funds for row in generator.list_security_rows())
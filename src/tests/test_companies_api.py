@@ -14,6 +14,7 @@ from decimal import Decimal
 from .constants import invalid_auths, invalid_uuids
 
 from .utils.database import sql_backend_company, sql_backend_security, sql_backend_funds, sql_backend_company_access
+from .utils.query_counter import QueryCounter
 
 import logging
 
@@ -193,6 +194,31 @@ class TestCompanies:
             assert user_3_companies[0]["id"] == "feebf58a-d382-4645-9855-d7e3f7534103"
             assert user_3_companies[0]["accessLevel"] == "OWNED"
 
+    def test_company_query_counts(self, client: TestClient, backend_mysql: MySqlContainer,
+                                  user_1_auth: BearerAuth, user_3_auth: BearerAuth):
+        """Tests that company endpoints use a fixed number of queries regardless of the number of companies"""
+        with sql_backend_funds(backend_mysql), sql_backend_company(backend_mysql), \
+                sql_backend_security(backend_mysql), sql_backend_company_access(backend_mysql):
+
+            assert 1 == len(self.list_companies(client=client, auth=user_3_auth))
+
+            with QueryCounter() as user_1_counter:
+                assert 3 == len(self.list_companies(client=client, auth=user_1_auth))
+
+            with QueryCounter() as user_3_counter:
+                assert 1 == len(self.list_companies(client=client, auth=user_3_auth))
+
+            assert 2 == user_1_counter.count, user_1_counter.statements
+            assert 2 == user_3_counter.count, user_3_counter.statements
+
+            with QueryCounter() as user_1_counter:
+                self.get_company(client=client, company_id="f0e88a2d-d773-46bd-b353-117a448abefd", auth=user_1_auth)
+
+            with QueryCounter() as user_3_counter:
+                self.get_company(client=client, company_id="feebf58a-d382-4645-9855-d7e3f7534103", auth=user_3_auth)
+
+            assert user_1_counter.count == user_3_counter.count, (user_1_counter.statements, user_3_counter.statements)
+
     @staticmethod
     def assert_find_company_fail(client: TestClient, expected_status: int, company_id: str,
                                  auth: Optional[BearerAuth]):
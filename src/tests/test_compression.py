@@ -0,0 +1,98 @@
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from ..utils.compression import CompressionMiddleware
+
+
+class TestCompression:
+    """
+    Tests for response compression middleware
+    """
+
+    payload = "[" + ",".join(f'{{"date":"2020-01-{i % 28 + 1:02}","value":"{i * 1.5}"}}' for i in range(500)) + "]"
+
+    @staticmethod
+    def create_client() -> TestClient:
+        """
+        Creates test client for an application with compression middleware
+
+        Returns: test client
+        """
+        app = FastAPI()
+        app.add_middleware(CompressionMiddleware, minimum_size=1024, gzip_level=6, brotli_quality=4)
+
+        @app.get("/large")
+        def large():
+            return PlainTextResponse(TestCompression.payload)
+
+        @app.get("/small")
+        def small():
+            return PlainTextResponse("pong", headers={"ETag": '"small"'})
+
+        @app.get("/etag")
+        def etag():
+            return PlainTextResponse(TestCompression.payload, headers={"ETag": '"large"'})
+
+        @app.get("/stream")
+        def stream():
+            return StreamingResponse(iter([TestCompression.payload, TestCompression.payload]))
+
+        return TestClient(app)
+
+    def test_brotli(self):
+        """Tests that brotli is preferred when accepted"""
+        response = self.create_client().get("/large", headers={"Accept-Encoding": "gzip, deflate, br"})
+        assert "br" == response.headers["content-encoding"]
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) < len(self.payload)
+        assert self.payload == response.text
+
+    def test_gzip(self):
+        """Tests gzip compression"""
+        response = self.create_client().get("/large", headers={"Accept-Encoding": "gzip, br;q=0"})
+        assert "gzip" == response.headers["content-encoding"]
+        assert int(response.headers["content-length"]) < len(self.payload)
+        assert self.payload == response.text
+
+    def test_streaming_brotli(self):
+        """Tests brotli compression of streaming responses"""
+        response = self.create_client().get("/stream", headers={"Accept-Encoding": "br"})
+        assert "br" == response.headers["content-encoding"]
+        assert self.payload + self.payload == response.text
+
+    def test_small_response(self):
+        """Tests that small responses are not compressed and keep their strong ETag"""
+        response = self.create_client().get("/small", headers={"Accept-Encoding": "gzip, br"})
+        assert "content-encoding" not in response.headers
+        assert '"small"' == response.headers["etag"]
+        assert "pong" == response.text
+
+    def test_quality_values(self):
+        """Tests that the encoding with the highest quality value is selected and brotli is preferred on ties"""
+        client = self.create_client()
+
+        for accept_encoding, expected in [("gzip;q=1.0, br;q=0.5", "gzip"), ("gzip;q=0.5, br;q=0.5", "br"),
+                                          ("*", "br"), ("br;q=0, *;q=0.1", "gzip"), ("gzip;q=0", None),
+                                          ("gzip;q=0.5, identity", None)]:
+            response = client.get("/large", headers={"Accept-Encoding": accept_encoding})
+            assert expected == response.headers.get("content-encoding"), accept_encoding
+            assert self.payload == response.text
+
+    def test_weak_etag(self):
+        """Tests that ETags of compressed responses are weak"""
+        client = self.create_client()
+
+        for accept_encoding in ["br", "gzip"]:
+            response = client.get("/etag", headers={"Accept-Encoding": accept_encoding})
+            assert accept_encoding == response.headers["content-encoding"]
+            assert 'W/"large"' == response.headers["etag"]
+
+        response = client.get("/etag", headers={"Accept-Encoding": "identity"})
+        assert '"large"' == response.headers["etag"]
+
+    def test_identity(self):
+        """Tests that responses are not compressed when client does not accept compression"""
+        response = self.create_client().get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert self.payload == response.text
@@ -0,0 +1,80 @@
+from typing import Dict, Any
+
+from .fixtures.backend_mysql import *  # noqa
+from sqlalchemy import create_engine, text
+
+from .utils.database import sql_backend_company, sql_backend_company_access, sql_backend_funds, \
+    sql_backend_security, sql_backend_portfolio, sql_backend_portfolio_log
+
+
+class TestDatabaseIndexes:
+    """
+    Tests that the planner uses indexes for the most frequent queries
+    """
+
+    def test_portfolio_log_listing(self, backend_mysql: MySqlContainer):
+        """Tests portfolio log listing uses the portfolio, status and transaction date index without filesort"""
+        engine = create_engine(backend_mysql.get_connection_url())
+
+        with sql_backend_funds(backend_mysql), sql_backend_company(backend_mysql), \
+                sql_backend_security(backend_mysql), sql_backend_portfolio(backend_mysql), \
+                sql_backend_portfolio_log(backend_mysql):
+
+            with engine.connect() as connection:
+                portfolio_id = connection.execute(text("SELECT id FROM portfolio WHERE original_id = '123'")).scalar()
+
+                plan = self.explain(connection, "SELECT * FROM portfolio_log "
+                                                "WHERE status = '0' AND portfolio_id = :portfolio_id "
+                                                "AND transaction_code IN ('11', '12', '31', '41') "
+                                                "AND transaction_date >= '1997-01-01' "
+                                                "AND transaction_date <= '2022-01-01' "
+                                                "ORDER BY transaction_date, transaction_number",
+                                    {"portfolio_id": portfolio_id})
+
+                assert "ix_portfolio_log_portfolio_id_status_transaction_date" == plan["key"]
+                assert "filesort" not in (plan["Extra"] or "")
+
+    def test_company_ssn(self, backend_mysql: MySqlContainer):
+        """Tests company listing by ssn uses the ssn index without filesort"""
+        engine = create_engine(backend_mysql.get_connection_url())
+
+        with sql_backend_company(backend_mysql):
+            with engine.connect() as connection:
+                plan = self.explain(connection, "SELECT * FROM company WHERE ssn = :ssn ORDER BY name",
+                                    {"ssn": "010170-999R"})
+
+                assert "ix_company_ssn_name" == plan["key"]
+                assert "filesort" not in (plan["Extra"] or "")
+
+    def test_company_access_ssn(self, backend_mysql: MySqlContainer):
+        """Tests company access lookups by ssn use the ssn index"""
+        engine = create_engine(backend_mysql.get_connection_url())
+
+        with sql_backend_company(backend_mysql), sql_backend_company_access(backend_mysql):
+            with engine.connect() as connection:
+                company_id = connection.execute(text("SELECT id FROM company WHERE original_id = '333'")).scalar()
+
+                plan = self.explain(connection, "SELECT * FROM company_access WHERE ssn = :ssn",
+                                    {"ssn": "010200A9618"})
+                assert "ix_company_access_ssn_company_id" == plan["key"]
+
+                plan = self.explain(connection, "SELECT * FROM company_access "
+                                                "WHERE ssn = :ssn AND company_id = :company_id",
+                                    {"ssn": "010200A9618", "company_id": company_id})
+                assert "ix_company_access_ssn_company_id" == plan["key"]
+
+    @staticmethod
+    def explain(connection, statement: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns query plan of a single table query
+
+        Args:
+            connection: database connection
+            statement: SQL statement
+            params: statement parameters
+
+        Returns:
+            query plan row as dict
+        """
+        connection.execute(text("ANALYZE TABLE portfolio_log, company, company_access"))
+        return dict(connection.execute(text(f"EXPLAIN {statement}"), params).mappings().one())
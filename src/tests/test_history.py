@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict
+from uuid import uuid4, UUID
+
+import numpy
+
+from ..holdings.holdings import Holdings
+from ..holdings.history import HistoryInput, calculate_history_values
+from ..utils.process_pool import BoundedProcessPool, PoolSaturatedException
+from ..utils.unit_value_cache import UnitValueCache, UnitValueSeries
+
+
+def slow_double(value: int) -> int:
+    time.sleep(0.3)
+    return value * 2
+
+
+class TestHistory:
+    """
+    Tests for portfolio history calculation in worker processes
+    """
+
+    @staticmethod
+    def create_rates(start_date: date, end_date: date, first: Decimal, step: Decimal) -> Dict[date, Decimal]:
+        """
+        Creates daily rate map
+        Args:
+            start_date: first date
+            end_date: last date
+            first: first rate
+            step: daily rate change
+
+        Returns: daily rate map
+        """
+        return {start_date + timedelta(days=i): first + step * i for i in range((end_date - start_date).days + 1)}
+
+    def test_calculate_history_values(self):
+        """Tests that dot product of holdings and unit values matches calculation from holdings digit by digit"""
+        security_1_id = uuid4()
+        security_2_id = uuid4()
+        start_date = date(1998, 12, 20)
+        end_date = date(1999, 2, 10)
+
+        holdings = Holdings()
+        holdings.add_holding(security_id=security_1_id, holding_date=date(1998, 12, 20), amount=Decimal("10.5"))
+        holdings.add_holding(security_id=security_1_id, holding_date=date(1999, 1, 5), amount=Decimal("-2.25"))
+        holdings.add_holding(security_id=security_2_id, holding_date=date(1999, 1, 3), amount=Decimal("3.333333"))
+        holdings.add_holding(security_id=security_2_id, holding_date=date(1999, 1, 3), amount=Decimal("1"))
+
+        eur_rates = {x: Decimal("5.94573") if x <= date(1998, 12, 31) else Decimal(1)
+                     for x in self.create_rates(start_date, end_date, Decimal(0), Decimal(0))}
+        sek_rates = self.create_rates(date(1999, 1, 3), end_date, Decimal("9.1"), Decimal("0.013"))
+
+        security_rates: Dict[UUID, Dict[date, Decimal]] = {
+            security_1_id: self.create_rates(start_date, end_date, Decimal("12.1234567"), Decimal("0.0731")),
+            security_2_id: self.create_rates(date(1999, 1, 3), end_date, Decimal("3.2"), Decimal("-0.011"))
+        }
+        currency_rates = {security_1_id: eur_rates, security_2_id: sek_rates}
+
+        days = list(self.create_rates(start_date, end_date, Decimal(0), Decimal(0)))
+        rates = {security_id: [security_rates[security_id].get(x) for x in days] for security_id in security_rates}
+        divisors = {security_id: [None if currency_rates[security_id].get(x) == 1
+                                  else currency_rates[security_id].get(x) for x in days]
+                    for security_id in security_rates}
+
+        history_input = HistoryInput.create(holdings=holdings,
+                                            start_date=start_date,
+                                            end_date=end_date,
+                                            rates=rates,
+                                            divisors=divisors)
+
+        holdings.calculate_amounts(start_date=start_date, end_date=end_date)
+        expected = [(start_date + timedelta(days=i),
+                     holdings.get_day_sum(holding_date=start_date + timedelta(days=i),
+                                          currency_rates=currency_rates,
+                                          security_rates=security_rates))
+                    for i in range((end_date - start_date).days + 1)]
+
+        """Rates are sent as fixed-point integers and each distinct divisor once"""
+        assert numpy.int64 == history_input.rates.dtype
+        assert 7 == history_input.scale
+        assert 1 + len(sek_rates) == len(history_input.divisor_values)
+
+        result = calculate_history_values(history_input)
+        assert [x[0] for x in expected] == [x[0] for x in result]
+        assert [x[1] for x in expected] == [x[1] for x in result]
+
+        pool = BoundedProcessPool(name="test-history", max_workers=1, max_pending=1)
+        try:
+            assert result == asyncio.run(pool.run(calculate_history_values, history_input))
+        finally:
+            pool.shutdown()
+
+    def test_unit_value_series(self):
+        """Tests building forward filled FIM and currency converted unit values"""
+        cache = UnitValueCache(name="test-unit-values", max_size=2)
+        fim_convert_rate = cache.settings.FIM_CONVERT_RATE
+
+        rates = UnitValueSeries(first_date=date(1998, 12, 30).toordinal(),
+                                values=[Decimal(6), Decimal(6), Decimal(2), Decimal(3)],
+                                version=1)
+        sek_rates = UnitValueSeries(first_date=date(1999, 1, 1).toordinal(),
+                                    values=[Decimal(10), Decimal(20)],
+                                    version=1)
+
+        fim_converted = cache.create_fim_converted_series(rates=rates, version=1)
+        assert rates.values == fim_converted.values
+        assert [fim_convert_rate, fim_convert_rate, None, None] == fim_converted.divisors
+        assert date(1998, 12, 30) == fim_converted.get_first_date()
+        assert fim_converted.get(date(1998, 12, 29)) is None
+        assert Decimal(6) / fim_convert_rate == fim_converted.get(date(1998, 12, 31))
+        assert Decimal(3) == fim_converted.get(date(2022, 1, 1))
+        assert ([None] + rates.values + [Decimal(3)], [None, fim_convert_rate, fim_convert_rate, None, None, None]) == \
+            fim_converted.get_range(start_date=date(1998, 12, 29), end_date=date(1999, 1, 3))
+
+        sek_converted = cache.create_currency_converted_series(rates=rates, currency_rates=sek_rates, version=1)
+        assert [None, None, Decimal(2), Decimal(3)] == sek_converted.values
+        assert [None, None, Decimal(10), Decimal(20)] == sek_converted.divisors
+        assert date(1999, 1, 1) == sek_converted.get_first_date()
+        assert Decimal("0.15") == sek_converted.get(date(1999, 1, 5))
+
+    def test_admission_control(self):
+        """Tests that calls exceeding max pending calls are rejected"""
+        pool = BoundedProcessPool(name="test-admission", max_workers=1, max_pending=2)
+
+        async def run():
+            return await asyncio.gather(
+                pool.run(slow_double, 1),
+                pool.run(slow_double, 2),
+                pool.run(slow_double, 3),
+                return_exceptions=True
+            )
+
+        try:
+            results = asyncio.run(run())
+        finally:
+            pool.shutdown()
+
+        assert [2, 4] == results[:2]
+        assert isinstance(results[2], PoolSaturatedException)
+        assert {"workers": 1, "queueDepth": 0, "completed": 2, "rejected": 1, "failures": 0} == pool.get_stats()
+
+    def test_start_method(self):
+        """Tests that worker processes are not forked from the multithreaded serving process"""
+        assert BoundedProcessPool.get_mp_context().get_start_method() in ["forkserver", "spawn"]
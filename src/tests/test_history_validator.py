@@ -0,0 +1,112 @@
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import uuid4
+
+from ..utils.history_validator import HistoryValidator
+
+
+class TestHistoryValidator:
+    """
+    Tests for history value validators
+    """
+
+    def test_etag(self):
+        """Tests that validator is read back from If-None-Match header"""
+        validator = HistoryValidator.create(
+            key=("portfolio", uuid4(), date(2020, 1, 1)),
+            end_date=date(2022, 3, 4),
+            logs=[(date(2020, 6, 1), datetime(2022, 3, 1, 12, 30, 15, 123456))],
+            rate_versions={uuid4(): (10, date(2022, 3, 3), Decimal("12.500000"))},
+            rate_date=date(2022, 3, 3),
+            rate_date_versions={}
+        )
+
+        parsed = HistoryValidator.from_etag(f'W/"other", {validator.to_etag()}')
+
+        assert validator.to_etag() == parsed.to_etag()
+        assert datetime(2022, 3, 1, 12, 30, 15, 123456) == parsed.log_updated
+        assert date(2022, 3, 4) == parsed.end_date
+        assert validator.to_etag() == HistoryValidator.from_etag(f"W/{validator.to_etag()}").to_etag()
+        assert HistoryValidator.from_etag(None) is None
+        assert HistoryValidator.from_etag('"abc"') is None
+        assert HistoryValidator.from_etag("*") is None
+
+    def test_get_rate_date(self):
+        """Tests that rate date is the last rate date of the active security with the oldest rates"""
+        assert HistoryValidator.get_rate_date({}) is None
+        assert date(2022, 3, 2) == HistoryValidator.get_rate_date({
+            uuid4(): (1, date(2022, 3, 4), Decimal(1)),
+            uuid4(): (1, date(2022, 3, 2), Decimal(1)),
+            uuid4(): (1, date(2019, 5, 1), Decimal(1))
+        })
+
+    def test_get_valid_until(self):
+        """Tests resolving the first day whose value may have changed"""
+        key = ("portfolio", uuid4(), date(2020, 1, 1))
+        security_id = uuid4()
+        logs = [(date(2020, 6, 1), datetime(2022, 1, 1)), (date(2021, 6, 1), datetime(2022, 2, 1))]
+        settled = {security_id: (100, date(2022, 3, 2), Decimal("150.5"))}
+
+        validator = HistoryValidator.create(
+            key=key,
+            end_date=date(2022, 3, 4),
+            logs=logs,
+            rate_versions={security_id: (101, date(2022, 3, 3), Decimal("152"))},
+            rate_date=date(2022, 3, 2),
+            rate_date_versions=settled
+        )
+
+        """Unchanged logs and settled rates leave values after rate date to be refreshed"""
+        assert date(2022, 3, 3) == validator.get_valid_until(key=key, logs=logs, rate_date_versions=settled)
+
+        """Logs updated later move the day to their transaction date"""
+        assert date(2021, 12, 24) == validator.get_valid_until(
+            key=key,
+            logs=logs + [(date(2021, 12, 24), datetime(2022, 3, 4)), (date(2022, 3, 10), datetime(2022, 3, 10))],
+            rate_date_versions=settled
+        )
+
+        """Updated or removed logs, changed settled rates and other requests invalidate all values"""
+        assert validator.get_valid_until(key=key, logs=logs[:1], rate_date_versions=settled) is None
+        assert validator.get_valid_until(
+            key=key,
+            logs=[logs[0], (date(2021, 6, 1), datetime(2022, 3, 4))],
+            rate_date_versions=settled
+        ) is None
+        assert validator.get_valid_until(
+            key=key,
+            logs=logs,
+            rate_date_versions={security_id: (100, date(2022, 3, 2), Decimal("150.6"))}
+        ) is None
+        assert validator.get_valid_until(key=("portfolio", uuid4(), date(2020, 1, 1)), logs=logs,
+                                         rate_date_versions=settled) is None
+
+    def test_get_settled_versions(self):
+        """Tests that rates added after the rate date leave settled versions unchanged"""
+        active_id = uuid4()
+        inactive_id = uuid4()
+        rate_date = date(2022, 3, 2)
+        versions = {
+            active_id: (100, date(2022, 3, 2), Decimal("150.5"), 3),
+            inactive_id: (20, date(2021, 1, 4), Decimal("20"), 0)
+        }
+        settled = HistoryValidator.get_settled_versions(rate_versions=versions, rate_date=rate_date)
+
+        assert {active_id: (3, date(2022, 3, 2)), inactive_id: (0, date(2021, 1, 4))} == settled
+        assert {} == HistoryValidator.get_settled_versions(rate_versions=versions, rate_date=None)
+
+        """Appended rates after the rate date"""
+        assert settled == HistoryValidator.get_settled_versions(rate_versions={
+            active_id: (101, date(2022, 3, 3), Decimal("152"), 3),
+            inactive_id: (20, date(2021, 1, 4), Decimal("20"), 0)
+        }, rate_date=rate_date)
+
+        """Revised rates and rates appended up to the rate date"""
+        assert settled != HistoryValidator.get_settled_versions(rate_versions={
+            active_id: (100, date(2022, 3, 2), Decimal("150.6"), 4),
+            inactive_id: (20, date(2021, 1, 4), Decimal("20"), 0)
+        }, rate_date=rate_date)
+        assert settled != HistoryValidator.get_settled_versions(rate_versions={
+            active_id: (100, date(2022, 3, 2), Decimal("150.5"), 3),
+            inactive_id: (21, date(2022, 2, 1), Decimal("21"), 0)
+        }, rate_date=rate_date)
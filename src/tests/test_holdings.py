@@ -117,3 +117,25 @@ class TestHoldings:
                                                          security_1_id: {date(2022, 1, 1): Decimal(2)},
                                                          security_2_id: {date(2022, 1, 1): Decimal(2)}
                                                      })
+
+    def test_get_amount_on(self):
+        """Tests for holdings get_amount_on method"""
+        security_1_id = uuid4()
+        security_2_id = uuid4()
+
+        holdings = Holdings()
+        assert Decimal(0) == holdings.get_amount_on(security_id=security_1_id, holding_date=date(2022, 1, 1))
+
+        holdings.add_holding(security_id=security_1_id, holding_date=date(2022, 1, 10), amount=Decimal(100))
+        holdings.add_holding(security_id=security_1_id, holding_date=date(2022, 1, 1), amount=Decimal(50))
+        holdings.add_holding(security_id=security_2_id, holding_date=date(2022, 1, 5), amount=Decimal(10))
+
+        assert Decimal(0) == holdings.get_amount_on(security_id=security_1_id, holding_date=date(2021, 12, 31))
+        assert Decimal(50) == holdings.get_amount_on(security_id=security_1_id, holding_date=date(2022, 1, 1))
+        assert Decimal(50) == holdings.get_amount_on(security_id=security_1_id, holding_date=date(2022, 1, 9))
+        assert Decimal(150) == holdings.get_amount_on(security_id=security_1_id, holding_date=date(2022, 1, 10))
+        assert Decimal(10) == holdings.get_amount_on(security_id=security_2_id, holding_date=date(2022, 12, 31))
+
+        holdings.add_holding(security_id=security_1_id, holding_date=date(2022, 1, 5), amount=Decimal(-25))
+        assert Decimal(25) == holdings.get_amount_on(security_id=security_1_id, holding_date=date(2022, 1, 5))
+        assert Decimal(125) == holdings.get_amount_on(security_id=security_1_id, holding_date=date(2022, 1, 10))
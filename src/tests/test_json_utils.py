@@ -0,0 +1,48 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from ..spec.models.portfolio_history_value import PortfolioHistoryValue
+from ..spec.models.portfolio_transaction import PortfolioTransaction
+from ..utils.json_utils import FastJSONResponse, JsonUtils
+
+
+class TestJsonUtils:
+    """
+    Tests for fast JSON responses
+    """
+
+    def test_history_values(self):
+        """Tests that history values are serialized as with pydantic models"""
+        rows = [(date(1998, 12, 31), Decimal("1234.5") / Decimal("5.94573")),
+                (date(1999, 1, 1), Decimal("0E-8")),
+                (date(1999, 1, 2), Decimal("12.300000"))]
+
+        expected = JSONResponse(content=jsonable_encoder(
+            [PortfolioHistoryValue(date=row[0], value=row[1]) for row in rows]
+        )).body
+
+        assert expected == FastJSONResponse.from_rows(fields=("date", "value"), rows=rows).body
+
+    def test_transactions(self):
+        """Tests that transactions are serialized as with pydantic models"""
+        transaction = {
+            "id": "1de01320-1b5b-4e72-b4e0-785a98d40739",
+            "securityId": "3a4e5a3b-d0d3-4f0e-9b8c-9a4f4bb2d1c1",
+            "targetSecurityId": None,
+            "transactionType": "SUBSCRIPTION",
+            "valueDate": date(2020, 6, 3),
+            "value": Decimal("29.94"),
+            "shareAmount": Decimal("48.501945"),
+            "marketValue": Decimal("41.719267"),
+            "totalValue": Decimal("30.00"),
+            "paymentDate": None,
+            "provision": Decimal("0.06")
+        }
+
+        expected = jsonable_encoder([PortfolioTransaction(**transaction)])
+
+        assert expected == json.loads(JsonUtils.dumps([transaction]))
@@ -0,0 +1,221 @@
+import os
+
+import pytest
+from fastapi_mail import MessageSchema
+
+from ..mail.dispatcher import CLAIM_SUFFIX, MailDispatcher
+
+
+class FakeConnection:
+    """
+    SMTP connection that records sent messages
+    """
+
+    def __init__(self, fail: bool):
+        """
+        Constructor
+        Args:
+            fail: whether sending fails
+        """
+        self.fail = fail
+        self.is_connected = True
+        self.messages = []
+
+    async def send_message(self, message):
+        if self.fail:
+            raise ConnectionError("Connection refused")
+
+        self.messages.append(message)
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+
+class TestMailDispatcher:
+    """
+    Tests for background mail dispatcher
+    """
+
+    @staticmethod
+    def create_dispatcher(name: str, spool_path: str, connections: list, fail: bool,
+                          queue_size: int = 10) -> MailDispatcher:
+        """
+        Creates dispatcher that opens fake connections
+
+        Args:
+            name: dispatcher name
+            spool_path: spool directory
+            connections: list where opened connections are added
+            fail: whether sending fails
+            queue_size: max number of queued messages
+
+        Returns: dispatcher
+        """
+        dispatcher = MailDispatcher(name=name, queue_size=queue_size, max_attempts=3, retry_delay=0, idle_timeout=5,
+                                    spool_path=spool_path, claim_timeout=60)
+
+        async def connect():
+            connections.append(FakeConnection(fail=fail))
+            return connections[-1]
+
+        dispatcher.connect = connect
+        return dispatcher
+
+    @staticmethod
+    def create_message(subject: str) -> MessageSchema:
+        return MessageSchema(subject=subject, recipients=["test@example.com"], body="body")
+
+    def test_reuse_connection(self, tmp_path, monkeypatch):
+        """Tests that queued messages are sent using one connection"""
+        monkeypatch.setenv("MAIL_FROM", "sender@example.com")
+        connections = []
+        dispatcher = self.create_dispatcher(name="test-reuse", spool_path=str(tmp_path), connections=connections,
+                                            fail=False)
+
+        for index in range(3):
+            dispatcher.enqueue(self.create_message(subject=f"Message {index}"))
+
+        dispatcher.close(timeout=5)
+
+        assert 1 == len(connections)
+        assert ["Message 0", "Message 1", "Message 2"] == [x["Subject"] for x in connections[0].messages]
+        assert {"queued": 0, "sent": 3, "retries": 0, "spooled": 0, "dropped": 0} == dispatcher.get_stats()
+
+    def test_spool(self, tmp_path, monkeypatch):
+        """Tests that undelivered messages are spooled after retries and sent later"""
+        monkeypatch.setenv("MAIL_FROM", "sender@example.com")
+        connections = []
+        dispatcher = self.create_dispatcher(name="test-spool", spool_path=str(tmp_path), connections=connections,
+                                            fail=True)
+
+        dispatcher.enqueue(self.create_message(subject="Spooled"))
+        dispatcher.close(timeout=5)
+
+        assert 3 == len(connections)
+        assert {"queued": 0, "sent": 0, "retries": 2, "spooled": 1, "dropped": 0} == dispatcher.get_stats()
+        assert 1 == len(os.listdir(tmp_path))
+
+        connections = []
+        dispatcher = self.create_dispatcher(name="test-spool-resend", spool_path=str(tmp_path),
+                                            connections=connections, fail=False)
+
+        dispatcher.queue_spooled()
+        dispatcher.start()
+        dispatcher.close(timeout=5)
+
+        assert ["Spooled"] == [x["Subject"] for x in connections[0].messages]
+        assert [] == os.listdir(tmp_path)
+
+    def test_shared_spool(self, tmp_path, monkeypatch):
+        """Tests that dispatchers sharing a spool directory send each spooled message once"""
+        monkeypatch.setenv("MAIL_FROM", "sender@example.com")
+        spooling = self.create_dispatcher(name="test-shared-spooling", spool_path=str(tmp_path), connections=[],
+                                          fail=True)
+
+        for index in range(6):
+            spooling.spool(self.create_message(subject=f"Message {index}"))
+
+        first_connections = []
+        second_connections = []
+        first = self.create_dispatcher(name="test-shared-first", spool_path=str(tmp_path),
+                                       connections=first_connections, fail=False, queue_size=3)
+        second = self.create_dispatcher(name="test-shared-second", spool_path=str(tmp_path),
+                                        connections=second_connections, fail=False)
+
+        first.queue_spooled()
+        second.queue_spooled()
+        first.queue_spooled()
+
+        assert 3 == first.get_stats()["queued"]
+        assert 3 == second.get_stats()["queued"]
+
+        for dispatcher in [first, second]:
+            dispatcher.start()
+            dispatcher.close(timeout=5)
+
+        first_subjects = [x["Subject"] for x in first_connections[0].messages]
+        second_subjects = [x["Subject"] for x in second_connections[0].messages]
+
+        assert ["Message 0", "Message 1", "Message 2"] == first_subjects
+        assert ["Message 3", "Message 4", "Message 5"] == second_subjects
+        assert [] == os.listdir(tmp_path)
+
+    def test_abandoned_claim(self, tmp_path, monkeypatch):
+        """Tests that claims of live dispatchers are kept and abandoned claims are released"""
+        monkeypatch.setenv("MAIL_FROM", "sender@example.com")
+        spooling = self.create_dispatcher(name="test-claim-spooling", spool_path=str(tmp_path), connections=[],
+                                          fail=True)
+
+        for index in range(2):
+            spooling.spool(self.create_message(subject=f"Message {index}"))
+
+        claiming = self.create_dispatcher(name="test-claim-claiming", spool_path=str(tmp_path), connections=[],
+                                          fail=False)
+        first_file, second_file = sorted(os.listdir(tmp_path))
+        claimed_file = claiming.claim_spooled(file_name=first_file)
+
+        """Claim of a dispatcher that no longer exists in this process"""
+        os.rename(os.path.join(tmp_path, second_file),
+                  os.path.join(tmp_path, f"{second_file}.{os.getpid()}.removed{CLAIM_SUFFIX}"))
+
+        connections = []
+        dispatcher = self.create_dispatcher(name="test-claim-recovering", spool_path=str(tmp_path),
+                                            connections=connections, fail=False)
+        dispatcher.queue_spooled()
+        assert 1 == dispatcher.get_stats()["queued"]
+        assert claimed_file in os.listdir(tmp_path)
+
+        """Claim older than the claim timeout"""
+        os.utime(os.path.join(tmp_path, claimed_file), (0, 0))
+        dispatcher.queue_spooled()
+        assert 2 == dispatcher.get_stats()["queued"]
+
+        dispatcher.start()
+        dispatcher.close(timeout=5)
+
+        assert ["Message 1", "Message 0"] == [x["Subject"] for x in connections[0].messages]
+        assert [] == os.listdir(tmp_path)
+
+    def test_claim_refreshed_before_attempt(self, tmp_path, monkeypatch):
+        """Tests that claims are refreshed before delivery attempts and released claims are not sent"""
+        monkeypatch.setenv("MAIL_FROM", "sender@example.com")
+        connections = []
+        dispatcher = self.create_dispatcher(name="test-claim-refresh", spool_path=str(tmp_path),
+                                            connections=connections, fail=False)
+
+        for index in range(2):
+            dispatcher.spool(self.create_message(subject=f"Message {index}"))
+
+        dispatcher.queue_spooled()
+        first_file, second_file = sorted(os.listdir(tmp_path))
+        os.utime(os.path.join(tmp_path, first_file), (0, 0))
+
+        """Second claim is taken over by another dispatcher while the message waits in the queue"""
+        os.rename(os.path.join(tmp_path, second_file), os.path.join(tmp_path, f"{second_file}.taken"))
+
+        sent_claim_times = []
+        send = dispatcher.send
+
+        async def send_and_record(message):
+            sent_claim_times.append(os.path.getmtime(os.path.join(tmp_path, first_file)))
+            await send(message=message)
+
+        dispatcher.send = send_and_record
+        dispatcher.start()
+        dispatcher.close(timeout=5)
+
+        assert 1 == len(sent_claim_times) and sent_claim_times[0] > 0
+        assert ["Message 0"] == [x["Subject"] for x in connections[0].messages]
+        assert [f"{second_file}.taken"] == os.listdir(tmp_path)
+
+    def test_claim_timeout_validation(self):
+        """Tests that claim timeout must exceed the total retry delay"""
+        with pytest.raises(ValueError):
+            MailDispatcher(name="test-claim-timeout", queue_size=1, max_attempts=3, retry_delay=10, idle_timeout=5,
+                           spool_path=None, claim_timeout=30)
+
+        MailDispatcher(name="test-claim-timeout", queue_size=1, max_attempts=3, retry_delay=10, idle_timeout=5,
+                       spool_path=None, claim_timeout=31)
@@ -0,0 +1,47 @@
+import os
+
+from datetime import date, datetime, timedelta, timezone
+
+from ..utils.meeting_calendar import HolidayCalendar, MeetingCalendar
+
+
+class TestMeetingCalendar:
+    """
+    Tests for meeting slot calendar
+    """
+
+    def test_list_slots(self, tmp_path, monkeypatch):
+        """Tests that slots are listed for working days with the UTC offset of each day"""
+        holidays_csv = tmp_path / "holidays.csv"
+        holidays_csv.write_text("2022-03-25,2022-12-24\n")
+        monkeypatch.setenv("HOLIDAYS_CSV", str(holidays_csv))
+
+        calendar = MeetingCalendar(holiday_calendar=HolidayCalendar(), meeting_hours=range(9, 17))
+        slots = calendar.list_slots(start_date=date(2022, 3, 24), end_date=date(2022, 3, 28))
+
+        """Friday is a holiday and the weekend is skipped, daylight saving time starts on Sunday"""
+        assert [date(2022, 3, 24), date(2022, 3, 28)] == sorted(set(x[0].date() for x in slots))
+        assert 18 == len(slots)
+        assert timedelta(hours=2) == slots[0][0].utcoffset()
+        assert timedelta(hours=3) == slots[-1][0].utcoffset()
+        assert datetime(2022, 3, 24, 7, tzinfo=timezone.utc) == slots[0][0]
+        assert (datetime(2022, 3, 28, 16, 30), datetime(2022, 3, 28, 17, 30)) == \
+               (slots[-1][0].replace(tzinfo=None), slots[-1][1].replace(tzinfo=None))
+
+    def test_reload_holidays(self, tmp_path, monkeypatch):
+        """Tests that holidays are reloaded only when the file changes"""
+        holidays_csv = tmp_path / "holidays.csv"
+        holidays_csv.write_text("2022-12-24,2022-12-25\n")
+        monkeypatch.setenv("HOLIDAYS_CSV", str(holidays_csv))
+
+        calendar = HolidayCalendar()
+        holidays = calendar.get_holidays()
+
+        assert frozenset([date(2022, 12, 24), date(2022, 12, 25)]) == holidays
+        assert holidays is calendar.get_holidays()
+
+        holidays_csv.write_text("2022-12-26\n")
+        stat = os.stat(holidays_csv)
+        os.utime(holidays_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert frozenset([date(2022, 12, 26)]) == calendar.get_holidays()
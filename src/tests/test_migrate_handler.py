@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+
+
+class FakeTask:
+    """
+    Default migration task that records its calls
+    """
+
+    def __init__(self, task_type, verify_results: List[bool], up_to_date: bool = False):
+        """
+        Constructor
+        Args:
+            task_type: default task type of the migrate module
+            verify_results: results returned by successive verify calls
+            up_to_date: whether the task is up-to-date
+        """
+        self.task_type = task_type
+        self.verify_results = verify_results
+        self.is_up_to_date = up_to_date
+        self.calls: List[str] = []
+
+    def get_name(self) -> str:
+        return "fake"
+
+    def get_type(self):
+        return self.task_type
+
+    def prepare(self, backend_session):
+        pass
+
+    def up_to_date(self, backend_session) -> bool:
+        return self.is_up_to_date
+
+    def migrate(self, backend_session, timeout: datetime, force_recheck: bool) -> int:
+        self.calls.append("migrate")
+        return 0
+
+    def release_session_objects(self, backend_session):
+        pass
+
+    def should_timeout(self, timeout: datetime) -> bool:
+        return False
+
+    def verify(self, backend_session, security) -> bool:
+        self.calls.append("verify")
+        return self.verify_results.pop(0)
+
+    def finish(self, backend_session):
+        self.calls.append("finish")
+
+
+class TestMigrateHandler:
+    """
+    Tests for running and verifying migration tasks
+    """
+
+    @staticmethod
+    def create_handler(monkeypatch, full_verify: bool = False):
+        """
+        Creates migrate handler that does not notify or reset watermarks
+
+        Args:
+            monkeypatch: monkeypatch fixture
+            full_verify: whether up-to-date tasks are verified too
+
+        Returns: handler and default task type of the migrate module
+        """
+        # migration tasks are created when the module is imported and they create their database engines
+        monkeypatch.setenv("KIID_DATABASE_URL", "sqlite://")
+        # migrate module compares task types imported with absolute module names
+        from ..commands.migrate import MigrateHandler, MigrationTaskType
+
+        monkeypatch.setattr(MigrateHandler, "get_backend_engine", staticmethod(lambda: create_engine("sqlite://")))
+        handler = MigrateHandler(debug=False, force_recheck=False, timeout=1, security=None, verify_only=False,
+                                 skip_verify=False, full_verify=full_verify)
+
+        async def notify_verification_failure(task):
+            pass
+
+        monkeypatch.setattr(handler, "notify_verification_failure", notify_verification_failure)
+        monkeypatch.setattr(handler, "reset_task_watermark", lambda **kwargs: None)
+        return handler, MigrationTaskType.DEFAULT
+
+    @pytest.mark.parametrize("verify_results, expected_result, expected_calls", [
+        ([True], True, ["migrate", "verify", "finish"]),
+        ([False, True], True, ["migrate", "verify", "migrate", "verify", "finish"]),
+        ([False, False], False, ["migrate", "verify", "migrate", "verify"])
+    ])
+    def test_finish_after_verify(self, monkeypatch, verify_results, expected_result, expected_calls):
+        """Tests that task is finished only after it has passed verification"""
+        handler, task_type = self.create_handler(monkeypatch=monkeypatch)
+        task = FakeTask(task_type=task_type, verify_results=verify_results)
+
+        result = asyncio.run(handler.run_and_verify_task(task=task,
+                                                         timeout=datetime.now() + timedelta(minutes=1),
+                                                         backend_session=Session(handler.backend_engine)))
+
+        assert expected_result == result
+        assert expected_calls == task.calls
+
+    @pytest.mark.parametrize("full_verify, expected_calls", [
+        (False, ["finish"]),
+        (True, ["verify", "finish"])
+    ])
+    def test_up_to_date(self, monkeypatch, full_verify, expected_calls):
+        """Tests that up-to-date task is verified only in full verify mode"""
+        handler, task_type = self.create_handler(monkeypatch=monkeypatch, full_verify=full_verify)
+        task = FakeTask(task_type=task_type, verify_results=[True], up_to_date=True)
+
+        result = asyncio.run(handler.run_and_verify_task(task=task,
+                                                         timeout=datetime.now() + timedelta(minutes=1),
+                                                         backend_session=Session(handler.backend_engine)))
+
+        assert result
+        assert expected_calls == task.calls
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from ..commands.migration_pipeline import PagedSourceReader
+
+
+class TestMigrationPipeline:
+    """
+    Tests for paged source reader used by the migration tasks
+    """
+
+    @staticmethod
+    def create_reader(source, batch: int, pipelined: bool) -> PagedSourceReader:
+        """
+        Creates reader over a list of source rows
+        Args:
+            source: source rows
+            batch: page size
+            pipelined: whether pages are fetched in a producer thread
+
+        Returns: reader
+        """
+        return PagedSourceReader(funds_session=Session(bind=create_engine("sqlite://")),
+                                 fetch_page=lambda session, offset, limit: source[offset:offset + limit],
+                                 batch=batch,
+                                 timeout=datetime.now() + timedelta(minutes=1),
+                                 pipelined=pipelined)
+
+    @pytest.mark.parametrize("pipelined", [False, True])
+    def test_read_pages(self, pipelined: bool):
+        """Tests that all rows are read in order both sequentially and pipelined"""
+        source = list(range(25))
+        reader = self.create_reader(source=source, batch=10, pipelined=pipelined)
+
+        pages = list(reader)
+
+        assert [0, 10, 20] == [offset for offset, rows in pages]
+        assert source == [row for offset, rows in pages for row in rows]
+        assert 25 == reader.stats.rows
+        assert 3 == reader.stats.pages
+
+    @pytest.mark.parametrize("pipelined", [False, True])
+    def test_read_empty(self, pipelined: bool):
+        """Tests reading empty source"""
+        reader = self.create_reader(source=[], batch=10, pipelined=pipelined)
+        assert [] == list(reader)
+        assert 0 == reader.stats.rows
+
+    def test_stop_reading(self):
+        """Tests that pipelined producer stops when the consumer stops reading"""
+        reader = self.create_reader(source=list(range(1000)), batch=10, pipelined=True)
+
+        for offset, rows in reader:
+            if offset == 20:
+                break
+
+        assert 2 == reader.stats.pages
+
+    def test_producer_error(self):
+        """Tests that producer errors are raised in the consumer"""
+        def fail(session, offset, limit):
+            raise ValueError("source failure")
+
+        reader = PagedSourceReader(funds_session=Session(bind=create_engine("sqlite://")),
+                                   fetch_page=fail,
+                                   batch=10,
+                                   timeout=datetime.now() + timedelta(minutes=1),
+                                   pipelined=True)
+
+        with pytest.raises(ValueError):
+            list(reader)
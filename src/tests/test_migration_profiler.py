@@ -0,0 +1,88 @@
+import json
+import time
+
+from sqlalchemy import create_engine, text
+
+from ..commands.migration_profiler import MemorySampler, MigrationProfiler
+
+
+class TestMigrationProfiler:
+    """
+    Tests for migration profiler
+    """
+
+    def test_report(self, tmp_path):
+        """Tests that queries, written rows and phases are recorded into task and security entries"""
+        report_file = tmp_path / "report.json"
+        backend_engine = create_engine("sqlite://")
+        funds_engine = create_engine("sqlite://")
+
+        profiler = MigrationProfiler(report_file=str(report_file), dump_file=None)
+        profiler.start(backend_engine=backend_engine)
+
+        with profiler.scope(task="portfolio-logs", security=None):
+            with profiler.scope(task="portfolio-logs", security="PASSIVETEST01"):
+                with profiler.phase("migrate"):
+                    with funds_engine.connect() as connection:
+                        connection.execute(text("SELECT 1"))
+                        connection.execute(text("SELECT 2"))
+
+                    with backend_engine.connect() as connection:
+                        connection.execute(text("SELECT 1"))
+
+                profiler.add_written(5)
+
+            with backend_engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+
+            with profiler.phase("finish"):
+                time.sleep(0.01)
+
+        profiler.stop()
+
+        with funds_engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+        report = json.loads(report_file.read_text())
+        task_entry, security_entry = report["entries"]
+
+        assert "portfolio-logs" == task_entry["task"]
+        assert task_entry["security"] is None
+        assert 2 == task_entry["source_queries"]
+        assert 2 == task_entry["backend_queries"]
+        assert 5 == task_entry["rows_written"]
+        assert task_entry["finish_seconds"] > 0
+
+        assert "PASSIVETEST01" == security_entry["security"]
+        assert 2 == security_entry["source_queries"]
+        assert 1 == security_entry["backend_queries"]
+        assert 5 == security_entry["rows_written"]
+        assert security_entry["migrate_seconds"] >= 0
+        assert 0 == security_entry["finish_seconds"]
+        assert security_entry["peak_memory_kb"] > 0
+        assert security_entry["start_memory_kb"] > 0
+        assert security_entry["end_memory_kb"] > 0
+
+    def test_memory_sampler(self):
+        """Tests that the sampled peak includes memory that was released before the end of the period"""
+        size_kb = 64 * 1024
+
+        with MemorySampler(interval=0.01) as memory_sampler:
+            start_memory = MigrationProfiler.get_current_memory()
+            data = b"x" * size_kb * 1024
+            time.sleep(0.1)
+            del data
+
+        assert memory_sampler.peak_kb >= start_memory + size_kb // 2
+        assert memory_sampler.peak_kb > MigrationProfiler.get_current_memory() + size_kb // 2
+
+    def test_disabled(self):
+        """Tests that profiler without report file does not record anything"""
+        profiler = MigrationProfiler(report_file=None, dump_file=None)
+        profiler.start(backend_engine=create_engine("sqlite://"))
+
+        with profiler.scope(task="funds", security=None):
+            profiler.add_written(1)
+
+        profiler.stop()
+        assert [] == profiler.entries
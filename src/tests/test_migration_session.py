@@ -0,0 +1,73 @@
+import gc
+import weakref
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from uuid import uuid4
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from ..commands import migration_tasks
+from ..commands.migration_tasks import MigrateSecurityRatesTask, RATES_FIRST_DATE
+
+# models of the task module, which imports them with absolute module names
+Security = migration_tasks.destination_models.Security
+SecurityRate = migration_tasks.destination_models.SecurityRate
+
+
+class TestMigrationSession:
+    """
+    Tests for bounded backend session memory in migration tasks
+    """
+
+    def test_release_objects_per_batch(self, monkeypatch):
+        """Tests that migrated rates are detached and freed after each batch, so memory does not grow with rows"""
+        backend_engine = create_engine("sqlite://")
+        Security.metadata.create_all(backend_engine, tables=[Security.__table__, SecurityRate.__table__])
+
+        funds_rows = [SimpleNamespace(RDATE=date(2000, 1, 1) + timedelta(days=index), RCLOSE=Decimal(1))
+                      for index in range(2500)]
+        task = MigrateSecurityRatesTask()
+        monkeypatch.setattr(task, "list_funds_security_rates",
+                            lambda funds_session, security, rdate, offset, limit: funds_rows[offset:offset + limit])
+
+        created_rates = []
+        upsert_security_rate = task.upsert_security_rate
+
+        def upsert_and_track(**kwargs):
+            security_rate = upsert_security_rate(**kwargs)
+            created_rates.append(weakref.ref(security_rate))
+            return security_rate
+
+        batch_states = []
+        release_session_objects = task.release_session_objects
+
+        def release_and_measure(backend_session: Session):
+            release_session_objects(backend_session=backend_session)
+            gc.collect()
+            batch_states.append((len(backend_session.identity_map),
+                                 sum(1 for x in created_rates if x() is not None)))
+
+        monkeypatch.setattr(task, "upsert_security_rate", upsert_and_track)
+        monkeypatch.setattr(task, "release_session_objects", release_and_measure)
+
+        with Session(backend_engine) as backend_session, Session(create_engine("sqlite://")) as funds_session:
+            security = Security(id=uuid4(), original_id="PASSIVETEST01", currency="EUR", name_fi="fi", name_sv="sv",
+                                name_en="en", updated=datetime(2022, 1, 1))
+            backend_session.add(security)
+            backend_session.commit()
+
+            count = task.migrate_security_rates(security=security,
+                                                funds_session=funds_session,
+                                                backend_session=backend_session,
+                                                last_backend_date=RATES_FIRST_DATE,
+                                                timeout=datetime.now() + timedelta(minutes=1),
+                                                force_recheck=False)
+
+            assert 2500 == count
+            assert 2500 == backend_session.query(SecurityRate).count()
+
+        """Only the shared security stays in the session and no rate outlives its batch"""
+        assert [(1, 0), (1, 0), (1, 0)] == batch_states
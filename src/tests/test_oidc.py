@@ -0,0 +1,76 @@
+import time
+
+import jwt
+
+from ..auth import oidc
+from ..auth.oidc import Oidc, VerifiedTokenCache
+
+TOKEN_SECRET = "test-secret-for-unverified-tokens"
+
+
+class TestOidc:
+    """
+    Tests for OIDC token verification
+    """
+
+    @staticmethod
+    def create_token(issuer: str, expires: float) -> str:
+        """
+        Creates signed test token
+
+        Args:
+            issuer: iss claim
+            expires: exp claim
+
+        Returns: encoded token
+        """
+        return jwt.encode({"iss": issuer, "exp": int(expires), "sub": "user"}, TOKEN_SECRET, algorithm="HS256",
+                          headers={"kid": "test"})
+
+    def test_verified_token_cache(self, monkeypatch):
+        """Tests that verified tokens are decoded once and only with the issuer matching their iss claim"""
+        monkeypatch.setattr(oidc, "verified_token_cache", VerifiedTokenCache(name="test-tokens", max_size=10))
+        attempts = []
+
+        def try_decode_with_issuer(issuer: str, token: str, audience: str, kid: str):
+            attempts.append(issuer)
+            return jwt.decode(token, options={"verify_signature": False})
+
+        token = self.create_token(issuer="https://second.example.com/realms/test", expires=time.time() + 60)
+        verifier = Oidc(issuers=["https://first.example.com/realms/test", "https://second.example.com/realms/test/"])
+        monkeypatch.setattr(verifier, "try_decode_with_issuer", try_decode_with_issuer)
+
+        assert "user" == verifier.decode_jwt_token(token=token, audience="api")["sub"]
+        assert "user" == verifier.decode_jwt_token(token=token, audience="api")["sub"]
+        assert ["https://second.example.com/realms/test/"] == attempts
+
+        verifier.decode_jwt_token(token=token, audience="other")
+        assert 2 == len(attempts)
+        assert {"size": 2, "hits": 1, "misses": 2} == oidc.verified_token_cache.get_stats()
+
+    def test_unknown_issuer(self):
+        """Tests that all issuers are tried when iss claim does not match any of them"""
+        issuers = ["https://first.example.com/realms/test", "https://second.example.com/realms/test"]
+        verifier = Oidc(issuers=issuers)
+
+        token = self.create_token(issuer="https://public.example.com/realms/test", expires=time.time() + 60)
+        assert issuers == verifier.get_candidate_issuers(token=token)
+        assert issuers == verifier.get_candidate_issuers(token="invalid")
+
+    def test_expiry(self):
+        """Tests that tokens are cached until they expire"""
+        cache = VerifiedTokenCache(name="test-token-expiry", max_size=1)
+
+        cache.put(token="expired", audience="api", claims={"exp": time.time() - 1})
+        cache.put(token="no-expiry", audience="api", claims={})
+        assert cache.get(token="expired", audience="api") is None
+        assert cache.get(token="no-expiry", audience="api") is None
+
+        cache.put(token="first", audience="api", claims={"exp": time.time() + 60})
+        cache.put(token="second", audience="api", claims={"exp": time.time() + 60})
+        assert cache.get(token="first", audience="api") is None
+        assert cache.get(token="second", audience="api") is not None
+
+        cache.tokens[cache.get_key(token="second", audience="api")] = (time.time() - 1, {})
+        assert cache.get(token="second", audience="api") is None
+        assert 0 == cache.get_stats()["size"]
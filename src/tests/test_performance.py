@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List, Optional, Tuple
+from uuid import uuid4
+
+import numpy
+import pytest
+
+from ..holdings.holdings import Holdings
+from ..holdings.history import HistoryInput
+from ..holdings.performance import PerformanceInput, calculate_irr, calculate_performance
+
+
+class TestPerformance:
+    """
+    Tests for portfolio performance calculation
+    """
+
+    @staticmethod
+    def create_input(transactions: List[Tuple[date, Decimal, bool]],
+                     unit_values: List[Optional[Decimal]],
+                     base_date: date,
+                     end_date: date) -> PerformanceInput:
+        """
+        Creates performance input of a single security portfolio
+        Args:
+            transactions: transaction dates, amount changes and whether they are cash flows
+            unit_values: daily unit values from base date to end date
+            base_date: day before the period
+            end_date: last date of the period
+
+        Returns: performance input
+        """
+        security_id = uuid4()
+        holdings = Holdings()
+        flows = []
+
+        for transaction_date, amount, is_flow in transactions:
+            holdings.add_holding(security_id=security_id, holding_date=transaction_date, amount=amount)
+            if is_flow:
+                flows.append((transaction_date.toordinal(), amount))
+
+        return PerformanceInput(
+            history_input=HistoryInput.create(holdings=holdings, start_date=base_date, end_date=end_date,
+                                              rates={security_id: unit_values}),
+            flows=[flows]
+        )
+
+    def test_constant_value(self):
+        """Tests that returns of a portfolio with constant unit value are zero"""
+        base_date = date(2021, 12, 31)
+        end_date = date(2022, 1, 10)
+        performance_input = self.create_input(
+            transactions=[(date(2021, 6, 1), Decimal(10), True), (date(2022, 1, 5), Decimal(5), True)],
+            unit_values=[Decimal(2)] * 11,
+            base_date=base_date,
+            end_date=end_date
+        )
+
+        result = calculate_performance(performance_input)
+
+        assert date(2022, 1, 1) == result["startDate"]
+        assert end_date == result["endDate"]
+        assert 20 == result["startValue"]
+        assert 30 == result["endValue"]
+        assert 10 == result["netCashFlow"]
+        assert 0 == pytest.approx(result["timeWeightedReturn"], abs=1e-12)
+        assert result["annualizedTimeWeightedReturn"] is None
+        assert 0 == pytest.approx(result["moneyWeightedReturn"], abs=1e-9)
+
+    def test_growth_with_cash_flow(self):
+        """Tests that time-weighted return is not affected by cash flows but money-weighted return is"""
+        base_date = date(2021, 12, 31)
+        end_date = base_date + timedelta(days=730)
+        days = (end_date - base_date).days + 1
+        flow_date = base_date + timedelta(days=365)
+
+        """Unit value doubles during the first year and stays flat for the second year, rates have six decimals"""
+        unit_values = [(Decimal(1) + Decimal(min(i, 365)) / Decimal(365)).quantize(Decimal("0.000001"))
+                       for i in range(days)]
+        performance_input = self.create_input(
+            transactions=[(date(2021, 1, 1), Decimal(100), True), (flow_date, Decimal(100), True),
+                          (date(2022, 6, 1), Decimal(-10), False), (date(2022, 6, 1), Decimal(10), False)],
+            unit_values=unit_values,
+            base_date=base_date,
+            end_date=end_date
+        )
+
+        result = calculate_performance(performance_input)
+
+        assert 100 == pytest.approx(result["startValue"])
+        assert 400 == pytest.approx(result["endValue"])
+        assert 200 == pytest.approx(result["netCashFlow"])
+        assert 1 == pytest.approx(result["timeWeightedReturn"])
+        assert numpy.sqrt(2) - 1 == pytest.approx(result["annualizedTimeWeightedReturn"])
+        assert 0 < result["moneyWeightedReturn"] < result["annualizedTimeWeightedReturn"]
+
+    def test_portfolio_without_value(self):
+        """Tests that returns are not defined when the portfolio has no value"""
+        performance_input = self.create_input(
+            transactions=[(date(2022, 1, 1), Decimal(0), True)],
+            unit_values=[None, Decimal(1), Decimal(1)],
+            base_date=date(2021, 12, 31),
+            end_date=date(2022, 1, 2)
+        )
+
+        result = calculate_performance(performance_input)
+
+        assert result["timeWeightedReturn"] is None
+        assert result["moneyWeightedReturn"] is None
+
+    def test_calculate_irr(self):
+        """Tests internal rate of return against closed form solutions"""
+        assert 0.1 == pytest.approx(calculate_irr(times=numpy.array([0.0, 1.0]),
+                                                  cash_flows=numpy.array([-100.0, 110.0])))
+        assert 0.1 == pytest.approx(calculate_irr(times=numpy.array([0.0, 1.0, 2.0]),
+                                                  cash_flows=numpy.array([-100.0, 10.0, 110.0])))
+        assert -0.5 == pytest.approx(calculate_irr(times=numpy.array([0.0, 1.0]),
+                                                   cash_flows=numpy.array([-100.0, 50.0])))
+        assert calculate_irr(times=numpy.array([0.0, 1.0]), cash_flows=numpy.array([100.0, 50.0])) is None
@@ -0,0 +1,74 @@
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from ..impl.apis import portfolios_api
+from ..impl.apis.portfolios_api import PortfoliosApiImpl
+from ..utils.security_catalog import CatalogSecurity
+
+
+class TestPortfolioPositionValues:
+    """
+    Tests for valuating portfolio positions
+    """
+
+    @staticmethod
+    def create_security(original_id: str) -> CatalogSecurity:
+        """
+        Creates catalog security
+
+        Args:
+            original_id: original id
+
+        Returns: catalog security
+        """
+        return CatalogSecurity(id=uuid4(), original_id=original_id, currency="EUR", fund_id=None, series_id=None,
+                               name_fi="fi", name_sv="sv", name_en="en", updated=None)
+
+    def list_positions(self, monkeypatch, security: CatalogSecurity, sek_security):
+        """
+        Lists positions of a portfolio holding given security with faked database access
+
+        Args:
+            monkeypatch: monkeypatch fixture
+            security: held security
+            sek_security: SEK security or None if it is missing
+
+        Returns: positions
+        """
+        position_date = date(2022, 1, 10)
+        row = SimpleNamespace(transaction_code="11", security_id=security.id, c_security_id=None,
+                              amount=Decimal("2.5"), transaction_date=date(2022, 1, 1))
+        rates = {security.id: SimpleNamespace(rate_close=Decimal("12.5"), rate_date=position_date)}
+        if sek_security is not None:
+            rates[sek_security.id] = SimpleNamespace(rate_close=Decimal("10"), rate_date=position_date)
+
+        monkeypatch.setattr(portfolios_api.operations, "get_portfolio_logs", lambda **kwargs: [row])
+        monkeypatch.setattr(portfolios_api.operations, "get_most_recent_security_rates", lambda **kwargs: rates)
+        monkeypatch.setattr(portfolios_api.security_catalog, "get_securities",
+                            lambda database, security_ids: {security.id: security})
+        monkeypatch.setattr(portfolios_api.security_catalog, "find_by_original_id",
+                            lambda database, original_id: sek_security)
+
+        api = PortfoliosApiImpl(database=None, authorization=None, settings=None)
+        return api.list_portfolio_position_resources(portfolio_id=uuid4(), position_date=position_date)
+
+    def test_sek_position(self, monkeypatch):
+        """Tests that SEK positions are converted with the SEK rate"""
+        positions = self.list_positions(monkeypatch=monkeypatch,
+                                        security=self.create_security("SPILTAN"),
+                                        sek_security=self.create_security("SEK"))
+
+        assert 1 == len(positions)
+        assert Decimal("2.5") * Decimal("12.5") / Decimal("10") == Decimal(positions[0].value)
+
+    def test_missing_sek_security(self, monkeypatch):
+        """Tests that SEK positions fail with an error response when the SEK security is missing"""
+        with pytest.raises(HTTPException) as error:
+            self.list_positions(monkeypatch=monkeypatch, security=self.create_security("SPILTAN"), sek_security=None)
+
+        assert 500 == error.value.status_code
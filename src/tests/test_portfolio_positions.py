@@ -0,0 +1,155 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+
+from ..commands import migration_tasks
+from ..commands.migration_tasks import MigratePortfolioTransactionsTask
+
+# models of the task module, which imports them with absolute module names
+models = migration_tasks.destination_models
+
+
+class TestPortfolioPositions:
+    """
+    Tests for maintained portfolio positions
+    """
+
+    @staticmethod
+    def create_row(trans_nr: int, porid: str, amount: str, purchase_c_value: str, updated: datetime):
+        """
+        Creates funds database portfolio transaction row
+
+        Args:
+            trans_nr: transaction number
+            porid: portfolio original id
+            amount: amount
+            purchase_c_value: purchase value
+            updated: update time
+
+        Returns: row
+        """
+        return SimpleNamespace(TRANS_NR=trans_nr, PORID=porid, TRANS_DATE=date(2022, 1, 1), AMOUNT=Decimal(amount),
+                               PUR_CVALUE=Decimal(purchase_c_value), UPDATED=updated)
+
+    @staticmethod
+    def migrate(backend_session: Session, security, funds_rows: List[SimpleNamespace], monkeypatch):
+        """
+        Runs portfolio transactions migration of a security against given funds database rows
+
+        Args:
+            backend_session: backend session
+            security: migrated security
+            funds_rows: funds database portfolio transaction rows
+            monkeypatch: monkeypatch fixture
+        """
+        task = MigratePortfolioTransactionsTask()
+        task.watermarks = {}
+        task.funds_updates = {security.original_id: SimpleNamespace(LAST_DATE=max(x.UPDATED for x in funds_rows),
+                                                                    ROW_COUNT=len(funds_rows))}
+
+        def list_portfolio_transactions(funds_session, security, updated, offset, limit):
+            rows = sorted((x for x in funds_rows if x.UPDATED > updated), key=lambda x: x.UPDATED)
+            return SimpleNamespace(fetchall=lambda: rows[offset:offset + limit])
+
+        monkeypatch.setattr(task, "get_funds_database_engine", lambda: create_engine("sqlite://"))
+        monkeypatch.setattr(task, "list_funds_portfolio_transaction_trans_nrs",
+                            lambda funds_session, secid: [x.TRANS_NR for x in funds_rows])
+        monkeypatch.setattr(task, "list_portfolio_transactions", list_portfolio_transactions)
+        monkeypatch.setattr(task, "update_watermark", lambda **kwargs: None)
+
+        task.migrate_security(backend_session=backend_session,
+                              timeout=datetime.now() + timedelta(minutes=1),
+                              force_recheck=False,
+                              security=security)
+        backend_session.commit()
+
+    @staticmethod
+    def get_positions(backend_session: Session) -> Dict[Tuple[UUID, UUID], Tuple[Decimal, Decimal]]:
+        """
+        Returns maintained portfolio positions
+
+        Args:
+            backend_session: backend session
+
+        Returns: total amount and purchase total by portfolio id and security id
+        """
+        rows = backend_session.query(models.PortfolioPosition.portfolio_id,
+                                     models.PortfolioPosition.security_id,
+                                     models.PortfolioPosition.total_amount,
+                                     models.PortfolioPosition.purchase_total).all()
+
+        return {(x[0], x[1]): (x[2], x[3]) for x in rows}
+
+    @staticmethod
+    def get_transaction_totals(backend_session: Session) -> Dict[Tuple[UUID, UUID], Tuple[Decimal, Decimal]]:
+        """
+        Returns portfolio positions aggregated from portfolio transactions
+
+        Args:
+            backend_session: backend session
+
+        Returns: total amount and purchase total by portfolio id and security id
+        """
+        rows = backend_session.query(models.PortfolioTransaction.portfolio_id,
+                                     models.PortfolioTransaction.security_id,
+                                     func.sum(models.PortfolioTransaction.amount),
+                                     func.sum(models.PortfolioTransaction.purchase_c_value)) \
+            .group_by(models.PortfolioTransaction.portfolio_id, models.PortfolioTransaction.security_id) \
+            .all()
+
+        return {(x[0], x[1]): (x[2], x[3]) for x in rows}
+
+    def test_positions_match_transactions(self, monkeypatch):
+        """Tests that positions match transaction totals after a migration and after an incremental update"""
+        engine = create_engine("sqlite://")
+        models.Base.metadata.create_all(engine, tables=[models.Company.__table__, models.Portfolio.__table__,
+                                                        models.Security.__table__,
+                                                        models.PortfolioTransaction.__table__,
+                                                        models.PortfolioPosition.__table__])
+        updated = datetime(2022, 1, 1)
+
+        with Session(engine) as backend_session:
+            company = models.Company(id=uuid4(), original_id="123", ssn="010101-1234", name="Company",
+                                     updated=updated)
+            security = models.Security(id=uuid4(), original_id="PASSIVETEST01", currency="EUR", name_fi="fi",
+                                       name_sv="sv", name_en="en", updated=updated)
+            portfolios = [models.Portfolio(id=uuid4(), original_id=original_id, name=original_id,
+                                           company_id=company.id) for original_id in ["123", "123_1", "123_2"]]
+            portfolio_ids = [x.id for x in portfolios]
+            backend_session.add_all([company, security] + portfolios)
+            backend_session.commit()
+
+            funds_rows = [
+                self.create_row(1, "123", "10.5", "100.25", updated),
+                self.create_row(2, "123", "2.25", "20.5", updated),
+                self.create_row(3, "123_1", "4", "40", updated),
+                self.create_row(4, "123_2", "1.5", "15", updated)
+            ]
+
+            self.migrate(backend_session=backend_session, security=security, funds_rows=funds_rows,
+                         monkeypatch=monkeypatch)
+
+            assert 3 == len(self.get_positions(backend_session=backend_session))
+            assert self.get_transaction_totals(backend_session=backend_session) == \
+                   self.get_positions(backend_session=backend_session)
+
+            """Update, insert and removals touch only some portfolios, and the last transaction of 123_2 is removed"""
+            updated += timedelta(days=1)
+            funds_rows = [
+                self.create_row(1, "123", "11.5", "110.25", updated),
+                self.create_row(3, "123_1", "4", "40", datetime(2022, 1, 1)),
+                self.create_row(5, "123_1", "-1.25", "-12.5", updated)
+            ]
+
+            self.migrate(backend_session=backend_session, security=security, funds_rows=funds_rows,
+                         monkeypatch=monkeypatch)
+
+            positions = self.get_positions(backend_session=backend_session)
+            assert {(portfolio_ids[0], security.id), (portfolio_ids[1], security.id)} == set(positions.keys())
+            assert self.get_transaction_totals(backend_session=backend_session) == positions
+            assert Decimal("2.75") == positions[(portfolio_ids[1], security.id)][0]
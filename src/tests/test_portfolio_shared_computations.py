@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+from uuid import uuid4
+
+from ..impl.apis import portfolios_api
+from ..impl.apis.portfolios_api import PortfoliosApiImpl
+
+
+class FakeSession:
+    """
+    Database session stub recording whether it has been closed
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.closed = False
+
+
+class TestPortfolioSharedComputations:
+    """
+    Tests for computations shared by concurrent portfolio requests
+    """
+
+    def test_own_session(self, monkeypatch):
+        """Tests that a shared computation outlives the session of the request that started it"""
+        sessions = []
+
+        def get_database():
+            session = FakeSession()
+            sessions.append(session)
+            yield session
+            session.closed = True
+
+        monkeypatch.setattr(portfolios_api, "get_database", get_database)
+
+        request_session = FakeSession()
+        request_api = PortfoliosApiImpl(database=request_session, authorization=None, settings=None)
+        started = threading.Event()
+        request_ended = threading.Event()
+        portfolio_id = uuid4()
+
+        def compute(api: PortfoliosApiImpl, value_id):
+            started.set()
+            request_ended.wait(timeout=10)
+            assert not api.database.closed
+            return api.database, value_id
+
+        async def run():
+            first = asyncio.ensure_future(portfolios_api.portfolio_single_flight.run(
+                ("test-own-session", portfolio_id), request_api.run_in_own_session, compute, portfolio_id))
+            second = asyncio.ensure_future(portfolios_api.portfolio_single_flight.run(
+                ("test-own-session", portfolio_id), request_api.run_in_own_session, compute, portfolio_id))
+
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+
+            """First request is cancelled and its session is closed while the computation is running"""
+            first.cancel()
+            request_session.closed = True
+            request_ended.set()
+
+            return await second
+
+        database, value_id = asyncio.run(run())
+
+        assert portfolio_id == value_id
+        assert [database] == sessions
+        assert database is not request_session
+        assert database.closed
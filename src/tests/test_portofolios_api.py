@@ -1,4 +1,5 @@
-from typing import Optional
+import json
+from typing import Any, Dict, Optional, Tuple
 
 from .fixtures.client import *  # noqa
 from .fixtures.users import *  # noqa
@@ -15,6 +16,7 @@ from .constants import security_ids, invalid_auths, invalid_uuids
 from .utils.database import sql_backend_company, sql_backend_security, sql_backend_portfolio_log, \
     sql_backend_portfolio_transaction, sql_backend_last_rate, sql_backend_portfolio, sql_backend_funds, \
     sql_backend_security_rates, sql_backend_company_access
+from .utils.query_counter import QueryCounter
 
 import logging
 
@@ -263,6 +265,51 @@ class TestPortfolio:
             assert expected_redemption == Decimal(values["redemptions"])
             assert expected_subscription == Decimal(values["subscriptions"])
 
+    def test_list_portfolio_period_summaries(self, client: TestClient, user_1_auth: BearerAuth,
+                                             backend_mysql: MySqlContainer):
+        """
+        test to list portfolio subscriptions and redemptions by month and by year
+        """
+        with sql_backend_company(backend_mysql), sql_backend_funds(backend_mysql), \
+                sql_backend_security(backend_mysql), sql_backend_last_rate(backend_mysql), \
+                sql_backend_portfolio(backend_mysql), sql_backend_portfolio_transaction(backend_mysql), \
+                sql_backend_portfolio_log(backend_mysql):
+
+            portfolio_table_id = "6bb05ba3-2b4f-4031-960f-0f20d5244440"
+            start_date = "1998-01-23"
+            end_date = "1998-03-23"
+
+            response = client.get(
+                f"/v1/portfolios/{portfolio_table_id}/summaries?startDate={start_date}&endDate={end_date}",
+                auth=user_1_auth)
+
+            assert response.status_code == 200
+            values = response.json()
+            assert ["1998-01-01", "1998-02-01", "1998-03-01"] == [x["startDate"] for x in values]
+            assert [Decimal("20000.00"), Decimal("10000.00"), Decimal("5000.00")] == \
+                   [Decimal(x["subscriptions"]) for x in values]
+            assert [Decimal("5000.00"), Decimal("25099.17"), Decimal("0")] == \
+                   [Decimal(x["redemptions"]) for x in values]
+
+            response = client.get(
+                f"/v1/portfolios/{portfolio_table_id}/summaries?startDate={start_date}&endDate={end_date}"
+                f"&period=YEAR",
+                auth=user_1_auth)
+
+            assert response.status_code == 200
+            values = response.json()
+            assert 1 == len(values)
+            assert "1998-01-01" == values[0]["startDate"]
+            assert Decimal("35000.00") == Decimal(values[0]["subscriptions"])
+            assert Decimal("30099.17") == Decimal(values[0]["redemptions"])
+
+            response = client.get(
+                f"/v1/portfolios/{portfolio_table_id}/summaries?startDate={start_date}&endDate={end_date}"
+                f"&period=WEEK",
+                auth=user_1_auth)
+
+            assert response.status_code == 400
+
     def test_find_portfolio_summary_invalid_id(self, client: TestClient, backend_mysql: MySqlContainer,
                                                user_1_auth: BearerAuth):
         for invalid_uuid in invalid_uuids:
@@ -384,6 +431,180 @@ class TestPortfolio:
                                    f"startDate=1999-01-01&endDate=1999-01-01", auth=user_1_auth).json()
             assert 1 == len(responses)
 
+    def test_list_portfolio_positions(self, client: TestClient, backend_mysql: MySqlContainer,
+                                      user_1_auth: BearerAuth):
+        """
+        Test that portfolio positions on a date sum up to the history value of the date
+        """
+        with sql_backend_company(backend_mysql), sql_backend_funds(backend_mysql), \
+                sql_backend_security(backend_mysql), sql_backend_last_rate(backend_mysql), \
+                sql_backend_security_rates(backend_mysql), sql_backend_portfolio(backend_mysql), \
+                sql_backend_portfolio_transaction(backend_mysql), sql_backend_portfolio_log(backend_mysql):
+
+            portfolio_id = "6bb05ba3-2b4f-4031-960f-0f20d5244440"
+
+            response = client.get(f"/v1/portfolios/{portfolio_id}/positions?date=2020-06-06", auth=user_1_auth)
+            assert response.status_code == 200
+            positions = response.json()
+            assert 6 == len(positions)
+
+            passive_position = next(x for x in positions if x["securityId"] == security_ids["PASSIVETEST01"])
+            assert round(Decimal("61.398344"), 4) == round(Decimal(passive_position["amount"]), 4)
+            assert Decimal("2.265511") == Decimal(passive_position["rate"])
+
+            expected_value_2020_06_06 = 1159.37786386
+            assert round(Decimal(expected_value_2020_06_06), 4) == \
+                round(sum(Decimal(x["value"]) for x in positions), 4)
+
+            response = client.get(f"/v1/portfolios/{portfolio_id}/positions?date=1990-01-01", auth=user_1_auth)
+            assert response.status_code == 200
+            assert [] == response.json()
+
+            response = client.get(f"/v1/portfolios/{portfolio_id}/positions", auth=user_1_auth)
+            assert response.status_code == 400
+
+            response = client.get(f"/v1/portfolios/{portfolio_id}/positions?date=2020-06-06")
+            assert response.status_code == 403
+
+    def test_history_values_validators(self, client: TestClient, backend_mysql: MySqlContainer,
+                                       user_1_auth: BearerAuth):
+        """
+        Test history values validators and incremental fetch
+        """
+        with sql_backend_company(backend_mysql), sql_backend_funds(backend_mysql), \
+                sql_backend_security(backend_mysql), sql_backend_last_rate(backend_mysql), \
+                sql_backend_security_rates(backend_mysql), sql_backend_portfolio(backend_mysql), \
+                sql_backend_portfolio_transaction(backend_mysql), sql_backend_portfolio_log(backend_mysql):
+
+            url = "/v1/portfolios/6bb05ba3-2b4f-4031-960f-0f20d5244440/historyValues?" \
+                  "startDate=2020-06-01&endDate=2020-06-20"
+
+            response = client.get(url, auth=user_1_auth)
+            assert response.status_code == 200
+            etag = response.headers["ETag"]
+            values = response.json()
+            assert 20 == len(values)
+            assert "X-History-Invalidated" not in response.headers
+
+            response = client.get(url, auth=user_1_auth, headers={"If-None-Match": etag})
+            assert response.status_code == 304
+            assert etag == response.headers["ETag"]
+
+            response = client.get(f"{url}&since=2020-06-18", auth=user_1_auth, headers={"If-None-Match": etag})
+            assert response.status_code == 304
+
+            response = client.get(url.replace("2020-06-20", "2020-06-22") + "&since=2020-06-18", auth=user_1_auth,
+                                  headers={"If-None-Match": etag})
+            assert response.status_code == 200
+            assert "false" == response.headers["X-History-Invalidated"]
+            assert etag != response.headers["ETag"]
+            since_values = response.json()
+            assert ["2020-06-18", "2020-06-19", "2020-06-20", "2020-06-21", "2020-06-22"] == \
+                [x["date"] for x in since_values]
+            assert values[-3:] == since_values[:3]
+
+            response = client.get(f"{url}&since=2020-06-18", auth=user_1_auth)
+            assert response.status_code == 200
+            assert "true" == response.headers["X-History-Invalidated"]
+            assert values == response.json()
+
+            response = client.get("/v2/portfolios/historyValues?startDate=2020-06-01&endDate=2020-06-20",
+                                  auth=user_1_auth)
+            assert response.status_code == 200
+            response = client.get("/v2/portfolios/historyValues?startDate=2020-06-01&endDate=2020-06-20",
+                                  auth=user_1_auth, headers={"If-None-Match": response.headers["ETag"]})
+            assert response.status_code == 304
+
+            response = client.get(f"{url}&since=invalid", auth=user_1_auth)
+            assert response.status_code == 400
+
+    def test_portfolio_performance(self, client: TestClient, backend_mysql: MySqlContainer,
+                                   user_1_auth: BearerAuth):
+        """
+        Test that portfolio performance values match history values of the period
+        """
+        with sql_backend_company(backend_mysql), sql_backend_funds(backend_mysql), \
+                sql_backend_security(backend_mysql), sql_backend_last_rate(backend_mysql), \
+                sql_backend_security_rates(backend_mysql), sql_backend_portfolio(backend_mysql), \
+                sql_backend_portfolio_transaction(backend_mysql), sql_backend_portfolio_log(backend_mysql):
+
+            portfolio_id = "6bb05ba3-2b4f-4031-960f-0f20d5244440"
+
+            response = client.get(f"/v1/portfolios/{portfolio_id}/historyValues?"
+                                  f"startDate=2020-06-01&endDate=2020-06-20", auth=user_1_auth)
+            assert response.status_code == 200
+            history_values = {x["date"]: Decimal(x["value"]) for x in response.json()}
+
+            response = client.get(f"/v1/portfolios/{portfolio_id}/performance?"
+                                  f"startDate=2020-06-02&endDate=2020-06-20", auth=user_1_auth)
+            assert response.status_code == 200
+            performance = response.json()
+            assert "2020-06-02" == performance["startDate"]
+            assert "2020-06-20" == performance["endDate"]
+            assert round(history_values["2020-06-01"], 2) == Decimal(performance["startValue"])
+            assert round(history_values["2020-06-20"], 2) == Decimal(performance["endValue"])
+            assert performance["timeWeightedReturn"] is not None
+            assert performance["annualizedTimeWeightedReturn"] is None
+
+            response = client.get(f"/v1/portfolios/{portfolio_id}/performance?startDate=2020-06-20", auth=user_1_auth)
+            assert response.status_code == 400
+
+            response = client.get(f"/v1/portfolios/{portfolio_id}/performance?"
+                                  f"startDate=2020-06-20&endDate=2020-06-01", auth=user_1_auth)
+            assert response.status_code == 400
+
+            response = client.get(f"/v1/portfolios/{portfolio_id}/performance?"
+                                  f"startDate=2020-06-02&endDate=2020-06-20")
+            assert response.status_code == 403
+
+    def test_aggregated_history_values(self, client: TestClient, backend_mysql: MySqlContainer,
+                                       user_1_auth: BearerAuth):
+        """
+        Test that aggregated history values equal sum of history values of user's portfolios
+        """
+        portfolio_ids = ["6bb05ba3-2b4f-4031-960f-0f20d5244440", "84da0adf-db11-4be9-8c51-fcebc05a1d4f",
+                         "10b9cf58-669a-492a-9fb4-91e18129916d", "ba4869f3-dff4-409f-9208-69503f88f228"]
+
+        with sql_backend_company(backend_mysql), sql_backend_funds(backend_mysql), \
+                sql_backend_security(backend_mysql), sql_backend_last_rate(backend_mysql), \
+                sql_backend_security_rates(backend_mysql), sql_backend_portfolio(backend_mysql), \
+                sql_backend_portfolio_transaction(backend_mysql), sql_backend_portfolio_log(backend_mysql):
+
+            expected: Dict[str, Decimal] = {}
+            for portfolio_id in portfolio_ids:
+                response = client.get(f"/v1/portfolios/{portfolio_id}/historyValues?"
+                                      f"startDate=2020-06-01&endDate=2020-06-20", auth=user_1_auth)
+                assert response.status_code == 200
+                for value in response.json():
+                    expected[value["date"]] = expected.get(value["date"], Decimal(0)) + Decimal(value["value"])
+
+            response = client.get("/v2/portfolios/historyValues?startDate=2020-06-01&endDate=2020-06-20",
+                                  auth=user_1_auth)
+            assert response.status_code == 200
+            results = response.json()
+            assert 20 == len(results)
+            for result in results:
+                assert round(expected[result["date"]], 4) == round(Decimal(result["value"]), 4)
+
+            response = client.get("/v2/portfolios/historyValues?startDate=2020-06-01&endDate=2020-06-20"
+                                  "&groupBy=COMPANY", auth=user_1_auth)
+            assert response.status_code == 200
+            grouped: Dict[str, Decimal] = {}
+            for result in response.json():
+                assert result["companyId"] is not None
+                grouped[result["date"]] = grouped.get(result["date"], Decimal(0)) + Decimal(result["value"])
+
+            assert expected.keys() == grouped.keys()
+            for value_date, value in grouped.items():
+                assert round(expected[value_date], 4) == round(value, 4)
+
+            response = client.get("/v2/portfolios/historyValues?startDate=2020-06-01&endDate=2020-06-20"
+                                  "&groupBy=PORTFOLIO", auth=user_1_auth)
+            assert response.status_code == 400
+
+            response = client.get("/v2/portfolios/historyValues?startDate=2020-06-01&endDate=2020-06-20")
+            assert response.status_code == 403
+
     def test_list_portfolio_history_values_invalid_id(self, client: TestClient, backend_mysql: MySqlContainer,
                                                       user_1_auth: BearerAuth):
         for invalid_uuid in invalid_uuids:
@@ -537,6 +758,110 @@ class TestPortfolio:
             assert "feebf58a-d382-4645-9855-d7e3f7534103" == shared_portfolio["companyId"]
             assert "SHARED" == shared_portfolio["accessLevel"]
 
+    def test_portfolio_query_counts(self,
+                                    client: TestClient,
+                                    backend_mysql: MySqlContainer,
+                                    user_1_auth: BearerAuth,
+                                    user_3_auth: BearerAuth):
+        """
+        test that portfolio endpoints use a fixed number of queries regardless of the number of companies,
+        portfolios and positions
+        """
+        with sql_backend_company(backend_mysql), sql_backend_funds(backend_mysql), \
+                sql_backend_security(backend_mysql), sql_backend_last_rate(backend_mysql), \
+                sql_backend_portfolio(backend_mysql), sql_backend_portfolio_transaction(backend_mysql), \
+                sql_backend_portfolio_log(backend_mysql), sql_backend_company_access(backend_mysql):
+
+            assert 200 == client.get("/v2/portfolios", auth=user_3_auth).status_code
+
+            for path in ["/v1/portfolios", "/v2/portfolios"]:
+                with QueryCounter() as user_1_counter:
+                    assert 4 == len(client.get(path, auth=user_1_auth).json())
+
+                with QueryCounter() as user_3_counter:
+                    assert 1 == len(client.get(path, auth=user_3_auth).json())
+
+                assert 5 == user_1_counter.count, user_1_counter.statements
+                assert 5 == user_3_counter.count, user_3_counter.statements
+
+            for portfolio_id in ["6bb05ba3-2b4f-4031-960f-0f20d5244440", "84da0adf-db11-4be9-8c51-fcebc05a1d4f"]:
+                with QueryCounter() as counter:
+                    self.get_portfolio(client=client, portfolio_id=portfolio_id, auth=user_1_auth)
+
+                assert 4 == counter.count, counter.statements
+
+    def test_portfolio_value_query_counts(self,
+                                          client: TestClient,
+                                          backend_mysql: MySqlContainer,
+                                          user_1_auth: BearerAuth,
+                                          user_3_auth: BearerAuth):
+        """
+        test that portfolio value, transaction and position endpoints use a fixed number of queries regardless of
+        the number of portfolios, securities, transactions and dates in the result
+        """
+        portfolio_id = "6bb05ba3-2b4f-4031-960f-0f20d5244440"
+        sub_portfolio_id = "84da0adf-db11-4be9-8c51-fcebc05a1d4f"
+
+        with sql_backend_company(backend_mysql), sql_backend_funds(backend_mysql), \
+                sql_backend_security(backend_mysql), sql_backend_last_rate(backend_mysql), \
+                sql_backend_security_rates(backend_mysql), sql_backend_portfolio(backend_mysql), \
+                sql_backend_portfolio_transaction(backend_mysql), sql_backend_portfolio_log(backend_mysql), \
+                sql_backend_company_access(backend_mysql):
+
+            # warm up security catalog and unit value caches
+            assert 200 == client.get("/v1/portfolios/ba4869f3-dff4-409f-9208-69503f88f228/historyValues?"
+                                     "startDate=2020-06-01&endDate=2020-06-20", auth=user_1_auth).status_code
+            assert 200 == client.get(f"/v1/portfolios/{portfolio_id}/positions?date=2020-06-20",
+                                     auth=user_1_auth).status_code
+
+            small, large = self.assert_same_query_count(
+                client=client,
+                small=(f"/v1/portfolios/{portfolio_id}/historyValues?startDate=2020-06-01&endDate=2020-06-02",
+                       user_1_auth),
+                large=(f"/v1/portfolios/{sub_portfolio_id}/historyValues?startDate=2020-06-01&endDate=2020-06-20",
+                       user_1_auth)
+            )
+            assert 2 == len(small) and 20 == len(large)
+
+            small, large = self.assert_same_query_count(
+                client=client,
+                small=("/v2/portfolios/historyValues?startDate=2020-06-01&endDate=2020-06-20", user_3_auth),
+                large=("/v2/portfolios/historyValues?startDate=2020-06-01&endDate=2020-06-20&groupBy=COMPANY",
+                       user_1_auth)
+            )
+            assert len(small) < len(large)
+
+            small, large = self.assert_same_query_count(
+                client=client,
+                small=(f"/v1/portfolios/{portfolio_id}/transactions?startDate=2020-06-03&endDate=2020-06-03",
+                       user_1_auth),
+                large=(f"/v1/portfolios/{portfolio_id}/transactions?startDate=2020-06-03&endDate=2020-06-06",
+                       user_1_auth)
+            )
+            assert 3 == len(small) and 12 == len(large)
+
+            small, large = self.assert_same_query_count(
+                client=client,
+                small=(f"/v1/portfolios/{sub_portfolio_id}/securities", user_1_auth),
+                large=(f"/v1/portfolios/{portfolio_id}/securities", user_1_auth)
+            )
+            assert len(small) < len(large)
+
+            self.assert_same_query_count(
+                client=client,
+                small=(f"/v1/portfolios/{sub_portfolio_id}/summary?startDate=2020-06-01&endDate=2020-06-06",
+                       user_1_auth),
+                large=(f"/v1/portfolios/{portfolio_id}/summary?startDate=1998-01-01&endDate=2020-06-06",
+                       user_1_auth)
+            )
+
+            small, large = self.assert_same_query_count(
+                client=client,
+                small=(f"/v1/portfolios/{portfolio_id}/positions?date=2020-06-01", user_1_auth),
+                large=(f"/v1/portfolios/{portfolio_id}/positions?date=2020-06-06", user_1_auth)
+            )
+            assert 2 == len(small) and 6 == len(large)
+
     def test_list_portfolios_by_company_unauthorized(self,
                                                      client: TestClient,
                                                      backend_mysql: MySqlContainer,
@@ -909,6 +1234,41 @@ class TestPortfolio:
             assert find_response.status_code == 200
             assert find_expected == find_response.json()
 
+            paged_responses = []
+            after = None
+            while True:
+                query = "startDate=2020-06-03&endDate=2020-06-06&maxResults=5"
+                if after:
+                    query = f"{query}&after={after}"
+
+                page_response = client.get(f"/v1/portfolios/{portfolio_id}/transactions?{query}", auth=user_1_auth)
+                assert page_response.status_code == 200
+                page = page_response.json()
+                paged_responses.extend(page)
+
+                if len(page) < 5:
+                    break
+
+                after = page[-1]["id"]
+
+            assert expected_response == paged_responses
+
+            query = "startDate=2020-06-03&endDate=2020-06-06&maxResults=0"
+            zero_response = client.get(f"/v1/portfolios/{portfolio_id}/transactions?{query}", auth=user_1_auth)
+            assert zero_response.status_code == 200
+            assert expected_response == zero_response.json()
+
+            query = "startDate=2020-06-03&endDate=2020-06-06&maxResults=1001"
+            too_many_response = client.get(f"/v1/portfolios/{portfolio_id}/transactions?{query}", auth=user_1_auth)
+            assert too_many_response.status_code == 400
+
+            query = "startDate=2020-06-03&endDate=2020-06-06"
+            export_response = client.get(f"/v1/portfolios/{portfolio_id}/transactionsExport?{query}",
+                                         auth=user_1_auth)
+            assert export_response.status_code == 200
+            assert export_response.headers["content-type"].startswith("application/x-ndjson")
+            assert expected_response == list(map(json.loads, export_response.text.splitlines()))
+
     def test_list_portfolio_transactions_invalid_id(self, client: TestClient, backend_mysql: MySqlContainer,
                                                     user_1_auth: BearerAuth):
         for invalid_uuid in invalid_uuids:
@@ -1051,6 +1411,35 @@ class TestPortfolio:
 
         assert expected_status == response.status_code
 
+    @staticmethod
+    def assert_same_query_count(client: TestClient,
+                                small: Tuple[str, BearerAuth],
+                                large: Tuple[str, BearerAuth]) -> Tuple[Any, Any]:
+        """
+        Assert that two requests of an endpoint with different amounts of data execute the same number of queries.
+
+        Args:
+            client: The test client.
+            small: path and authentication of the request with less data.
+            large: path and authentication of the request with more data.
+
+        Returns:
+            parsed responses of both requests
+        """
+        counters = []
+        results = []
+
+        for path, auth in [small, large]:
+            with QueryCounter() as counter:
+                response = client.get(path, auth=auth)
+
+            assert 200 == response.status_code, path
+            counters.append(counter)
+            results.append(response.json())
+
+        assert counters[0].count == counters[1].count, (counters[0].statements, counters[1].statements)
+        return results[0], results[1]
+
     @staticmethod
     def get_portfolio(client: TestClient, portfolio_id: str, auth: BearerAuth) -> Dict[str, any]:
         """Finds single portfolio from the API
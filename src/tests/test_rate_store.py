@@ -0,0 +1,127 @@
+import os
+import tempfile
+import threading
+
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+from ..utils.rate_store import RateStore, RateStoreWriter
+
+
+class TestRateStore:
+    """
+    Tests for memory-mapped rate store
+    """
+
+    def test_write_and_read(self):
+        """Tests that stored rates are read back exactly when the version matches"""
+        security_1_id = uuid4()
+        security_2_id = uuid4()
+        rates = [(date(1998, 12, 30), Decimal("12.000000")), (date(1999, 1, 4), Decimal("0.564846"))]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rates.bin")
+            assert 2 == RateStoreWriter.write(path=path,
+                                              securities=[(security_1_id, rates), (security_2_id, [])],
+                                              security_count=2,
+                                              headroom_days=10)
+
+            store = RateStore(path=path)
+            try:
+                version = (2, date(1999, 1, 4), Decimal("12.564846"))
+                first_date, values = store.get_rate_values(security_id=security_1_id, version=version)
+
+                assert date(1998, 12, 30).toordinal() == first_date
+                assert [Decimal("12.000000"), None, None, None, None, Decimal("0.564846")] == values
+                assert ["12.000000", "0.564846"] == [str(x) for x in values if x is not None]
+                assert store.is_current(versions={security_1_id: version})
+
+                assert store.get_rate_values(security_id=security_1_id,
+                                             version=(2, date(1999, 1, 4), Decimal("12.564847"))) is None
+                assert store.get_rate_values(security_id=uuid4(), version=version) is None
+                assert not store.is_current(versions={security_1_id: version, uuid4(): version})
+            finally:
+                store.close()
+
+    def test_patch(self):
+        """Tests that patched rates are seen by readers and rates that do not fit make the security stale"""
+        security_id = uuid4()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rates.bin")
+            RateStoreWriter.write(path=path,
+                                  securities=[(security_id, [(date(2022, 1, 3), Decimal("10.5"))])],
+                                  security_count=1,
+                                  headroom_days=3)
+
+            store = RateStore(path=path)
+            try:
+                assert RateStoreWriter.patch(path=path, security_id=security_id, rate_date=date(2022, 1, 5),
+                                             rate_close=Decimal("11.25"))
+                version = (2, date(2022, 1, 5), Decimal("21.75"))
+                assert [Decimal("10.5"), None, Decimal("11.25")] == \
+                    store.get_rate_values(security_id=security_id, version=version)[1]
+
+                assert RateStoreWriter.patch(path=path, security_id=security_id, rate_date=date(2022, 1, 5),
+                                             rate_close=None)
+                assert [Decimal("10.5")] == \
+                    store.get_rate_values(security_id=security_id, version=(1, date(2022, 1, 3), Decimal("10.5")))[1]
+
+                assert not RateStoreWriter.patch(path=path, security_id=security_id, rate_date=date(2022, 2, 1),
+                                                 rate_close=Decimal("12"))
+                assert store.get_rate_values(security_id=security_id,
+                                             version=(1, date(2022, 1, 3), Decimal("10.5"))) is None
+
+                RateStoreWriter.write(path=path,
+                                      securities=[(security_id, [(date(2022, 2, 1), Decimal("12"))])],
+                                      security_count=1,
+                                      headroom_days=3)
+                assert [Decimal("12")] == \
+                    store.get_rate_values(security_id=security_id, version=(1, date(2022, 2, 1), Decimal("12")))[1]
+            finally:
+                store.close()
+
+    def test_remap_during_read(self):
+        """Tests that a reader holding the previous mapping can finish reading after the store file is replaced"""
+        security_id = uuid4()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rates.bin")
+            RateStoreWriter.write(path=path,
+                                  securities=[(security_id, [(date(2022, 1, 3), Decimal("10.5"))])],
+                                  security_count=1,
+                                  headroom_days=3)
+
+            store = RateStore(path=path)
+            entry_found = threading.Event()
+            remapped = threading.Event()
+            results = []
+
+            def read():
+                mapped, entry_offset = store.find_entry(security_id=security_id)
+                entry_found.set()
+                remapped.wait(timeout=10)
+                try:
+                    results.append(RateStore.read_entries(mapped=mapped)[security_id] == entry_offset)
+                except ValueError as e:
+                    results.append(e)
+
+            reader = threading.Thread(target=read)
+            try:
+                reader.start()
+                assert entry_found.wait(timeout=10)
+
+                RateStoreWriter.write(path=path,
+                                      securities=[(security_id, [(date(2022, 2, 1), Decimal("12"))])],
+                                      security_count=1,
+                                      headroom_days=3)
+                assert [Decimal("12")] == \
+                    store.get_rate_values(security_id=security_id, version=(1, date(2022, 2, 1), Decimal("12")))[1]
+
+                remapped.set()
+                reader.join(timeout=10)
+                assert [True] == results
+            finally:
+                remapped.set()
+                store.close()
@@ -0,0 +1,92 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import uuid4
+
+from ..utils import security_catalog as security_catalog_module
+from ..utils.security_catalog import SecurityCatalog
+
+
+class TestSecurityCatalog:
+    """
+    Tests for security catalog
+    """
+
+    @staticmethod
+    def create_row(original_id: str, updated: datetime) -> tuple:
+        """
+        Creates security catalog row
+
+        Args:
+            original_id: original id
+            updated: update time
+
+        Returns: row
+        """
+        return uuid4(), original_id, "EUR", uuid4(), 1, f"{original_id} fi", f"{original_id} sv", \
+            f"{original_id} en", updated
+
+    def test_refresh(self, monkeypatch):
+        """Tests that catalog reads only updated securities and reloads when security count changes"""
+        rows = [self.create_row("PASSIV", datetime(2022, 1, 1)), self.create_row("SEK", datetime(2022, 2, 1))]
+        queries: List[Optional[datetime]] = []
+
+        def list_security_catalog_rows(database, updated_min: Optional[datetime]):
+            queries.append(updated_min)
+            return [row for row in rows if updated_min is None or row[8] >= updated_min]
+
+        monkeypatch.setattr(security_catalog_module.operations, "list_security_catalog_rows",
+                            list_security_catalog_rows)
+        monkeypatch.setattr(security_catalog_module.operations, "count_securities", lambda database: len(rows))
+
+        catalog = SecurityCatalog(name="test-securities", refresh_interval=60, full_reload_interval=600,
+                                  miss_refresh_interval=0)
+
+        assert "SEK" == catalog.find(database=None, security_id=rows[1][0]).original_id
+        assert rows[0][0] == catalog.find_by_original_id(database=None, original_id="PASSIV").id
+        assert [None] == queries
+
+        """Updated security is read incrementally on a miss"""
+        rows[0] = (rows[0][0],) + self.create_row("PASSIV-2", datetime(2022, 3, 1))[1:]
+        assert "PASSIV-2 en" == catalog.find_by_original_id(database=None, original_id="PASSIV-2").name_en
+        assert catalog.find_by_original_id(database=None, original_id="PASSIV") is None
+        assert [None, datetime(2022, 2, 1), datetime(2022, 3, 1)] == queries
+
+        """New security with an older update time is found by full reload after count check"""
+        rows.append(self.create_row("SPILTAN", datetime(2021, 1, 1)))
+        assert {rows[2][0]} == set(catalog.get_securities(database=None, security_ids=[rows[2][0]]).keys())
+        assert [None, datetime(2022, 2, 1), datetime(2022, 3, 1), datetime(2022, 3, 1), None] == queries
+        assert ["PASSIV-2", "SEK", "SPILTAN"] == [x.original_id for x in catalog.list_securities(database=None)]
+        assert {"size": 3, "hits": 4, "misses": 1, "refreshes": 2, "reloads": 2} == catalog.get_stats()
+
+    def test_miss_refresh_interval(self, monkeypatch):
+        """Tests that repeated misses refresh the catalog at most once per miss refresh interval"""
+        rows = [self.create_row("PASSIV", datetime(2022, 1, 1))]
+        queries: List[Optional[datetime]] = []
+
+        def list_security_catalog_rows(database, updated_min: Optional[datetime]):
+            queries.append(updated_min)
+            return [row for row in rows if updated_min is None or row[8] >= updated_min]
+
+        monkeypatch.setattr(security_catalog_module.operations, "list_security_catalog_rows",
+                            list_security_catalog_rows)
+        monkeypatch.setattr(security_catalog_module.operations, "count_securities", lambda database: len(rows))
+
+        now = [1000.0]
+        monkeypatch.setattr(security_catalog_module.time, "monotonic", lambda: now[0])
+
+        catalog = SecurityCatalog(name="test-securities", refresh_interval=60, full_reload_interval=600,
+                                  miss_refresh_interval=5)
+
+        for _ in range(10):
+            assert catalog.find_by_original_id(database=None, original_id="SEK") is None
+            assert catalog.find(database=None, security_id=uuid4()) is None
+            assert {} == catalog.get_securities(database=None, security_ids=[uuid4()])
+
+        assert [None] == queries
+
+        """Security added after the interval is found by the next miss"""
+        rows.append(self.create_row("SEK", datetime(2022, 2, 1)))
+        now[0] += 5
+        assert "SEK" == catalog.find_by_original_id(database=None, original_id="SEK").original_id
+        assert [None, datetime(2022, 1, 1)] == queries
+        assert {"size": 2, "hits": 1, "misses": 30, "refreshes": 1, "reloads": 1} == catalog.get_stats()
@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+
+from ..utils.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """
+    Tests for single flight request coalescing
+    """
+
+    def test_coalesce(self):
+        """Tests that identical concurrent computations are computed once"""
+        single_flight = SingleFlight(name="test-coalesce")
+        computations = []
+
+        def compute(value: int) -> int:
+            computations.append(value)
+            time.sleep(0.2)
+            return value * 2
+
+        async def run():
+            return await asyncio.gather(
+                single_flight.run(("key", 1), compute, 1),
+                single_flight.run(("key", 1), compute, 1),
+                single_flight.run(("key", 1), compute, 1),
+                single_flight.run(("key", 2), compute, 2)
+            )
+
+        assert [2, 2, 2, 4] == asyncio.run(run())
+        assert [1, 2] == sorted(computations)
+        assert {"calls": 4, "hits": 2, "failures": 0, "cancellations": 0, "inFlight": 0} == single_flight.get_stats()
+
+    def test_sequential(self):
+        """Tests that results are not reused after the computation has completed"""
+        single_flight = SingleFlight(name="test-sequential")
+        counter = iter(range(10))
+
+        async def run():
+            first = await single_flight.run("key", lambda: next(counter))
+            second = await single_flight.run("key", lambda: next(counter))
+            return first, second
+
+        assert (0, 1) == asyncio.run(run())
+        assert 0 == single_flight.get_stats()["hits"]
+
+    def test_failure(self):
+        """Tests that failures are raised to all waiting callers"""
+        single_flight = SingleFlight(name="test-failure")
+        def fail():
+            time.sleep(0.2)
+            raise ValueError("failure")
+
+        async def run():
+            return await asyncio.gather(
+                single_flight.run("key", fail),
+                single_flight.run("key", fail),
+                return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, ValueError) for result in results)
+        assert {"calls": 2, "hits": 1, "failures": 1, "cancellations": 0, "inFlight": 0} == single_flight.get_stats()
+
+        with pytest.raises(ValueError):
+            asyncio.run(single_flight.run("key", fail))
+
+    def test_cancel_waiter(self):
+        """Tests that cancelling the caller that started the computation does not fail the other callers"""
+        single_flight = SingleFlight(name="test-cancel-waiter")
+        computations = []
+
+        async def compute() -> str:
+            computations.append(1)
+            await asyncio.sleep(0.2)
+            return "result"
+
+        async def run():
+            leader = asyncio.ensure_future(single_flight.run("key", compute))
+            await asyncio.sleep(0.05)
+            follower = asyncio.ensure_future(single_flight.run("key", compute))
+            await asyncio.sleep(0.05)
+            leader.cancel()
+
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+
+            return await follower
+
+        assert "result" == asyncio.run(run())
+        assert [1] == computations
+        assert {"calls": 2, "hits": 1, "failures": 0, "cancellations": 0, "inFlight": 0} == single_flight.get_stats()
+
+    def test_cancel_all_waiters(self):
+        """Tests that the computation is cancelled when every caller has been cancelled"""
+        single_flight = SingleFlight(name="test-cancel-all-waiters")
+        completed = []
+
+        async def compute() -> str:
+            await asyncio.sleep(0.2)
+            completed.append(1)
+            return "result"
+
+        async def run():
+            callers = [asyncio.ensure_future(single_flight.run("key", compute)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+
+            for caller in callers:
+                caller.cancel()
+
+            await asyncio.gather(*callers, return_exceptions=True)
+            await asyncio.sleep(0.3)
+            return await single_flight.run("key", lambda: "next")
+
+        assert "next" == asyncio.run(run())
+        assert [] == completed
+        assert {"calls": 3, "hits": 1, "failures": 0, "cancellations": 1, "inFlight": 0} == single_flight.get_stats()
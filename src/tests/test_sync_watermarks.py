@@ -0,0 +1,336 @@
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..database import operations
+from ..database.models import Security, SecurityRate, SyncWatermark
+from ..commands.migration_tasks import MigrateSecurityRatesTask, RATES_FIRST_DATE
+from ..sync_handler import handler as handler_module
+from ..sync_handler.handler import SyncHandler, SECURITY_RATES_WATERMARK_TASK
+from ..utils.security_catalog import CatalogSecurity
+
+
+class TestSecurityRatesWatermarks:
+    """
+    Tests for security rates migration watermark skip logic
+    """
+
+    @staticmethod
+    def create_task(monkeypatch,
+                    security,
+                    watermark: Optional[SimpleNamespace],
+                    backend_state: Optional[Tuple[date, int]],
+                    funds_state: Tuple[datetime, int],
+                    created_count: int,
+                    calls: list,
+                    versioned: bool = True) -> MigrateSecurityRatesTask:
+        """
+        Creates security rates task with faked database access
+
+        Args:
+            monkeypatch: monkeypatch fixture
+            security: migrated security
+            watermark: watermark of the security or None
+            backend_state: last rate date and rate count in the backend or None
+            funds_state: last rate date and rate count in the funds database
+            created_count: count of rates created by incremental migration
+            calls: list where migration calls are added
+            versioned: whether the security has a maintained rate version
+
+        Returns: task
+        """
+        task = MigrateSecurityRatesTask()
+        funds_summary = SimpleNamespace(LAST_DATE=funds_state[0], ROW_COUNT=funds_state[1])
+
+        def migrate_security_rates(security, funds_session, backend_session, last_backend_date, timeout,
+                                   force_recheck):
+            calls.append(("migrate", last_backend_date, force_recheck))
+            return 0 if force_recheck else created_count
+
+        def delete_removed_security_rates(security, funds_session, backend_session):
+            calls.append(("delete",))
+            return 0
+
+        def update_watermark(backend_session, security, source_updated, row_count):
+            calls.append(("watermark", source_updated, row_count))
+
+        def update_rate_version(backend_session, security):
+            calls.append(("version",))
+
+        monkeypatch.setattr(task, "get_funds_database_engine", lambda: create_engine("sqlite://"))
+        monkeypatch.setattr(task, "get_funds_rate_summaries", lambda funds_session: {"PASSIVE": funds_summary})
+        monkeypatch.setattr(task, "get_watermarks", lambda backend_session: {security.id: watermark} if watermark
+                            else {})
+        monkeypatch.setattr(task, "get_backend_rate_states", lambda backend_session: {security.id: backend_state}
+                            if backend_state else {})
+        monkeypatch.setattr(task, "list_securities", lambda backend_session: [security])
+        monkeypatch.setattr(task, "migrate_security_rates", migrate_security_rates)
+        monkeypatch.setattr(task, "delete_removed_security_rates", delete_removed_security_rates)
+        monkeypatch.setattr(task, "update_watermark", update_watermark)
+        monkeypatch.setattr(task, "get_rate_version_security_ids", lambda backend_session: {security.id}
+                            if versioned else set())
+        monkeypatch.setattr(task, "update_rate_version", update_rate_version)
+
+        return task
+
+    @pytest.mark.parametrize("watermark_state, backend_state, funds_state, created_count, expected_calls", [
+        ((datetime(2022, 1, 10), 10), None, (datetime(2022, 1, 10), 10), 0, []),
+        ((datetime(2022, 1, 10), 10), None, (datetime(2022, 1, 12), 12), 2, [
+            ("migrate", date(2022, 1, 10), False),
+            ("version",),
+            ("watermark", datetime(2022, 1, 12), 12)
+        ]),
+        ((datetime(2022, 1, 10), 10), None, (datetime(2022, 1, 10), 11), 0, [
+            ("migrate", RATES_FIRST_DATE, True),
+            ("delete",),
+            ("version",),
+            ("watermark", datetime(2022, 1, 10), 11)
+        ]),
+        ((datetime(2022, 1, 10), 10), None, (datetime(2022, 1, 10), 9), 0, [
+            ("migrate", RATES_FIRST_DATE, True),
+            ("delete",),
+            ("version",),
+            ("watermark", datetime(2022, 1, 10), 9)
+        ]),
+        ((datetime(2022, 1, 10), 10), None, (datetime(2022, 1, 12), 13), 2, [
+            ("migrate", date(2022, 1, 10), False),
+            ("migrate", RATES_FIRST_DATE, True),
+            ("delete",),
+            ("version",),
+            ("watermark", datetime(2022, 1, 12), 13)
+        ]),
+        (None, (date(2022, 1, 10), 10), (datetime(2022, 1, 10), 10), 0, [
+            ("version",),
+            ("watermark", datetime(2022, 1, 10), 10)
+        ]),
+        (None, (date(2022, 1, 10), 8), (datetime(2022, 1, 10), 10), 0, [
+            ("migrate", RATES_FIRST_DATE, True),
+            ("delete",),
+            ("version",),
+            ("watermark", datetime(2022, 1, 10), 10)
+        ]),
+        (None, None, (datetime(2022, 1, 10), 3), 3, [
+            ("migrate", RATES_FIRST_DATE, False),
+            ("version",),
+            ("watermark", datetime(2022, 1, 10), 3)
+        ])
+    ])
+    def test_migrate(self, monkeypatch, watermark_state, backend_state, funds_state, created_count, expected_calls):
+        """Tests that securities are skipped, migrated incrementally or rechecked according to watermarks"""
+        security = SimpleNamespace(id=uuid4(), original_id="PASSIVE")
+        watermark = SimpleNamespace(source_updated=watermark_state[0], row_count=watermark_state[1]) \
+            if watermark_state else None
+        calls: List[tuple] = []
+
+        task = self.create_task(monkeypatch=monkeypatch,
+                                security=security,
+                                watermark=watermark,
+                                backend_state=backend_state,
+                                funds_state=funds_state,
+                                created_count=created_count,
+                                calls=calls)
+
+        task.migrate(backend_session=None, timeout=datetime(2100, 1, 1), force_recheck=False)
+
+        assert expected_calls == calls
+
+    def test_migrate_without_rate_version(self, monkeypatch):
+        """Tests that rate version is created for a security whose rates are otherwise up-to-date"""
+        security = SimpleNamespace(id=uuid4(), original_id="PASSIVE")
+        watermark = SimpleNamespace(source_updated=datetime(2022, 1, 10), row_count=10)
+        calls: List[tuple] = []
+
+        task = self.create_task(monkeypatch=monkeypatch,
+                                security=security,
+                                watermark=watermark,
+                                backend_state=None,
+                                funds_state=(datetime(2022, 1, 10), 10),
+                                created_count=0,
+                                calls=calls,
+                                versioned=False)
+
+        task.migrate(backend_session=None, timeout=datetime(2100, 1, 1), force_recheck=False)
+
+        assert [("version",)] == calls
+
+
+class TestSyncHandlerWatermarks:
+    """
+    Tests for security rates watermark maintenance in the sync handler
+    """
+
+    @staticmethod
+    def mock_operations(monkeypatch, watermark: Optional[SimpleNamespace], calls: list):
+        """
+        Replaces watermark database operations with fakes
+
+        Args:
+            monkeypatch: monkeypatch fixture
+            watermark: existing watermark or None
+            calls: list where watermark changes are added
+        """
+        monkeypatch.setattr(handler_module.operations, "find_sync_watermark", lambda **kwargs: watermark)
+        monkeypatch.setattr(handler_module.operations, "upsert_sync_watermark",
+                            lambda **kwargs: calls.append(("upsert", kwargs["task"], kwargs["source_updated"],
+                                                           kwargs["row_count"])))
+        monkeypatch.setattr(handler_module.operations, "delete_sync_watermarks",
+                            lambda **kwargs: calls.append(("delete", kwargs["task"], kwargs["security_ids"])))
+
+    @staticmethod
+    def create_security() -> CatalogSecurity:
+        return CatalogSecurity(id=uuid4(), original_id="PASSIVE", currency="EUR", fund_id=None, series_id=None,
+                               name_fi="fi", name_sv="sv", name_en="en", updated=None)
+
+    def test_advance(self, monkeypatch):
+        """Tests that created rates advance the watermark date and count"""
+        calls = []
+        watermark = SimpleNamespace(source_updated=datetime(2022, 1, 10), row_count=10)
+        self.mock_operations(monkeypatch=monkeypatch, watermark=watermark, calls=calls)
+        security = self.create_security()
+
+        SyncHandler.advance_security_rates_watermark(session=None, security=security, rate_date=date(2022, 1, 11))
+        SyncHandler.advance_security_rates_watermark(session=None, security=security, rate_date=date(2021, 6, 1))
+
+        assert [("upsert", SECURITY_RATES_WATERMARK_TASK, datetime(2022, 1, 11), 11),
+                ("upsert", SECURITY_RATES_WATERMARK_TASK, datetime(2022, 1, 10), 11)] == calls
+
+    def test_advance_without_watermark(self, monkeypatch):
+        """Tests that securities without a watermark are left for the migration"""
+        calls = []
+        self.mock_operations(monkeypatch=monkeypatch, watermark=None, calls=calls)
+
+        SyncHandler.advance_security_rates_watermark(session=None, security=self.create_security(),
+                                                     rate_date=date(2022, 1, 11))
+        SyncHandler.retreat_security_rates_watermark(session=None, security=self.create_security(),
+                                                     rate_date=date(2022, 1, 11))
+
+        assert [] == calls
+
+    def test_retreat(self, monkeypatch):
+        """Tests that deleting an older rate decreases the count and deleting the latest removes the watermark"""
+        calls = []
+        watermark = SimpleNamespace(source_updated=datetime(2022, 1, 10), row_count=10)
+        self.mock_operations(monkeypatch=monkeypatch, watermark=watermark, calls=calls)
+        security = self.create_security()
+
+        SyncHandler.retreat_security_rates_watermark(session=None, security=security, rate_date=date(2022, 1, 3))
+        SyncHandler.retreat_security_rates_watermark(session=None, security=security, rate_date=date(2022, 1, 10))
+
+        assert [("upsert", SECURITY_RATES_WATERMARK_TASK, datetime(2022, 1, 10), 9),
+                ("delete", SECURITY_RATES_WATERMARK_TASK, [security.id])] == calls
+
+
+class TestSyncWatermarkOperations:
+    """
+    Tests for synchronization watermark database operations
+    """
+
+    def test_task_watermark_unique(self):
+        """Tests that task level watermarks are unique although they have no security id"""
+        engine = create_engine("sqlite://")
+        SyncWatermark.metadata.create_all(engine, tables=[Security.__table__, SyncWatermark.__table__])
+
+        with Session(engine) as session:
+            operations.upsert_sync_watermark(database=session, task="authorization", security_id=None,
+                                             source_updated=None, row_count=1)
+            session.commit()
+            operations.upsert_sync_watermark(database=session, task="authorization", security_id=None,
+                                             source_updated=None, row_count=2)
+            session.commit()
+
+            assert [2] == [x.row_count for x in operations.list_sync_watermarks(database=session,
+                                                                                  task="authorization")]
+
+            session.add(SyncWatermark(task="authorization", scope=operations.SYNC_WATERMARK_TASK_SCOPE,
+                                      updated=datetime.now()))
+
+            with pytest.raises(IntegrityError):
+                session.commit()
+
+    def test_security_rate_version(self):
+        """Tests that rate version revision changes when rates up to the last rate date change"""
+        engine = create_engine("sqlite://")
+        SyncWatermark.metadata.create_all(engine, tables=[Security.__table__, SecurityRate.__table__,
+                                                          SyncWatermark.__table__])
+
+        with Session(engine) as session:
+            security = Security(id=uuid4(), original_id="PASSIVE", currency="EUR", name_fi="fi", name_sv="sv",
+                                name_en="en", updated=datetime(2022, 1, 1))
+            session.add(security)
+            rates = [SecurityRate(id=uuid4(), security_id=security.id, rate_date=date(2022, 1, day),
+                                  rate_close=Decimal(day)) for day in range(3, 6)]
+            session.add_all(rates)
+
+            def refresh():
+                operations.refresh_security_rate_version(database=session, security_id=security.id)
+                session.commit()
+                return operations.get_security_rate_versions(database=session, security_ids=[security.id]), \
+                    [x.revision for x in operations.list_security_rate_versions(database=session,
+                                                                                security_ids=[security.id])]
+
+            assert ({security.id: (3, date(2022, 1, 5), Decimal(12))}, [0]) == refresh()
+
+            """Appended rates do not change the revision"""
+            session.add(SecurityRate(id=uuid4(), security_id=security.id, rate_date=date(2022, 1, 6),
+                                     rate_close=Decimal(6)))
+            assert ({security.id: (4, date(2022, 1, 6), Decimal(18))}, [0]) == refresh()
+
+            """Updated, inserted and deleted earlier rates do"""
+            rates[0].rate_close = Decimal(4)
+            assert ({security.id: (4, date(2022, 1, 6), Decimal(19))}, [1]) == refresh()
+
+            session.add(SecurityRate(id=uuid4(), security_id=security.id, rate_date=date(2022, 1, 2),
+                                     rate_close=Decimal(1)))
+            assert ({security.id: (5, date(2022, 1, 6), Decimal(20))}, [2]) == refresh()
+
+            session.query(SecurityRate).filter(SecurityRate.rate_date == date(2022, 1, 6)).delete()
+            assert ({security.id: (4, date(2022, 1, 5), Decimal(14))}, [3]) == refresh()
+
+            session.query(SecurityRate).delete()
+            assert ({}, []) == refresh()
+
+    def test_security_rate_version_change(self):
+        """Tests that incremental rate version updates match versions recalculated from the rates"""
+        engine = create_engine("sqlite://")
+        SyncWatermark.metadata.create_all(engine, tables=[Security.__table__, SecurityRate.__table__,
+                                                          SyncWatermark.__table__])
+
+        with Session(engine) as session:
+            security = Security(id=uuid4(), original_id="PASSIVE", currency="EUR", name_fi="fi", name_sv="sv",
+                                name_en="en", updated=datetime(2022, 1, 1))
+            session.add(security)
+            session.add_all([SecurityRate(id=uuid4(), security_id=security.id, rate_date=date(2022, 1, day),
+                                          rate_close=Decimal(day)) for day in range(3, 6)])
+            operations.refresh_security_rate_version(database=session, security_id=security.id)
+            session.commit()
+
+            def get_version():
+                return [(x.row_count, x.source_updated, x.value_sum, x.revision)
+                        for x in operations.list_security_rate_versions(database=session,
+                                                                        security_ids=[security.id])]
+
+            def change(rate_date: date, previous_close: Optional[Decimal], rate_close: Decimal):
+                operations.apply_security_rate_version_change(database=session,
+                                                              security_id=security.id,
+                                                              rate_date=rate_date,
+                                                              previous_close=previous_close,
+                                                              rate_close=rate_close)
+                session.commit()
+                return get_version()
+
+            """Appended rate does not change the revision"""
+            assert [(4, datetime(2022, 1, 6), Decimal(18), 0)] == change(date(2022, 1, 6), None, Decimal(6))
+
+            """Unchanged rate does not change the version"""
+            assert [(4, datetime(2022, 1, 6), Decimal(18), 0)] == change(date(2022, 1, 3), Decimal(3), Decimal(3))
+
+            """Updated and inserted earlier rates do"""
+            assert [(4, datetime(2022, 1, 6), Decimal(19), 1)] == change(date(2022, 1, 3), Decimal(3), Decimal(4))
+            assert [(5, datetime(2022, 1, 6), Decimal(20), 2)] == change(date(2022, 1, 2), None, Decimal(1))
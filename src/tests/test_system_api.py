@@ -1,6 +1,9 @@
 from .fixtures.client import *  # noqa
+from .fixtures.users import *  # noqa
 from .fixtures.backend_mysql import *  # noqa
 
+from .constants import invalid_auths
+
 
 class TestSystem:
     """Tests for system endpoints"""
@@ -9,3 +12,15 @@ class TestSystem:
         response = client.get("/v1/system/ping")
         assert response.status_code == 200
         assert response.json() == "pong"
+
+    def test_get_metrics_without_metrics_role(self, client: TestClient, keycloak: KeycloakContainer,
+                                              user_1_auth: BearerAuth):
+        """Tests that metrics are not available for users without metrics role"""
+        response = client.get("/v1/system/metrics", auth=user_1_auth)
+        assert response.status_code == 403
+
+    @pytest.mark.parametrize("auth", invalid_auths)
+    def test_get_metrics_invalid_auth(self, client: TestClient, keycloak: KeycloakContainer, auth: BearerAuth):
+        """Tests that metrics are not available without a valid token"""
+        response = client.get("/v1/system/metrics", auth=auth)
+        assert response.status_code == 403
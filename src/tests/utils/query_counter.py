@@ -0,0 +1,47 @@
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    """
+    Context manager that counts SQL statements executed by any engine while it is active.
+
+    Usage:
+        with QueryCounter() as counter:
+            client.get(...)
+
+        assert 5 == counter.count
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.count = 0
+        self.statements = []
+        self.lock = threading.Lock()
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(Engine, "before_cursor_execute", self.before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        event.remove(Engine, "before_cursor_execute", self.before_cursor_execute)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        """
+        Counts executed statement
+
+        Args:
+            conn: connection
+            cursor: DBAPI cursor
+            statement: SQL statement
+            parameters: statement parameters
+            context: execution context
+            executemany: whether statement is executed with multiple parameter sets
+        """
+        with self.lock:
+            self.count += 1
+            self.statements.append(statement)
@@ -0,0 +1,198 @@
+from typing import Dict, Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+SUPPORTED_ENCODINGS = ["br", "gzip"]
+
+
+def weaken_etag(headers: MutableHeaders):
+    """
+    Marks ETag of a re-encoded response weak, as the encoded body is not byte for byte the representation
+    the ETag was created for
+
+    Args:
+        headers: response headers
+    """
+    etag = headers.get("etag")
+    if etag is not None and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with brotli or gzip depending on the Accept-Encoding request header.
+    The encoding with the highest quality value is used and brotli is preferred on ties. Responses smaller than
+    minimum size are sent uncompressed.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, gzip_level: int, brotli_quality: int):
+        """
+        Constructor
+        Args:
+            app: ASGI application
+            minimum_size: minimum response size in bytes to be compressed
+            gzip_level: gzip compression level (1-9)
+            brotli_quality: brotli compression quality (0-11)
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            accept_encoding = Headers(scope=scope).get("Accept-Encoding", "")
+            encoding = self.select_encoding(self.get_accepted_encodings(accept_encoding))
+
+            if encoding == "br":
+                responder = BrotliResponder(app=self.app, minimum_size=self.minimum_size, quality=self.brotli_quality)
+                await responder(scope, receive, send)
+                return
+
+            if encoding == "gzip":
+                responder = WeakETagGZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+                await responder(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def select_encoding(encodings: Dict[str, float]) -> Optional[str]:
+        """
+        Selects response encoding. Encodings not listed get the quality of the "*" entry. Response is not compressed
+        when identity encoding is explicitly preferred over the supported encodings.
+
+        Args:
+            encodings: accepted encodings with their quality values
+
+        Returns: selected encoding or None if response should not be compressed
+        """
+        default_quality = encodings.get("*", 0.0)
+        selected, selected_quality = None, 0.0
+
+        for encoding in SUPPORTED_ENCODINGS:
+            quality = encodings.get(encoding, default_quality)
+            if quality > selected_quality:
+                selected, selected_quality = encoding, quality
+
+        if selected is not None and encodings.get("identity", 0.0) > selected_quality:
+            return None
+
+        return selected
+
+    @staticmethod
+    def get_accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+        """
+        Parses Accept-Encoding header. Encodings with zero quality are kept, so that they can override "*".
+
+        Args:
+            accept_encoding: Accept-Encoding header value
+
+        Returns: listed encodings with their quality values
+        """
+        result: Dict[str, float] = {}
+
+        for part in accept_encoding.split(","):
+            encoding, _, parameters = part.strip().partition(";")
+            encoding = encoding.strip().lower()
+            if not encoding:
+                continue
+
+            quality = 1.0
+            parameter_name, _, parameter_value = parameters.strip().partition("=")
+            if parameter_name.strip() == "q":
+                try:
+                    quality = float(parameter_value)
+                except ValueError:
+                    quality = 0.0
+
+            result[encoding] = quality
+
+        return result
+
+
+class BrotliResponder:
+    """
+    Compresses response body with brotli. Streaming responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int):
+        """
+        Constructor
+        Args:
+            app: ASGI application
+            minimum_size: minimum response size in bytes to be compressed
+            quality: brotli compression quality (0-11)
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compressor = brotli.Compressor(quality=quality)
+        self.send: Send = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.compressing = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_with_brotli)
+
+    async def send_with_brotli(self, message: Message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Headers are sent with the first body message when it's known whether the response is compressed
+            self.initial_message = message
+        elif message_type == "http.response.body" and not self.started:
+            self.started = True
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+
+            if "content-encoding" in headers or (len(body) < self.minimum_size and not more_body):
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            self.compressing = True
+            headers["Content-Encoding"] = "br"
+            weaken_etag(headers)
+            headers.add_vary_header("Accept-Encoding")
+
+            if more_body:
+                del headers["Content-Length"]
+                message["body"] = self.compressor.process(body) + self.compressor.flush()
+            else:
+                message["body"] = self.compressor.process(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(message["body"]))
+
+            await self.send(self.initial_message)
+            await self.send(message)
+        elif message_type == "http.response.body" and self.compressing:
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if more_body:
+                message["body"] = self.compressor.process(body) + self.compressor.flush()
+            else:
+                message["body"] = self.compressor.process(body) + self.compressor.finish()
+
+            await self.send(message)
+        else:
+            await self.send(message)
+
+
+class WeakETagGZipResponder(GZipResponder):
+    """
+    Gzip responder that marks ETag weak when the response is compressed
+    """
+
+    async def send_with_gzip(self, message: Message):
+        if message["type"] == "http.response.body" and not self.started:
+            body = message.get("body", b"")
+            if len(body) >= self.minimum_size or message.get("more_body", False):
+                weaken_etag(MutableHeaders(raw=self.initial_message["headers"]))
+
+        await super().send_with_gzip(message)
@@ -0,0 +1,236 @@
+import hashlib
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+RATE_ACTIVE_DAYS = 30
+DIGEST_SIZE = 10
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class HistoryValidator:
+    """
+    Strong validator of a history value series, sent to clients as ETag.
+
+    The series digest covers the request parameters, the relevant portfolio logs and the rate versions of held
+    securities, so it changes whenever any value of the series may change. The remaining parts describe the state
+    the client's values were calculated from, so that an incremental request can tell which of them are still valid:
+
+    - end date of the series
+    - count and latest update time of the portfolio logs of the series
+    - rate date, up to which all active securities had rates, and digest of the rates up to it. Later days may have
+      been forward filled from earlier rates and change when the rates of the day arrive
+    """
+
+    def __init__(self,
+                 key_digest: str,
+                 series_digest: str,
+                 end_date: date,
+                 log_count: int,
+                 log_updated: Optional[datetime],
+                 rate_date: Optional[date],
+                 rate_digest: str):
+        """
+        Constructor
+        Args:
+            key_digest: digest of request parameters excluding the end date
+            series_digest: digest of everything the series depends on
+            end_date: last date of the series
+            log_count: number of portfolio logs the series was calculated from
+            log_updated: latest update time of the portfolio logs
+            rate_date: date up to which all active securities had rates
+            rate_digest: digest of the rates up to rate date
+        """
+        self.key_digest = key_digest
+        self.series_digest = series_digest
+        self.end_date = end_date
+        self.log_count = log_count
+        self.log_updated = log_updated
+        self.rate_date = rate_date
+        self.rate_digest = rate_digest
+
+    @staticmethod
+    def create(key: Tuple,
+               end_date: date,
+               logs: List[Tuple[date, datetime]],
+               rate_versions: Dict[UUID, Tuple],
+               rate_date: Optional[date],
+               rate_date_versions: Dict[UUID, Tuple]) -> "HistoryValidator":
+        """
+        Creates validator of a history series
+
+        Args:
+            key: request parameters excluding the end date
+            end_date: last date of the series
+            logs: transaction dates and update times of the portfolio logs of the series
+            rate_versions: rate versions of held securities
+            rate_date: rate date resolved with get_rate_date
+            rate_date_versions: rate versions of held securities up to rate date resolved with get_settled_versions
+
+        Returns: validator
+        """
+        log_updated = max((x[1] for x in logs), default=None)
+        key_digest = HistoryValidator.digest(key)
+
+        return HistoryValidator(
+            key_digest=key_digest,
+            series_digest=HistoryValidator.digest(key_digest, end_date, len(logs), log_updated,
+                                                  sorted(rate_versions.items())),
+            end_date=end_date,
+            log_count=len(logs),
+            log_updated=log_updated,
+            rate_date=rate_date,
+            rate_digest=HistoryValidator.digest(sorted(rate_date_versions.items()))
+        )
+
+    @staticmethod
+    def get_rate_date(rate_versions: Dict[UUID, Tuple]) -> Optional[date]:
+        """
+        Returns the date up to which all active securities have rates. Securities without rates for
+        RATE_ACTIVE_DAYS before the latest rate are not expected to get new rates and are ignored.
+
+        Args:
+            rate_versions: rate versions of held securities
+
+        Returns: rate date or None if there are no rates
+        """
+        last_dates = [x[1] for x in rate_versions.values()]
+        if not last_dates:
+            return None
+
+        active_since = max(last_dates) - timedelta(days=RATE_ACTIVE_DAYS)
+        return min(x for x in last_dates if x >= active_since)
+
+    @staticmethod
+    def get_settled_versions(rate_versions: Dict[UUID, Tuple], rate_date: Optional[date]) -> Dict[UUID, Tuple]:
+        """
+        Returns versions of the rates of held securities up to a rate date. Revision of a security changes when its
+        rates up to its last rate date change, while added later rates only move the last rate date, which matters up
+        to the rate date.
+
+        Args:
+            rate_versions: rate count, last rate date, sum of close rates and revision of held securities
+            rate_date: rate date or None if securities had no rates
+
+        Returns: rate revision and last rate date capped to rate date by security id
+        """
+        if rate_date is None:
+            return {}
+
+        return {security_id: (version[3], min(version[1], rate_date)) for security_id, version in rate_versions.items()}
+
+    def get_valid_until(self,
+                        key: Tuple,
+                        logs: List[Tuple[date, datetime]],
+                        rate_date_versions: Dict[UUID, Tuple]) -> Optional[date]:
+        """
+        Resolves the first day whose value may have changed after this validator was created.
+
+        Logs updated after the validator move the day to their transaction date. Removed or updated logs move it
+        to the start of the series, because their original transaction date is not known.
+
+        Args:
+            key: request parameters excluding the end date
+            logs: transaction dates and update times of current portfolio logs
+            rate_date_versions: current rate versions of held securities up to rate date of this validator
+
+        Returns: first day that may have changed, day after the end date if none has, or None if all values of
+            the series may have changed
+        """
+        if self.key_digest != self.digest(key) or self.rate_digest != self.digest(sorted(rate_date_versions.items())):
+            return None
+
+        logs = [x for x in logs if x[0] <= self.end_date]
+        unchanged = [x for x in logs if self.log_updated is not None and x[1] <= self.log_updated]
+        if len(unchanged) != self.log_count:
+            return None
+
+        changed_dates = [x[0] for x in logs if self.log_updated is None or x[1] > self.log_updated]
+        after_end_date = self.end_date + timedelta(days=1)
+        first_unsettled = self.rate_date + timedelta(days=1) if self.rate_date is not None else after_end_date
+
+        return min(changed_dates + [first_unsettled, after_end_date])
+
+    def to_etag(self) -> str:
+        """
+        Returns validator as ETag header value
+
+        Returns: quoted ETag value
+        """
+        log_updated = (self.log_updated - EPOCH) // MICROSECOND if self.log_updated is not None else 0
+        rate_date = self.rate_date.toordinal() if self.rate_date is not None else 0
+
+        return f'"{self.key_digest}.{self.series_digest}.{self.end_date.toordinal()}.{self.log_count}.' \
+               f'{log_updated}.{rate_date}.{self.rate_digest}"'
+
+    @staticmethod
+    def from_etag(value: Optional[str]) -> Optional["HistoryValidator"]:
+        """
+        Parses validator from If-None-Match header value
+
+        Args:
+            value: header value
+
+        Returns: validator or None if header is missing or does not contain a history validator
+        """
+        if not value:
+            return None
+
+        for etag in value.split(","):
+            """Compressed responses have weak ETags, and If-None-Match uses weak comparison"""
+            etag = etag.strip().removeprefix("W/")
+            if not (len(etag) > 1 and etag[0] == '"' and etag[-1] == '"'):
+                continue
+
+            try:
+                key_digest, series_digest, end_date, log_count, log_updated, rate_date, rate_digest = \
+                    etag[1:-1].split(".")
+
+                return HistoryValidator(
+                    key_digest=key_digest,
+                    series_digest=series_digest,
+                    end_date=date.fromordinal(int(end_date)),
+                    log_count=int(log_count),
+                    log_updated=EPOCH + int(log_updated) * MICROSECOND if int(log_updated) else None,
+                    rate_date=date.fromordinal(int(rate_date)) if int(rate_date) else None,
+                    rate_digest=rate_digest
+                )
+            except (ValueError, OverflowError):
+                continue
+
+        return None
+
+    @staticmethod
+    def digest(*values: Any) -> str:
+        """
+        Returns short digest of values
+
+        Args:
+            *values: values with stable string representations
+
+        Returns: hex digest
+        """
+        return hashlib.blake2b(repr(values).encode("utf-8"), digest_size=DIGEST_SIZE).hexdigest()
+
+
+class HistoryValidation:
+    """
+    Result of validating history values held by a client against the current state
+    """
+
+    def __init__(self, validator: HistoryValidator, not_modified: bool, values_start: date,
+                 invalidated: Optional[bool]):
+        """
+        Constructor
+        Args:
+            validator: validator of the current series
+            not_modified: whether client already has the current series
+            values_start: first date of values to be returned
+            invalidated: whether client must discard values before since date. None when since date is not given
+        """
+        self.validator = validator
+        self.not_modified = not_modified
+        self.values_start = values_start
+        self.invalidated = invalidated
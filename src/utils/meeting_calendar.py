@@ -0,0 +1,120 @@
+import os
+import threading
+
+from csv import reader
+from datetime import date, datetime, time, timedelta
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+import pytz
+
+from config.settings import Settings
+
+LOCAL_TIMEZONE = 'Europe/Helsinki'
+LAST_SLOT_START = time(hour=16, minute=30)
+LAST_SLOT_END = time(hour=17, minute=30)
+OFFSET_REFERENCE_TIME = time(hour=12)
+
+
+class HolidayCalendar:
+    """
+    Holidays read from the CSV file named by HOLIDAYS_CSV environment variable. The file is parsed once and
+    parsed again only when its modification time or size changes.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.lock = threading.Lock()
+        self.version: Optional[Tuple[str, int, int]] = None
+        self.holidays: FrozenSet[date] = frozenset()
+
+    def get_holidays(self) -> FrozenSet[date]:
+        """
+        Returns holidays, reloading the file if it has changed
+
+        Returns: holiday dates
+        """
+        path = os.environ["HOLIDAYS_CSV"]
+        stat = os.stat(path)
+        version = (path, stat.st_mtime_ns, stat.st_size)
+
+        if version == self.version:
+            return self.holidays
+
+        with self.lock:
+            if version != self.version:
+                self.holidays = self.load_holidays(path=path)
+                self.version = version
+
+            return self.holidays
+
+    @staticmethod
+    def load_holidays(path: str) -> FrozenSet[date]:
+        """
+        Parses holidays from the first row of a CSV file
+
+        Args:
+            path: CSV file path
+
+        Returns: holiday dates
+        """
+        with open(path) as csv_file:
+            row = next(reader(csv_file, delimiter=","), [])
+
+        return frozenset(date.fromisoformat(value.strip()) for value in row if value.strip())
+
+
+class MeetingCalendar:
+    """
+    Available meeting slots. Slots of each weekday are precomputed as local times, so listing slots only filters
+    out weekends and holidays and attaches the UTC offset of the day. Offset is resolved once per day, because
+    daylight saving time changes at night, outside the meeting hours.
+    """
+
+    def __init__(self, holiday_calendar: HolidayCalendar, meeting_hours: Iterable[int]):
+        """
+        Constructor
+        Args:
+            holiday_calendar: holiday calendar
+            meeting_hours: starting hours of hour-long meetings
+        """
+        self.holiday_calendar = holiday_calendar
+        self.timezone = pytz.timezone(LOCAL_TIMEZONE)
+
+        slots = tuple((time(hour=hour), time(hour=hour + 1)) for hour in meeting_hours) + \
+            ((LAST_SLOT_START, LAST_SLOT_END),)
+
+        self.weekday_slots: Tuple[Tuple[Tuple[time, time], ...], ...] = tuple(
+            slots if weekday < 5 else () for weekday in range(7)
+        )
+
+    def list_slots(self, start_date: date, end_date: date) -> List[Tuple[datetime, datetime]]:
+        """
+        Lists meeting slots between given dates
+
+        Args:
+            start_date: first date
+            end_date: last date
+
+        Returns: slot start and end times in local timezone
+        """
+        holidays = self.holiday_calendar.get_holidays()
+        result = []
+        slot_date = start_date
+
+        while slot_date <= end_date:
+            slots = self.weekday_slots[slot_date.weekday()]
+
+            if slots and slot_date not in holidays:
+                tzinfo = self.timezone.localize(datetime.combine(slot_date, OFFSET_REFERENCE_TIME)).tzinfo
+                result.extend((datetime.combine(slot_date, start, tzinfo=tzinfo),
+                               datetime.combine(slot_date, end, tzinfo=tzinfo)) for start, end in slots)
+
+            slot_date += timedelta(days=1)
+
+        return result
+
+
+meeting_calendar = MeetingCalendar(holiday_calendar=HolidayCalendar(),
+                                   meeting_hours=Settings().MEETING_TIME_PERIOD)
@@ -2,9 +2,8 @@ from dataclasses import dataclass
 from decimal import Decimal
 from sqlalchemy.orm import Session
 from database import operations
-from database.models import Portfolio
 from uuid import UUID
-from typing import List
+from typing import Dict, List
 from utils.currency_utils import CurrencyUtils
 
 
@@ -28,17 +27,18 @@ class PortfolioValues:
 class PortfolioUtils:
 
     @staticmethod
-    def get_portfolio_values(database: Session, portfolio: Portfolio) -> PortfolioValues:
+    def get_portfolio_values(database: Session, portfolio_id: UUID) -> PortfolioValues:
         """
         Returns calculated summary of portfolio values
         Args:
             database: database session
-            portfolio: portfolio
+            portfolio_id: portfolio id
 
         Returns:
             calculated summary of portfolio values
         """
-        portfolio_security_values = PortfolioUtils.get_portfolio_security_values(database=database, portfolio=portfolio)
+        portfolio_security_values = PortfolioUtils.get_portfolio_security_values(database=database,
+                                                                                 portfolio_id=portfolio_id)
         total_amount = Decimal(0)
         purchase_total = Decimal(0)
         market_value_total = Decimal(0)
@@ -54,19 +54,55 @@ class PortfolioUtils:
         )
 
     @staticmethod
-    def get_portfolio_security_values(database: Session, portfolio: Portfolio) -> List[PortfolioSecurityValues]:
+    def get_portfolios_values(database: Session, portfolio_ids: List[UUID]) -> Dict[UUID, PortfolioValues]:
+        """
+        Returns calculated summaries of values of multiple portfolios using one query for positions and one
+        for currency rates
+        Args:
+            database: database session
+            portfolio_ids: portfolio ids
+
+        Returns:
+            calculated summaries of portfolio values by portfolio id
+        """
+        rows = operations.get_portfolios_security_values(
+            database=database,
+            portfolio_ids=portfolio_ids
+        )
+
+        currency_rate_map = CurrencyUtils.get_currency_map(
+            database=database,
+            currencies=list(set(map(lambda x: x.currency, rows)))
+        )
+
+        result = {portfolio_id: PortfolioValues(
+            total_amount=Decimal(0),
+            purchase_total=Decimal(0),
+            market_value_total=Decimal(0)
+        ) for portfolio_id in portfolio_ids}
+
+        for row in rows:
+            portfolio_values = result[row.portfolio_id]
+            portfolio_values.total_amount += row.total_amount
+            portfolio_values.purchase_total += row.purchase_total
+            portfolio_values.market_value_total += row.market_value_total / currency_rate_map[row.currency]
+
+        return result
+
+    @staticmethod
+    def get_portfolio_security_values(database: Session, portfolio_id: UUID) -> List[PortfolioSecurityValues]:
         """
         Returns calculated values for portfolio securities. Values are returned in euros
         Args:
             database: database session
-            portfolio: portfolio
+            portfolio_id: portfolio id
 
         Returns:
             calculated values for portfolio securities
         """
         portfolio_security_values = operations.get_portfolio_security_values(
             database=database,
-            portfolio=portfolio
+            portfolio_id=portfolio_id
         )
 
         currencies = list(map(lambda x: x.currency, portfolio_security_values))
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturatedException(Exception):
+    """
+    Exception raised when process pool queue is full
+    """
+    pass
+
+
+class BoundedProcessPool:
+    """
+    Runs CPU-bound functions in a process pool with admission control. At most max_pending calls may be running or
+    queued at once and further calls are rejected. Functions and arguments must be picklable.
+
+    Worker processes are started with the forkserver start method where available and with spawn otherwise, so they
+    do not inherit locks held by other threads of the serving process. The executor is created on first use.
+    With zero workers functions are run in the thread pool instead.
+    """
+
+    instances: List["BoundedProcessPool"] = []
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        """
+        Constructor
+        Args:
+            name: name used in metrics
+            max_workers: number of worker processes
+            max_pending: max number of running and queued calls
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failures = 0
+        BoundedProcessPool.instances.append(self)
+
+    async def run(self, function: Callable[..., Any], *args) -> Any:
+        """
+        Runs function in a worker process
+        Args:
+            function: module level function
+            *args: function arguments
+
+        Returns: function result
+
+        Raises:
+            PoolSaturatedException: when max pending calls is reached
+        """
+        if self.is_saturated():
+            self.rejected += 1
+            raise PoolSaturatedException(f"{self.name} pool is saturated with {self.pending} pending calls")
+
+        self.pending += 1
+        try:
+            if self.max_workers > 0:
+                result = await asyncio.get_event_loop().run_in_executor(self.get_executor(), function, *args)
+            else:
+                result = await run_in_threadpool(function, *args)
+
+            self.completed += 1
+            return result
+        except BrokenProcessPool:
+            # Worker process died, next call starts a new pool
+            self.failures += 1
+            self.executor = None
+            raise
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.pending -= 1
+
+    def is_saturated(self) -> bool:
+        """
+        Returns whether the pool rejects new calls
+
+        Returns: whether max pending calls is reached
+        """
+        return self.pending >= self.max_pending
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """
+        Returns process pool executor, creating it when needed
+
+        Returns: executor
+        """
+        if self.executor is None:
+            logger.info(f"Starting {self.name} process pool with {self.max_workers} workers")
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.get_mp_context())
+
+        return self.executor
+
+    @staticmethod
+    def get_mp_context() -> multiprocessing.context.BaseContext:
+        """
+        Returns multiprocessing context used for starting worker processes
+
+        Returns: forkserver context where available, spawn context otherwise
+        """
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context("forkserver")
+
+        return multiprocessing.get_context("spawn")
+
+    def shutdown(self):
+        """
+        Shuts down the worker processes
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns pool counters
+
+        Returns: workers, queue depth (running and queued calls), completed, rejected and failed calls
+        """
+        return {
+            "workers": self.max_workers,
+            "queueDepth": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failures": self.failures
+        }
@@ -0,0 +1,331 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TSRATES\0"
+FORMAT_VERSION = 1
+EPOCH = date(1970, 1, 1).toordinal()
+SCALE = 6
+MISSING = -2 ** 63
+
+# magic, format version, epoch ordinal, security count, scale, created timestamp
+HEADER = struct.Struct("<8sIIIId32x")
+# security id, first day, capacity in days, data offset, row count, last day, rate sum in fixed-point
+ENTRY = struct.Struct("<16siIQqiq12x")
+# row count, last day, rate sum in fixed-point
+ENTRY_VERSION = struct.Struct("<qiq")
+ENTRY_VERSION_OFFSET = 32
+VALUE = struct.Struct("<q")
+
+# Version of rates of a security as row count, last rate date and sum of close rates
+RateVersion = Tuple[int, date, Decimal]
+
+
+class RateStoreException(Exception):
+    """
+    Exception for invalid rate store files
+    """
+    pass
+
+
+class RateStore:
+    """
+    Memory-mapped binary store of daily security rates shared by API worker processes.
+
+    The file contains a header, an index entry per security and per security contiguous arrays of fixed-point
+    close rates indexed by day offset from the epoch. Each array has headroom after the last rate so that the sync
+    service can patch new rates in place. Index entries hold the rate version of the security, which is compared
+    against the database to detect stale data.
+
+    Readers map the file read-only, so all processes share the same page cache copy. The file is mapped on first use
+    and remapped when it is replaced.
+    """
+
+    def __init__(self, path: str):
+        """
+        Constructor
+        Args:
+            path: rate store file path
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.mapped: Optional[mmap.mmap] = None
+        self.mapped_file: Optional[Tuple[int, int]] = None
+        self.entries: Dict[UUID, int] = {}
+
+    def get_rate_values(self, security_id: UUID,
+                        version: Optional[RateVersion]) -> Optional[Tuple[int, List[Optional[Decimal]]]]:
+        """
+        Returns rates of a security when the stored rates are current
+        Args:
+            security_id: security id
+            version: rate version of the security in the database
+
+        Returns: first day ordinal and daily rates with None for days without rate or None when rates are
+        missing from the store or stale
+        """
+        if version is None:
+            return None
+
+        mapped, entry_offset = self.find_entry(security_id=security_id)
+        if mapped is None or entry_offset is None:
+            return None
+
+        _, first_day, capacity, data_offset, row_count, last_day, rate_sum = ENTRY.unpack_from(mapped, entry_offset)
+        if (row_count, date.fromordinal(EPOCH + last_day), self.from_fixed_point(rate_sum)) != tuple(version):
+            return None
+
+        count = last_day - first_day + 1
+        if count > capacity:
+            return None
+
+        values = struct.unpack_from(f"<{count}q", mapped, data_offset)
+        return EPOCH + first_day, [None if x == MISSING else self.from_fixed_point(x) for x in values]
+
+    def is_current(self, versions: Dict[UUID, RateVersion]) -> bool:
+        """
+        Returns whether the store contains current rates of all given securities
+        Args:
+            versions: rate versions of securities in the database
+
+        Returns: whether the store is current
+        """
+        for security_id, version in versions.items():
+            mapped, entry_offset = self.find_entry(security_id=security_id)
+            if mapped is None or entry_offset is None:
+                return False
+
+            _, _, _, _, row_count, last_day, rate_sum = ENTRY.unpack_from(mapped, entry_offset)
+            if (row_count, date.fromordinal(EPOCH + last_day), self.from_fixed_point(rate_sum)) != tuple(version):
+                return False
+
+        return True
+
+    def find_entry(self, security_id: UUID) -> Tuple[Optional[mmap.mmap], Optional[int]]:
+        """
+        Finds index entry of a security, mapping the file when needed
+        Args:
+            security_id: security id
+
+        Returns: mapped file and entry offset. None when file or security is missing
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None, None
+
+        with self.lock:
+            if self.mapped_file != (stat.st_dev, stat.st_ino):
+                self.open()
+
+            return self.mapped, self.entries.get(security_id, None)
+
+    def open(self):
+        """
+        Maps the store file read-only and reads the security index. A previous mapping is not closed, because
+        readers may still be reading it outside the lock. It is unmapped when the last reader drops it.
+        """
+        self.mapped = None
+        self.mapped_file = None
+        self.entries = {}
+
+        try:
+            with open(self.path, "rb") as file:
+                stat = os.fstat(file.fileno())
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            entries = self.read_entries(mapped=mapped)
+        except (OSError, ValueError, struct.error, RateStoreException) as e:
+            logger.warning(f"Could not open rate store {self.path}: {e}")
+            return
+
+        self.mapped = mapped
+        self.mapped_file = (stat.st_dev, stat.st_ino)
+        self.entries = entries
+        logger.info(f"Mapped rate store {self.path} with {len(entries)} securities")
+
+    def close(self):
+        """
+        Unmaps the store file. Must not be called while other threads may be reading the store
+        """
+        if self.mapped is not None:
+            self.mapped.close()
+
+        self.mapped = None
+        self.mapped_file = None
+        self.entries = {}
+
+    @staticmethod
+    def read_entries(mapped: mmap.mmap) -> Dict[UUID, int]:
+        """
+        Reads security index of a store file
+        Args:
+            mapped: mapped store file
+
+        Returns: index entry offsets by security id
+
+        Raises:
+            RateStoreException: when file is not a rate store file of supported format
+        """
+        magic, format_version, epoch, security_count, scale, _ = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION or epoch != EPOCH or scale != SCALE:
+            raise RateStoreException("Unsupported rate store file")
+
+        return {UUID(bytes=ENTRY.unpack_from(mapped, HEADER.size + i * ENTRY.size)[0]): HEADER.size + i * ENTRY.size
+                for i in range(security_count)}
+
+    @staticmethod
+    def to_fixed_point(value: Decimal) -> int:
+        """
+        Converts rate into fixed-point integer
+        Args:
+            value: rate
+
+        Returns: fixed-point integer
+        """
+        return int(value.scaleb(SCALE))
+
+    @staticmethod
+    def from_fixed_point(value: int) -> Decimal:
+        """
+        Converts fixed-point integer into rate
+        Args:
+            value: fixed-point integer
+
+        Returns: rate with the scale of the database column
+        """
+        return Decimal(value).scaleb(-SCALE)
+
+
+class RateStoreWriter:
+    """
+    Writes and patches rate store files
+    """
+
+    @staticmethod
+    def write(path: str, securities: Iterable[Tuple[UUID, List[Tuple[date, Decimal]]]], security_count: int,
+              headroom_days: int) -> int:
+        """
+        Writes a new store file. The file is written next to the target and moved in place when complete,
+        so readers never see a partially written file.
+
+        Args:
+            path: rate store file path
+            securities: security ids with rate dates and close rates ordered by rate date
+            security_count: number of securities
+            headroom_days: days reserved after the last rate for patched rates
+
+        Returns: number of written rates
+        """
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        data_offset = HEADER.size + security_count * ENTRY.size
+        entries: List[bytes] = []
+        rate_count = 0
+
+        try:
+            with open(temp_path, "wb") as file:
+                file.seek(data_offset)
+
+                for security_id, rates in securities:
+                    if len(entries) >= security_count:
+                        raise RateStoreException("More securities than reserved in index")
+
+                    if rates:
+                        first_day = rates[0][0].toordinal() - EPOCH
+                        last_day = rates[-1][0].toordinal() - EPOCH
+                    else:
+                        first_day = date.today().toordinal() - EPOCH
+                        last_day = first_day - 1
+
+                    capacity = last_day - first_day + 1 + headroom_days
+                    values = [MISSING] * capacity
+                    rate_sum = 0
+
+                    for rate_date, rate_close in rates:
+                        value = RateStore.to_fixed_point(rate_close)
+                        values[rate_date.toordinal() - EPOCH - first_day] = value
+                        rate_sum += value
+
+                    entries.append(ENTRY.pack(security_id.bytes, first_day, capacity, data_offset, len(rates),
+                                              last_day, rate_sum))
+                    file.write(struct.pack(f"<{capacity}q", *values))
+                    data_offset += capacity * VALUE.size
+                    rate_count += len(rates)
+
+                file.seek(0)
+                file.write(HEADER.pack(MAGIC, FORMAT_VERSION, EPOCH, len(entries), SCALE, datetime.now().timestamp()))
+                file.write(b"".join(entries))
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return rate_count
+
+    @staticmethod
+    def patch(path: str, security_id: UUID, rate_date: date, rate_close: Optional[Decimal]) -> bool:
+        """
+        Patches a rate of a security in place. Rates outside the reserved days of a security can not be patched,
+        in which case the security is marked stale until the store is written again.
+
+        Args:
+            path: rate store file path
+            security_id: security id
+            rate_date: rate date
+            rate_close: close rate or None when the rate is deleted
+
+        Returns: whether the rate was patched
+        """
+        if not os.path.exists(path):
+            return False
+
+        with open(path, "r+b") as file, mmap.mmap(file.fileno(), 0) as mapped:
+            entry_offset = RateStore.read_entries(mapped=mapped).get(security_id, None)
+            if entry_offset is None:
+                return False
+
+            _, first_day, capacity, data_offset, row_count, last_day, rate_sum = \
+                ENTRY.unpack_from(mapped, entry_offset)
+            day = rate_date.toordinal() - EPOCH - first_day
+
+            if day < 0 or day >= capacity or row_count < 0:
+                ENTRY_VERSION.pack_into(mapped, entry_offset + ENTRY_VERSION_OFFSET, -1, last_day, rate_sum)
+                return False
+
+            value_offset = data_offset + day * VALUE.size
+            previous = VALUE.unpack_from(mapped, value_offset)[0]
+            value = MISSING if rate_close is None else RateStore.to_fixed_point(rate_close)
+
+            if previous != MISSING:
+                row_count -= 1
+                rate_sum -= previous
+
+            if value != MISSING:
+                row_count += 1
+                rate_sum += value
+                last_day = max(last_day, first_day + day)
+
+            VALUE.pack_into(mapped, value_offset, value)
+
+            if value == MISSING and first_day + day == last_day:
+                while last_day >= first_day and \
+                        VALUE.unpack_from(mapped, data_offset + (last_day - first_day) * VALUE.size)[0] == MISSING:
+                    last_day -= 1
+
+            # Version is written after the value, so readers see a version mismatch rather than a torn rate
+            ENTRY_VERSION.pack_into(mapped, entry_offset + ENTRY_VERSION_OFFSET, row_count, last_day, rate_sum)
+            mapped.flush()
+
+        return True
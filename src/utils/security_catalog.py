@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from config.settings import Settings
+from database import operations
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSecurity(NamedTuple):
+    """
+    Immutable copy of security columns. Has the same attribute names as the security entity, so it can be used
+    where entity columns are only read.
+    """
+    id: UUID
+    original_id: str
+    currency: Optional[str]
+    fund_id: Optional[UUID]
+    series_id: Optional[int]
+    name_fi: str
+    name_sv: str
+    name_en: str
+    updated: Optional[datetime]
+
+
+class SecurityCatalog:
+    """
+    Per process catalog of securities indexed by id and original id.
+
+    Securities updated since the last refresh are read at most once per refresh interval. Update times come from
+    the source database, so securities updated with an older time than already seen, and deleted securities not
+    noticed by the count check, are picked up by a full reload on every full reload interval. Lookup misses
+    refresh the catalog at most once per miss refresh interval, so newly migrated securities are found by the count
+    check even when their update time is older than the latest one seen, while lookups of unknown securities do not
+    query the database on every call.
+    """
+
+    instances: List["SecurityCatalog"] = []
+
+    def __init__(self, name: str, refresh_interval: float, full_reload_interval: float, miss_refresh_interval: float):
+        """
+        Constructor
+        Args:
+            name: name used in metrics
+            refresh_interval: seconds between incremental refreshes
+            full_reload_interval: seconds between full reloads
+            miss_refresh_interval: minimum seconds between refreshes caused by lookup misses
+        """
+        self.name = name
+        self.refresh_interval = refresh_interval
+        self.miss_refresh_interval = miss_refresh_interval
+        self.full_reload_interval = full_reload_interval
+        self.lock = threading.Lock()
+        self.by_id: Dict[UUID, CatalogSecurity] = {}
+        self.by_original_id: Dict[str, CatalogSecurity] = {}
+        self.max_updated: Optional[datetime] = None
+        self.refreshed: Optional[float] = None
+        self.reloaded: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.reloads = 0
+        SecurityCatalog.instances.append(self)
+
+    def find(self, database: Session, security_id: UUID) -> Optional[CatalogSecurity]:
+        """
+        Finds security by id
+
+        Args:
+            database: database session
+            security_id: security id
+
+        Returns: security or None if not found
+        """
+        self.refresh(database=database)
+        security = self.by_id.get(security_id, None)
+
+        if security is None and self.refresh(database=database, min_age=self.miss_refresh_interval):
+            security = self.by_id.get(security_id, None)
+
+        self.count(found=security is not None)
+        return security
+
+    def find_by_original_id(self, database: Session, original_id: str) -> Optional[CatalogSecurity]:
+        """
+        Finds security by original id
+
+        Args:
+            database: database session
+            original_id: original id
+
+        Returns: security or None if not found
+        """
+        self.refresh(database=database)
+        security = self.by_original_id.get(original_id, None)
+
+        if security is None and self.refresh(database=database, min_age=self.miss_refresh_interval):
+            security = self.by_original_id.get(original_id, None)
+
+        self.count(found=security is not None)
+        return security
+
+    def get_securities(self, database: Session, security_ids: Iterable[UUID]) -> Dict[UUID, CatalogSecurity]:
+        """
+        Returns securities with given ids
+
+        Args:
+            database: database session
+            security_ids: security ids
+
+        Returns: found securities by id
+        """
+        security_ids = set(security_ids)
+        self.refresh(database=database)
+
+        if not security_ids.issubset(self.by_id.keys()):
+            self.refresh(database=database, min_age=self.miss_refresh_interval)
+
+        by_id = self.by_id
+        result = {security_id: by_id[security_id] for security_id in security_ids if security_id in by_id}
+        self.count(found=len(result) == len(security_ids))
+        return result
+
+    def list_securities(self, database: Session) -> List[CatalogSecurity]:
+        """
+        Lists all securities ordered by original id
+
+        Args:
+            database: database session
+
+        Returns: securities
+        """
+        self.refresh(database=database)
+        return sorted(self.by_id.values(), key=lambda security: security.original_id)
+
+    def refresh(self, database: Session, min_age: Optional[float] = None) -> bool:
+        """
+        Reads securities updated since the last refresh, or all securities on full reload
+
+        Args:
+            database: database session
+            min_age: refresh only if the catalog is older than given seconds, defaults to refresh interval
+
+        Returns: whether catalog was refreshed
+        """
+        min_age = self.refresh_interval if min_age is None else min_age
+        if self.refreshed is not None and time.monotonic() - self.refreshed < min_age:
+            return False
+
+        with self.lock:
+            now = time.monotonic()
+            if self.refreshed is not None and now - self.refreshed < min_age:
+                return False
+
+            full = self.reloaded is None or now - self.reloaded >= self.full_reload_interval
+            by_id = {} if full else dict(self.by_id)
+
+            for row in operations.list_security_catalog_rows(database=database,
+                                                             updated_min=None if full else self.max_updated):
+                by_id[row[0]] = CatalogSecurity(*row)
+
+            if not full and operations.count_securities(database=database) != len(by_id):
+                logger.info(f"{self.name}: security count has changed, reloading catalog")
+                full = True
+                by_id = {row[0]: CatalogSecurity(*row)
+                         for row in operations.list_security_catalog_rows(database=database, updated_min=None)}
+
+            self.by_original_id = {security.original_id: security for security in by_id.values()}
+            self.by_id = by_id
+            self.max_updated = max((security.updated for security in by_id.values() if security.updated is not None),
+                                   default=None)
+            self.refreshed = now
+
+            if full:
+                self.reloaded = now
+                self.reloads += 1
+            else:
+                self.refreshes += 1
+
+            return True
+
+    def count(self, found: bool):
+        """
+        Updates lookup counters
+
+        Args:
+            found: whether lookup found all securities
+        """
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns catalog counters
+
+        Returns: catalog size, hits, misses, incremental refreshes and full reloads
+        """
+        return {
+            "size": len(self.by_id),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "reloads": self.reloads
+        }
+
+
+settings = Settings()
+security_catalog = SecurityCatalog(name="securities",
+                                   refresh_interval=settings.SECURITY_CATALOG_REFRESH_SECONDS,
+                                   full_reload_interval=settings.SECURITY_CATALOG_FULL_RELOAD_SECONDS,
+                                   miss_refresh_interval=settings.SECURITY_CATALOG_MISS_REFRESH_SECONDS)
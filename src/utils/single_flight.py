@@ -0,0 +1,141 @@
+import asyncio
+import logging
+
+from typing import Any, Callable, Dict, Hashable, List
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """
+    Computation in flight and the number of callers waiting for it
+    """
+
+    def __init__(self, task: asyncio.Task):
+        """
+        Constructor
+        Args:
+            task: computation task
+        """
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent computations. While a computation with a key is in flight, further calls with
+    the same key wait for its result instead of computing it again. Results are not cached after the computation
+    completes.
+
+    The computation runs in its own task that no caller owns, so a cancelled caller, e.g. a disconnected client,
+    does not fail the other callers. The task is cancelled only when every caller has stopped waiting.
+    Synchronous computations are run in the thread pool so that the event loop keeps serving other requests
+    meanwhile. Cancelling them discards the result, the thread runs the function to the end.
+    Coalescing is per process.
+    """
+
+    instances: List["SingleFlight"] = []
+
+    def __init__(self, name: str):
+        """
+        Constructor
+        Args:
+            name: name used in metrics
+        """
+        self.name = name
+        self.in_flight: Dict[Hashable, Flight] = {}
+        self.calls = 0
+        self.hits = 0
+        self.failures = 0
+        self.cancellations = 0
+        SingleFlight.instances.append(self)
+
+    async def run(self, key: Hashable, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs function or waits for the result of an identical computation in flight
+        Args:
+            key: computation key. Calls with equal keys must produce equal results
+            function: coroutine function or synchronous function to be run in the thread pool
+            *args: function arguments
+            **kwargs: function keyword arguments
+
+        Returns: function result
+        """
+        self.calls += 1
+
+        flight = self.in_flight.get(key, None)
+        if flight is None:
+            flight = Flight(task=asyncio.ensure_future(self.compute(function, *args, **kwargs)))
+            flight.task.add_done_callback(lambda task: self.complete(key=key, flight=flight))
+            self.in_flight[key] = flight
+        else:
+            self.hits += 1
+            logger.debug(f"{self.name}: joining computation in flight")
+
+        flight.waiters += 1
+
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+
+            if flight.waiters == 0 and not flight.task.done():
+                self.cancellations += 1
+                self.remove(key=key, flight=flight)
+                flight.task.cancel()
+
+    @staticmethod
+    async def compute(function: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs the computation
+        Args:
+            function: coroutine function or synchronous function to be run in the thread pool
+            *args: function arguments
+            **kwargs: function keyword arguments
+
+        Returns: function result
+        """
+        if asyncio.iscoroutinefunction(function):
+            return await function(*args, **kwargs)
+
+        return await run_in_threadpool(function, *args, **kwargs)
+
+    def complete(self, key: Hashable, flight: Flight):
+        """
+        Removes completed computation and counts its failure
+        Args:
+            key: computation key
+            flight: completed computation
+        """
+        self.remove(key=key, flight=flight)
+
+        # Retrieving the exception also marks it retrieved when nobody was waiting for it
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            self.failures += 1
+
+    def remove(self, key: Hashable, flight: Flight):
+        """
+        Removes computation from computations in flight unless a new computation has replaced it
+        Args:
+            key: computation key
+            flight: computation
+        """
+        if self.in_flight.get(key, None) is flight:
+            del self.in_flight[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns coalescing counters
+
+        Returns: calls, hits (calls that joined a computation in flight), failures, computations cancelled because
+        all callers stopped waiting and computations in flight
+        """
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "failures": self.failures,
+            "cancellations": self.cancellations,
+            "inFlight": len(self.in_flight)
+        }
@@ -0,0 +1,362 @@
+import logging
+import threading
+
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Hashable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from config.settings import Settings
+from database import operations
+from utils.rate_store import RateStore
+from utils.security_catalog import CatalogSecurity, security_catalog
+
+logger = logging.getLogger(__name__)
+
+SEK_SECURITY_ORIGINAL_ID = "SEK"
+
+
+class UnitValueSeries:
+    """
+    Daily unit values of a security as consecutive daily arrays of rates and divisors. Unit value of a day is
+    the rate divided by the divisor of the day, but values of holdings are calculated as amount * rate / divisor,
+    so the divisor is kept separate to produce the same Decimal digits. Days without rates are forward filled from
+    the previous rate and days after the last rate have the last value.
+    """
+
+    def __init__(self,
+                 first_date: int,
+                 values: List[Optional[Decimal]],
+                 version: Hashable,
+                 divisors: Optional[List[Optional[Decimal]]] = None):
+        """
+        Constructor
+        Args:
+            first_date: first day ordinal
+            values: daily rates, None for days without value
+            version: version of the rates the series was built from
+            divisors: daily divisors, None for days whose rate is not divided. None when no rate is divided
+        """
+        self.first_date = first_date
+        self.values = values
+        self.version = version
+        self.divisors = divisors
+
+    def get_first_date(self) -> Optional[date]:
+        """
+        Returns first date with a value
+
+        Returns: first date with a value or None if series is empty
+        """
+        for index, value in enumerate(self.values):
+            if value is not None:
+                return date.fromordinal(self.first_date + index)
+
+        return None
+
+    def get(self, value_date: date) -> Optional[Decimal]:
+        """
+        Returns unit value of a day
+        Args:
+            value_date: date
+
+        Returns: unit value or None if there is no value for the day
+        """
+        index = value_date.toordinal() - self.first_date
+        if index < 0 or not self.values:
+            return None
+
+        index = min(index, len(self.values) - 1)
+        value = self.values[index]
+        divisor = self.divisors[index] if self.divisors is not None else None
+
+        return value if value is None or divisor is None else value / divisor
+
+    def get_range(self, start_date: date, end_date: date) -> Tuple[List[Optional[Decimal]],
+                                                                   Optional[List[Optional[Decimal]]]]:
+        """
+        Returns rates and divisors of a date range
+        Args:
+            start_date: first date
+            end_date: last date
+
+        Returns: rates and divisors of each day from start date to end date. Divisors are None when no rate
+        is divided
+        """
+        divisors = self.slice(self.divisors, start_date=start_date, end_date=end_date) \
+            if self.divisors is not None else None
+
+        return self.slice(self.values, start_date=start_date, end_date=end_date), divisors
+
+    def slice(self, values: List[Optional[Decimal]], start_date: date, end_date: date) -> List[Optional[Decimal]]:
+        """
+        Returns daily values of a date range from an array aligned with the series
+        Args:
+            values: daily values aligned with the series
+            start_date: first date
+            end_date: last date
+
+        Returns: values of each day from start date to end date
+        """
+        start = start_date.toordinal() - self.first_date
+        end = end_date.toordinal() - self.first_date + 1
+
+        if not values:
+            return [None] * (end - start)
+
+        before = [None] * min(max(-start, 0), end - start)
+        middle = values[max(start, 0):max(end, 0)]
+        after = [values[-1]] * max(end - max(start, len(values)), 0)
+
+        return before + middle + after
+
+
+class UnitValueCache:
+    """
+    Per process cache of daily security unit values. Unit values are same for every customer so they are built once
+    from security rates and rebuilt when the rates of the security change.
+
+    Unit values are rates converted from FIM to EUR before the last FIM date. Currency converted unit values of
+    SEK securities are additionally divided by SEK rates.
+    """
+
+    instances: List["UnitValueCache"] = []
+
+    def __init__(self, name: str, max_size: int):
+        """
+        Constructor
+        Args:
+            name: name used in metrics
+            max_size: max number of cached series
+        """
+        self.name = name
+        self.max_size = max_size
+        self.series: "OrderedDict[Tuple[UUID, bool], UnitValueSeries]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.settings = Settings()
+        self.rate_store = RateStore(path=self.settings.RATE_STORE_PATH) if self.settings.RATE_STORE_PATH else None
+        self.hits = 0
+        self.misses = 0
+        self.store_reads = 0
+        self.database_reads = 0
+        UnitValueCache.instances.append(self)
+
+    @staticmethod
+    def is_sek_security(security: CatalogSecurity) -> bool:
+        """
+        Returns whether security rates are in SEK
+
+        Args:
+            security: security
+
+        Returns: whether security rates are in SEK
+        """
+        return "SPILTAN" in security.original_id
+
+    def find_currency_security(self,
+                               database: Session,
+                               securities: List[CatalogSecurity],
+                               convert_currency: bool) -> Optional[CatalogSecurity]:
+        """
+        Finds currency security whose rates are needed for unit values of given securities
+        Args:
+            database: database session
+            securities: securities
+            convert_currency: whether SEK security values are converted into EUR
+
+        Returns: SEK security or None if no currency conversion is needed
+        """
+        if not convert_currency or not any(map(self.is_sek_security, securities)):
+            return None
+
+        return security_catalog.find_by_original_id(
+            database=database,
+            original_id=SEK_SECURITY_ORIGINAL_ID
+        )
+
+    def get_unit_values(self,
+                        database: Session,
+                        securities: List[CatalogSecurity],
+                        convert_currency: bool) -> Dict[UUID, UnitValueSeries]:
+        """
+        Returns unit value series of securities, building series that are missing or outdated
+        Args:
+            database: database session
+            securities: securities
+            convert_currency: whether SEK security values are converted into EUR
+
+        Returns: unit value series by security id
+        """
+        sek_security = self.find_currency_security(database=database, securities=securities,
+                                                   convert_currency=convert_currency)
+
+        security_ids = [x.id for x in securities]
+        if sek_security is not None:
+            security_ids.append(sek_security.id)
+
+        versions = operations.get_security_rate_versions(database=database, security_ids=security_ids)
+        sek_version = versions.get(sek_security.id) if sek_security is not None else None
+        sek_rates: Optional[UnitValueSeries] = None
+        result: Dict[UUID, UnitValueSeries] = {}
+
+        for security in securities:
+            convert = convert_currency and self.is_sek_security(security)
+            key = (security.id, convert)
+            version = (versions.get(security.id), sek_version) if convert else versions.get(security.id)
+
+            with self.lock:
+                series = self.series.get(key, None)
+                if series is not None and series.version == version:
+                    self.hits += 1
+                    self.series.move_to_end(key)
+                    result[security.id] = series
+                    continue
+
+                self.misses += 1
+
+            logger.debug(f"{self.name}: building unit values for security {security.id}")
+            rates = self.create_rate_series(database=database, security_id=security.id,
+                                            version=versions.get(security.id))
+
+            if convert:
+                if sek_rates is None:
+                    sek_rates = self.create_rate_series(database=database,
+                                                        security_id=sek_security.id,
+                                                        version=sek_version) \
+                        if sek_security is not None else UnitValueSeries(first_date=0, values=[], version=None)
+
+                series = self.create_currency_converted_series(rates=rates, currency_rates=sek_rates,
+                                                               version=version)
+            else:
+                series = self.create_fim_converted_series(rates=rates, version=version)
+
+            with self.lock:
+                self.series[key] = series
+                self.series.move_to_end(key)
+                while len(self.series) > self.max_size:
+                    self.series.popitem(last=False)
+
+            result[security.id] = series
+
+        return result
+
+    def create_rate_series(self, database: Session, security_id: UUID, version: Hashable) -> UnitValueSeries:
+        """
+        Creates forward filled daily rate series of a security. Rates are read from the shared rate store when it
+        is current and from the database otherwise.
+
+        Args:
+            database: database session
+            security_id: security id
+            version: rate version
+
+        Returns: daily rates
+        """
+        stored = self.rate_store.get_rate_values(security_id=security_id, version=version) \
+            if self.rate_store is not None else None
+
+        if stored is not None:
+            self.store_reads += 1
+            first_date, values = stored
+        else:
+            self.database_reads += 1
+            rates = operations.list_security_rate_values(database=database, security_id=security_id)
+            if not rates:
+                return UnitValueSeries(first_date=0, values=[], version=version)
+
+            first_date = rates[0][0].toordinal()
+            values = [None] * (rates[-1][0].toordinal() - first_date + 1)
+
+            for rate_date, rate_close in rates:
+                values[rate_date.toordinal() - first_date] = rate_close
+
+        for index in range(1, len(values)):
+            if values[index] is None:
+                values[index] = values[index - 1]
+
+        return UnitValueSeries(first_date=first_date, values=values, version=version)
+
+    def get_value(self, value_date: date, amount: Decimal, rate: Decimal, currency_rate: Optional[Decimal]) -> Decimal:
+        """
+        Returns EUR value of a holding with the same conversions and operation order as history values
+        Args:
+            value_date: date of the value
+            amount: held amount
+            rate: rate of the security on the date
+            currency_rate: SEK rate on the date for currency converted SEK securities, None otherwise
+
+        Returns: value
+        """
+        if currency_rate is not None:
+            return amount * rate / currency_rate
+
+        if value_date > self.settings.LAST_FIM_DATE:
+            return amount * rate
+
+        return amount * rate / self.settings.FIM_CONVERT_RATE
+
+    def create_fim_converted_series(self, rates: UnitValueSeries, version: Hashable) -> UnitValueSeries:
+        """
+        Creates EUR unit values from daily rates by dividing FIM rates with the FIM conversion rate
+        Args:
+            rates: daily rates
+            version: rate version
+
+        Returns: daily unit values
+        """
+        last_fim_date = self.settings.LAST_FIM_DATE.toordinal()
+        fim_convert_rate = self.settings.FIM_CONVERT_RATE
+
+        if rates.first_date > last_fim_date:
+            return UnitValueSeries(first_date=rates.first_date, values=rates.values, version=version)
+
+        divisors = [None if rates.first_date + index > last_fim_date else fim_convert_rate
+                    for index in range(len(rates.values))]
+
+        return UnitValueSeries(first_date=rates.first_date, values=rates.values, version=version, divisors=divisors)
+
+    @staticmethod
+    def create_currency_converted_series(rates: UnitValueSeries,
+                                         currency_rates: UnitValueSeries,
+                                         version: Hashable) -> UnitValueSeries:
+        """
+        Creates EUR unit values from daily rates by dividing them with daily currency rates
+        Args:
+            rates: daily rates
+            currency_rates: daily currency rates
+            version: rate version
+
+        Returns: daily unit values, None for days without currency rate
+        """
+        if not rates.values:
+            return UnitValueSeries(first_date=0, values=[], version=version)
+
+        last_date = date.fromordinal(max(rates.first_date + len(rates.values),
+                                         currency_rates.first_date + len(currency_rates.values)) - 1)
+        first_date = date.fromordinal(rates.first_date)
+
+        values, _ = rates.get_range(first_date, last_date)
+        divisors, _ = currency_rates.get_range(first_date, last_date)
+        values = [rate if divisor is not None else None for rate, divisor in zip(values, divisors)]
+
+        return UnitValueSeries(first_date=rates.first_date, values=values, version=version, divisors=divisors)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns cache counters
+
+        Returns: cached series, hits, misses and whether missing series were read from rate store or database
+        """
+        return {
+            "size": len(self.series),
+            "hits": self.hits,
+            "misses": self.misses,
+            "storeReads": self.store_reads,
+            "databaseReads": self.database_reads
+        }
+
+
+unit_value_cache = UnitValueCache(name="unitValues", max_size=Settings().UNIT_VALUE_CACHE_SIZE)